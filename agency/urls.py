@@ -22,6 +22,8 @@ from recruiter.views import (
     applicants,
     view_company,
     multiple_resume_upload,
+    resume_batch_upload,
+    resume_batch_status,
     enable_email_notifications,
     edit_company,
     company_recruiter_list,
@@ -170,6 +172,12 @@ urlpatterns = [
         multiple_resume_upload,
         name="multiple_resume_upload",
     ),
+    url(r"^resume/batch/$", resume_batch_upload, name="resume_batch_upload"),
+    url(
+        r"^resume/batch/(?P<batch_id>[0-9]+)/$",
+        resume_batch_status,
+        name="resume_batch_status",
+    ),
     url(r"^resume/edit/(?P<resume_id>[a-zA-Z0-9]+)/$", resume_edit, name="resume_edit"),
     url(r"^resume/view/(?P<resume_id>[a-zA-Z0-9]+)/$", resume_view, name="resume_view"),
     url(
@@ -15,18 +15,32 @@ from django.core.files.storage import default_storage
 from datetime import datetime
 
 from mpcomp.views import jobseeker_login_required
-from mpcomp.views import get_resume_data, handle_uploaded_file
-from peeldb.models import City, Country, FunctionalArea, Industry, Language, Skill, UserMessage, Project, UserLanguage, EmploymentHistory, EducationDetails, EducationInstitue, Degree, Qualification, TechnicalSkill, Certification
+from mpcomp.views import get_resume_data
+from mpcomp.reference_data import reference_data
+from peeldb.models import City, Country, FunctionalArea, Industry, Language, Skill, State, UserMessage, Project, UserLanguage, EmploymentHistory, EducationDetails, EducationInstitue, Degree, Qualification, TechnicalSkill, Certification
 
 
 from candidate.utils.recommend import recommend_internships
+
+
+def cities_json_rows(rows):
+    states = dict(State.objects.values_list("id", "name"))
+    return json.dumps([
+        {
+            'id': city['id'],
+            'name': city['name'],
+            'state': states.get(city['state'], '')
+        }
+        for city in rows
+        if city['status'] == "Enabled" and "india" not in city['slug'].lower()
+    ])
+
+
 @jobseeker_login_required
 def my_home(request):
     """need to check user login or not"""
     messages = UserMessage.objects.filter(message_to=request.user.id, is_read=False)
     user = request.user
-    user.profile_completeness = user.profile_completion_percentage
-    user.save()
 
     nationality = ""
     functional_areas = FunctionalArea.objects.filter(status="Active").order_by(
@@ -66,15 +80,11 @@ def my_home(request):
     # Get qualifications for education form
     qualifications = Qualification.objects.filter(status="Active").order_by("name")
     
-    # Prepare cities as JSON for the basic profile edit modal
-    cities_json = json.dumps([
-        {
-            'id': city.id,
-            'name': city.name,
-            'state': city.state.name if city.state else ''
-        }
-        for city in cities
-    ])
+    # Prepare cities as JSON for the basic profile edit modal, encoded once
+    # per version of the cities and states
+    cities_json = reference_data.snapshot("city").derived(
+        "cities_json:%s" % reference_data.snapshot("state").version, cities_json_rows
+    )
     
     return render(
         request,
@@ -1815,7 +1825,6 @@ def upload_resume_modal(request):
             
             # Extract resume data (optional - keep existing functionality)
             try:
-                handle_uploaded_file(resume_file, resume_file.name)
                 email, mobile, text = get_resume_data(resume_file)
                 request.user.resume_text = text
                 
@@ -1996,7 +2005,6 @@ def update_resume_modal(request):
             
             # Extract resume data
             try:
-                handle_uploaded_file(resume_file, resume_file.name)
                 email, mobile, text = get_resume_data(resume_file)
                 request.user.resume_text = text
                 
@@ -2072,8 +2080,6 @@ def edit_basic_profile(request):
             user.year = year if year else ''
             user.month = month if month else ''
             
-            # Update profile completeness
-            user.profile_completeness = user.profile_completion_percentage
             user.profile_updated = timezone.now()
             
             user.save()
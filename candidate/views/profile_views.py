@@ -35,9 +35,6 @@ def profile(request):
     """need to check user login or not"""
     if request.user.is_authenticated:
         messages = UserMessage.objects.filter(message_to=request.user.id, is_read=False)
-        user = request.user
-        user.profile_completeness = user.profile_completion_percentage
-        user.save()
 
         nationality = ""
         functional_areas = FunctionalArea.objects.filter(status="Active").order_by(
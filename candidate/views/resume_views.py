@@ -12,7 +12,6 @@ from mpcomp.s3_utils import S3Connection
 from mpcomp.views import (
     jobseeker_login_required,
     get_resume_data,
-    handle_uploaded_file,
 )
 
 
@@ -60,9 +59,6 @@ def upload_resume(request):
                 )
                 request.user.resume = path
                 request.user.profile_updated = timezone.now()
-                handle_uploaded_file(
-                    request.FILES["resume"], request.FILES["resume"].name
-                )
                 email, mobile, text = get_resume_data(request.FILES["resume"])
                 request.user.resume_text = text
                 if not request.user.mobile:
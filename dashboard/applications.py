@@ -0,0 +1,142 @@
+import logging
+import os
+from email.mime.application import MIMEApplication
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from functools import lru_cache
+
+import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError, HTTPClientError
+from botocore.exceptions import ConnectionError as AWSConnectionError
+from django.conf import settings
+from django.db import transaction
+from django.template import loader
+
+from peeldb.models import AppliedJobs
+
+logger = logging.getLogger(__name__)
+
+# HTTP connections each shared AWS client keeps open, per worker process
+AWS_MAX_POOL_CONNECTIONS = 10
+
+
+@lru_cache(maxsize=None)
+def aws_client(service):
+    """boto3 client of service shared by the process, boto3 clients are
+    thread safe and reuse their connections between calls."""
+    region_name = None
+    if service == "ses":
+        region_name = settings.AWS_SES_REGION_NAME or "eu-west-1"
+    return boto3.client(
+        service,
+        region_name=region_name,
+        aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+        aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+        config=Config(max_pool_connections=AWS_MAX_POOL_CONNECTIONS),
+    )
+
+
+# error codes of S3 and SES a retry can get past, the others are rejections
+AWS_TRANSIENT_ERROR_CODES = frozenset(
+    [
+        "Throttling",
+        "ThrottlingException",
+        "TooManyRequestsException",
+        "RequestLimitExceeded",
+        "SlowDown",
+        "RequestTimeout",
+        "ServiceUnavailable",
+        "InternalError",
+        "InternalFailure",
+    ]
+)
+
+
+class TransientAWSError(Exception):
+    """A throttled or failed AWS request, the task is retried."""
+
+
+def is_transient_aws_error(exc):
+    """Whether exc, raised by a boto3 client, may pass on a retry."""
+    if isinstance(exc, ClientError):
+        status = exc.response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+        return (
+            exc.response.get("Error", {}).get("Code") in AWS_TRANSIENT_ERROR_CODES
+            or (status or 0) >= 500
+        )
+    return isinstance(exc, (AWSConnectionError, HTTPClientError))
+
+
+def resume_attachment(user):
+    """(filename, content) of the jobseeker's resume read from S3 into
+    memory, None when it is missing. Connection errors and throttling are
+    raised, so the task is retried."""
+    key = user.resume.name.encode("ascii", "ignore").decode("ascii")
+    try:
+        response = aws_client("s3").get_object(
+            Bucket=settings.AWS_STORAGE_BUCKET_NAME, Key=key
+        )
+    except ClientError as exc:
+        if is_transient_aws_error(exc):
+            raise
+        logger.warning("resume %s of user %s could not be read", key, user.id)
+        return None
+    filename = str(user.email) + (os.path.splitext(key)[1] or ".docx")
+    return filename, response["Body"].read()
+
+
+def application_message(applied_job):
+    job_post = applied_job.job_post
+    rendered = loader.get_template("email/applicant_apply_job.html").render(
+        {"user": applied_job.user, "recruiter": job_post.user, "job_post": job_post}
+    )
+    message = MIMEMultipart()
+    message["Subject"] = "Resume Alert - " + job_post.title
+    message["From"] = settings.DEFAULT_FROM_EMAIL
+    message["To"] = job_post.user.email
+    message.attach(MIMEText(rendered, "html"))
+    attachment = (
+        resume_attachment(applied_job.user) if applied_job.user.resume else None
+    )
+    if attachment:
+        filename, content = attachment
+        part = MIMEApplication(content)
+        part.add_header("Content-Disposition", "attachment", filename=filename)
+        message.attach(part)
+    return message
+
+
+def send_application_notification(applied_job_id):
+    """Mails the recruiter of the job the application with the resume
+    attached, returns False when the application is gone."""
+    applied_job = (
+        AppliedJobs.objects.filter(id=applied_job_id, user__isnull=False)
+        .select_related("user", "job_post__user")
+        .first()
+    )
+    if not applied_job:
+        return False
+    message = application_message(applied_job)
+    aws_client("ses").send_raw_email(
+        Source=message["From"],
+        Destinations=[message["To"]],
+        RawMessage={"Data": message.as_string()},
+    )
+    return True
+
+
+def enqueue_application_notification(applied_job_id):
+    from dashboard.tasks import sending_application_notification
+
+    try:
+        sending_application_notification.delay(applied_job_id)
+    except Exception:
+        # the application is saved either way
+        logger.exception("could not queue the notification of %s", applied_job_id)
+
+
+def notify_application(applied_job):
+    """Queues the recruiter notification of a new application, once the
+    AppliedJobs row is committed."""
+    transaction.on_commit(lambda: enqueue_application_notification(applied_job.id))
@@ -0,0 +1,165 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from django.template import loader
+
+from peeldb.models import JobPost, User
+
+JOB_ALERT_SUBJECT = "Top Matching Jobs for your Profile - CareerLite"
+JOB_ALERT_JOBS = 10
+# jobseekers loaded per keyset page, and recipients per send_bulk_email task
+JOB_ALERT_USER_CHUNK = 1000
+JOB_ALERT_MAIL_BATCH = 100
+
+
+class JobAlertFanout(object):
+    """
+    Matches the jobs published since `since` against every jobseeker who
+    gets email notifications, with the jobs indexed by skill and city once
+    per run and the users streamed in keyset pages.
+
+    batches() yields lists of [mto, subject, body] for send_bulk_email.
+    """
+
+    def __init__(
+        self,
+        since=None,
+        until=None,
+        chunk_size=JOB_ALERT_USER_CHUNK,
+        batch_size=JOB_ALERT_MAIL_BATCH,
+    ):
+        self.until = until or datetime.now()
+        self.since = since or self.until - timedelta(days=1)
+        self.chunk_size = chunk_size
+        self.batch_size = batch_size
+        self.template = loader.get_template("email/job_alert.html")
+        self.jobs = {}
+        self.users = 0
+        self.messages = 0
+
+    def build_index(self):
+        # new jobs by skill and by city
+        self.new_by_skill = defaultdict(set)
+        self.new_by_city = defaultdict(set)
+        new_jobs = JobPost.objects.filter(
+            published_on__range=(self.since, self.until), status="Live"
+        ).values_list("id", "skill_ids", "location_ids")
+        for job_id, skill_ids, location_ids in new_jobs:
+            for skill_id in skill_ids:
+                self.new_by_skill[skill_id].add(job_id)
+            for city_id in location_ids:
+                self.new_by_city[city_id].add(job_id)
+
+        # newest live jobs per skill, to fill alerts with fewer than 10 matches
+        self.live_by_skill = defaultdict(list)
+        self.created_on = {}
+        live_jobs = (
+            JobPost.objects.filter(
+                status="Live", skill_ids__overlap=list(self.new_by_skill)
+            )
+            .order_by("-created_on", "-id")
+            .values_list("id", "created_on", "skill_ids")
+        )
+        for job_id, created_on, skill_ids in live_jobs:
+            self.created_on[job_id] = created_on
+            for skill_id in skill_ids:
+                if len(self.live_by_skill[skill_id]) < JOB_ALERT_JOBS:
+                    self.live_by_skill[skill_id].append(job_id)
+
+    def users_after(self, last_id):
+        return list(
+            User.objects.filter(
+                id__gt=last_id,
+                email_notifications=True,
+                user_type="JS",
+                is_bounce=False,
+                is_unsubscribe=False,
+                skills__skill__id__in=list(self.new_by_skill),
+            )
+            .distinct()
+            .only("id", "email", "current_city", "unsubscribe_code")
+            .order_by("id")[: self.chunk_size]
+        )
+
+    def user_skills(self, users):
+        skills = defaultdict(set)
+        rows = User.skills.through.objects.filter(
+            user_id__in=[user.id for user in users]
+        ).values_list("user_id", "technicalskill__skill_id")
+        for user_id, skill_id in rows:
+            skills[user_id].add(skill_id)
+        return skills
+
+    def match(self, skills, city_id):
+        """Top job ids: new jobs in the user's city by skill overlap, then
+        the newest live jobs with the user's skills."""
+        in_city = self.new_by_city.get(city_id)
+        if not in_city:
+            return []
+        scores = defaultdict(int)
+        for skill_id in skills:
+            for job_id in self.new_by_skill.get(skill_id, set()) & in_city:
+                scores[job_id] += 1
+        if not scores:
+            return []
+        picked = sorted(
+            scores,
+            key=lambda job_id: (scores[job_id], self.created_on[job_id], job_id),
+            reverse=True,
+        )[:JOB_ALERT_JOBS]
+        if len(picked) < JOB_ALERT_JOBS:
+            extra = set()
+            for skill_id in skills:
+                extra.update(self.live_by_skill.get(skill_id, ()))
+            extra.difference_update(picked)
+            picked += sorted(
+                extra,
+                key=lambda job_id: (self.created_on[job_id], job_id),
+                reverse=True,
+            )[: JOB_ALERT_JOBS - len(picked)]
+        return picked
+
+    def load_jobs(self, job_ids):
+        missing = set(job_ids) - set(self.jobs)
+        if missing:
+            for job in (
+                JobPost.objects.filter(id__in=missing)
+                .select_related("company")
+                .prefetch_related("skills", "industry", "location")
+            ):
+                self.jobs[job.id] = job
+
+    def batches(self):
+        self.build_index()
+        if not self.new_by_skill:
+            return
+        batch = []
+        last_id = 0
+        while True:
+            users = self.users_after(last_id)
+            if not users:
+                break
+            last_id = users[-1].id
+            self.users += len(users)
+            skills = self.user_skills(users)
+            picks = [
+                (user, self.match(skills[user.id], user.current_city_id))
+                for user in users
+            ]
+            self.load_jobs(job_id for _, job_ids in picks for job_id in job_ids)
+            for user, job_ids in picks:
+                if not job_ids:
+                    continue
+                body = self.template.render(
+                    {
+                        "jobposts": [self.jobs[job_id] for job_id in job_ids],
+                        "user": user,
+                    }
+                )
+                batch.append([[user.email], JOB_ALERT_SUBJECT, body])
+                self.messages += 1
+                if len(batch) == self.batch_size:
+                    yield batch
+                    batch = []
+        if batch:
+            yield batch
@@ -0,0 +1,334 @@
+import hashlib
+from collections import Counter
+from datetime import datetime, timedelta
+
+from django.db.models import Count, Q
+from django.db.models.functions import Lower
+
+from mpcomp.cache import PrefixedCache
+from peeldb.models import AppliedJobs, DailyReport, JobPost, Skill, Ticket, User
+
+REPORT_JOB_TYPES = (
+    ("full_time", "full-time"),
+    ("govt", "government"),
+    ("internship", "internship"),
+    ("walkin", "walk-in"),
+)
+REPORT_JOB_STATUSES = ("Draft", "Pending", "Published", "Live", "Disabled")
+# the skills charted on the reports page when none are selected
+REPORT_SKILLS = (
+    "java",
+    "html",
+    "php",
+    "android",
+    ".net",
+    "bpo",
+    "testing",
+    "javascript",
+    "c#",
+    "adobe photoshop",
+    "fresher",
+    "css",
+    "mysql",
+    "j2ee",
+    "sql server",
+    "sales",
+    "marketing",
+    "accounting",
+    "technical support",
+    "python",
+)
+REPORT_RANGE_FORMAT = "%b %d, %Y %H:%M"
+# the reports page charts are allowed to lag the tables by this many seconds
+REPORTS_TIMEOUT = 10 * 60
+
+reports_cache = PrefixedCache("reports", REPORTS_TIMEOUT)
+
+
+# (registered_from, total, login only once, with resume, profile >= 50, applied)
+REPORT_APPLICANT_KEYS = (
+    (
+        "Social",
+        "today_applicants_count",
+        "today_login_only_once_applicants_count",
+        "today_resume_applicants_count",
+        "today_profile_applicants_count",
+        "today_applied_applicants_count",
+    ),
+    (
+        "Email",
+        "today_register_applicants_count",
+        "today_register_login_only_once_applicants_count",
+        "today_register_resume_applicants_count",
+        "today_register_profile_applicants_count",
+        "today_register_applied_applicants_count",
+    ),
+    (
+        "Resume",
+        "resume_applicants_count",
+        "resume_login_once_applicants_count",
+        "resume_uploaded_applicants_count",
+        "resume_profile_applicants_count",
+        "resume_applied_applicants_count",
+    ),
+)
+
+
+def day_filter(field, day):
+    start = datetime(day.year, day.month, day.day)
+    return {field + "__gte": start, field + "__lt": start + timedelta(days=1)}
+
+
+def get_jobpost_counts(day):
+    """{(job_type, status, is_superuser): count} for jobs published on day"""
+    rows = (
+        JobPost.objects.filter(**day_filter("published_on", day))
+        .values_list("job_type", "status", "user__is_superuser")
+        .annotate(num=Count("id"))
+        .order_by()
+    )
+    return {(job_type, status, admin): num for job_type, status, admin, num in rows}
+
+
+def get_user_counts(day):
+    return list(
+        User.objects.filter(**day_filter("date_joined", day))
+        .values("user_type", "registered_from", "is_active", "is_login")
+        .annotate(
+            num=Count("id"),
+            with_resume=Count("id", filter=~Q(resume="")),
+            profiled=Count("id", filter=Q(profile_completeness__gte=50)),
+        )
+        .order_by()
+    )
+
+
+def get_applied_counts(day):
+    """application count plus distinct applicants per registered_from"""
+    rows = (
+        AppliedJobs.objects.filter(**day_filter("applied_on", day))
+        .values("user__registered_from")
+        .annotate(num=Count("id"), users=Count("user", distinct=True))
+        .order_by()
+    )
+    applications = 0
+    applied_users = Counter()
+    for row in rows:
+        applications += row["num"]
+        applied_users[row["user__registered_from"]] += row["users"]
+    return applications, applied_users
+
+
+def get_ticket_counts(day):
+    rows = (
+        Ticket.objects.filter(**day_filter("created_on", day))
+        .values_list("status")
+        .annotate(num=Count("id"))
+        .order_by()
+    )
+    return dict(rows)
+
+
+def sum_users(rows, field="num", **conditions):
+    return sum(
+        row[field]
+        for row in rows
+        if all(row[key] == value for key, value in conditions.items())
+    )
+
+
+def get_daily_report_data(day):
+    """The daily_report template context for one day, from grouped queries."""
+    jobs = get_jobpost_counts(day)
+    users = get_user_counts(day)
+    applications, applied_users = get_applied_counts(day)
+    tickets = get_ticket_counts(day)
+
+    def jobs_count(admin, job_type=None, status=None):
+        return sum(
+            num
+            for (row_type, row_status, row_admin), num in jobs.items()
+            if row_admin == admin
+            and (job_type is None or row_type == job_type)
+            and (status is None or row_status == status)
+        )
+
+    data = {
+        "current_date": day.strftime("%Y-%m-%d"),
+        "today_active_tickets": tickets.get("Open", 0),
+        "today_closed_tickets": tickets.get("Closed", 0),
+        "today_job_applications": applications,
+        "today_jobs_count": jobs_count(False),
+        "today_admin_jobs_count": jobs_count(True),
+        "today_all_applicants_count": sum_users(users, user_type="JS"),
+    }
+    for status in REPORT_JOB_STATUSES:
+        name = status.lower()
+        data["today_jobs_%s_count" % name] = jobs_count(False, status=status)
+        data["today_admin_%s_jobs_count" % name] = jobs_count(True, status=status)
+    for prefix, job_type in REPORT_JOB_TYPES:
+        data["today_%s_jobs_count" % prefix] = jobs_count(False, job_type)
+        data["today_admin_%s_jobs_count" % prefix] = jobs_count(True, job_type)
+        for status in REPORT_JOB_STATUSES:
+            name = status.lower()
+            if prefix == "full_time":
+                key = "today_full_time_%s_jobs_count" % name
+            else:
+                key = "today_%s_jobs_%s_count" % (prefix, name)
+            data[key] = jobs_count(False, job_type, status)
+            data["today_admin_%s_%s_jobs_count" % (prefix, name)] = jobs_count(
+                True, job_type, status
+            )
+
+    for registered_from, total, login_once, resume, profile, applied in (
+        REPORT_APPLICANT_KEYS
+    ):
+        source = {"user_type": "JS", "registered_from": registered_from}
+        data[total] = sum_users(users, **source)
+        data[login_once] = sum_users(users, is_login=False, **source)
+        data[resume] = sum_users(users, "with_resume", **source)
+        data[profile] = sum_users(users, "profiled", **source)
+        data[applied] = applied_users[registered_from]
+
+    pool = {"user_type": "JS", "registered_from": "ResumePool"}
+    data["resumepool_applicants"] = sum_users(users, **pool)
+    data["resumepool_login_once_applicants"] = sum_users(users, is_login=False, **pool)
+    data["resumepool_profile_applicants"] = sum_users(users, "profiled", **pool)
+    data["resumepool_applied_applicants"] = applied_users["Resume"]
+
+    for prefix, user_type in (("today", "RR"), ("today_agency", "AA")):
+        data[prefix + "_recruiters_count"] = sum_users(users, user_type=user_type)
+        data[prefix + "_active_recruiters"] = sum_users(
+            users, user_type=user_type, is_active=True
+        )
+        data[prefix + "_inactive_recruiters"] = sum_users(
+            users, user_type=user_type, is_active=False
+        )
+    data["today_total_recruiters"] = (
+        data["today_recruiters_count"] + data["today_agency_recruiters_count"]
+    )
+    return data
+
+
+def save_daily_report(day):
+    report, _ = DailyReport.objects.update_or_create(
+        date=day, defaults={"data": get_daily_report_data(day)}
+    )
+    return report
+
+
+def get_daily_report(day):
+    """Stored rollup for a past day, materialized on first read."""
+    report = DailyReport.objects.filter(date=day).first()
+    if report:
+        return report.data
+    if day < datetime.now().date():
+        return save_daily_report(day).data
+    return get_daily_report_data(day)
+
+
+def parse_report_range(timestamp):
+    """(start, end) of a "<start> - <end>" range of the reports page, None
+    when there is none or it does not parse."""
+    try:
+        start, end = (timestamp or "").split(" - ")
+        return (
+            datetime.strptime(start, REPORT_RANGE_FORMAT),
+            datetime.strptime(end, REPORT_RANGE_FORMAT),
+        )
+    except ValueError:
+        return None
+
+
+def get_city_recruiters(date_range=None):
+    """[(city, active, inactive)] of the recruiters joined in date_range, by
+    city id."""
+    users = User.objects.exclude(user_type="JS").filter(city__isnull=False)
+    if date_range:
+        users = users.filter(date_joined__range=date_range)
+    rows = (
+        users.values_list("city_id", "city__name")
+        .annotate(
+            active=Count("id", filter=Q(is_active=True)),
+            inactive=Count("id", filter=Q(is_active=False)),
+        )
+        .order_by("city_id")
+    )
+    return [(name, active, inactive) for _, name, active, inactive in rows]
+
+
+def get_city_live_jobs(date_range=None):
+    """[(city, count)] of the live jobs published in date_range, by city
+    id."""
+    rows = JobPost.location.through.objects.filter(jobpost__status="Live")
+    if date_range:
+        rows = rows.filter(jobpost__published_on__range=date_range)
+    rows = (
+        rows.values_list("city_id", "city__name")
+        .annotate(num=Count("jobpost_id"))
+        .order_by("city_id")
+    )
+    return [(name, num) for _, name, num in rows]
+
+
+def get_skill_live_jobs(names, date_range=None):
+    """[(skill, count)] of the live jobs published in date_range in each of
+    names, matched case insensitively, in the order of names. Skills
+    without such jobs are left out."""
+    lowered = {name.lower() for name in names}
+    skills = {}
+    for lower, name in (
+        Skill.objects.annotate(lower=Lower("name"))
+        .filter(lower__in=lowered)
+        .order_by("-id")
+        .values_list("lower", "name")
+    ):
+        skills[lower] = name
+    rows = JobPost.skills.through.objects.annotate(lower=Lower("skill__name")).filter(
+        lower__in=lowered, jobpost__status="Live"
+    )
+    if date_range:
+        rows = rows.filter(jobpost__published_on__range=date_range)
+    counts = dict(
+        rows.values_list("lower")
+        .annotate(num=Count("jobpost_id", distinct=True))
+        .order_by()
+    )
+    return [
+        (skills[name.lower()], counts[name.lower()])
+        for name in names
+        if counts.get(name.lower())
+    ]
+
+
+def compute_reports_data(date_range=None, skill_ids=None):
+    if skill_ids:
+        names = list(
+            Skill.objects.filter(id__in=skill_ids).values_list("name", flat=True)
+        )
+    else:
+        names = REPORT_SKILLS
+    return {
+        "recruiters": get_city_recruiters(date_range),
+        "jobs": get_city_live_jobs(date_range),
+        "skills": names,
+        "skill_jobs": get_skill_live_jobs(names, date_range),
+    }
+
+
+def get_reports_data(date_range=None, skill_ids=None):
+    """
+    {"recruiters", "jobs", "skills", "skill_jobs"} charted on the reports
+    page for date_range and the selected skill_ids, from a few grouped
+    queries and cached per range and selection for REPORTS_TIMEOUT.
+    """
+    skill_ids = sorted(set(skill_ids or ()))
+    key = hashlib.sha1(
+        repr(
+            (
+                [value.isoformat() for value in date_range or ()],
+                skill_ids,
+            )
+        ).encode()
+    ).hexdigest()
+    return reports_cache.get(key, lambda: compute_reports_data(date_range, skill_ids))
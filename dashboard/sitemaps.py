@@ -0,0 +1,400 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from datetime import datetime
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.db.models import Count, Q
+
+from peeldb.job_counters import job_counts
+from peeldb.models import (
+    City,
+    Company,
+    Industry,
+    JobPost,
+    Qualification,
+    Skill,
+    State,
+    User,
+)
+
+logger = logging.getLogger(__name__)
+
+SITE_URL = "https://peeljobs.com"
+SITEMAP_URL = SITE_URL + "/sitemap/"
+MAX_SITEMAP_URLS = 50000
+MANIFEST_NAME = "manifest.json"
+
+
+def atomic_write(path, write, compress=False):
+    """Writes through write(file) into a temp file renamed over path."""
+    directory = os.path.dirname(path)
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as raw:
+            if compress:
+                with gzip.GzipFile(
+                    filename=os.path.basename(path)[:-3], mode="wb", fileobj=raw
+                ) as zipped:
+                    write(zipped)
+            else:
+                write(raw)
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def write_urlset(urls, changefreq="daily", priority="0.5"):
+    def write(out):
+        out.write(
+            b'<?xml version="1.0" encoding="UTF-8"?>\n'
+            b'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+        )
+        for url in urls:
+            out.write(
+                (
+                    "<url><loc>%s</loc><changefreq>%s</changefreq>"
+                    "<priority>%s</priority></url>\n"
+                    % (escape(url), changefreq, priority)
+                ).encode("ascii", "ignore")
+            )
+        out.write(b"</urlset>\n")
+
+    return write
+
+
+class SitemapBuilder(object):
+    """
+    Writes sitemap sections as gzipped shards of at most MAX_SITEMAP_URLS
+    urls. A shard whose urls hash the same as in the previous run's manifest
+    is left untouched, and shards no longer produced are removed.
+    """
+
+    def __init__(self, directory=None, max_urls=MAX_SITEMAP_URLS):
+        self.directory = directory or settings.SITEMAP_DIR
+        self.max_urls = max_urls
+        os.makedirs(self.directory, exist_ok=True)
+        self.manifest = self.load_manifest()
+        self.shards = {}
+        self.stats = []
+
+    def load_manifest(self):
+        try:
+            with open(os.path.join(self.directory, MANIFEST_NAME)) as manifest:
+                return json.load(manifest)
+        except (IOError, ValueError):
+            return {}
+
+    def write_shard(self, file_name, urls, started):
+        digest = hashlib.sha1("\n".join(urls).encode("utf-8")).hexdigest()
+        path = os.path.join(self.directory, file_name)
+        changed = self.manifest.get(file_name) != digest or not os.path.exists(path)
+        if changed:
+            atomic_write(path, write_urlset(urls), compress=True)
+        self.shards[file_name] = digest
+        stat = {
+            "file": file_name,
+            "urls": len(urls),
+            "written": changed,
+            "seconds": round(time.monotonic() - started, 3),
+        }
+        self.stats.append(stat)
+        logger.info(
+            "sitemap %(file)s urls=%(urls)s written=%(written)s " "seconds=%(seconds)s",
+            stat,
+        )
+
+    def add_section(self, name, urls, skip_empty=False):
+        started = time.monotonic()
+        shard = []
+        index = 0
+        for url in urls:
+            shard.append(url)
+            if len(shard) == self.max_urls:
+                self.write_shard(self.shard_name(name, index), shard, started)
+                shard = []
+                index += 1
+                started = time.monotonic()
+        if shard or (index == 0 and not skip_empty):
+            self.write_shard(self.shard_name(name, index), shard, started)
+
+    def shard_name(self, name, index):
+        if index:
+            return "sitemap-%s-%d.xml.gz" % (name, index)
+        return "sitemap-%s.xml.gz" % name
+
+    def finish(self):
+        for file_name in set(self.manifest) - set(self.shards):
+            path = os.path.join(self.directory, file_name)
+            if os.path.exists(path):
+                os.remove(path)
+
+        def write_index(out):
+            lastmod = datetime.now().strftime("%Y-%m-%d")
+            out.write(
+                b'<?xml version="1.0" encoding="UTF-8"?>\n'
+                b'<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+            )
+            for file_name in sorted(self.shards):
+                out.write(
+                    (
+                        "<sitemap><loc>%s%s</loc><lastmod>%s</lastmod></sitemap>\n"
+                        % (SITEMAP_URL, file_name, lastmod)
+                    ).encode("ascii")
+                )
+            out.write(b"</sitemapindex>\n")
+
+        atomic_write(os.path.join(self.directory, "sitemap.xml"), write_index)
+        atomic_write(
+            os.path.join(self.directory, MANIFEST_NAME),
+            lambda out: out.write(json.dumps(self.shards, indent=1).encode("utf-8")),
+        )
+        return self.stats
+
+
+def live_job_counts(group_by):
+    """{id: (jobs, walkins, fresher jobs)} of live jobs grouped by group_by"""
+    rows = (
+        JobPost.objects.filter(status="Live")
+        .values_list(*group_by)
+        .annotate(
+            jobs=Count("id", distinct=True),
+            walkins=Count("id", distinct=True, filter=Q(job_type="walk-in")),
+            freshers=Count("id", distinct=True, filter=Q(min_year=0)),
+        )
+        .order_by()
+    )
+    size = len(group_by)
+    return {
+        (row[0] if size == 1 else row[:size]): row[size:]
+        for row in rows
+        if None not in row[:size]
+    }
+
+
+def counter_counts(kind):
+    """{id: (jobs, walkins, fresher jobs)} of live jobs from the job counters"""
+    walkins = job_counts.counts(kind, "walk-in")
+    freshers = job_counts.counts(kind, "fresher")
+    return {
+        object_id: (jobs, walkins.get(object_id, 0), freshers.get(object_id, 0))
+        for object_id, jobs in job_counts.counts(kind).items()
+    }
+
+
+def split_urls(items, has_jobs, url):
+    """Splits items into urls with and without jobs."""
+    with_jobs, without_jobs = [], []
+    for item in items:
+        (with_jobs if has_jobs(item) else without_jobs).append(url(item))
+    return with_jobs, without_jobs
+
+
+def page_urls(no_pages):
+    now = datetime.now()
+    yield SITE_URL + "/"
+    yield SITE_URL + "/sitemap/"
+    for each in range(1, no_pages):
+        yield SITE_URL + "/sitemap/" + str(each) + "/"
+    for path in [
+        "post-job/",
+        "internship-jobs/",
+        "government-jobs/",
+        "full-time-jobs/",
+        "walkin-jobs/",
+        "alert/list/",
+        "jobs-by-location/",
+        "jobs-by-skill/",
+        "jobs-by-industry/",
+        "calendar/%s/" % now.year,
+        "calendar/%s/month/%s/" % (now.year, now.month),
+        "page/about-us/",
+        "page/terms-conditions/",
+        "page/privacy-policy/",
+        "page/contact-us/",
+        "page/faq/",
+        "page/recruiter-faq/",
+        "recruiters/",
+        "companies/",
+        "jobs/",
+        "fresher-jobs-by-skills/",
+        "walkin-jobs-by-skills/",
+        "walkins-by-location/",
+        "jobs-by-degree/",
+        "fresher-jobs-by-location/",
+    ]:
+        yield SITE_URL + "/" + path
+
+
+def generate_sitemaps(directory=None):
+    builder = SitemapBuilder(directory)
+    empty = (0, 0, 0)
+
+    skills = list(
+        Skill.objects.filter(status="Active")
+        .exclude(name__iexact="Fresher")
+        .values_list("id", "slug")
+    )
+    cities = list(City.objects.filter(status="Enabled").values_list("id", "slug"))
+    skill_counts = counter_counts("skill")
+    city_counts = counter_counts("city")
+    pair_counts = live_job_counts(["skills", "location"])
+
+    builder.add_section(
+        "jobs",
+        (
+            SITE_URL + slug
+            for slug in JobPost.objects.filter(status="Live")
+            .order_by("id")
+            .values_list("slug", flat=True)
+            .iterator()
+        ),
+    )
+
+    for name, column, url in [
+        ("skills", 0, lambda skill: "%s/%s-jobs/" % (SITE_URL, skill[1])),
+        ("skill-walkins", 1, lambda skill: "%s/%s-walkins/" % (SITE_URL, skill[1])),
+        (
+            "skill-fresher-jobs",
+            2,
+            lambda skill: "%s/%s-fresher-jobs/" % (SITE_URL, skill[1]),
+        ),
+    ]:
+        with_jobs, without_jobs = split_urls(
+            skills, lambda skill: skill_counts.get(skill[0], empty)[column], url
+        )
+        builder.add_section(name, with_jobs)
+        without_name = name.replace("skill-", "skill-without-", 1)
+        if name == "skills":
+            without_name = "skills-without-jobs"
+        builder.add_section(without_name, without_jobs, skip_empty=name == "skills")
+
+    for name, without_name, column, url in [
+        (
+            "locations",
+            "locations-without-jobs",
+            0,
+            lambda city: "%s/jobs-in-%s/" % (SITE_URL, city[1]),
+        ),
+        (
+            "location-walkins",
+            "location-without-walkins",
+            1,
+            lambda city: "%s/walkins-in-%s/" % (SITE_URL, city[1]),
+        ),
+        (
+            "location-fresher-jobs",
+            "location-without-fresher-jobs",
+            2,
+            lambda city: "%s/fresher-jobs-in-%s/" % (SITE_URL, city[1]),
+        ),
+    ]:
+        with_jobs, without_jobs = split_urls(
+            cities, lambda city: city_counts.get(city[0], empty)[column], url
+        )
+        builder.add_section(name, with_jobs)
+        builder.add_section(without_name, without_jobs, skip_empty=name == "locations")
+
+    for name, without_name, column, path in [
+        ("skill-locations", "skill-locations-without-jobs", 0, "jobs"),
+        ("skill-location-walkins", "skill-location-without-walkins", 1, "walkins"),
+        (
+            "skill-location-fresher-jobs",
+            "skill-location-without-fresher-jobs",
+            2,
+            "fresher-jobs",
+        ),
+    ]:
+        # every skill x city pair, streamed, the without-jobs side is large
+        def pair_urls(with_jobs, column=column, path=path):
+            for city_id, city_slug in cities:
+                for skill_id, skill_slug in skills:
+                    counts = pair_counts.get((skill_id, city_id), empty)
+                    if bool(counts[column]) == with_jobs:
+                        yield "%s/%s-%s-in-%s/" % (
+                            SITE_URL,
+                            skill_slug,
+                            path,
+                            city_slug,
+                        )
+
+        builder.add_section(name, pair_urls(True))
+        builder.add_section(without_name, pair_urls(False))
+
+    builder.add_section(
+        "industries",
+        (
+            SITE_URL + industry.get_job_url()
+            for industry in Industry.objects.filter(status="Active").only("slug")
+        ),
+    )
+    builder.add_section(
+        "internships",
+        (
+            "%s/internship-jobs-in-%s/" % (SITE_URL, slug)
+            for slug in City.objects.filter(
+                status="Enabled",
+                locations__status="Live",
+                locations__job_type="internship",
+            )
+            .distinct()
+            .values_list("slug", flat=True)
+        ),
+    )
+
+    states = list(State.objects.filter(status="Enabled").values_list("slug", flat=True))
+    for name, path in [
+        ("state-jobs", "jobs"),
+        ("state-walkins", "walkins"),
+        ("state-fresher-jobs", "fresher-jobs"),
+    ]:
+        builder.add_section(
+            name, ("%s/%s-in-%s/" % (SITE_URL, path, slug) for slug in states)
+        )
+
+    builder.add_section(
+        "education-jobs",
+        (
+            "%s/%s-jobs/" % (SITE_URL, slug)
+            for slug in Qualification.objects.filter(status="Active").values_list(
+                "slug", flat=True
+            )
+        ),
+    )
+    builder.add_section(
+        "recruiters",
+        (
+            "%s/recruiters/%s/" % (SITE_URL, username)
+            for username in User.objects.filter(
+                Q(user_type="RR")
+                | Q(user_type="AR")
+                | Q(user_type="AA") & Q(is_active=True)
+            )
+            .values_list("username", flat=True)
+            .iterator()
+        ),
+    )
+    builder.add_section(
+        "companies",
+        (
+            "%s/%s-job-openings/" % (SITE_URL, slug)
+            for slug in Company.objects.filter(is_active=True).values_list(
+                "slug", flat=True
+            )
+        ),
+    )
+
+    live_jobs = JobPost.objects.filter(
+        status="Live",
+        job_type__in=["full-time", "internship", "walk-in", "government"],
+    ).count()
+    builder.add_section("pages", page_urls(-(-live_jobs // 100)))
+    return builder.finish()
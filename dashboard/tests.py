@@ -5,7 +5,20 @@ when you run "manage.py test".
 Replace this with more appropriate tests for your application.
 """
 
-from django.test import TestCase
+import gzip
+import io
+import os
+import shutil
+import tempfile
+from datetime import date, datetime
+
+from botocore.exceptions import ClientError
+from botocore.response import StreamingBody
+from botocore.stub import ANY, Stubber
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 
 # from django.test import Client
 from django.core.files.uploadedfile import SimpleUploadedFile
@@ -21,7 +34,33 @@ from .forms import (
     FunctionalAreaForm,
     UserForm,
 )
-from peeldb.models import Country, State
+from peeldb.models import (
+    AppliedJobs,
+    City,
+    Country,
+    DailyReport,
+    JobPost,
+    Skill,
+    State,
+    TechnicalSkill,
+    User,
+)
+from dashboard.reporting import (
+    get_daily_report,
+    get_daily_report_data,
+    get_reports_data,
+    save_daily_report,
+)
+from dashboard.applications import (
+    TransientAWSError,
+    aws_client,
+    notify_application,
+    send_application_notification,
+)
+from dashboard.job_alerts import JobAlertFanout
+from dashboard.tasks import sending_application_notification
+from dashboard.sitemaps import SitemapBuilder, generate_sitemaps
+from peeldb.job_counters import job_counts
 
 
 class ChangePasswordForm_form_test(TestCase):
@@ -164,3 +203,345 @@ class user_form_test(TestCase):
             }
         )
         self.assertFalse(form.is_valid())
+
+
+class daily_report_data_test(TestCase):
+    def setUp(self):
+        self.day = date(2024, 5, 10)
+        published_on = datetime(2024, 5, 10, 11, 30)
+        admin = User.objects.create(
+            email="admin@mp.com", username="admin", is_superuser=True
+        )
+        recruiter = User.objects.create(
+            email="rr@mp.com", username="rr", user_type="RR"
+        )
+        for user, job_type, status in [
+            (recruiter, "full-time", "Live"),
+            (recruiter, "full-time", "Draft"),
+            (recruiter, "walk-in", "Live"),
+            (admin, "government", "Live"),
+        ]:
+            JobPost.objects.create(
+                user=user,
+                title="developer",
+                vacancies=1,
+                job_type=job_type,
+                status=status,
+                published_on=published_on,
+            )
+        JobPost.objects.create(
+            user=recruiter,
+            title="developer",
+            vacancies=1,
+            job_type="full-time",
+            status="Live",
+            published_on=datetime(2024, 5, 11),
+        )
+        User.objects.create(
+            email="js@mp.com",
+            username="js",
+            user_type="JS",
+            registered_from="Email",
+            date_joined=published_on,
+        )
+
+    def test_grouped_counts(self):
+        with self.assertNumQueries(4):
+            data = get_daily_report_data(self.day)
+        self.assertEqual(data["today_jobs_count"], 3)
+        self.assertEqual(data["today_jobs_live_count"], 2)
+        self.assertEqual(data["today_full_time_jobs_count"], 2)
+        self.assertEqual(data["today_full_time_draft_jobs_count"], 1)
+        self.assertEqual(data["today_walkin_jobs_live_count"], 1)
+        self.assertEqual(data["today_admin_govt_live_jobs_count"], 1)
+        self.assertEqual(data["today_register_applicants_count"], 1)
+        self.assertEqual(data["today_all_applicants_count"], 1)
+
+    def test_backfilled_report_is_read_back(self):
+        save_daily_report(self.day)
+        self.assertEqual(DailyReport.objects.count(), 1)
+        with self.assertNumQueries(1):
+            data = get_daily_report(self.day)
+        self.assertEqual(data["today_jobs_count"], 3)
+
+
+# queries the reports page may run whatever the number of cities and
+# skills: session, user, the grouped reports queries and the skills dropdown
+REPORTS_PAGE_QUERIES = 8
+
+
+class reports_page_test(TestCase):
+    def setUp(self):
+        cache.clear()
+        country = Country.objects.create(name="India", slug="india")
+        self.state = State.objects.create(
+            name="Telangana", slug="telangana", country=country
+        )
+        self.python = Skill.objects.create(name="Python", slug="python")
+        self.java = Skill.objects.create(name="Java", slug="java")
+        admin = User.objects.create(
+            email="admin@mp.com", username="admin", is_staff=True, is_active=True
+        )
+        self.client.force_login(admin)
+        self.add_city("Hyderabad", [self.python, self.java])
+        self.add_city("Pune", [self.java])
+
+    def add_city(self, name, skills):
+        city = City.objects.create(name=name, slug=name.lower(), state=self.state)
+        for is_active in (True, True, False):
+            User.objects.create(
+                email="%s%s@mp.com" % (name, User.objects.count()),
+                username="%s%s" % (name, User.objects.count()),
+                user_type="RR",
+                city=city,
+                is_active=is_active,
+                date_joined=datetime(2024, 5, 10),
+            )
+        job = JobPost.objects.create(
+            user=User.objects.filter(city=city).first(),
+            title="developer",
+            slug="/developer-%s/" % name.lower(),
+            vacancies=1,
+            job_type="full-time",
+            status="Live",
+            published_on=datetime(2024, 5, 10),
+        )
+        job.location.add(city)
+        job.skills.add(*skills)
+
+    def test_grouped_counts(self):
+        data = get_reports_data()
+        self.assertEqual(data["recruiters"], [("Hyderabad", 2, 1), ("Pune", 2, 1)])
+        self.assertEqual(data["jobs"], [("Hyderabad", 1), ("Pune", 1)])
+        self.assertEqual(data["skill_jobs"], [("Java", 2), ("Python", 1)])
+        data = get_reports_data(
+            (datetime(2024, 5, 11), datetime(2024, 5, 12)), [self.python.id]
+        )
+        self.assertEqual(data["recruiters"], [])
+        self.assertEqual(data["skills"], ["Python"])
+        self.assertEqual(data["skill_jobs"], [])
+
+    def test_results_are_cached(self):
+        get_reports_data(None, [self.python.id])
+        with self.assertNumQueries(0):
+            get_reports_data(None, [self.python.id])
+
+    def test_query_budget(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/dashboard/reports/")
+        self.assertLessEqual(len(queries), REPORTS_PAGE_QUERIES)
+        self.assertEqual(response.context["location"], '["Hyderabad", "Pune"]')
+        for i in range(5):
+            self.add_city("City %d" % i, [self.python])
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                "/dashboard/reports/",
+                {
+                    "timestamp": "May 01, 2024 00:00 - May 31, 2024 00:00",
+                    "skills": [self.python.id, self.java.id],
+                },
+            )
+        self.assertLessEqual(len(queries), REPORTS_PAGE_QUERIES)
+        self.assertEqual(response.context["job_posts"], "[1, 1, 1, 1, 1, 1, 1]")
+        self.assertEqual(response.context["skill_wise_jobs_count"], "[6, 2]")
+
+class sitemap_generation_test(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        country = Country.objects.create(name="India", slug="india")
+        state = State.objects.create(
+            name="Telangana", slug="telangana", country=country
+        )
+        self.city = City.objects.create(name="Hyderabad", slug="hyderabad", state=state)
+        City.objects.create(name="Pune", slug="pune", state=state)
+        self.skill = Skill.objects.create(name="Python", slug="python", status="Active")
+        Skill.objects.create(name="Java", slug="java", status="Active")
+        user = User.objects.create(email="rr@mp.com", username="rr", user_type="RR")
+        job = JobPost.objects.create(
+            user=user,
+            title="python developer",
+            slug="/python-developer-1/",
+            vacancies=1,
+            job_type="walk-in",
+            status="Live",
+        )
+        job.skills.add(self.skill)
+        job.location.add(self.city)
+        # the counts other tests loaded, the refreshes above wait for a commit
+        with self.captureOnCommitCallbacks(execute=True):
+            job_counts.invalidate()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def read(self, name):
+        with gzip.open(os.path.join(self.directory, name)) as sitemap:
+            return sitemap.read().decode("utf-8")
+
+    def test_counts_in_grouped_queries(self):
+        with self.assertNumQueries(12):
+            stats = generate_sitemaps(self.directory)
+        self.assertTrue(all(stat["written"] for stat in stats))
+        self.assertIn(
+            "/python-walkins-in-hyderabad/",
+            self.read("sitemap-skill-location-walkins.xml.gz"),
+        )
+        without = self.read("sitemap-skill-location-without-walkins.xml.gz")
+        self.assertNotIn("/python-walkins-in-hyderabad/", without)
+        self.assertIn("/java-walkins-in-pune/", without)
+        with open(os.path.join(self.directory, "sitemap.xml")) as index:
+            self.assertIn("/sitemap/sitemap-jobs.xml.gz", index.read())
+
+    def test_unchanged_shards_are_skipped(self):
+        generate_sitemaps(self.directory)
+        self.skill.status = "InActive"
+        self.skill.save()
+        stats = {stat["file"]: stat for stat in generate_sitemaps(self.directory)}
+        self.assertFalse(stats["sitemap-jobs.xml.gz"]["written"])
+        self.assertTrue(stats["sitemap-skills.xml.gz"]["written"])
+
+    def test_shards_are_split(self):
+        builder = SitemapBuilder(self.directory, max_urls=2)
+        builder.add_section("pages", ["https://peeljobs.com/%d/" % i for i in range(5)])
+        builder.add_section("old", ["https://peeljobs.com/"])
+        builder.finish()
+        self.assertEqual(
+            sorted(name for name in os.listdir(self.directory) if name.endswith(".gz")),
+            [
+                "sitemap-old.xml.gz",
+                "sitemap-pages-1.xml.gz",
+                "sitemap-pages-2.xml.gz",
+                "sitemap-pages.xml.gz",
+            ],
+        )
+        builder = SitemapBuilder(self.directory, max_urls=2)
+        builder.add_section("pages", ["https://peeljobs.com/"])
+        builder.finish()
+        self.assertEqual(
+            [name for name in os.listdir(self.directory) if name.endswith(".gz")],
+            ["sitemap-pages.xml.gz"],
+        )
+
+
+class job_alert_fanout_test(TestCase):
+    def setUp(self):
+        country = Country.objects.create(name="India", slug="india")
+        state = State.objects.create(
+            name="Telangana", slug="telangana", country=country
+        )
+        hyderabad = City.objects.create(name="Hyderabad", slug="hyderabad", state=state)
+        pune = City.objects.create(name="Pune", slug="pune", state=state)
+        python = Skill.objects.create(name="Python", slug="python", status="Active")
+        java = Skill.objects.create(name="Java", slug="java", status="Active")
+        recruiter = User.objects.create(email="rr@mp.com", username="rr")
+        for title, skills, city, published_on in [
+            ("python hyderabad", [python], hyderabad, datetime.now()),
+            ("java pune", [java], pune, datetime.now()),
+            ("old python", [python], pune, datetime(2020, 1, 1)),
+        ]:
+            job = JobPost.objects.create(
+                user=recruiter,
+                title=title,
+                slug="/%s/" % title.replace(" ", "-"),
+                vacancies=1,
+                job_type="full-time",
+                status="Live",
+                published_on=published_on,
+            )
+            job.skills.add(*skills)
+            job.location.add(city)
+        for i, (skill, city) in enumerate(
+            [(python, hyderabad), (python, pune), (java, pune), (java, hyderabad)]
+        ):
+            user = User.objects.create(
+                email="js%d@mp.com" % i,
+                username="js%d" % i,
+                user_type="JS",
+                current_city=city,
+            )
+            user.skills.add(TechnicalSkill.objects.create(skill=skill))
+
+    def test_batches(self):
+        fanout = JobAlertFanout(chunk_size=3, batch_size=1)
+        batches = list(fanout.batches())
+        self.assertEqual(fanout.users, 4)
+        self.assertEqual(
+            sorted(batch[0][0][0] for batch in batches), ["js0@mp.com", "js2@mp.com"]
+        )
+        python_mail = [
+            batch[0][2] for batch in batches if batch[0][0] == ["js0@mp.com"]
+        ]
+        self.assertIn("python hyderabad", python_mail[0])
+        self.assertIn("old python", python_mail[0])
+        self.assertNotIn("java pune", python_mail[0])
+
+    def test_queries_per_chunk(self):
+        # 2 index queries, users + skills + 4 job queries for each of the 2
+        # chunks, and the empty page that ends the scan
+        with self.assertNumQueries(15):
+            list(JobAlertFanout(chunk_size=2).batches())
+
+
+
+@override_settings(AWS_STORAGE_BUCKET_NAME="peeljobs")
+class application_notification_test(TestCase):
+    def setUp(self):
+        recruiter = User.objects.create(email="rr@mp.com", username="rr")
+        job_post = JobPost.objects.create(
+            user=recruiter,
+            title="developer",
+            vacancies=1,
+            job_type="full-time",
+            status="Live",
+        )
+        user = User.objects.create(
+            email="js@mp.com",
+            username="js",
+            user_type="JS",
+            resume="resume/1AB/resume.pdf",
+        )
+        self.applied_job = AppliedJobs.objects.create(
+            user=user, job_post=job_post, status="Pending"
+        )
+
+    def test_notification_queued_on_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            notify_application(self.applied_job)
+        self.assertEqual(len(callbacks), 1)
+
+    def test_resume_attached_from_memory(self):
+        with Stubber(aws_client("s3")) as s3, Stubber(aws_client("ses")) as ses:
+            s3.add_response(
+                "get_object",
+                {"Body": StreamingBody(io.BytesIO(b"resume content"), 14)},
+                {"Bucket": "peeljobs", "Key": "resume/1AB/resume.pdf"},
+            )
+            ses.add_response(
+                "send_raw_email",
+                {"MessageId": "1"},
+                {"Source": ANY, "Destinations": ["rr@mp.com"], "RawMessage": ANY},
+            )
+            self.assertTrue(send_application_notification(self.applied_job.id))
+            ses.assert_no_pending_responses()
+
+    def test_missing_resume_not_attached(self):
+        with Stubber(aws_client("s3")) as s3, Stubber(aws_client("ses")) as ses:
+            s3.add_client_error("get_object", "NoSuchKey")
+            ses.add_response("send_raw_email", {"MessageId": "1"})
+            self.assertTrue(send_application_notification(self.applied_job.id))
+        self.applied_job.delete()
+        self.assertFalse(send_application_notification(self.applied_job.id))
+
+    def test_only_transient_failures_retried(self):
+        with Stubber(aws_client("s3")) as s3, Stubber(aws_client("ses")) as ses:
+            s3.add_client_error("get_object", "SlowDown", http_status_code=503)
+            with self.assertRaises(TransientAWSError):
+                sending_application_notification(self.applied_job.id)
+            s3.add_client_error("get_object", "NoSuchKey")
+            ses.add_client_error("send_raw_email", "Throttling")
+            with self.assertRaises(TransientAWSError):
+                sending_application_notification(self.applied_job.id)
+            s3.add_client_error("get_object", "NoSuchKey")
+            ses.add_client_error("send_raw_email", "MessageRejected")
+            with self.assertRaises(ClientError):
+                sending_application_notification(self.applied_job.id)
@@ -23,6 +23,7 @@ from .views import (
     industries,
     delete_industry,
     industry_status,
+    taxonomy_merge_status,
     functional_area,
     functional_area_status,
     recruiters_list,
@@ -62,6 +63,7 @@ from .views import (
     # applicants_mail,
     removing_duplicate_companies,
     reports,
+    daily_reports,
     new_company,
     edit_company,
     companies,
@@ -136,6 +138,11 @@ urlpatterns = [
         industry_status,
         name="industry_status",
     ),
+    url(
+        r"^taxonomy/merge/(?P<merge_id>[0-9]+)/$",
+        taxonomy_merge_status,
+        name="taxonomy_merge_status",
+    ),
     # functinal area
     url(r"^functional_area/$", functional_area, name="functional_area"),
     url(
@@ -275,6 +282,7 @@ urlpatterns = [
         name="removing_duplicate_companies",
     ),
     url(r"^reports/", reports, name="reports"),
+    url(r"^daily-reports/", daily_reports, name="daily_reports"),
     # companies
     url(r"^companies/new/", new_company, name="new_company"),
     url(r"^companies/edit/(?P<company_id>[-\w]+)/", edit_company, name="edit_company"),
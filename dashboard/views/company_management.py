@@ -344,7 +344,7 @@ def company_recruiters(request, company_id, status):
 @permission_required("activity_edit", "activity_view")
 def company_jobposts(request, company_id):
     company = get_object_or_404(Company, id=company_id)
-    job_posts = company.get_jobposts()
+    job_posts = company.get_jobposts().select_related("applicant_tally")
     items_per_page = 100
     no_pages = int(math.ceil(float(job_posts.count()) / items_per_page))
     page = request.GET.get("page")
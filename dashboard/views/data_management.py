@@ -16,6 +16,7 @@ from mpcomp.views import (
     permission_required,
 )
 from mpcomp.aws import AWS
+from mpcomp.slug_index import slug_index
 from peeldb.models import (
     City,
     Country,
@@ -27,8 +28,10 @@ from peeldb.models import (
     Skill,
     State,
     SKILL_TYPE,
+    TaxonomyMerge,
     User,
 )
+from peeldb.taxonomy_merge import merge_progress, queue_taxonomy_merge
 from dashboard.forms import CityForm
 
 from ..forms import (
@@ -383,6 +386,7 @@ def country(request):
                         status="Disabled"
                     )
                     City.objects.filter(state_id__in=states).update(status="Disabled")
+                    slug_index.invalidate()
 
                 data = {"error": False, "message": "Country Disabled Successfully"}
                 return HttpResponse(json.dumps(data))
@@ -393,6 +397,7 @@ def country(request):
                 if states:
                     State.objects.filter(country_id=country.id).update(status="Enabled")
                     City.objects.filter(state_id__in=states).update(status="Enabled")
+                    slug_index.invalidate()
 
                 data = {"error": False, "message": "Country Enabled Successfully"}
                 return HttpResponse(json.dumps(data))
@@ -413,6 +418,7 @@ def country(request):
                 cities = state.state.all()
                 if cities:
                     cities.update(status="Disabled")
+                    slug_index.invalidate()
 
                 if not State.objects.filter(country=state.country, status="Enabled"):
                     if state.country.status != "Disabled":
@@ -434,6 +440,7 @@ def country(request):
                 cities = state.state.all()
                 if cities:
                     cities.update(status="Enabled")
+                    slug_index.invalidate()
 
                 data = {
                     "error": False,
@@ -617,20 +624,19 @@ def locations(request, status):
                     from_city = City.objects.get(id=from_city_id)
                     to_city = City.objects.get(id=to_city_id)
 
-                    # Get all job posts that have the source city
-                    job_posts = JobPost.objects.filter(location=from_city)
-                    moved_count = 0
-
-                    for job_post in job_posts:
-                        # Remove the old city and add the new one
-                        job_post.location.remove(from_city)
-                        job_post.location.add(to_city)
-                        moved_count += 1
+                    # the jobs are moved set-based in the background
+                    moved_count = JobPost.location.through.objects.filter(
+                        city=from_city
+                    ).count()
+                    merge = queue_taxonomy_merge(
+                        "city", from_city.id, to_city.id, request.user, jobs_only=True
+                    )
 
                     data = {
                         "error": False,
-                        "message": f"Successfully moved {moved_count} jobs from '{from_city.name}' to '{to_city.name}'",
+                        "message": f"{moved_count} jobs are being moved from '{from_city.name}' to '{to_city.name}'",
                         "moved_count": moved_count,
+                        "merge_id": merge.id,
                     }
                 except City.DoesNotExist:
                     data = {
@@ -1168,20 +1174,23 @@ def industries(request):
                 from_industry = Industry.objects.get(id=from_industry_id)
                 to_industry = Industry.objects.get(id=to_industry_id)
 
-                # Get all job posts that have the source industry
-                job_posts = JobPost.objects.filter(industry=from_industry)
-                moved_count = 0
-
-                for job_post in job_posts:
-                    # Remove the old industry and add the new one
-                    job_post.industry.remove(from_industry)
-                    job_post.industry.add(to_industry)
-                    moved_count += 1
+                # the jobs are moved set-based in the background
+                moved_count = JobPost.industry.through.objects.filter(
+                    industry=from_industry
+                ).count()
+                merge = queue_taxonomy_merge(
+                    "industry",
+                    from_industry.id,
+                    to_industry.id,
+                    request.user,
+                    jobs_only=True,
+                )
 
                 data = {
                     "error": False,
-                    "message": f"Successfully moved {moved_count} jobs from '{from_industry.name}' to '{to_industry.name}'",
+                    "message": f"{moved_count} jobs are being moved from '{from_industry.name}' to '{to_industry.name}'",
                     "moved_count": moved_count,
+                    "merge_id": merge.id,
                     "page": request.POST.get("page") if request.POST.get("page") else 1,
                 }
             except Industry.DoesNotExist:
@@ -1236,6 +1245,25 @@ def industry_status(request, industry_id):
 
 
 
+@permission_required("activity_view", "activity_edit")
+def taxonomy_merge_status(request, merge_id):
+    merge = TaxonomyMerge.objects.filter(id=merge_id).first()
+    if not merge:
+        data = {"error": True, "message": "Merge not found"}
+        return HttpResponse(json.dumps(data))
+    processed, total = merge_progress(merge)
+    data = {
+        "error": False,
+        "kind": merge.kind,
+        "status": merge.status,
+        "processed": processed,
+        "total": total,
+        "jobs": merge.jobs,
+        "message": merge.error,
+    }
+    return HttpResponse(json.dumps(data))
+
+
 @permission_required("activity_view", "activity_edit")
 def functional_area(request):
     if request.method == "GET":
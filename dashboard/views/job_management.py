@@ -52,7 +52,9 @@ from ..tasks import (
 
 @permission_required("activity_view", "activity_edit")
 def post_list(request, job_type):
-    posts = JobPost.objects.filter(job_type=job_type)
+    posts = JobPost.objects.filter(job_type=job_type).select_related(
+        "applicant_tally"
+    )
 
     if request.POST.get("timestamp", ""):
         date = request.POST.get("timestamp").split(" - ")
@@ -3,7 +3,8 @@ import re
 from datetime import datetime
 
 from django.urls import reverse
-from django.db.models import Count, Q
+from django.db.models import Q
+from django.db.models.functions import Coalesce
 from django.http.response import HttpResponseRedirect
 from django.shortcuts import get_object_or_404, render
 
@@ -79,17 +80,17 @@ def view_recruiter(request, user_id):
         )
     if recruiter.agency_admin:
         jobposts = JobPost.objects.filter(user__company=recruiter.company).annotate(
-            responses=Count("appliedjobs")
+            responses=Coalesce("applicant_tally__total", 0)
         )
     elif recruiter.is_agency_recruiter:
         jobposts = (
             JobPost.objects.filter(Q(agency_recruiters=recruiter) | Q(user=recruiter))
-            .annotate(responses=Count("appliedjobs"))
+            .annotate(responses=Coalesce("applicant_tally__total", 0))
             .distinct()
         )
     else:
         jobposts = JobPost.objects.filter(user=recruiter).annotate(
-            responses=Count("appliedjobs")
+            responses=Coalesce("applicant_tally__total", 0)
         )
     items_per_page = 10
     no_pages = int(math.ceil(float(jobposts.count()) / items_per_page))
@@ -1,123 +1,72 @@
 import json
 import math
 import re
-from datetime import datetime
+from datetime import datetime, timedelta
 
 from django.urls import reverse
-from django.db.models import Count, Q
+from django.db.models import Sum
 from django.http.response import HttpResponseRedirect
 from django.shortcuts import render
 
+from dashboard.reporting import get_daily_report, get_reports_data, parse_report_range
 from mpcomp.views import (
     get_prev_after_pages_count,
     permission_required,
 )
+from peeldb.search_log import search_terms
 from peeldb.models import (
     City,
-    JobPost,
     SearchResult,
+    SearchSummary,
     Skill,
     Subscriber,
-    User,
 )
 
 
 @permission_required("activity_view", "activity_edit")
 def reports(request):
-    cities = City.objects.filter()
-    skills = [
-        "java",
-        "html",
-        "php",
-        "android",
-        ".net",
-        "bpo",
-        "testing",
-        "javascript",
-        "c#",
-        "adobe photoshop",
-        "fresher",
-        "css",
-        "mysql",
-        "j2ee",
-        "sql server",
-        "sales",
-        "marketing",
-        "accounting",
-        "technical support",
-        "python",
-    ]
-    all_skills = Skill.objects.filter()
-    location = []
-    jobs_location = []
-
-    job_posts = []
-    active_recruiters = []
-    inactive_recruiters = []
-    skills_names = []
-    skill_wise_jobs_count = []
-    for city in cities:
-        users = User.objects.filter(city=city).exclude(user_type="JS")
-        if request.method == "POST" and request.POST.get("timestamp"):
-            date = request.POST.get("timestamp").split(" - ")
-            start_date = datetime.strptime(date[0], "%b %d, %Y %H:%M")
-            end_date = datetime.strptime(date[1], "%b %d, %Y %H:%M")
-            users = users.filter(date_joined__range=(start_date, end_date))
-        if users:
-            location.append(str(city.name))
-            active_recruiters.append(int(users.filter(is_active=True).count()))
-            inactive_recruiters.append(int(users.filter(is_active=False).count()))
-        jobs = JobPost.objects.filter(location__in=[city], status="Live")
-        if request.method == "POST" and request.POST.get("timestamp"):
-
-            date = request.POST.get("timestamp").split(" - ")
-            start_date = datetime.strptime(date[0], "%b %d, %Y %H:%M")
-            end_date = datetime.strptime(date[1], "%b %d, %Y %H:%M")
-
-            jobs = jobs.filter(published_on__range=(start_date, end_date))
-
-        if jobs:
-            jobs_location.append(str(city.name))
-            job_posts.append(jobs.count())
-    if request.POST.getlist("skills"):
-        skills = Skill.objects.filter(
-            id__in=request.POST.getlist("skills")
-        ).values_list("name", flat=True)
-    for skill in skills:
-        skill = Skill.objects.filter(name__iexact=skill)
-        jobs_skills = JobPost.objects.filter(skills__in=skill, status="Live")
-        if request.method == "POST" and request.POST.get("timestamp"):
-
-            date = request.POST.get("timestamp").split(" - ")
-            start_date = datetime.strptime(date[0], "%b %d, %Y %H:%M")
-            end_date = datetime.strptime(date[1], "%b %d, %Y %H:%M")
-
-           
-
-            jobs_skills = jobs_skills.filter(published_on__range=(start_date, end_date))
-        if jobs_skills:
-            skills_names.append(skill[0].name)
-            skill_wise_jobs_count.append(jobs_skills.count())
-
+    date_range = None
+    if request.method == "POST":
+        date_range = parse_report_range(request.POST.get("timestamp"))
+    selected_skills = request.POST.getlist("skills")
+    data = get_reports_data(
+        date_range, [int(skill) for skill in selected_skills if skill.isdigit()]
+    )
     return render(
         request,
         "dashboard/reports.html",
         {
-            "location": json.dumps(location),
-            "job_posts": json.dumps(job_posts),
-            "cities": cities,
-            "skills": skills,
-            "active_recruiters": json.dumps(active_recruiters),
-            "inactive_recruiters": json.dumps(inactive_recruiters),
-            "skill_wise_jobs_count": json.dumps(skill_wise_jobs_count),
-            "skills_names": json.dumps(skills_names),
-            "all_skills": all_skills,
-            "selected_skills": request.POST.getlist("skills"),
-            "jobs_location": json.dumps(jobs_location),
+            "location": json.dumps([city for city, _, _ in data["recruiters"]]),
+            "active_recruiters": json.dumps(
+                [active for _, active, _ in data["recruiters"]]
+            ),
+            "inactive_recruiters": json.dumps(
+                [inactive for _, _, inactive in data["recruiters"]]
+            ),
+            "jobs_location": json.dumps([city for city, _ in data["jobs"]]),
+            "job_posts": json.dumps([num for _, num in data["jobs"]]),
+            "cities": City.objects.filter(),
+            "skills": data["skills"],
+            "skills_names": json.dumps([skill for skill, _ in data["skill_jobs"]]),
+            "skill_wise_jobs_count": json.dumps([num for _, num in data["skill_jobs"]]),
+            "all_skills": Skill.objects.filter(),
+            "selected_skills": selected_skills,
         },
     )
 
 
+@permission_required("activity_view", "activity_edit")
+def daily_reports(request):
+    report_date = datetime.now().date() - timedelta(days=1)
+    if request.GET.get("date"):
+        try:
+            report_date = datetime.strptime(request.GET.get("date"), "%Y-%m-%d").date()
+        except ValueError:
+            pass
+    data = get_daily_report(report_date)
+    data["report_date"] = report_date
+    return render(request, "dashboard/daily_report.html", data)
+
 
 @permission_required("activity_view", "activity_edit")
 def search_log(request):
@@ -187,76 +136,44 @@ def view_subscribers(request, skill_id):
 
 
 
+# search_summary url type -> SearchSummary kind
+SEARCH_SUMMARY_TYPES = {
+    "other-skills": "other_skill",
+    "other-locations": "other_location",
+    "skills": "skill",
+    "locations": "city",
+}
+
+
 @permission_required("activity_edit", "activity_view")
 def search_summary(request, search_type):
-    values = []
-    count = []
-    if request.POST.get("timestamp"):
-        date = request.POST.get("timestamp").split(" - ")
-        start_date = datetime.strptime(date[0], "%b %d, %Y %H:%M")
-        end_date = datetime.strptime(date[1], "%b %d, %Y %H:%M")
-    if search_type == "other-skills":
-        summary = (
-            SearchResult.objects.exclude(other_skill="")
-            .values("other_skill")
-            .annotate(num=Count("other_skill"))
-            .order_by("-num")
-        )
-        if request.POST.get("search"):
-            search = request.POST.get("search")
-            summary = summary.filter(other_skill=search)
-        if request.POST.get("timestamp"):
-            summary = summary.filter(search_on__range=(start_date, end_date))
-        for each in summary[:20]:
-            values.append(each["other_skill"])
-            count.append(each["num"])
-    elif search_type == "other-locations":
-        summary = (
-            SearchResult.objects.exclude(other_location="")
-            .values("other_location")
-            .annotate(num=Count("other_location"))
-            .order_by("-num")
-        )
-        if request.POST.get("search"):
-            search = request.POST.get("search")
-            summary = summary.filter(other_location=search)
-        if request.POST.get("timestamp"):
-            summary = summary.filter(search_on__range=(start_date, end_date))
-        for each in summary[:20]:
-            values.append(each["other_location"])
-            count.append(each["num"])
-    elif search_type == "skills":
-        summary = (
-            SearchResult.objects.values("skills__name")
-            .annotate(num=Count("skills"))
-            .order_by("-num")
-        )
-        if request.POST.get("search"):
-            search = request.POST.get("search").split(",")
+    kind = SEARCH_SUMMARY_TYPES.get(search_type, "city")
+    summary = SearchSummary.objects.filter(kind=kind)
+    if request.POST.get("search"):
+        search = request.POST.get("search")
+        if kind in ("skill", "city"):
+            # the summary holds names, slugs are searched by their name
+            terms = search_terms(kind)
             summary = summary.filter(
-                Q(skills__name__in=search) | Q(skills__slug__in=search)
+                term__in=[
+                    terms.get(term.lower(), (None, term))[1]
+                    for term in search.split(",")
+                ]
             )
-        if request.POST.get("timestamp"):
-            summary = summary.filter(search_on__range=(start_date, end_date))
-        for each in summary[:20]:
-            values.append(each["skills__name"])
-            count.append(each["num"])
-    else:
-        summary = (
-            SearchResult.objects.values("locations__name")
-            .annotate(num=Count("locations"))
-            .order_by("-num")
+        else:
+            summary = summary.filter(term=search)
+    date_range = parse_report_range(request.POST.get("timestamp"))
+    if date_range:
+        summary = summary.filter(
+            date__range=(date_range[0].date(), date_range[1].date())
         )
-        if request.POST.get("search"):
-            search = request.POST.get("search").split(",")
-            summary = summary.filter(
-                Q(locations__name__in=search) | Q(locations__slug__in=search)
-            )
-        if request.POST.get("timestamp"):
-            summary = summary.filter(search_on__range=(start_date, end_date))
-        for each in summary[:20]:
-            values.append(each["locations__name"])
-            count.append(each["num"])
+    summary = (
+        summary.values_list("term")
+        .annotate(num=Sum("searches"))
+        .order_by("-num", "term")[:20]
+    )
+    values = [term for term, num in summary]
+    count = [num for term, num in summary]
     return render(
         request,
         "dashboard/search_summary.html",
@@ -20,6 +20,13 @@ CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL", "redis://localhost:6379/1")
 CELERY_RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND")
 CELERY_IMPORTS = ("dashboard.tasks")
 
+# job detail views are buffered here when set, else in each process until it
+# exits
+JOB_VIEWS_REDIS_URL = os.getenv("JOB_VIEWS_REDIS_URL")
+# searches are buffered here for the search log when set, else in each process
+# until it exits
+SEARCH_LOG_REDIS_URL = os.getenv("SEARCH_LOG_REDIS_URL")
+
 
 # Enable debug logging
 
@@ -206,6 +213,7 @@ MEDIA_URL = "/media/"
 # STATIC_ROOT = os.path.join(BASE_DIR, "static")
 STATIC_ROOT = os.path.join(BASE_DIR, "staticfiles")
 STATIC_URL = "/static/"
+SITEMAP_DIR = os.path.join(BASE_DIR, "sitemap")
 
 ADMIN_MEDIA_PREFIX = STATIC_URL + "admin/"
 COMPRESS_OUTPUT_DIR = "CACHE"
@@ -246,10 +254,14 @@ HAYSTACK_CONNECTIONS = {
 }
 
 
-HAYSTACK_SIGNAL_PROCESSOR = "haystack.signals.RealtimeSignalProcessor"
+# saves are queued in SearchIndexQueue and indexed by a celery task
+HAYSTACK_SIGNAL_PROCESSOR = "peeldb.search_queue.QueuedSignalProcessor"
 HAYSTACK_DEFAULT_OPERATOR = "OR"
 HAYSTACK_SEARCH_RESULTS_PER_PAGE = 1
 
+# "haystack" (Elasticsearch) or "database" (postgres array columns on JobPost)
+JOB_SEARCH_ENGINE = os.getenv("JOB_SEARCH_ENGINE", "haystack")
+
 CELERY_TIMEZONE = "Asia/Calcutta"
 
 CELERY_BEAT_SCHEDULE = {
@@ -330,6 +342,26 @@ CELERY_BEAT_SCHEDULE = {
     #     "task": "dashboard.tasks.recruiter_profile_update_notifications",
     #     "schedule": crontab(hour="09", minute="30", day_of_week="mon"),
     # },
+    "processing-search-index-queue": {
+        "task": "dashboard.tasks.processing_search_index_queue",
+        "schedule": crontab(minute="*"),
+    },
+    "flushing-buffered-job-views": {
+        "task": "dashboard.tasks.flushing_job_views",
+        "schedule": crontab(minute="*"),
+    },
+    "flushing-buffered-search-log": {
+        "task": "dashboard.tasks.flushing_search_log",
+        "schedule": crontab(minute="*"),
+    },
+    "rebuilding-similar-jobs": {
+        "task": "dashboard.tasks.refreshing_similar_jobs",
+        "schedule": crontab(hour="01", minute="40"),
+    },
+    "reconciling-live-job-counters": {
+        "task": "dashboard.tasks.reconciling_job_counters",
+        "schedule": crontab(minute="15"),
+    },
     "haystack-rebuilding-indexes": {
         "task": "dashboard.tasks.rebuilding_index",
         "schedule": crontab(
@@ -361,23 +393,45 @@ THUMBNAIL_FORCE_OVERWRITE = True
 # AWS_ENABLED = os.getenv("AWSENABLED")
 # DISQUS_SHORTNAME = ""
 
-# CACHES = {
-#     "default": {
-#         "BACKEND": "django.core.cache.backends.memcached.PyMemcacheCache",
-#         "LOCATION": "127.0.0.1:11211",
-#         "TIMEOUT": 48 * 60 * 60,
-#         "OPTIONS": {"server_max_value_length": 1024 * 1024 * 2,},
-#     }
-# }
+# "memcached://127.0.0.1:11211/", "redis://127.0.0.1:6379/2" or unset for a
+# local memory cache per process (tests, local development)
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "")
+
+
+def cache_settings(backend):
+    """CACHES of a CACHE_BACKEND url."""
+    if backend.startswith("memcached://"):
+        return {
+            "default": {
+                "BACKEND": "django.core.cache.backends.memcached.PyMemcacheCache",
+                "LOCATION": backend[len("memcached://") :].strip("/").split(";"),
+                "TIMEOUT": 48 * 60 * 60,
+                "OPTIONS": {
+                    "use_pooling": True,
+                    "max_pool_size": 16,
+                    # a memcached outage reads as cache misses
+                    "ignore_exc": True,
+                },
+            }
+        }
+    if backend.startswith("redis://"):
+        return {
+            "default": {
+                "BACKEND": "django.core.cache.backends.redis.RedisCache",
+                "LOCATION": backend,
+                "TIMEOUT": 48 * 60 * 60,
+                "OPTIONS": {"max_connections": 16},
+            }
+        }
+    return {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "TIMEOUT": 48 * 60 * 60,
+        }
+    }
 
-# Alternative Redis cache configuration (if you prefer Redis over Memcached)
-# CACHES = {
-#     "default": {
-#         "BACKEND": "django.core.cache.backends.redis.RedisCache",
-#         "LOCATION": "redis://127.0.0.1:6379/1",
-#         "TIMEOUT": 48 * 60 * 60,
-#     }
-# }
+
+CACHES = cache_settings(CACHE_BACKEND)
 
 FB_ACCESS_TOKEN = os.getenv("FBACCESSTOKEN")
 FB_PAGE_ACCESS_TOKEN = os.getenv("FBPAGEACCESSTOKEN")
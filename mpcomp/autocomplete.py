@@ -0,0 +1,158 @@
+import re
+import threading
+from bisect import bisect_left
+
+from mpcomp.reference_data import reference_data
+from peeldb.job_counters import job_counts
+
+AUTOCOMPLETE_LIMIT = 10
+# characters between the words of a name or slug, "c#" and ".net" stay whole
+WORD_SEPARATORS = re.compile(r"[\s\-_/(),&]+")
+
+
+def normalize(text):
+    return " ".join(WORD_SEPARATORS.split((text or "").lower())).strip()
+
+
+def word_suffixes(text):
+    """text from the start of each of its words, "sql server" gives "sql
+    server" and "server", so a prefix of any word finds it."""
+    words = normalize(text).split(" ")
+    return {" ".join(words[i:]) for i in range(len(words)) if words[i]}
+
+
+class AutocompleteIndex(object):
+    """
+    The suggestions of one taxonomy, best ranked first, found by a prefix
+    of any word of their name or slug. The word suffixes are kept in one
+    sorted array, a prefix is the slice between two bisections.
+    """
+
+    def __init__(self, suggestions, texts):
+        self.suggestions = suggestions
+        keys = sorted(
+            {
+                (key, position)
+                for position, names in enumerate(texts)
+                for text in names
+                for key in word_suffixes(text)
+            }
+        )
+        self.keys = [key for key, _ in keys]
+        self.positions = [position for _, position in keys]
+
+    def search(self, prefix, limit=AUTOCOMPLETE_LIMIT, exclude=()):
+        """The first limit suggestions with a word starting with prefix,
+        leaving out the names in exclude."""
+        prefix = normalize(prefix)
+        if prefix:
+            start = bisect_left(self.keys, prefix)
+            end = bisect_left(self.keys, prefix[:-1] + chr(ord(prefix[-1]) + 1), start)
+            positions = sorted(set(self.positions[start:end]))
+        else:
+            positions = range(len(self.suggestions))
+        found = []
+        for position in positions:
+            suggestion = self.suggestions[position]
+            if suggestion["name"] not in exclude:
+                found.append(suggestion)
+                if len(found) == limit:
+                    break
+        return found
+
+
+def ranked_index(kind, rows, keep=None, display=None):
+    """AutocompleteIndex of reference rows of kind, the ones with the most
+    live jobs first, then the shortest names. keep(row, jobs) filters the
+    rows and display(name) is the name suggested."""
+    counts = job_counts.counts(kind)
+    entries = []
+    for row in rows:
+        jobs = counts.get(row["id"], 0)
+        if keep is None or keep(row, jobs):
+            entries.append((row, jobs))
+    entries.sort(key=lambda entry: (-entry[1], len(entry[0]["name"]), entry[0]["name"]))
+    suggestions = [
+        {
+            "id": row["id"],
+            "name": display(row["name"]) if display else row["name"],
+            "slug": row["slug"],
+            "jobs_count": jobs,
+        }
+        for row, jobs in entries
+    ]
+    return AutocompleteIndex(
+        suggestions, [(row["name"], row["slug"]) for row, _ in entries]
+    )
+
+
+def live_only(row, jobs):
+    return jobs > 0
+
+
+def build_city_states(states, cities):
+    # states named like one of their cities are suggested as the city
+    duplicates = {(city["state"], city["name"]) for city in cities}
+    return ranked_index(
+        "state",
+        states,
+        keep=lambda row, jobs: jobs > 0 and (row["id"], row["name"]) not in duplicates,
+    )
+
+
+# index name -> (the reference data kinds it is built from, build(*rows))
+AUTOCOMPLETE_INDEXES = {
+    "skill": (("skill",), lambda rows: ranked_index("skill", rows)),
+    "qualification": (
+        ("qualification",),
+        lambda rows: ranked_index("qualification", rows),
+    ),
+    "industry": (
+        ("industry",),
+        lambda rows: ranked_index(
+            "industry", rows, display=lambda name: name.split("/")[0]
+        ),
+    ),
+    "functional_area": (
+        ("functional_area",),
+        lambda rows: ranked_index("functional_area", rows),
+    ),
+    "state": (("state",), lambda rows: ranked_index("state", rows)),
+    "city": (("city",), lambda rows: ranked_index("city", rows, keep=live_only)),
+    "city_state": (("state", "city"), build_city_states),
+}
+
+
+class Autocomplete(object):
+    """
+    In-process AutocompleteIndex of each taxonomy, rebuilt on the first
+    lookup after its reference data or the live job counts change version.
+    Lookups read neither Elasticsearch nor the database.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._indexes = {}
+
+    def index(self, name):
+        kinds, build = AUTOCOMPLETE_INDEXES[name]
+        snapshots = [reference_data.snapshot(kind) for kind in kinds]
+        version = (
+            tuple(snapshot.version for snapshot in snapshots),
+            job_counts.version,
+        )
+        current = self._indexes.get(name)
+        if current and current[0] == version:
+            return current[1]
+        with self._lock:
+            current = self._indexes.get(name)
+            if not current or current[0] != version:
+                current = (version, build(*[snapshot.rows for snapshot in snapshots]))
+                self._indexes[name] = current
+            return current[1]
+
+    def search(self, name, prefix, limit=AUTOCOMPLETE_LIMIT, exclude=()):
+        return self.index(name).search(prefix, limit, exclude)
+
+
+autocomplete = Autocomplete()
@@ -0,0 +1,149 @@
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.cache.backends.locmem import LocMemCache
+
+# marks a cached "nothing found", so empty results are not recomputed
+NOT_FOUND = "__not_found__"
+# seconds a process tallies hits and misses before adding them to the cache
+STATS_FLUSH_INTERVAL = 30
+
+_stats_lock = threading.Lock()
+_pending = defaultdict(Counter)
+_flushed_at = time.monotonic()
+_prefixes = set()
+
+
+def stats_key(prefix, stat):
+    return "cache_stats:%s:%s" % (prefix, stat)
+
+
+def flush_stats():
+    global _flushed_at
+    with _stats_lock:
+        pending = {prefix: dict(counts) for prefix, counts in _pending.items()}
+        _pending.clear()
+        _flushed_at = time.monotonic()
+    for prefix, counts in pending.items():
+        for stat, value in counts.items():
+            if not value:
+                continue
+            try:
+                cache.incr(stats_key(prefix, stat), value)
+            except ValueError:
+                if not cache.add(stats_key(prefix, stat), value, None):
+                    cache.incr(stats_key(prefix, stat), value)
+
+
+def record(prefix, hits, misses):
+    with _stats_lock:
+        _pending[prefix]["hits"] += hits
+        _pending[prefix]["misses"] += misses
+        due = time.monotonic() - _flushed_at >= STATS_FLUSH_INTERVAL
+    if due:
+        flush_stats()
+
+
+def cache_stats():
+    """{prefix: {"hits", "misses", "hit_rate"}} of every process, as of
+    their last flush."""
+    flush_stats()
+    keys = [
+        stats_key(prefix, stat) for prefix in _prefixes for stat in ("hits", "misses")
+    ]
+    values = cache.get_many(keys)
+    stats = {}
+    for prefix in sorted(_prefixes):
+        hits = values.get(stats_key(prefix, "hits"), 0)
+        misses = values.get(stats_key(prefix, "misses"), 0)
+        total = hits + misses
+        stats[prefix] = {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": float(hits) / total if total else 0.0,
+        }
+    return stats
+
+
+def cache_per_process(alias=DEFAULT_CACHE_ALIAS):
+    """Whether the cache is kept in each process, the version keys the
+    in-process indexes are invalidated by are then not shared."""
+    return isinstance(caches[alias], LocMemCache)
+
+
+class PrefixedCache(object):
+    """
+    Cache-aside lookups under one key prefix of a CACHES alias, with the
+    hits and misses of the prefix counted. Empty results are cached too.
+
+    The backend is configured in settings.CACHES, its client is pooled and
+    shared by the process and values are pickled.
+    """
+
+    def __init__(self, prefix, timeout=DEFAULT_TIMEOUT, alias=DEFAULT_CACHE_ALIAS):
+        self.prefix = prefix
+        self.timeout = timeout
+        self.alias = alias
+        _prefixes.add(prefix)
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def key(self, key, version=None):
+        if version is not None:
+            return "%s:%s:%s" % (self.prefix, version, key)
+        return "%s:%s" % (self.prefix, key)
+
+    def get_many(self, keys, compute, version=None):
+        """{key: value} for keys, compute(missing keys) returns {key: value}
+        for the ones not in the cache."""
+        keys = list(keys)
+        cache_keys = {key: self.key(key, version) for key in keys}
+        found = self.cache.get_many(list(cache_keys.values()))
+        values = {}
+        missing = []
+        for key in keys:
+            value = found.get(cache_keys[key])
+            if value is None:
+                missing.append(key)
+            else:
+                values[key] = None if value == NOT_FOUND else value
+        record(self.prefix, len(keys) - len(missing), len(missing))
+        if missing:
+            computed = compute(missing)
+            self.cache.set_many(
+                {
+                    cache_keys[key]: (
+                        NOT_FOUND if computed.get(key) is None else computed[key]
+                    )
+                    for key in missing
+                },
+                self.timeout,
+            )
+            values.update((key, computed.get(key)) for key in missing)
+        return values
+
+    def cached_many(self, keys, version=None):
+        """{key: value} of the keys in the cache, nothing is computed."""
+        cache_keys = {self.key(key, version): key for key in keys}
+        return {
+            cache_keys[cache_key]: None if value == NOT_FOUND else value
+            for cache_key, value in self.cache.get_many(list(cache_keys)).items()
+        }
+
+    def set_many(self, values, version=None):
+        """Stores {key: value}, for values computed ahead of the lookups."""
+        self.cache.set_many(
+            {
+                self.key(key, version): NOT_FOUND if value is None else value
+                for key, value in values.items()
+            },
+            self.timeout,
+        )
+
+    def get(self, key, compute, version=None):
+        return self.get_many([key], lambda keys: {key: compute()}, version)[key]
@@ -0,0 +1,232 @@
+import hashlib
+import re
+import time
+from functools import wraps
+
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+
+from mpcomp.views import (
+    get_social_referer,
+    get_valid_locations_list,
+    get_valid_qualifications,
+    get_valid_skills_list,
+    get_valid_state,
+)
+from peeldb.models import City, Industry, Qualification, Skill, State
+
+# seconds a rendered page is served for, edits to live jobs show up after this
+LISTING_CACHE_TIMEOUT = 15 * 60
+LISTING_CACHE_STATS = ("hits", "misses", "invalidations")
+# tag of the all jobs listing, expired whenever any job goes, is or leaves Live
+ALL_JOBS_TAG = "jobs"
+# tag of every listing, expired when a skill, city etc. is added or edited
+TAXONOMY_TAG = "taxonomy"
+# the CSRF token a page was rendered with, replaced by the visitor's own
+# token when the page is served from the cache
+CSRF_TOKEN_INPUT = re.compile(rb'name="csrfmiddlewaretoken" value="([A-Za-z0-9]+)"')
+CSRF_TOKEN_PLACEHOLDER = b"__listing_csrf_token__"
+
+
+def count(stat, delta=1):
+    key = "listing_cache_" + stat
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        if not cache.add(key, delta, None):
+            cache.incr(key, delta)
+
+
+def listing_cache_stats():
+    values = cache.get_many(["listing_cache_" + stat for stat in LISTING_CACHE_STATS])
+    return {
+        stat: values.get("listing_cache_" + stat, 0) for stat in LISTING_CACHE_STATS
+    }
+
+
+def tag_key(tag):
+    return "listing_tag_" + tag
+
+
+def tag_versions(tags):
+    versions = cache.get_many([tag_key(tag) for tag in tags])
+    return {tag: versions.get(tag_key(tag), 0) for tag in tags}
+
+
+def invalidate_tags(tags):
+    """Expires every cached listing tagged with any of tags."""
+    tags = set(tags)
+    if tags:
+        version = time.time()
+        cache.set_many({tag_key(tag): version for tag in tags}, None)
+        count("invalidations", len(tags))
+
+
+def jobpost_tags(
+    skill_ids=(), location_ids=(), industry_ids=(), qualification_ids=(), **kwargs
+):
+    """Tags of the listings a job with the given JobPost array columns is on."""
+    tags = {ALL_JOBS_TAG}
+    tags.update("skill:%s" % pk for pk in skill_ids)
+    tags.update("city:%s" % pk for pk in location_ids)
+    tags.update("industry:%s" % pk for pk in industry_ids)
+    tags.update("qualification:%s" % pk for pk in qualification_ids)
+    if location_ids:
+        tags.update(
+            "state:%s" % pk
+            for pk in City.objects.filter(id__in=location_ids).values_list(
+                "state_id", flat=True
+            )
+        )
+    return tags
+
+
+def invalidate_jobpost_listings(jobpost):
+    invalidate_tags(
+        jobpost_tags(
+            jobpost.skill_ids,
+            jobpost.location_ids,
+            jobpost.industry_ids,
+            jobpost.qualification_ids,
+        )
+    )
+
+
+def invalidate_column_listings(column, ids):
+    """Expires the listings of ids of a JobPost array column, e.g. cities."""
+    invalidate_tags(jobpost_tags(**{column: ids}))
+
+
+def named_tags(kind, model, names):
+    if not names:
+        return set()
+    return {
+        "%s:%s" % (kind, pk)
+        for pk in model.objects.filter(name__in=names).values_list("id", flat=True)
+    }
+
+
+def index_tags(**kwargs):
+    return {ALL_JOBS_TAG}
+
+
+def location_tags(location, **kwargs):
+    state = get_valid_state(location)
+    if state:
+        return named_tags("state", State, [state])
+    return named_tags("city", City, get_valid_locations_list(location))
+
+
+def skill_tags(skill, **kwargs):
+    return named_tags("skill", Skill, get_valid_skills_list(skill)) | named_tags(
+        "qualification", Qualification, get_valid_qualifications(skill)
+    )
+
+
+def industry_tags(industry, **kwargs):
+    return {
+        "industry:%s" % pk
+        for pk in Industry.objects.filter(slug=industry).values_list("id", flat=True)
+    }
+
+
+def skill_location_tags(skill_name, city_name, **kwargs):
+    return named_tags("skill", Skill, get_valid_skills_list(skill_name)) | named_tags(
+        "city", City, get_valid_locations_list(city_name)
+    )
+
+
+def listing_cache_key(view_name, request, kwargs):
+    slug = "/".join(
+        "%s=%s" % (name, str(value).lower())
+        for name, value in sorted(kwargs.items())
+        if name != "page_num"
+    )
+    social = get_social_referer(request)
+    parts = (
+        view_name,
+        slug,
+        kwargs.get("page_num") or "1",
+        request.GET.get("job_type", ""),
+        social,
+    )
+    return "listing_page_" + hashlib.md5("|".join(parts).encode("utf-8")).hexdigest()
+
+
+def is_cacheable(request):
+    return (
+        request.method == "GET"
+        and not request.user.is_authenticated
+        and set(request.GET) <= {"job_type"}
+    )
+
+
+def cacheable_content(request, response):
+    """The content of response to cache, with the CSRF token it was
+    rendered with taken out, or None when it can't be shared."""
+    if response.status_code != 200 or response.streaming or response.cookies:
+        return None
+    content = response.content
+    if not request.META.get("CSRF_COOKIE_NEEDS_UPDATE"):
+        return content
+    match = CSRF_TOKEN_INPUT.search(content)
+    if not match:
+        # the token was used somewhere it can't be found again
+        return None
+    return content.replace(match.group(1), CSRF_TOKEN_PLACEHOLDER)
+
+
+def cached_response(request, cached):
+    """The cached page with the visitor's CSRF token, get_token has the
+    CSRF middleware send the cookie."""
+    content = cached["content"]
+    if CSRF_TOKEN_PLACEHOLDER in content:
+        content = content.replace(
+            CSRF_TOKEN_PLACEHOLDER, get_token(request).encode("ascii")
+        )
+    response = HttpResponse(content)
+    for header, value in cached.get("headers", {}).items():
+        response[header] = value
+    return response
+
+
+def cache_listing(view_name, get_tags):
+    """
+    Serves the rendered page of an anonymous GET from the cache, keyed by
+    (view, slug, page, job_type). get_tags(**kwargs) names the skills,
+    cities etc. the page lists jobs for, invalidate_tags expires it.
+    Responses setting cookies are not cached.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not is_cacheable(request):
+                return view(request, *args, **kwargs)
+            key = listing_cache_key(view_name, request, kwargs)
+            cached = cache.get(key)
+            if cached and tag_versions(cached["tags"]) == cached["tags"]:
+                count("hits")
+                return cached_response(request, cached)
+            count("misses")
+            # versions read before rendering, so a change while rendering
+            # expires this page
+            tags = tag_versions(get_tags(**kwargs) | {TAXONOMY_TAG})
+            response = view(request, *args, **kwargs)
+            content = cacheable_content(request, response)
+            if content is not None:
+                cache.set(
+                    key,
+                    {
+                        "content": content,
+                        "headers": dict(response.items()),
+                        "tags": tags,
+                    },
+                    LISTING_CACHE_TIMEOUT,
+                )
+            return response
+
+        return wrapper
+
+    return decorator
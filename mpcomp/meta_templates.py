@@ -0,0 +1,81 @@
+import hashlib
+import threading
+import time
+
+from django.core.cache import cache
+from django.template import Context, Template
+
+from peeldb.models import MetaData
+
+META_TEMPLATES_VERSION_KEY = "meta_templates_version"
+# how often (seconds) a process checks whether MetaData was changed elsewhere
+META_TEMPLATES_CHECK_INTERVAL = 5
+META_FIELDS = ("meta_title", "meta_description", "h1_tag")
+
+
+class MetaTemplates(object):
+    """
+    In-process {name: (title, description, h1)} registry of compiled
+    MetaData templates, reloaded whenever the shared version number changes.
+    Compiled templates are kept by source hash, so a reload only compiles
+    the fields that were edited.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._templates = None
+        self._compiled = {}
+        self._version = None
+        self._checked_at = 0
+
+    def _compile(self, source, compiled):
+        key = hashlib.sha1(source.encode("utf-8")).hexdigest()
+        if key not in compiled:
+            compiled[key] = self._compiled.get(key) or Template(source)
+        return compiled[key]
+
+    def _load(self):
+        templates = {}
+        compiled = {}
+        # first (lowest id) row wins, like meta[0] did
+        for row in MetaData.objects.order_by("-id").values_list("name", *META_FIELDS):
+            templates[row[0]] = tuple(
+                self._compile(source, compiled) for source in row[1:]
+            )
+        self._compiled = compiled
+        return templates
+
+    def _current(self):
+        now = time.monotonic()
+        if (
+            self._templates is not None
+            and now - self._checked_at < META_TEMPLATES_CHECK_INTERVAL
+        ):
+            return self._templates
+        version = cache.get_or_set(META_TEMPLATES_VERSION_KEY, 1, None)
+        with self._lock:
+            if self._templates is None or version != self._version:
+                self._templates = self._load()
+                self._version = version
+            self._checked_at = now
+            return self._templates
+
+    def invalidate(self):
+        try:
+            cache.incr(META_TEMPLATES_VERSION_KEY)
+        except ValueError:
+            cache.set(META_TEMPLATES_VERSION_KEY, 1, None)
+        with self._lock:
+            self._templates = None
+
+    def render(self, name, data):
+        """(meta_title, meta_description, h1_tag) of name rendered with data,
+        empty strings when there is no MetaData row for name."""
+        templates = self._current().get(name)
+        if not templates:
+            return "", "", ""
+        context = Context(data)
+        return tuple(template.render(context) for template in templates)
+
+
+meta_templates = MetaTemplates()
@@ -0,0 +1,181 @@
+import gzip
+import hashlib
+import json
+import threading
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+from peeldb.models import (
+    City,
+    Country,
+    FunctionalArea,
+    Industry,
+    Qualification,
+    Skill,
+    State,
+)
+
+# how often (seconds) a process checks the shared versions for changes made
+# by other processes; saves in this process invalidate immediately.
+REFERENCE_DATA_CHECK_INTERVAL = 5
+# the rows of older versions are kept this long to answer diffs from them
+REFERENCE_DATA_TIMEOUT = 7 * 24 * 60 * 60
+# values derived from a snapshot kept per version, the oldest are dropped
+REFERENCE_DATA_DERIVED_SIZE = 32
+
+# the dropdown rows of each kind: (model, excluded status, columns), ordered
+# by name. Foreign keys are sent as ids under the field name.
+REFERENCE_DATA = {
+    "skill": (Skill, "InActive", ("name", "slug", "status", "icon", "skill_type")),
+    "industry": (Industry, "InActive", ("name", "slug", "status")),
+    "functional_area": (FunctionalArea, "InActive", ("name", "slug", "status")),
+    "qualification": (Qualification, "InActive", ("name", "slug", "status")),
+    "country": (Country, None, ("name", "slug", "status")),
+    "state": (State, "Disabled", ("name", "slug", "status", "country")),
+    "city": (City, "Disabled", ("name", "slug", "status", "state")),
+}
+REFERENCE_DATA_KINDS = {model: kind for kind, (model, *_) in REFERENCE_DATA.items()}
+
+
+def version_key(kind):
+    return "reference_data_version:%s" % kind
+
+
+def first_version():
+    # a lost version key restarts above every version handed out before, so
+    # the cached rows of an old version are never read as a new one
+    return int(time.time())
+
+
+def rows_key(kind, version):
+    return "reference_data:%s:%s" % (kind, version)
+
+
+def reference_rows(kind, queryset=None):
+    """[{column: value}] of queryset, the dropdown rows of kind by default."""
+    model, excluded, columns = REFERENCE_DATA[kind]
+    if queryset is None:
+        queryset = model.objects.exclude(status=excluded) if excluded else model.objects
+        queryset = queryset.order_by("name", "id")
+    return list(queryset.values("id", *columns))
+
+
+def compact_json(value):
+    return json.dumps(value, separators=(",", ":")).encode()
+
+
+class Snapshot(object):
+    """The rows of one version of a kind, with their JSON and gzip bodies
+    built once."""
+
+    def __init__(self, kind, version, rows):
+        self.kind = kind
+        self.version = version
+        self.rows = rows
+        self.json = compact_json({"kind": kind, "version": version, "rows": rows})
+        self.gzip = gzip.compress(self.json)
+        self.etag = '"%s-%s-%s"' % (
+            kind,
+            version,
+            hashlib.sha1(self.json).hexdigest()[:16],
+        )
+        self.checked_at = 0
+        self._lock = threading.Lock()
+        self._derived = {}
+
+    def derived(self, name, build):
+        """build(rows), computed once per version of the kind while it is
+        among the REFERENCE_DATA_DERIVED_SIZE latest names."""
+        value = self._derived.get(name)
+        if value is None:
+            value = build(self.rows)
+            with self._lock:
+                while len(self._derived) >= REFERENCE_DATA_DERIVED_SIZE:
+                    del self._derived[next(iter(self._derived))]
+                self._derived[name] = value
+        return value
+
+
+class ReferenceData(object):
+    """
+    In-process snapshots of the dropdown taxonomies, rebuilt lazily whenever
+    the shared version number of their kind changes. The rows of each
+    version are shared through the cache, so processes agree on what a
+    version holds and diffs between versions can be answered.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshots = {}
+
+    def snapshot(self, kind):
+        now = time.monotonic()
+        snapshot = self._snapshots.get(kind)
+        if snapshot and now - snapshot.checked_at < REFERENCE_DATA_CHECK_INTERVAL:
+            return snapshot
+        version = cache.get_or_set(version_key(kind), first_version, None)
+        with self._lock:
+            snapshot = self._snapshots.get(kind)
+            if snapshot is None or snapshot.version != version:
+                rows = cache.get(rows_key(kind, version))
+                if rows is None:
+                    rows = reference_rows(kind)
+                    # the first process to load a version decides its rows
+                    if not cache.add(
+                        rows_key(kind, version), rows, REFERENCE_DATA_TIMEOUT
+                    ):
+                        rows = cache.get(rows_key(kind, version), rows)
+                snapshot = Snapshot(kind, version, rows)
+                self._snapshots[kind] = snapshot
+            snapshot.checked_at = now
+            return snapshot
+
+    def rows(self, kind):
+        return self.snapshot(kind).rows
+
+    def invalidate(self, kind):
+        try:
+            cache.incr(version_key(kind))
+        except ValueError:
+            cache.set(version_key(kind), first_version(), None)
+        with self._lock:
+            self._snapshots.pop(kind, None)
+
+    def schedule_invalidate(self, kind):
+        """Invalidates kind once the current transaction commits, so no
+        process loads the new version before the change is visible."""
+        transaction.on_commit(lambda: self.invalidate(kind))
+
+    def diff(self, kind, since):
+        """JSON of {"kind", "version", "since", "changed", "removed"} from
+        version since to the current one, None when the rows of since are
+        gone."""
+        snapshot = self.snapshot(kind)
+        if since > snapshot.version:
+            return None
+        if since == snapshot.version:
+            old = snapshot.rows
+        else:
+            old = cache.get(rows_key(kind, since))
+            if old is None:
+                return None
+
+        def build(rows):
+            previous = {row["id"]: row for row in old}
+            current = {row["id"] for row in rows}
+            return compact_json(
+                {
+                    "kind": kind,
+                    "version": snapshot.version,
+                    "since": since,
+                    "changed": [row for row in rows if previous.get(row["id"]) != row],
+                    "removed": sorted(set(previous) - current),
+                }
+            )
+
+        return snapshot.derived("diff:%s" % since, build)
+
+
+reference_data = ReferenceData()
@@ -0,0 +1,160 @@
+import hashlib
+import io
+import os
+import re
+import subprocess
+import tempfile
+import zipfile
+from functools import partial
+
+from lxml import etree
+
+from mpcomp.cache import PrefixedCache
+
+# command line converters, run on an in-memory copy of the document
+RESUME_CONVERTERS = {
+    "pdf": ["pdftotext", "-q", "{path}", "-"],
+    "doc": ["antiword", "{path}"],
+    "odt": ["odt2txt", "{path}"],
+}
+# seconds a converter gets per document
+RESUME_CONVERTER_TIMEOUT = 30
+# bump when the extracted text changes, the cached text of older versions
+# is not read again
+RESUME_TEXT_VERSION = 1
+RESUME_CACHE_TIMEOUT = 30 * 24 * 60 * 60
+
+MOBILE_RE = re.compile(r"[0-9]{10}")
+EMAIL_RE = re.compile(r"[\w\.-]+@[\w\.-]+")
+
+WORD_NAMESPACE = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+WORD_PARAGRAPH = WORD_NAMESPACE + "p"
+WORD_TEXT = WORD_NAMESPACE + "t"
+WORD_TAB = WORD_NAMESPACE + "tab"
+
+# extractors by file format, each returns the text of a resume given as bytes
+RESUME_EXTRACTORS = {}
+
+resume_cache = PrefixedCache("resume_text", RESUME_CACHE_TIMEOUT)
+
+
+def extractor(*formats):
+    """Registers the decorated function as the extractor of formats."""
+
+    def register(function):
+        for file_format in formats:
+            RESUME_EXTRACTORS[file_format] = function
+        return function
+
+    return register
+
+
+def memory_file():
+    if hasattr(os, "memfd_create"):
+        return open(os.memfd_create("resume"), "w+b")
+    return tempfile.TemporaryFile()
+
+
+def run_converter(command, content):
+    """stdout of command run on content, passed as a /dev/fd path of an
+    anonymous in-memory file instead of a shared file on disk."""
+    with memory_file() as document:
+        document.write(content)
+        document.flush()
+        path = "/dev/fd/%d" % document.fileno()
+        try:
+            result = subprocess.run(
+                [part.format(path=path) for part in command],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                pass_fds=(document.fileno(),),
+                timeout=RESUME_CONVERTER_TIMEOUT,
+            )
+        except (OSError, subprocess.TimeoutExpired):
+            return ""
+    return result.stdout.decode("utf-8", "ignore")
+
+
+for converted_format, command in RESUME_CONVERTERS.items():
+    RESUME_EXTRACTORS[converted_format] = partial(run_converter, command)
+
+
+@extractor("docx")
+def docx_text(content):
+    """Paragraphs of word/document.xml, streamed with iterparse and freed as
+    they are read instead of building the whole tree."""
+    paragraphs = []
+    text = []
+    try:
+        with zipfile.ZipFile(io.BytesIO(content)) as document:
+            with document.open("word/document.xml") as xml:
+                for event, element in etree.iterparse(
+                    xml,
+                    tag=(WORD_PARAGRAPH, WORD_TEXT, WORD_TAB),
+                    resolve_entities=False,
+                    no_network=True,
+                ):
+                    tag = element.tag
+                    if tag == WORD_TEXT:
+                        text.append(element.text or "")
+                    elif tag == WORD_TAB:
+                        text.append("\t")
+                    else:
+                        if text:
+                            paragraphs.append("".join(text))
+                            text = []
+                        element.clear(keep_tail=True)
+                        while element.getprevious() is not None:
+                            del element.getparent()[0]
+    except (zipfile.BadZipFile, KeyError, etree.XMLSyntaxError):
+        return ""
+    return "\n\n".join(paragraph for paragraph in paragraphs if paragraph)
+
+
+def resume_format(filename):
+    return filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
+
+
+def resume_text(filename, content):
+    """Text of a resume given as bytes, empty for unsupported formats."""
+    extract = RESUME_EXTRACTORS.get(resume_format(filename))
+    return extract(content) if extract else ""
+
+
+def contact_details(text):
+    """(email, mobile) found first in text, empty when there are none."""
+    email = EMAIL_RE.search(text)
+    mobile = MOBILE_RE.search(text)
+    return email.group(0) if email else "", mobile.group(0) if mobile else ""
+
+
+def extract_resume(resume):
+    """(email, mobile, text) of a (filename, content) resume, not cached."""
+    filename, content = resume
+    text = resume_text(filename, content)
+    email, mobile = contact_details(text)
+    return email, mobile, text
+
+
+def resume_key(filename, content):
+    return "%s.%s" % (hashlib.sha256(content).hexdigest(), resume_format(filename))
+
+
+def resumes_data(resumes, map=map):
+    """(email, mobile, text) of each (filename, content) of resumes, cached
+    by the sha256 of the content. Only the resumes not in the cache are
+    extracted, once per content, with map (a pool's map runs them in
+    parallel)."""
+    keys = [resume_key(filename, content) for filename, content in resumes]
+    by_key = dict(zip(keys, resumes))
+
+    def extract(missing):
+        return dict(zip(missing, map(extract_resume, [by_key[key] for key in missing])))
+
+    values = resume_cache.get_many(by_key, extract, RESUME_TEXT_VERSION)
+    return [values[key] for key in keys]
+
+
+def resume_data(filename, content):
+    """(email, mobile, text) of a resume given as bytes."""
+    return resumes_data([(filename, content)])[0]
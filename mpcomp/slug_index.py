@@ -0,0 +1,137 @@
+import threading
+import time
+
+from django.core.cache import cache
+
+from peeldb.models import City, Qualification, Skill, State
+
+SLUG_INDEX_VERSION_KEY = "slug_index_version"
+# how often (seconds) a process checks the shared version for changes made
+# by other processes; saves in this process invalidate immediately.
+SLUG_INDEX_CHECK_INTERVAL = 5
+
+
+class SlugTrie(object):
+    """Trie over dash separated slug tokens mapping a full slug to a name."""
+
+    def __init__(self):
+        self.root = {}
+
+    def add(self, slug, name):
+        node = self.root
+        for token in slug.lower().split("-"):
+            node = node.setdefault(token, {})
+        # first (lowest id) row wins, like queryset[0] did
+        node.setdefault(None, name)
+
+    def get(self, slug):
+        node = self.root
+        for token in slug.lower().split("-"):
+            node = node.get(token)
+            if node is None:
+                return None
+        return node.get(None)
+
+    def matches(self, tokens, start):
+        """Yield (end, name) for every slug starting at tokens[start]."""
+        node = self.root
+        for end in range(start, len(tokens)):
+            node = node.get(tokens[end])
+            if node is None:
+                return
+            if None in node:
+                yield end, node[None]
+
+
+class SlugIndex(object):
+    """
+    In-process slug -> name dictionary for Skill, Qualification, City and
+    State, rebuilt lazily whenever the shared version number changes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tries = None
+        self._version = None
+        self._checked_at = 0
+
+    def _load(self):
+        tries = {
+            "skill": SlugTrie(),
+            "qualification": SlugTrie(),
+            "city": SlugTrie(),
+            "state": SlugTrie(),
+        }
+        querysets = {
+            "skill": Skill.objects.filter(status="Active"),
+            "qualification": Qualification.objects.filter(status="Active"),
+            "city": City.objects.filter(status="Enabled"),
+            "state": State.objects.all(),
+        }
+        for kind, queryset in querysets.items():
+            for slug, name in queryset.order_by("id").values_list("slug", "name"):
+                if slug:
+                    tries[kind].add(slug, name)
+        return tries
+
+    def _current(self):
+        now = time.monotonic()
+        if self._tries is not None and now - self._checked_at < SLUG_INDEX_CHECK_INTERVAL:
+            return self._tries
+        version = cache.get_or_set(SLUG_INDEX_VERSION_KEY, 1, None)
+        with self._lock:
+            if self._tries is None or version != self._version:
+                self._tries = self._load()
+                self._version = version
+            self._checked_at = now
+            return self._tries
+
+    def invalidate(self):
+        try:
+            cache.incr(SLUG_INDEX_VERSION_KEY)
+        except ValueError:
+            cache.set(SLUG_INDEX_VERSION_KEY, 1, None)
+        with self._lock:
+            self._tries = None
+
+    def version(self):
+        """Shared version of the loaded slugs, changes on every invalidation."""
+        self._current()
+        return self._version
+
+    def lookup(self, kind, slug):
+        return self._current()[kind].get(slug)
+
+    def all_matches(self, kind, slug):
+        """Names of every dash-joined n-gram of the slug, in order of start."""
+        trie = self._current()[kind]
+        name = trie.get(slug)
+        if name:
+            return [name]
+        tokens = slug.lower().split("-")
+        names = []
+        for start in range(len(tokens)):
+            for end, name in trie.matches(tokens, start):
+                if name not in names:
+                    names.append(name)
+        return names
+
+    def longest_matches(self, kind, slug):
+        """Names of the longest non-overlapping slugs, scanning left to right."""
+        trie = self._current()[kind]
+        tokens = slug.lower().split("-")
+        names = []
+        start = 0
+        while start < len(tokens):
+            longest = None
+            for longest in trie.matches(tokens, start):
+                pass
+            if longest:
+                names.append(longest[1])
+                start = longest[0] + 1
+            else:
+                start += 1
+        return names
+
+
+slug_index = SlugIndex()
@@ -0,0 +1,152 @@
+from datetime import date
+
+from django.db.models import Case, Count, F, Q, Value, When
+
+from peeldb.models import ApplicantTally, AppliedJobs, JobPost
+
+# ApplicantTally column of each application status
+TALLY_STATUSES = {
+    "Pending": "pending",
+    "Shortlisted": "shortlisted",
+    "Selected": "selected",
+    "Rejected": "rejected",
+    "Hired": "hired",
+}
+TALLY_FIELDS = ["total", *TALLY_STATUSES.values(), "today", "today_date"]
+# jobs recounted per query by reconcile_applicant_tallies
+RECONCILE_BATCH_SIZE = 2000
+
+
+def count_applicants(job_ids=None):
+    """ApplicantTally rows for job_ids, or every job applied to, from one
+    grouped query. Jobs of job_ids without applications get a zero row."""
+    today = date.today()
+    rows = AppliedJobs.objects.all()
+    if job_ids is not None:
+        rows = rows.filter(job_post_id__in=job_ids)
+    counts = {
+        "total": Count("id"),
+        "today": Count("id", filter=Q(applied_on__date=today)),
+    }
+    for status, column in TALLY_STATUSES.items():
+        counts[column] = Count("id", filter=Q(status=status))
+    tallies = {
+        row["job_post_id"]: ApplicantTally(today_date=today, **row)
+        for row in rows.values("job_post_id").annotate(**counts).order_by()
+    }
+    for job_id in job_ids or ():
+        tallies.setdefault(job_id, ApplicantTally(job_post_id=job_id, today_date=today))
+    return list(tallies.values())
+
+
+def refresh_applicant_tallies(job_ids=None):
+    """Recounts the tallies of job_ids, or of every job applied to."""
+    if job_ids is not None:
+        job_ids = list(job_ids)
+        if not job_ids:
+            return 0
+    tallies = count_applicants(job_ids)
+    ApplicantTally.objects.bulk_create(
+        tallies,
+        update_conflicts=True,
+        unique_fields=["job_post"],
+        update_fields=TALLY_FIELDS,
+    )
+    return len(tallies)
+
+
+def change_tally(job_id, total=0, today=0, **statuses):
+    """Adds the given deltas to the tally of job_id in one UPDATE, statuses
+    by their column name. Returns whether the job had a tally row."""
+    changes = {
+        column: F(column) + delta
+        for column, delta in dict(statuses, total=total).items()
+        if delta
+    }
+    current = date.today()
+    if today > 0:
+        changes["today"] = Case(
+            When(today_date=current, then=F("today") + today), default=Value(today)
+        )
+        changes["today_date"] = Value(current)
+    elif today < 0:
+        changes["today"] = Case(
+            When(today_date=current, then=F("today") + today), default=F("today")
+        )
+    if not changes:
+        return True
+    return bool(ApplicantTally.objects.filter(job_post_id=job_id).update(**changes))
+
+
+def add_applicants(job_id, count, status="Pending"):
+    """Counts count new applications of job_id made today. A job without a
+    tally row yet is recounted instead."""
+    if not count:
+        return
+    column = TALLY_STATUSES.get(status)
+    statuses = {column: count} if column else {}
+    if not change_tally(job_id, total=count, today=count, **statuses):
+        refresh_applicant_tallies([job_id])
+
+
+def remove_applicant(job_id, status, applied_on):
+    # a job deleted with its applications has no tally row left to fix
+    column = TALLY_STATUSES.get(status)
+    change_tally(
+        job_id,
+        total=-1,
+        today=-1 if applied_on and applied_on.date() == date.today() else 0,
+        **({column: -1} if column else {})
+    )
+
+
+def move_applicant(job_id, previous_status, status):
+    """Moves an application of job_id from previous_status to status."""
+    statuses = {}
+    for old, delta in ((previous_status, -1), (status, 1)):
+        column = TALLY_STATUSES.get(old)
+        if column:
+            statuses[column] = statuses.get(column, 0) + delta
+    if not change_tally(job_id, **statuses):
+        refresh_applicant_tallies([job_id])
+
+
+def tally_counts(tally):
+    return (
+        tally.total,
+        *[getattr(tally, column) for column in TALLY_STATUSES.values()],
+        tally.applied_today,
+    )
+
+
+def reconcile_applicant_tallies(batch_size=RECONCILE_BATCH_SIZE):
+    """Recounts the tally of every job, batch_size jobs a query. Returns the
+    (jobs, corrected) counts."""
+    last_id = 0
+    jobs = corrected = 0
+    while True:
+        job_ids = list(
+            JobPost.objects.filter(id__gt=last_id)
+            .order_by("id")
+            .values_list("id", flat=True)[:batch_size]
+        )
+        if not job_ids:
+            return jobs, corrected
+        stored = {
+            tally.job_post_id: tally_counts(tally)
+            for tally in ApplicantTally.objects.filter(job_post_id__in=job_ids)
+        }
+        tallies = [
+            tally
+            for tally in count_applicants(job_ids)
+            if stored.get(tally.job_post_id) != tally_counts(tally)
+        ]
+        ApplicantTally.objects.bulk_create(
+            tallies,
+            update_conflicts=True,
+            unique_fields=["job_post"],
+            update_fields=TALLY_FIELDS,
+        )
+        jobs += len(job_ids)
+        corrected += len(tallies)
+        last_id = job_ids[-1]
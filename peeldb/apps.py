@@ -0,0 +1,22 @@
+import logging
+
+from django.apps import AppConfig
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class PeeldbConfig(AppConfig):
+    name = "peeldb"
+
+    def ready(self):
+        from mpcomp.cache import cache_per_process
+        from peeldb import signals  # noqa: F401
+
+        if not settings.DEBUG and cache_per_process():
+            # the slug index, reference data, meta templates, job counts and
+            # autocomplete of each process never see the saves of the others
+            logger.warning(
+                "CACHE_BACKEND is not set, the in-process indexes are not "
+                "invalidated across processes"
+            )
@@ -0,0 +1,223 @@
+import threading
+import time
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from peeldb.models import City, JobCounter, JobPost
+
+JOB_COUNTS_VERSION_KEY = "job_counts_version"
+# how often (seconds) a process checks whether the counters were refreshed
+JOB_COUNTS_CHECK_INTERVAL = 60
+
+# kind -> (JobPost m2m field, through id column, JobPost array column)
+JOB_COUNTER_SOURCES = {
+    "skill": ("skills", "skill_id", "skill_ids"),
+    "city": ("location", "city_id", "location_ids"),
+    "state": ("location", "city__state_id", "location_ids"),
+    "industry": ("industry", "industry_id", "industry_ids"),
+    "qualification": ("edu_qualification", "qualification_id", "qualification_ids"),
+    "functional_area": (
+        "functional_area",
+        "functionalarea_id",
+        "functional_area_ids",
+    ),
+}
+
+
+def count_live_jobs(kind, ids=None):
+    """JobCounter rows for kind (limited to ids) from one grouped query."""
+    field, id_column, column = JOB_COUNTER_SOURCES[kind]
+    rows = getattr(JobPost, field).through.objects.filter(jobpost__status="Live")
+    if ids is not None:
+        rows = rows.filter(**{id_column + "__in": ids})
+    rows = (
+        rows.values_list(id_column, "jobpost__job_type")
+        .annotate(
+            live=Count("jobpost_id", distinct=True),
+            fresher=Count("jobpost_id", distinct=True, filter=Q(jobpost__min_year=0)),
+        )
+        .order_by()
+    )
+    return [
+        JobCounter(
+            kind=kind,
+            object_id=object_id,
+            job_type=job_type,
+            live=live,
+            fresher=fresher,
+        )
+        for object_id, job_type, live, fresher in rows
+    ]
+
+
+def refresh_job_counters(kind, ids=None, invalidate=True):
+    """Recounts kind for ids, or the whole kind when ids is None. Callers
+    refreshing several kinds pass invalidate=False and invalidate once."""
+    if ids is not None:
+        ids = list(ids)
+        if not ids:
+            return 0
+    counters = count_live_jobs(kind, ids)
+    keys = {(counter.object_id, counter.job_type) for counter in counters}
+    with transaction.atomic():
+        JobCounter.objects.bulk_create(
+            counters,
+            update_conflicts=True,
+            unique_fields=["kind", "object_id", "job_type"],
+            update_fields=["live", "fresher"],
+        )
+        existing = JobCounter.objects.filter(kind=kind)
+        if ids is not None:
+            existing = existing.filter(object_id__in=ids)
+        JobCounter.objects.filter(
+            id__in=[
+                counter_id
+                for counter_id, object_id, job_type in existing.values_list(
+                    "id", "object_id", "job_type"
+                )
+                if (object_id, job_type) not in keys
+            ]
+        ).delete()
+    if invalidate:
+        job_counts.invalidate()
+    return len(counters)
+
+
+def jobpost_counter_ids(job_ids):
+    """{kind: ids} of every taxonomy row the given jobs are tagged with."""
+    ids = defaultdict(set)
+    columns = {kind: source[2] for kind, source in JOB_COUNTER_SOURCES.items()}
+    for row in JobPost.objects.filter(pk__in=job_ids).values(*set(columns.values())):
+        for kind, column in columns.items():
+            if kind != "state":
+                ids[kind].update(row[column])
+    if ids["city"]:
+        ids["state"] = set(
+            City.objects.filter(id__in=ids["city"]).values_list("state_id", flat=True)
+        )
+    return ids
+
+
+def refresh_jobpost_counters(job_ids=None, counter_ids=None):
+    """Recounts every row the jobs are tagged with, or the given {kind: ids}."""
+    if counter_ids is None:
+        counter_ids = jobpost_counter_ids(job_ids)
+    counter_ids = {kind: ids for kind, ids in counter_ids.items() if ids}
+    for kind, ids in counter_ids.items():
+        refresh_job_counters(kind, ids, invalidate=False)
+    if counter_ids:
+        job_counts.invalidate()
+
+
+def refresh_column_counters(column, ids):
+    """Recounts the rows behind ids of a JobPost array column, e.g. the
+    cities of location_ids and the states they are in."""
+    ids = list(ids)
+    if not ids:
+        return
+    for kind, (field, id_column, source_column) in JOB_COUNTER_SOURCES.items():
+        if source_column != column:
+            continue
+        if kind == "state":
+            refresh_job_counters(
+                kind,
+                set(City.objects.filter(id__in=ids).values_list("state_id", flat=True)),
+                invalidate=False,
+            )
+        else:
+            refresh_job_counters(kind, ids, invalidate=False)
+    job_counts.invalidate()
+
+
+def reconcile_job_counters():
+    counts = {
+        kind: refresh_job_counters(kind, invalidate=False)
+        for kind in JOB_COUNTER_SOURCES
+    }
+    job_counts.invalidate()
+    return counts
+
+
+class JobCounts(object):
+    """
+    In-process {kind: {count: {object_id: jobs}}} copy of the JobCounter
+    table, where count is "live", "fresher" or a job type. Reloaded lazily
+    whenever the shared version number changes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = None
+        self._version = None
+        self._checked_at = 0
+
+    def _load(self):
+        counts = defaultdict(lambda: defaultdict(lambda: defaultdict(int)))
+        for kind, object_id, job_type, live, fresher in JobCounter.objects.values_list(
+            "kind", "object_id", "job_type", "live", "fresher"
+        ):
+            counts[kind]["live"][object_id] += live
+            counts[kind]["fresher"][object_id] += fresher
+            counts[kind][job_type][object_id] += live
+        return counts
+
+    def _current(self):
+        now = time.monotonic()
+        if (
+            self._counts is not None
+            and now - self._checked_at < JOB_COUNTS_CHECK_INTERVAL
+        ):
+            return self._counts
+        version = cache.get_or_set(JOB_COUNTS_VERSION_KEY, 1, None)
+        with self._lock:
+            if self._counts is None or version != self._version:
+                self._counts = self._load()
+                self._version = version
+            self._checked_at = now
+            return self._counts
+
+    def invalidate(self):
+        """Bumps the version once the current transaction commits, so no
+        process reloads the counters before the change is visible."""
+        transaction.on_commit(self._invalidate)
+
+    def _invalidate(self):
+        try:
+            cache.incr(JOB_COUNTS_VERSION_KEY)
+        except ValueError:
+            cache.set(JOB_COUNTS_VERSION_KEY, 1, None)
+        with self._lock:
+            self._counts = None
+
+    @property
+    def version(self):
+        """The version of the counts held, checked as counts() does."""
+        self._current()
+        return self._version
+
+    def counts(self, kind, count="live"):
+        return self._current()[kind][count]
+
+    def get(self, kind, object_id, count="live"):
+        return self.counts(kind, count).get(object_id, 0)
+
+
+job_counts = JobCounts()
+
+
+def with_live_job_counts(queryset, kind):
+    """Annotates num_posts, the live jobs of each row, from JobCounter."""
+    live = (
+        JobCounter.objects.filter(kind=kind, object_id=OuterRef("pk"))
+        .order_by()
+        .values("object_id")
+        .annotate(total=Sum("live"))
+        .values("total")
+    )
+    return queryset.annotate(
+        num_posts=Coalesce(Subquery(live, output_field=IntegerField()), 0)
+    )
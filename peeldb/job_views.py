@@ -0,0 +1,225 @@
+import atexit
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+
+from peeldb.models import JobPost, User, VisitedJobs
+
+logger = logging.getLogger(__name__)
+
+# get_social_referer() value -> JobPost counter
+JOB_VIEW_FIELDS = {
+    "fb": "fb_views",
+    "tw": "tw_views",
+    "ln": "ln_views",
+    "otr": "other_views",
+}
+# seconds an in-process buffer collects views before it writes them itself
+JOB_VIEWS_FLUSH_INTERVAL = 60
+JOB_VIEWS_UPDATE_BATCH = 500
+
+
+class LocalViewBuffer(object):
+    """Views buffered in this process, for tests and single process setups."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = Counter()
+        self._visits = set()
+        self._taken = (Counter(), set())
+        self._started = time.monotonic()
+
+    def add(self, job_id, field, user_id=None):
+        with self._lock:
+            self._counts["%s:%s" % (job_id, field)] += 1
+            if user_id:
+                self._visits.add("%s:%s" % (user_id, job_id))
+
+    def pending(self, job_id):
+        with self._lock:
+            return {
+                field: self._counts["%s:%s" % (job_id, field)]
+                + self._taken[0]["%s:%s" % (job_id, field)]
+                for field in JOB_VIEW_FIELDS.values()
+            }
+
+    def due(self):
+        return time.monotonic() - self._started >= JOB_VIEWS_FLUSH_INTERVAL
+
+    def take(self):
+        """The buffered views, kept aside until done() so a failed flush is
+        retried by the next one."""
+        with self._lock:
+            counts, visits = self._taken
+            counts.update(self._counts)
+            visits |= self._visits
+            self._counts = Counter()
+            self._visits = set()
+            self._started = time.monotonic()
+            return dict(counts), set(visits)
+
+    def done(self):
+        with self._lock:
+            self._taken = (Counter(), set())
+
+
+class RedisViewBuffer(object):
+    """Views buffered in a redis hash and set shared by every process."""
+
+    COUNTS_KEY = "job_views:counts"
+    VISITS_KEY = "job_views:visits"
+
+    def __init__(self, url):
+        import redis
+
+        self.errors = redis.exceptions
+        self.client = redis.Redis.from_url(url)
+
+    def add(self, job_id, field, user_id=None):
+        pipe = self.client.pipeline(transaction=False)
+        pipe.hincrby(self.COUNTS_KEY, "%s:%s" % (job_id, field), 1)
+        if user_id:
+            pipe.sadd(self.VISITS_KEY, "%s:%s" % (user_id, job_id))
+        pipe.execute()
+
+    def pending(self, job_id):
+        fields = list(JOB_VIEW_FIELDS.values())
+        keys = ["%s:%s" % (job_id, field) for field in fields]
+        pipe = self.client.pipeline(transaction=False)
+        pipe.hmget(self.COUNTS_KEY, keys)
+        pipe.hmget(self.COUNTS_KEY + ":flushing", keys)
+        buffered, flushing = pipe.execute()
+        return {
+            field: int(buffered[i] or 0) + int(flushing[i] or 0)
+            for i, field in enumerate(fields)
+        }
+
+    def due(self):
+        # flushed by the flushing_job_views beat task
+        return False
+
+    def take(self):
+        """Moves the buffered views aside, unless a failed flush left some."""
+        for key in (self.COUNTS_KEY, self.VISITS_KEY):
+            if not self.client.exists(key + ":flushing"):
+                try:
+                    self.client.rename(key, key + ":flushing")
+                except self.errors.ResponseError:
+                    # nothing buffered under key
+                    pass
+        counts = {
+            key.decode(): int(value)
+            for key, value in self.client.hgetall(self.COUNTS_KEY + ":flushing").items()
+        }
+        visits = {
+            member.decode()
+            for member in self.client.smembers(self.VISITS_KEY + ":flushing")
+        }
+        return counts, visits
+
+    def done(self):
+        self.client.delete(self.COUNTS_KEY + ":flushing", self.VISITS_KEY + ":flushing")
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def job_view_buffer():
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                url = getattr(settings, "JOB_VIEWS_REDIS_URL", None)
+                if url:
+                    _buffer = RedisViewBuffer(url)
+                else:
+                    if not settings.DEBUG:
+                        logger.warning(
+                            "JOB_VIEWS_REDIS_URL is not set, the views are buffered "
+                            "in each process"
+                        )
+                    _buffer = LocalViewBuffer()
+                    # written at exit too, the beat task only flushes its own process
+                    atexit.register(flush_job_views)
+    return _buffer
+
+
+def record_job_view(job_id, referer, user_id=None):
+    """Counts a view of a live job, the database is written by
+    flush_job_views."""
+    buffer = job_view_buffer()
+    buffer.add(job_id, JOB_VIEW_FIELDS.get(referer, "other_views"), user_id)
+    if buffer.due():
+        flush_job_views()
+
+
+def buffered_job_views(job_id):
+    return job_view_buffer().pending(job_id)
+
+
+def save_view_counts(counts):
+    """Adds {"job_id:field": views} to the JobPost counters with one UPDATE
+    per batch of jobs, bypassing save() and its signals."""
+    by_job = defaultdict(dict)
+    for key, views in counts.items():
+        job_id, field = key.split(":")
+        if views and field in JOB_VIEW_FIELDS.values():
+            by_job[int(job_id)][field] = views
+    job_ids = sorted(by_job)
+    for start in range(0, len(job_ids), JOB_VIEWS_UPDATE_BATCH):
+        batch = job_ids[start : start + JOB_VIEWS_UPDATE_BATCH]
+        updates = {}
+        for field in JOB_VIEW_FIELDS.values():
+            whens = [
+                When(id=job_id, then=Value(by_job[job_id][field]))
+                for job_id in batch
+                if field in by_job[job_id]
+            ]
+            if whens:
+                updates[field] = F(field) + Case(
+                    *whens, default=Value(0), output_field=IntegerField()
+                )
+        JobPost.objects.filter(id__in=batch).update(**updates)
+    return len(job_ids)
+
+
+def save_visits(visits):
+    """Inserts the {"user_id:job_id"} visits not recorded yet."""
+    pairs = {tuple(int(pk) for pk in visit.split(":")) for visit in visits}
+    if not pairs:
+        return 0
+    user_ids = {user_id for user_id, job_id in pairs}
+    job_ids = {job_id for user_id, job_id in pairs}
+    pairs -= set(
+        VisitedJobs.objects.filter(
+            user_id__in=user_ids, job_post_id__in=job_ids
+        ).values_list("user_id", "job_post_id")
+    )
+    # users or jobs deleted since the visit
+    user_ids = set(User.objects.filter(id__in=user_ids).values_list("id", flat=True))
+    job_ids = set(JobPost.objects.filter(id__in=job_ids).values_list("id", flat=True))
+    visited = VisitedJobs.objects.bulk_create(
+        VisitedJobs(user_id=user_id, job_post_id=job_id)
+        for user_id, job_id in pairs
+        if user_id in user_ids and job_id in job_ids
+    )
+    return len(visited)
+
+
+def flush_job_views():
+    """Writes the buffered views and visits, returns (jobs, visits) written."""
+    buffer = job_view_buffer()
+    counts, visits = buffer.take()
+    if not counts and not visits:
+        return 0, 0
+    with transaction.atomic():
+        jobs = save_view_counts(counts)
+        visited = save_visits(visits)
+    buffer.done()
+    return jobs, visited
@@ -0,0 +1,27 @@
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand
+
+from dashboard.reporting import save_daily_report
+
+
+class Command(BaseCommand):
+    help = "Materializes the daily report rollups for past days"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=30)
+        parser.add_argument("--start", help="first day, YYYY-MM-DD")
+        parser.add_argument("--end", help="last day, YYYY-MM-DD")
+
+    def handle(self, *args, **options):
+        end = datetime.now().date() - timedelta(days=1)
+        if options["end"]:
+            end = datetime.strptime(options["end"], "%Y-%m-%d").date()
+        start = end - timedelta(days=options["days"] - 1)
+        if options["start"]:
+            start = datetime.strptime(options["start"], "%Y-%m-%d").date()
+        day = start
+        while day <= end:
+            save_daily_report(day)
+            day += timedelta(days=1)
+        self.stdout.write("Saved daily reports from %s to %s" % (start, end))
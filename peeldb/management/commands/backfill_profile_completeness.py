@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from peeldb.profile_completeness import backfill_profile_sections
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes the profile sections mask and completeness of every user "
+        "to repair drifted rows, migration 0069 fills them in on deploy"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        total, changed = backfill_profile_sections(options["batch_size"])
+        self.stdout.write("%d users, %d updated" % (total, changed))
@@ -0,0 +1,105 @@
+import time
+
+from django.core.management.base import BaseCommand
+from haystack.query import SQ, SearchQuerySet
+
+from mpcomp.autocomplete import autocomplete
+from mpcomp.reference_data import reference_data
+from peeldb.models import City, FunctionalArea, Industry, Qualification, Skill, State
+
+# index name -> (model, name field, slug field) of the Elasticsearch
+# autocomplete the in-process index replaced
+LEGACY_FIELDS = {
+    "skill": (Skill, "skill_name", "skill_slug"),
+    "qualification": (Qualification, "edu_name", "edu_slug"),
+    "industry": (Industry, "industry_name", "industry_slug"),
+    "functional_area": (FunctionalArea, "functionalarea_name", None),
+    "state": (State, "state_name", "state_slug"),
+    "city": (City, "city_name", None),
+}
+
+
+def legacy_suggestions(name, prefix):
+    # the __contains query the auto_search views ran per keystroke, every
+    # hit read and sorted in Python, kept as the baseline
+    model, name_field, slug_field = LEGACY_FIELDS[name]
+    query = SQ(**{name_field + "__contains": prefix})
+    if slug_field:
+        query = query | SQ(**{slug_field + "__contains": prefix})
+    results = list(SearchQuerySet().models(model).filter_and(query))
+    return sorted(results, key=lambda result: len(getattr(result, name_field)))[:10]
+
+
+def keystrokes(names, length):
+    """Every prefix a user types for each of names, up to length characters."""
+    return [
+        name[:end].lower()
+        for name in names
+        for end in range(1, min(len(name), length) + 1)
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        "Replays the keystrokes of typing the taxonomy names into the "
+        "autocomplete, against the in-process prefix index and the "
+        "Elasticsearch queries it replaced"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--names", type=int, default=200)
+        parser.add_argument("--length", type=int, default=8)
+        parser.add_argument(
+            "--skip-es", action="store_true", help="only time the in-process index"
+        )
+
+    def time(self, label, search, prefixes):
+        timings = []
+        for prefix in prefixes:
+            start = time.perf_counter()
+            search(prefix)
+            timings.append((time.perf_counter() - start) * 1000000)
+        timings.sort()
+        self.stdout.write(
+            "%-24s keystrokes: %5d  mean us: %9.1f  p99 us: %9.1f"
+            % (
+                label,
+                len(timings),
+                sum(timings) / len(timings),
+                timings[int(len(timings) * 0.99)],
+            )
+        )
+
+    def handle(self, *args, **options):
+        for name in LEGACY_FIELDS:
+            # the index names of LEGACY_FIELDS are reference data kinds
+            rows = reference_data.rows(name)[: options["names"]]
+            prefixes = keystrokes([row["name"] for row in rows], options["length"])
+            if not prefixes:
+                self.stdout.write("%s: no rows" % name)
+                continue
+            start = time.perf_counter()
+            autocomplete.index(name)
+            self.stdout.write(
+                "%s: %d rows, index built in %.1f ms"
+                % (
+                    name,
+                    len(autocomplete.index(name).suggestions),
+                    (time.perf_counter() - start) * 1000,
+                )
+            )
+            self.time(
+                name + " memory",
+                lambda prefix: autocomplete.search(name, prefix),
+                prefixes,
+            )
+            if options["skip_es"]:
+                continue
+            try:
+                self.time(
+                    name + " elasticsearch",
+                    lambda prefix: legacy_suggestions(name, prefix),
+                    prefixes,
+                )
+            except Exception as error:
+                self.stdout.write("%s elasticsearch unavailable: %s" % (name, error))
@@ -0,0 +1,188 @@
+import random
+import time
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Case, When
+from django.template import loader
+
+from dashboard.job_alerts import JOB_ALERT_SUBJECT, JobAlertFanout
+from peeldb.models import (
+    City,
+    Country,
+    JobPost,
+    Skill,
+    State,
+    TechnicalSkill,
+    User,
+    update_jobpost_search_columns,
+)
+
+
+def legacy_job_alerts(limit):
+    # the per user loop JobAlertFanout replaced, kept as the baseline
+    from_date = datetime.now() - timedelta(days=1)
+    job_posts = JobPost.objects.filter(
+        published_on__range=(from_date, datetime.now()), status="Live"
+    )
+    users = User.objects.filter(
+        email_notifications=True,
+        user_type="JS",
+        is_bounce=False,
+        is_unsubscribe=False,
+        skills__skill__id__in=job_posts.values_list("skills", flat=True),
+    ).distinct()[:limit]
+    messages = 0
+    for user in users:
+        user_skills = user.skills.values_list("skill", flat=True)
+        user_posts = job_posts.filter(
+            skills__id__in=user_skills, location__in=[user.current_city]
+        )
+        if user_posts:
+            if user_posts.count() < 10:
+                job_order = Case(
+                    *[When(pk=pk.id, then=pos) for pos, pk in enumerate(user_posts)]
+                )
+                user_posts = user_posts | JobPost.objects.filter(
+                    skills__in=user_skills, status="Live"
+                )
+                user_posts = user_posts.order_by(job_order)
+            c = {"jobposts": user_posts.distinct()[:10], "user": user}
+            t = loader.get_template("email/job_alert.html")
+            [JOB_ALERT_SUBJECT, t.render(c)]
+            messages += 1
+    return len(users), messages
+
+
+class QueryCounter(object):
+    # counts through execute_wrapper, connection.queries is capped at 9000
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    help = (
+        "Times the job alert fan-out against the per user loop on a synthetic "
+        "fixture, rolled back afterwards"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=500000)
+        parser.add_argument("--jobs", type=int, default=300)
+        parser.add_argument("--skills", type=int, default=200)
+        parser.add_argument("--cities", type=int, default=50)
+        parser.add_argument(
+            "--legacy-users",
+            type=int,
+            default=2000,
+            help="jobseekers the per user loop is timed on",
+        )
+
+    def create_fixture(self, options):
+        country = Country.objects.create(name="Benchmark", slug="benchmark")
+        state = State.objects.create(
+            name="Benchmark", slug="benchmark", country=country
+        )
+        cities = City.objects.bulk_create(
+            City(name="bench city %d" % i, slug="bench-city-%d" % i, state=state)
+            for i in range(options["cities"])
+        )
+        skills = Skill.objects.bulk_create(
+            Skill(name="bench skill %d" % i, slug="bench-skill-%d" % i, status="Active")
+            for i in range(options["skills"])
+        )
+        recruiter = User.objects.create(
+            username="bench-recruiter", email="bench-recruiter@peeljobs.com"
+        )
+        now = datetime.now()
+        jobs = JobPost.objects.bulk_create(
+            JobPost(
+                user=recruiter,
+                title="bench job %d" % i,
+                slug="/bench-job-%d/" % i,
+                vacancies=1,
+                job_type="full-time",
+                status="Live",
+                published_on=now - timedelta(hours=random.randint(0, 47)),
+            )
+            for i in range(options["jobs"])
+        )
+        JobPost.skills.through.objects.bulk_create(
+            JobPost.skills.through(jobpost_id=job.id, skill_id=skill.id)
+            for job in jobs
+            for skill in random.sample(skills, 3)
+        )
+        JobPost.location.through.objects.bulk_create(
+            JobPost.location.through(
+                jobpost_id=job.id, city_id=random.choice(cities).id
+            )
+            for job in jobs
+        )
+        update_jobpost_search_columns([job.id for job in jobs])
+
+        chunk = 10000
+        for start in range(0, options["users"], chunk):
+            size = min(chunk, options["users"] - start)
+            users = User.objects.bulk_create(
+                User(
+                    username="bench-js-%d" % i,
+                    email="bench-js-%d@peeljobs.com" % i,
+                    user_type="JS",
+                    is_active=True,
+                    current_city_id=random.choice(cities).id,
+                )
+                for i in range(start, start + size)
+            )
+            technical_skills = TechnicalSkill.objects.bulk_create(
+                TechnicalSkill(skill_id=random.choice(skills).id)
+                for _ in range(size * 2)
+            )
+            User.skills.through.objects.bulk_create(
+                User.skills.through(
+                    user_id=user.id, technicalskill_id=technical_skills[2 * i + k].id
+                )
+                for i, user in enumerate(users)
+                for k in range(2)
+            )
+            self.stdout.write("created %d jobseekers" % (start + size))
+        with connection.cursor() as cursor:
+            # planner statistics for the uncommitted fixture rows
+            cursor.execute("ANALYZE")
+
+    def report(self, label, users, messages, seconds, queries):
+        self.stdout.write(
+            "%-7s users: %7d  mails: %7d  users/sec: %9.1f  queries/1000 users: %8.1f"
+            % (
+                label,
+                users,
+                messages,
+                users / seconds if seconds else 0,
+                1000.0 * queries / users if users else 0,
+            )
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.create_fixture(options)
+
+            counter = QueryCounter()
+            with connection.execute_wrapper(counter):
+                start = time.perf_counter()
+                users, messages = legacy_job_alerts(options["legacy_users"])
+                seconds = time.perf_counter() - start
+            self.report("legacy", users, messages, seconds, counter.count)
+
+            fanout = JobAlertFanout()
+            counter = QueryCounter()
+            with connection.execute_wrapper(counter):
+                start = time.perf_counter()
+                batches = sum(1 for _ in fanout.batches())
+                seconds = time.perf_counter() - start
+            self.report("fanout", fanout.users, fanout.messages, seconds, counter.count)
+            self.stdout.write("%d send_bulk_email tasks" % batches)
+            transaction.set_rollback(True)
@@ -0,0 +1,142 @@
+import json
+import threading
+import time
+from unittest import mock
+
+import boto3
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.template import loader
+from django.test import RequestFactory
+
+from dashboard import tasks
+from peeldb.management.commands.benchmark_slug_resolver import percentile
+from peeldb.models import JobPost, User
+from pjob import views
+
+
+def inline_notification(s3_seconds, ses_seconds):
+    # what job_apply did in the request before the pipeline: a resume
+    # download, a new SES client and the send, kept as the baseline
+    def notify(applied_job):
+        time.sleep(s3_seconds)
+        client = boto3.client(
+            "ses",
+            region_name="eu-west-1",
+            aws_access_key_id="benchmark",
+            aws_secret_access_key="benchmark",
+        )
+        job_post = applied_job.job_post
+        loader.get_template("email/applicant_apply_job.html").render(
+            {"user": applied_job.user, "recruiter": job_post.user, "job_post": job_post}
+        )
+        time.sleep(ses_seconds)
+        return client
+
+    return notify
+
+
+class Command(BaseCommand):
+    help = (
+        "Times job_apply under concurrent applicants with the notification sent "
+        "in the request against queued. AWS and broker round trips are "
+        "simulated with the given latencies, nothing is sent"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--applicants", type=int, default=200)
+        parser.add_argument("--concurrency", type=int, default=20)
+        parser.add_argument("--s3-ms", type=float, default=80)
+        parser.add_argument("--ses-ms", type=float, default=120)
+        parser.add_argument("--broker-ms", type=float, default=2)
+
+    def create_fixture(self, options):
+        # committed, the applicant threads use their own connections
+        self.recruiter = User.objects.create(
+            username="bench-apply-recruiter", email="bench-apply-recruiter@peeljobs.com"
+        )
+        self.job_post = JobPost.objects.create(
+            user=self.recruiter,
+            title="bench apply job",
+            slug="/bench-apply-job/",
+            company_name="bench",
+            vacancies=1,
+            job_type="full-time",
+            status="Live",
+        )
+        self.applicants = User.objects.bulk_create(
+            User(
+                username="bench-apply-%d" % i,
+                email="bench-apply-%d@peeljobs.com" % i,
+                user_type="JS",
+                is_active=True,
+                resume="resume/bench/resume.docx",
+            )
+            for i in range(2 * options["applicants"])
+        )
+
+    def apply(self, users, timings, errors):
+        factory = RequestFactory()
+        User.objects.exists()
+        try:
+            for user in users:
+                request = factory.post(
+                    "/jobs/apply/", REMOTE_ADDR="127.0.0.1", HTTP_USER_AGENT="bench"
+                )
+                request.user = user
+                start = time.perf_counter()
+                response = views.job_apply(request, self.job_post.id)
+                timings.append((time.perf_counter() - start) * 1000)
+                if json.loads(response.content)["error"]:
+                    errors.append(user.id)
+        finally:
+            connection.close()
+
+    def run(self, label, users, concurrency):
+        timings = []
+        errors = []
+        threads = [
+            threading.Thread(
+                target=self.apply, args=(users[i::concurrency], timings, errors)
+            )
+            for i in range(concurrency)
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        seconds = time.perf_counter() - start
+        self.stdout.write(
+            "%-8s applies: %5d  errors: %3d  applies/sec: %8.1f  "
+            "p50: %8.1f ms  p95: %8.1f ms"
+            % (
+                label,
+                len(timings),
+                len(errors),
+                len(timings) / seconds,
+                percentile(timings, 50),
+                percentile(timings, 95),
+            )
+        )
+
+    def handle(self, *args, **options):
+        applicants = options["applicants"]
+        try:
+            self.create_fixture(options)
+            with mock.patch.object(
+                views,
+                "notify_application",
+                inline_notification(
+                    options["s3_ms"] / 1000.0, options["ses_ms"] / 1000.0
+                ),
+            ):
+                self.run("inline", self.applicants[:applicants], options["concurrency"])
+            with mock.patch.object(
+                tasks.sending_application_notification,
+                "delay",
+                lambda applied_job_id: time.sleep(options["broker_ms"] / 1000.0),
+            ):
+                self.run("queued", self.applicants[applicants:], options["concurrency"])
+        finally:
+            User.objects.filter(username__startswith="bench-apply-").delete()
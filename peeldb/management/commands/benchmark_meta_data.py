@@ -0,0 +1,77 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.template import Context, Template
+from django.test.utils import CaptureQueriesContext
+
+from mpcomp.meta_templates import meta_templates
+from mpcomp.views import get_meta_data
+from peeldb.management.commands.benchmark_slug_resolver import percentile
+from peeldb.models import MetaData
+
+BENCHMARK_META_NAMES = ("skill_location_jobs", "location_jobs")
+
+
+def query_meta_data(name, data):
+    # per request query and compile the template registry replaced, kept as
+    # the baseline
+    final_location = ", ".join(data.get("final_location") or [])
+    final_skill = ", ".join(data.get("final_skill") or [])
+    context = {"city": final_location, "skill": final_skill, "current_page": 1}
+    meta_title = meta_description = h1_tag = ""
+    meta = MetaData.objects.filter(name=name)
+    if meta:
+        meta_title = Template(meta[0].meta_title).render(Context(context))
+        meta_description = Template(meta[0].meta_description).render(Context(context))
+        h1_tag = Template(meta[0].h1_tag).render(Context(context))
+    return meta_title, meta_description, h1_tag
+
+
+class Command(BaseCommand):
+    help = "Times get_meta_data per call against compiling MetaData per request"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--calls", type=int, default=2000)
+
+    def ensure_meta_data(self):
+        # sample rows, rolled back with the benchmark, for empty databases
+        for name in BENCHMARK_META_NAMES:
+            if not MetaData.objects.filter(name=name).exists():
+                MetaData.objects.create(
+                    name=name,
+                    meta_title="{{ skill }} Jobs in {{ city }}"
+                    "{% if current_page > 1 %} - Page {{ current_page }}{% endif %}",
+                    meta_description="Apply to {{ skill }} jobs in {{ city }}, "
+                    "latest openings for freshers and experienced candidates",
+                    h1_tag="{{ skill }} Jobs in {{ city }}",
+                )
+
+    def run(self, label, function, name, calls):
+        data = {"final_skill": ["Python", "Django"], "final_location": ["Hyderabad"]}
+        timings = []
+        with CaptureQueriesContext(connection) as context:
+            for _ in range(calls):
+                start = time.perf_counter()
+                function(name, data)
+                timings.append((time.perf_counter() - start) * 1000000)
+        self.stdout.write(
+            "%-20s %-8s queries/call: %5.2f  p50: %8.1f us  p95: %8.1f us"
+            % (
+                name,
+                label,
+                float(len(context.captured_queries)) / calls,
+                percentile(timings, 50),
+                percentile(timings, 95),
+            )
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.ensure_meta_data()
+            meta_templates.invalidate()
+            for name in BENCHMARK_META_NAMES:
+                self.run("queries", query_meta_data, name, options["calls"])
+                self.run("registry", get_meta_data, name, options["calls"])
+            transaction.set_rollback(True)
+        meta_templates.invalidate()
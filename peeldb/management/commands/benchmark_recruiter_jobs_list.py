@@ -0,0 +1,151 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+
+from peeldb.applicant_tally import refresh_applicant_tallies
+from peeldb.models import AppliedJobs, City, Company, Industry, JobPost, Skill, User
+from recruiter.job_listing import (
+    JOBS_PER_PAGE,
+    estimated_count,
+    job_page,
+    recruiter_jobs,
+)
+from recruiter.serializers import JobPostSerializer
+
+
+def legacy_jobs_list(user, page):
+    # the agency admin listing of jobs_list before the cursor pages: a
+    # Count over every job, a separate count and an OFFSET slice, kept as
+    # the baseline
+    jobs = (
+        JobPost.objects.filter(user__company=user.company)
+        .exclude(status__in=["Disabled", "Expired"])
+        .prefetch_related("location", "agency_recruiters")
+        .annotate(responses=Count("appliedjobs"))
+        .order_by("-id")
+    )
+    total = jobs.count()
+    jobs = jobs[(page - 1) * JOBS_PER_PAGE : page * JOBS_PER_PAGE]
+    return total, JobPostSerializer(jobs, many=True).data
+
+
+def cursor_jobs_list(user, **cursors):
+    jobs = recruiter_jobs(user).exclude(status__in=["Disabled", "Expired"])
+    total, exact = estimated_count(jobs)
+    page = job_page(jobs, **cursors)
+    return total, JobPostSerializer(page.jobs, many=True).data
+
+
+class Command(BaseCommand):
+    help = (
+        "Times the recruiter jobs_list API on a generated agency, the first "
+        "and a deep page, with OFFSET pages and a Count over the listing "
+        "against cursor pages and the applicant tallies. Nothing is kept"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--jobs", type=int, default=10000)
+        parser.add_argument("--applications", type=int, default=5)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def create_fixture(self, options):
+        company = Company.objects.create(
+            name="bench agency", company_type="Consultant", is_active=True
+        )
+        self.user = User.objects.create(
+            username="bench-jobs-admin",
+            email="bench-jobs-admin@peeljobs.com",
+            user_type="RR",
+            company=company,
+            agency_admin=True,
+        )
+        skills = Skill.objects.bulk_create(
+            Skill(name="bench skill %d" % i, slug="bench-skill-%d" % i, status="Active")
+            for i in range(50)
+        )
+        industries = Industry.objects.bulk_create(
+            Industry(name="bench industry %d" % i, status="Active") for i in range(20)
+        )
+        cities = list(City.objects.all()[:50])
+        jobs = JobPost.objects.bulk_create(
+            JobPost(
+                user=self.user,
+                company=company,
+                title="bench job %d" % i,
+                slug="/bench-job-%d/" % i,
+                vacancies=1,
+                job_type="full-time",
+                status=random.choice(["Live", "Live", "Pending", "Expired"]),
+            )
+            for i in range(options["jobs"])
+        )
+        JobPost.skills.through.objects.bulk_create(
+            JobPost.skills.through(jobpost_id=job.id, skill_id=skill.id)
+            for job in jobs
+            for skill in random.sample(skills, 3)
+        )
+        JobPost.industry.through.objects.bulk_create(
+            JobPost.industry.through(
+                jobpost_id=job.id, industry_id=random.choice(industries).id
+            )
+            for job in jobs
+        )
+        if cities:
+            JobPost.location.through.objects.bulk_create(
+                JobPost.location.through(
+                    jobpost_id=job.id, city_id=random.choice(cities).id
+                )
+                for job in jobs
+            )
+        AppliedJobs.objects.bulk_create(
+            AppliedJobs(job_post_id=job.id, status="Pending")
+            for job in jobs
+            for _ in range(random.randint(0, 2 * options["applications"]))
+        )
+        refresh_applicant_tallies([job.id for job in jobs])
+        with connection.cursor() as cursor:
+            # planner statistics for the uncommitted fixture rows
+            cursor.execute("ANALYZE")
+        self.listed = list(
+            JobPost.objects.filter(user=self.user)
+            .exclude(status__in=["Disabled", "Expired"])
+            .order_by("-id")
+            .values_list("id", flat=True)
+        )
+
+    def time(self, label, run, repeat):
+        timings = []
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                total, jobs = run()
+                timings.append((time.perf_counter() - start) * 1000)
+        self.stdout.write(
+            "%-14s jobs: %3d  total: %6d  queries: %3d  ms: %8.1f"
+            % (label, len(jobs), total, len(queries), min(timings))
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.create_fixture(options)
+            self.stdout.write("%d listed jobs" % len(self.listed))
+            deep = len(self.listed) // JOBS_PER_PAGE // 2 or 1
+            cursor = self.listed[(deep - 1) * JOBS_PER_PAGE - 1] if deep > 1 else None
+            repeat = options["repeat"]
+            self.time("legacy first", lambda: legacy_jobs_list(self.user, 1), repeat)
+            self.time("cursor first", lambda: cursor_jobs_list(self.user), repeat)
+            self.time(
+                "legacy page %d" % deep,
+                lambda: legacy_jobs_list(self.user, deep),
+                repeat,
+            )
+            self.time(
+                "cursor page %d" % deep,
+                lambda: cursor_jobs_list(self.user, after=cursor),
+                repeat,
+            )
+            transaction.set_rollback(True)
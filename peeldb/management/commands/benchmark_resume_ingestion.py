@@ -0,0 +1,259 @@
+import io
+import os
+import shutil
+import time
+import zipfile
+from collections import Counter
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils.crypto import get_random_string
+
+from mpcomp import resume_text
+from mpcomp.resume_text import RESUME_CONVERTERS, RESUME_EXTRACTORS, resume_format
+from mpcomp.views import get_resume_data
+from peeldb.models import AgencyResume, AppliedJobs, JobPost, ResumeBatch, User
+from recruiter import resume_ingestion
+
+BENCHMARK_FORMATS = ("docx", "pdf", "odt")
+
+
+def available_formats():
+    # the synthetic formats whose converter is installed here
+    return [
+        file_format
+        for file_format in BENCHMARK_FORMATS
+        if file_format not in RESUME_CONVERTERS
+        or shutil.which(RESUME_CONVERTERS[file_format][0])
+    ]
+
+
+def docx_resume(text):
+    content = io.BytesIO()
+    with zipfile.ZipFile(content, "w") as document:
+        document.writestr(
+            "word/document.xml",
+            '<w:document xmlns:w="http://schemas.openxmlformats.org/'
+            'wordprocessingml/2006/main"><w:body>'
+            + "".join(
+                "<w:p><w:r><w:t>%s</w:t></w:r></w:p>" % line
+                for line in text.splitlines()
+            )
+            + "</w:body></w:document>",
+        )
+    return content.getvalue()
+
+
+def odt_resume(text):
+    content = io.BytesIO()
+    with zipfile.ZipFile(content, "w") as document:
+        document.writestr("mimetype", "application/vnd.oasis.opendocument.text")
+        document.writestr(
+            "content.xml",
+            '<office:document-content xmlns:office="urn:oasis:names:tc:'
+            'opendocument:xmlns:office:1.0" xmlns:text="urn:oasis:names:tc:'
+            'opendocument:xmlns:text:1.0"><office:body><office:text>'
+            + "".join("<text:p>%s</text:p>" % line for line in text.splitlines())
+            + "</office:text></office:body></office:document-content>",
+        )
+    return content.getvalue()
+
+
+def pdf_resume(text):
+    stream = "BT /F1 11 Tf 72 760 Td 14 TL %s ET" % " ".join(
+        "(%s) '" % line for line in text.splitlines()
+    )
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        "<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R "
+        "/Resources << /Font << /F1 5 0 R >> >> >>",
+        "<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream),
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    content = "%PDF-1.4\n"
+    offsets = []
+    for i, body in enumerate(objects):
+        offsets.append(len(content))
+        content += "%d 0 obj\n%s\nendobj\n" % (i + 1, body)
+    xref = len(content)
+    content += "xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    content += "".join("%010d 00000 n \n" % offset for offset in offsets)
+    content += "trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1,
+        xref,
+    )
+    return content.encode("ascii")
+
+
+SYNTHETIC_RESUMES = {"docx": docx_resume, "pdf": pdf_resume, "odt": odt_resume}
+
+
+def cold_resume_cache():
+    # a version no text was cached under, every resume is extracted
+    return mock.patch.object(
+        resume_text, "RESUME_TEXT_VERSION", "bench-" + get_random_string(12)
+    )
+
+
+def legacy_ingest(user, job_post, resumes, s3_seconds):
+    # the per file path of multiple_resume_upload, kept as the baseline, the
+    # account mail left out
+    for name, content in resumes:
+        email, mobile, text = get_resume_data(SimpleUploadedFile(name, content))
+        if not email:
+            continue
+        if AgencyResume.objects.filter(email=email, uploaded_by=user).first():
+            continue
+        if not User.objects.filter(email__iexact=email).first():
+            account = User.objects.create(
+                email=email, user_type="JS", username=email, registered_from="Pool"
+            )
+            account.set_password(get_random_string(length=10).lower())
+            account.save()
+        time.sleep(s3_seconds)
+        agency_resume = AgencyResume.objects.create(
+            candidate_name=email,
+            email=email,
+            resume="resume/" + name,
+            uploaded_by=user,
+            mobile=mobile,
+        )
+        AppliedJobs.objects.create(
+            status="Pending", resume_applicant=agency_resume, job_post=job_post
+        )
+
+
+class Command(BaseCommand):
+    help = (
+        "Times the batch resume ingestion against the per file upload on a "
+        "mixed format corpus, rolled back afterwards. S3 uploads are "
+        "simulated with --s3-ms"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--files", type=int, default=1000)
+        parser.add_argument("--legacy-files", type=int, default=100)
+        parser.add_argument(
+            "--new-accounts",
+            type=int,
+            default=100,
+            help="resumes whose email has no account yet, the others belong "
+            "to existing jobseekers",
+        )
+        parser.add_argument(
+            "--corpus",
+            help="directory of real resumes (doc, docx, pdf, odt) used instead "
+            "of synthetic docx, pdf and odt files",
+        )
+        parser.add_argument("--processes", type=int, default=os.cpu_count())
+        parser.add_argument("--s3-ms", type=float, default=60)
+
+    def corpus(self, options):
+        if options["corpus"]:
+            samples = [
+                (name, open(os.path.join(options["corpus"], name), "rb").read())
+                for name in sorted(os.listdir(options["corpus"]))
+                if resume_format(name) in RESUME_EXTRACTORS
+            ]
+            return [
+                (
+                    "%d-%s" % (i, samples[i % len(samples)][0]),
+                    samples[i % len(samples)][1],
+                )
+                for i in range(options["files"])
+            ]
+        formats = available_formats()
+        skipped = set(BENCHMARK_FORMATS) - set(formats)
+        if skipped:
+            self.stderr.write(
+                "no converter installed for %s, left out" % ", ".join(sorted(skipped))
+            )
+        resumes = []
+        for i in range(options["files"]):
+            file_format = formats[i % len(formats)]
+            text = "Candidate %d\nbench-cv-%d@peeljobs.com\n98%08d\n%s" % (
+                i,
+                i,
+                i,
+                "Python Django developer with 5 years of experience\n" * 20,
+            )
+            resumes.append(
+                ("cv-%d.%s" % (i, file_format), SYNTHETIC_RESUMES[file_format](text))
+            )
+        return resumes
+
+    def create_fixture(self, options):
+        self.recruiter = User.objects.create(
+            username="bench-ingest-recruiter",
+            email="bench-ingest-recruiter@peeljobs.com",
+            user_type="RR",
+        )
+        self.job_post = JobPost.objects.create(
+            user=self.recruiter,
+            title="bench ingest job",
+            slug="/bench-ingest-job/",
+            vacancies=1,
+            job_type="full-time",
+            status="Live",
+        )
+        User.objects.bulk_create(
+            User(
+                username="bench-cv-%d@peeljobs.com" % i,
+                email="bench-cv-%d@peeljobs.com" % i,
+                user_type="JS",
+            )
+            for i in range(options["new_accounts"], options["files"])
+        )
+
+    def report(self, label, resumes, seconds):
+        formats = Counter(resume_format(name) for name, content in resumes)
+        self.stdout.write(
+            "%-7s files: %5d (%s)  seconds: %8.2f  files/sec: %8.1f"
+            % (
+                label,
+                len(resumes),
+                ", ".join("%s %d" % item for item in sorted(formats.items())),
+                seconds,
+                len(resumes) / seconds,
+            )
+        )
+
+    def handle(self, *args, **options):
+        resumes = self.corpus(options)
+        s3_seconds = options["s3_ms"] / 1000.0
+        with transaction.atomic():
+            self.create_fixture(options)
+            # an even sample, with the same share of new accounts as the batch
+            legacy = resumes[:: max(1, options["files"] // options["legacy_files"])]
+            start = time.perf_counter()
+            with transaction.atomic(), cold_resume_cache():
+                legacy_ingest(self.recruiter, self.job_post, legacy, s3_seconds)
+                transaction.set_rollback(True)
+            self.report("legacy", legacy, time.perf_counter() - start)
+
+            archive = io.BytesIO()
+            with zipfile.ZipFile(archive, "w") as batch_archive:
+                for name, content in resumes:
+                    batch_archive.writestr(name, content)
+            batch = ResumeBatch.objects.create(
+                uploaded_by=self.recruiter, job_post_ids=[self.job_post.id]
+            )
+            with cold_resume_cache(), mock.patch.object(
+                resume_ingestion,
+                "upload_resume",
+                lambda path, content: time.sleep(s3_seconds),
+            ):
+                start = time.perf_counter()
+                resume_ingestion.ResumeBatchIngestion(
+                    batch, processes=options["processes"]
+                ).run(archive.getvalue())
+                seconds = time.perf_counter() - start
+            self.report("batch", resumes, seconds)
+            self.stdout.write(
+                "batch created: %d  duplicates: %d  failed: %d"
+                % (batch.created, batch.duplicates, batch.failed)
+            )
+            transaction.set_rollback(True)
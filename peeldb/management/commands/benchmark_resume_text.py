@@ -0,0 +1,173 @@
+import io
+import json
+import os
+import resource
+import time
+import zipfile
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from lxml import etree
+
+from mpcomp.resume_text import (
+    RESUME_EXTRACTORS,
+    extract_resume,
+    resume_data,
+    resume_format,
+)
+from peeldb.management.commands.benchmark_resume_ingestion import (
+    SYNTHETIC_RESUMES,
+    available_formats,
+)
+
+WORD = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+
+
+def dom_docx_text(content):
+    # the whole tree reading of word/document.xml used before, kept as the
+    # docx baseline
+    document = etree.fromstring(
+        zipfile.ZipFile(io.BytesIO(content)).read("word/document.xml")
+    )
+    paragraphs = []
+    for paragraph in [e for e in document.iter() if e.tag == "{" + WORD + "}p"]:
+        text = ""
+        for element in paragraph.iter():
+            if element.tag == "{" + WORD + "}t":
+                if element.text:
+                    text = text + element.text
+            elif element.tag == "{" + WORD + "}tab":
+                text = text + "\t"
+        if text:
+            paragraphs.append(text)
+    return "\n\n".join(paragraphs)
+
+
+def max_rss_mb():
+    # kilobytes on linux, the converters run as children
+    return (
+        max(
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+        )
+        / 1024.0
+    )
+
+
+def timed(extract, resumes):
+    """{format: [seconds, files]} of extract run on each resume."""
+    timings = defaultdict(lambda: [0.0, 0])
+    for name, content in resumes:
+        start = time.perf_counter()
+        extract(name, content)
+        timing = timings[resume_format(name)]
+        timing[0] += time.perf_counter() - start
+        timing[1] += 1
+    return timings
+
+
+class Command(BaseCommand):
+    help = (
+        "Times resume text extraction per format, uncached, from the content "
+        "hash cache and with the previous docx reader, each in a forked "
+        "process to report its peak RSS"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--files", type=int, default=300)
+        parser.add_argument("--paragraphs", type=int, default=200)
+        parser.add_argument(
+            "--corpus",
+            help="directory of real resumes (doc, docx, pdf, odt) used instead "
+            "of synthetic ones",
+        )
+
+    def corpus(self, options):
+        if options["corpus"]:
+            return [
+                (name, open(os.path.join(options["corpus"], name), "rb").read())
+                for name in sorted(os.listdir(options["corpus"]))
+                if resume_format(name) in RESUME_EXTRACTORS
+            ]
+        formats = available_formats()
+        resumes = []
+        for i in range(options["files"]):
+            file_format = formats[i % len(formats)]
+            text = "Candidate %d\ncv-%d@peeljobs.com\n98%08d\n%s" % (
+                i,
+                i,
+                i,
+                "Python\tDjango developer with 5 years of experience\n"
+                * options["paragraphs"],
+            )
+            resumes.append(
+                ("cv-%d.%s" % (i, file_format), SYNTHETIC_RESUMES[file_format](text))
+            )
+        return resumes
+
+    def phase(self, run, resumes):
+        """Runs run(resumes) in a child process, returns its timings and peak
+        RSS."""
+        connections.close_all()
+        read, write = os.pipe()
+        pid = os.fork()
+        if not pid:
+            os.close(read)
+            start_rss = max_rss_mb()
+            timings = run(resumes)
+            with os.fdopen(write, "w") as result:
+                json.dump(
+                    {"timings": timings, "rss": max_rss_mb(), "start": start_rss},
+                    result,
+                )
+            os._exit(0)
+        os.close(write)
+        with os.fdopen(read) as result:
+            output = json.loads(result.read() or "{}")
+        os.waitpid(pid, 0)
+        return output
+
+    def handle(self, *args, **options):
+        resumes = self.corpus(options)
+        docx = [resume for resume in resumes if resume_format(resume[0]) == "docx"]
+
+        def cached(resumes):
+            for name, content in resumes:
+                resume_data(name, content)
+            return timed(resume_data, resumes)
+
+        phases = [
+            (
+                "extract",
+                lambda resumes: timed(lambda *r: extract_resume(r), resumes),
+                resumes,
+            ),
+            ("cached", cached, resumes),
+            (
+                "dom docx",
+                lambda resumes: timed(lambda n, c: dom_docx_text(c), resumes),
+                docx,
+            ),
+        ]
+        self.stdout.write(
+            "%d resumes from %s"
+            % (len(resumes), options["corpus"] or "synthetic corpus")
+        )
+        for label, run, phase_resumes in phases:
+            if not phase_resumes:
+                continue
+            output = self.phase(run, phase_resumes)
+            for file_format, (seconds, files) in sorted(output["timings"].items()):
+                self.stdout.write(
+                    "%-9s %-5s files: %5d  ms/file: %8.2f  peak RSS: %7.1f MB "
+                    "(+%.1f MB)"
+                    % (
+                        label,
+                        file_format,
+                        files,
+                        seconds * 1000 / files,
+                        output["rss"],
+                        output["rss"] - output["start"],
+                    )
+                )
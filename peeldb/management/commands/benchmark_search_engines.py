@@ -0,0 +1,61 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.http import QueryDict
+from django.test.utils import CaptureQueriesContext
+
+from peeldb.management.commands.benchmark_slug_resolver import percentile
+from peeldb.models import City, Industry, Skill
+from pjob.refine_search import database_refined_search, haystack_refined_search
+
+
+class Command(BaseCommand):
+    help = "Runs the listing page filters through the haystack and database engines"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def get_searches(self):
+        searches = [QueryDict("")]
+        for skill in Skill.objects.filter(status="Active")[:5]:
+            searches.append(QueryDict("refine_skill=" + skill.name))
+        for city in City.objects.filter(status="Enabled")[:5]:
+            searches.append(QueryDict("refine_location=" + city.name))
+        for industry in Industry.objects.all()[:3]:
+            searches.append(QueryDict("refine_industry=" + industry.name))
+        searches.append(QueryDict("job_type=Fresher"))
+        searches.append(QueryDict("job_type=walk-in&refine_experience_min=2"))
+        return searches
+
+    def run(self, label, engine, searches, repeat):
+        timings = []
+        queries = 0
+        try:
+            for _ in range(repeat):
+                for search in searches:
+                    with CaptureQueriesContext(connection) as context:
+                        start = time.perf_counter()
+                        job_list = engine(search)[0]
+                        job_list.count()
+                        list(job_list[0:20])
+                        timings.append((time.perf_counter() - start) * 1000)
+                    queries += len(context.captured_queries)
+        except Exception as e:
+            self.stdout.write("%-8s failed: %s" % (label, e))
+            return
+        self.stdout.write(
+            "%-8s queries/page: %6.2f  p50: %8.3f ms  p95: %8.3f ms"
+            % (
+                label,
+                float(queries) / len(timings),
+                percentile(timings, 50),
+                percentile(timings, 95),
+            )
+        )
+
+    def handle(self, *args, **options):
+        searches = self.get_searches()
+        self.stdout.write("%d searches x %d" % (len(searches), options["repeat"]))
+        self.run("haystack", haystack_refined_search, searches, options["repeat"])
+        self.run("database", database_refined_search, searches, options["repeat"])
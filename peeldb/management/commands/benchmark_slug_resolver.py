@@ -0,0 +1,160 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from mpcomp.slug_index import slug_index
+from mpcomp.views import (
+    get_valid_locations_list,
+    get_valid_qualifications,
+    get_valid_skills_list,
+)
+from peeldb.models import City, Qualification, Skill
+
+
+def query_skills_list(skill):
+    # per n-gram query resolver the slug index replaced, kept as the baseline
+    final_skill = []
+    s_list = Skill.objects.filter(slug__iexact=skill, status="Active")
+    if s_list:
+        return [s_list[0].name]
+    skill = skill.split("-")
+    for i, j in enumerate(skill):
+        while j:
+            sk = Skill.objects.filter(slug__iexact=j, status="Active")
+            if sk.exists() and sk[0].name not in final_skill:
+                final_skill.append(sk[0].name)
+            i = i + 1
+            if i < len(skill):
+                j = j + "-" + skill[i]
+            else:
+                break
+    return final_skill
+
+
+def query_locations_list(location):
+    final_location = []
+    location = location.lower().split("-")
+    k = -1
+    if location != [""]:
+        for i, j in enumerate(location):
+            if i <= k:
+                continue
+            while True:
+                city = City.objects.filter(slug__iexact=j, status="Enabled")
+                if city:
+                    final_location.append(city[0].name)
+                    k = i
+                    break
+                i = i + 1
+                if i < len(location):
+                    j = j + "-" + location[i]
+                else:
+                    break
+    return final_location
+
+
+def query_qualifications(skill):
+    final_edu = []
+    s_list = Qualification.objects.filter(slug__iexact=skill, status="Active")
+    if s_list:
+        return [s_list[0].name]
+    skill = skill.split("-")
+    for i, j in enumerate(skill):
+        while j:
+            edu = Qualification.objects.filter(slug__iexact=j, status="Active")
+            if edu.exists() and edu[0].name not in final_edu:
+                final_edu.append(edu[0].name)
+            i = i + 1
+            if i < len(skill):
+                j = j + "-" + skill[i]
+            else:
+                break
+    return final_edu
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    if not values:
+        return 0
+    index = min(len(values) - 1, int(round(pct / 100.0 * (len(values) - 1))))
+    return values[index]
+
+
+class Command(BaseCommand):
+    help = "Compares queries per request and latency of the slug resolvers"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--corpus",
+            help="file with one landing page slug per line, "
+            "defaults to slugs sampled from the database",
+        )
+        parser.add_argument("--size", type=int, default=500)
+
+    def get_corpus(self, options):
+        if options.get("corpus"):
+            with open(options["corpus"]) as corpus:
+                return [line.strip() for line in corpus if line.strip()]
+        skills = list(
+            Skill.objects.filter(status="Active").values_list("slug", flat=True)
+        )
+        cities = list(
+            City.objects.filter(status="Enabled").values_list("slug", flat=True)
+        )
+        if not skills or not cities:
+            return []
+        corpus = []
+        for _ in range(options["size"]):
+            corpus.append(
+                random.choice(
+                    [
+                        random.choice(skills),
+                        random.choice(skills) + "-" + random.choice(skills),
+                        "-".join(random.sample(skills, min(3, len(skills)))),
+                        random.choice(skills) + "-" + random.choice(cities),
+                        random.choice(cities),
+                    ]
+                )
+            )
+        return corpus
+
+    def run(self, label, resolvers, corpus):
+        timings = []
+        queries = 0
+        for slug in corpus:
+            with CaptureQueriesContext(connection) as context:
+                start = time.perf_counter()
+                for resolver in resolvers:
+                    resolver(slug)
+                timings.append((time.perf_counter() - start) * 1000)
+            queries += len(context.captured_queries)
+        self.stdout.write(
+            "%-8s queries/request: %6.2f  p50: %8.3f ms  p95: %8.3f ms"
+            % (
+                label,
+                float(queries) / len(corpus),
+                percentile(timings, 50),
+                percentile(timings, 95),
+            )
+        )
+
+    def handle(self, *args, **options):
+        corpus = self.get_corpus(options)
+        if not corpus:
+            self.stdout.write("No slugs to benchmark")
+            return
+        self.stdout.write("%d slugs" % len(corpus))
+        self.run(
+            "queries",
+            [query_skills_list, query_locations_list, query_qualifications],
+            corpus,
+        )
+        slug_index.lookup("skill", "")
+        self.run(
+            "index",
+            [get_valid_skills_list, get_valid_locations_list, get_valid_qualifications],
+            corpus,
+        )
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from mpcomp.cache import cache_stats
+from mpcomp.listing_cache import listing_cache_stats
+
+
+class Command(BaseCommand):
+    help = "Prints the hit rates of the shared cache lookups per key prefix"
+
+    def handle(self, *args, **options):
+        for prefix, stats in cache_stats().items():
+            self.stdout.write(
+                "%-12s hits: %8d  misses: %8d  hit rate: %5.1f%%"
+                % (prefix, stats["hits"], stats["misses"], 100 * stats["hit_rate"])
+            )
+        stats = listing_cache_stats()
+        self.stdout.write(
+            "%-12s hits: %8d  misses: %8d  invalidations: %d"
+            % ("listing", stats["hits"], stats["misses"], stats["invalidations"])
+        )
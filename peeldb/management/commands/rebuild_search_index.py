@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+
+from peeldb.search_rebuild import REBUILD_BATCH, REBUILD_WORKERS, rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = (
+        "Builds the search indexes into a new Elasticsearch index and swaps "
+        "the alias searches read to it once its document counts match"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=REBUILD_WORKERS)
+        parser.add_argument("--batch-size", type=int, default=REBUILD_BATCH)
+        parser.add_argument(
+            "--keep-old",
+            action="store_true",
+            help="keep the replaced index, e.g. to swap back to it",
+        )
+
+    def handle(self, *args, **options):
+        report = rebuild_search_index(
+            workers=options["workers"],
+            batch_size=options["batch_size"],
+            keep_old=options["keep_old"],
+        )
+        for label, documents in sorted(report["documents"].items()):
+            self.stdout.write("%s: %d documents" % (label, documents))
+        self.stdout.write(
+            "%s built in %.1fs, %.0f documents/s, swapped in after %.1fs, "
+            "replaced: %s"
+            % (
+                report["index"],
+                report["fill_seconds"],
+                report["documents_per_second"],
+                report["seconds"],
+                ", ".join(report["replaced"]) or "none",
+            )
+        )
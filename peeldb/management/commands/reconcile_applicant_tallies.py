@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from peeldb.applicant_tally import reconcile_applicant_tallies
+
+
+class Command(BaseCommand):
+    help = "Recounts the applicant tally of every job"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        jobs, corrected = reconcile_applicant_tallies(options["batch_size"])
+        self.stdout.write("%d jobs, %d tallies corrected" % (jobs, corrected))
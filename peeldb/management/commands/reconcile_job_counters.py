@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from peeldb.job_counters import reconcile_job_counters
+
+
+class Command(BaseCommand):
+    help = "Recounts the live job counters of every taxonomy row"
+
+    def handle(self, *args, **options):
+        for kind, rows in reconcile_job_counters().items():
+            self.stdout.write("%s: %d counters" % (kind, rows))
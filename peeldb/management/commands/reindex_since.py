@@ -0,0 +1,35 @@
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from peeldb.search_queue import enqueue_since, process_index_queue
+
+
+class Command(BaseCommand):
+    help = (
+        "Queues the objects changed since a point in time for search indexing, "
+        "e.g. to catch up after a search backend outage"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--since", help="YYYY-MM-DD or YYYY-MM-DD HH:MM")
+        parser.add_argument("--hours", type=int, help="changed in the last N hours")
+        parser.add_argument(
+            "--no-process",
+            action="store_true",
+            help="only queue, leave indexing to the celery task",
+        )
+
+    def handle(self, *args, **options):
+        if options["since"]:
+            try:
+                since = datetime.fromisoformat(options["since"])
+            except ValueError:
+                raise CommandError("invalid --since %r" % options["since"])
+        elif options["hours"]:
+            since = datetime.now() - timedelta(hours=options["hours"])
+        else:
+            raise CommandError("pass --since or --hours")
+        self.stdout.write("%d objects queued" % enqueue_since(since))
+        if not options["no_process"]:
+            self.stdout.write("%d objects indexed" % process_index_queue())
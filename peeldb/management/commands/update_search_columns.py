@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from peeldb.models import JobPost, update_jobpost_search_columns
+
+
+class Command(BaseCommand):
+    help = "Refreshes the denormalized skill/location/industry id columns on JobPost"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--live", action="store_true", help="only live jobs")
+
+    def handle(self, *args, **options):
+        jobs = JobPost.objects.order_by("id")
+        if options["live"]:
+            jobs = jobs.filter(status="Live")
+        ids = list(jobs.values_list("id", flat=True))
+        batch_size = options["batch_size"]
+        for start in range(0, len(ids), batch_size):
+            update_jobpost_search_columns(ids[start : start + batch_size])
+        self.stdout.write("Updated %d jobs" % len(ids))
@@ -0,0 +1,80 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.urls import reverse
+
+from dashboard.sitemaps import live_job_counts
+from mpcomp.listing_cache import listing_cache_stats
+from peeldb.job_counters import job_counts
+from peeldb.models import City, Industry, Skill
+
+
+def top_ids(counts, size):
+    return sorted(counts, key=counts.get, reverse=True)[:size]
+
+
+def slugs(model, ids):
+    slugs = dict(model.objects.filter(id__in=ids).values_list("id", "slug"))
+    return [slugs[pk] for pk in ids if slugs.get(pk)]
+
+
+def landing_urls(size):
+    """The job list and the first pages of the size most populated skill,
+    city, industry and skill in city listings."""
+    urls = [reverse("jobs:index")]
+    for slug in slugs(Skill, top_ids(job_counts.counts("skill"), size)):
+        urls.append(reverse("job_skills", kwargs={"skill": slug}))
+    for slug in slugs(City, top_ids(job_counts.counts("city"), size)):
+        urls.append(reverse("job_locations", kwargs={"location": slug}))
+    for slug in slugs(Industry, top_ids(job_counts.counts("industry"), size)):
+        urls.append(reverse("job_industries", kwargs={"industry": slug}))
+    pairs = live_job_counts(("skills", "location"))
+    pairs = sorted(pairs, key=lambda pair: pairs[pair][0], reverse=True)[:size]
+    skill_slugs = dict(
+        Skill.objects.filter(id__in={skill for skill, city in pairs}).values_list(
+            "id", "slug"
+        )
+    )
+    city_slugs = dict(
+        City.objects.filter(id__in={city for skill, city in pairs}).values_list(
+            "id", "slug"
+        )
+    )
+    for skill, city in pairs:
+        if skill_slugs.get(skill) and city_slugs.get(city):
+            urls.append(
+                reverse(
+                    "custome_search",
+                    kwargs={
+                        "skill_name": skill_slugs[skill],
+                        "city_name": city_slugs[city],
+                    },
+                )
+            )
+    return urls
+
+
+class Command(BaseCommand):
+    help = "Renders the top landing pages into the listing cache, e.g. after a deploy"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--top", type=int, default=50, help="pages per skill/city/industry list"
+        )
+        parser.add_argument(
+            "--stats", action="store_true", help="only print the cache counters"
+        )
+
+    def handle(self, *args, **options):
+        if not options["stats"]:
+            client = Client(
+                HTTP_HOST=settings.ALLOWED_HOSTS[0], raise_request_exception=False
+            )
+            failed = 0
+            urls = landing_urls(options["top"])
+            for url in urls:
+                if client.get(url).status_code != 200:
+                    failed += 1
+            self.stdout.write("%d pages warmed, %d failed" % (len(urls), failed))
+        for stat, value in listing_cache_stats().items():
+            self.stdout.write("%s: %d" % (stat, value))
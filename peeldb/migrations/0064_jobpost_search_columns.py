@@ -0,0 +1,76 @@
+# Generated by Django 5.2.2 on 2026-10-19 04:20
+
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('peeldb', '0063_question_difficulty_mcqoption_skillassessmentattempt_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='jobpost',
+            name='functional_area_ids',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.IntegerField(), blank=True, default=list, size=None),
+        ),
+        migrations.AddField(
+            model_name='jobpost',
+            name='industry_ids',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.IntegerField(), blank=True, default=list, size=None),
+        ),
+        migrations.AddField(
+            model_name='jobpost',
+            name='location_ids',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.IntegerField(), blank=True, default=list, size=None),
+        ),
+        migrations.AddField(
+            model_name='jobpost',
+            name='qualification_ids',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.IntegerField(), blank=True, default=list, size=None),
+        ),
+        migrations.AddField(
+            model_name='jobpost',
+            name='skill_ids',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.IntegerField(), blank=True, default=list, size=None),
+        ),
+        migrations.AddIndex(
+            model_name='jobpost',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['skill_ids'], name='peeldb_jobp_skill_i_3040f6_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='jobpost',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['location_ids'], name='peeldb_jobp_locatio_4bfe5c_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='jobpost',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['industry_ids'], name='peeldb_jobp_industr_d4038a_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='jobpost',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['qualification_ids'], name='peeldb_jobp_qualifi_e620df_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='jobpost',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['functional_area_ids'], name='peeldb_jobp_functio_60ce75_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='jobpost',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.search.SearchVector('title', 'job_role', 'description', config='simple'), name='peeldb_jobpost_text_gin'),
+        ),
+        migrations.RunSQL(
+            """
+            UPDATE peeldb_jobpost SET
+                skill_ids = ARRAY(SELECT skill_id FROM peeldb_jobpost_skills WHERE jobpost_id = peeldb_jobpost.id ORDER BY skill_id),
+                location_ids = ARRAY(SELECT city_id FROM peeldb_jobpost_location WHERE jobpost_id = peeldb_jobpost.id ORDER BY city_id),
+                industry_ids = ARRAY(SELECT industry_id FROM peeldb_jobpost_industry WHERE jobpost_id = peeldb_jobpost.id ORDER BY industry_id),
+                qualification_ids = ARRAY(SELECT qualification_id FROM peeldb_jobpost_edu_qualification WHERE jobpost_id = peeldb_jobpost.id ORDER BY qualification_id),
+                functional_area_ids = ARRAY(SELECT functionalarea_id FROM peeldb_jobpost_functional_area WHERE jobpost_id = peeldb_jobpost.id ORDER BY functionalarea_id)
+            """,
+            migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.2 on 2026-10-19 04:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('peeldb', '0064_jobpost_search_columns'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyReport',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('data', models.JSONField(default=dict)),
+                ('created_on', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
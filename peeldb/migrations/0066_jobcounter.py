@@ -0,0 +1,27 @@
+# Generated by Django 5.2.2 on 2026-10-19 04:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('peeldb', '0065_dailyreport'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobCounter',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('skill', 'Skill'), ('city', 'City'), ('state', 'State'), ('industry', 'Industry'), ('qualification', 'Qualification'), ('functional_area', 'FunctionalArea')], max_length=20)),
+                ('object_id', models.IntegerField()),
+                ('job_type', models.CharField(choices=[('full-time', 'Full Time'), ('internship', 'Internship'), ('walk-in', 'Walk-in'), ('government', 'Government'), ('Fresher', 'Fresher')], max_length=50)),
+                ('live', models.IntegerField(default=0)),
+                ('fresher', models.IntegerField(default=0)),
+            ],
+            options={
+                'unique_together': {('kind', 'object_id', 'job_type')},
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.2 on 2026-10-19 06:07
+
+from django.db import migrations, models
+
+
+def backfill_profile_sections(apps, schema_editor):
+    from peeldb.profile_completeness import backfill_profile_sections
+
+    backfill_profile_sections(user_model=apps.get_model("peeldb", "User"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('peeldb', '0068_resumebatch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='profile_sections',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_profile_sections, migrations.RunPython.noop),
+    ]
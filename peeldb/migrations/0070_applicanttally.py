@@ -0,0 +1,28 @@
+# Generated by Django 5.2.2 on 2026-10-19 06:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('peeldb', '0069_user_profile_sections'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ApplicantTally',
+            fields=[
+                ('job_post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='applicant_tally', serialize=False, to='peeldb.jobpost')),
+                ('total', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.RunSQL(
+            """
+            INSERT INTO peeldb_applicanttally (job_post_id, total)
+            SELECT job_post_id, COUNT(*) FROM peeldb_appliedjobs GROUP BY job_post_id
+            """,
+            migrations.RunSQL.noop,
+        ),
+    ]
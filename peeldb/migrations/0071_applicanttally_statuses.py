@@ -0,0 +1,72 @@
+# Generated by Django 5.2.2 on 2026-10-19 06:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('peeldb', '0070_applicanttally'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='applicanttally',
+            name='hired',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='applicanttally',
+            name='pending',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='applicanttally',
+            name='rejected',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='applicanttally',
+            name='selected',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='applicanttally',
+            name='shortlisted',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='applicanttally',
+            name='today',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='applicanttally',
+            name='today_date',
+            field=models.DateField(null=True),
+        ),
+        migrations.RunSQL(
+            """
+            UPDATE peeldb_applicanttally SET
+                pending = counts.pending,
+                shortlisted = counts.shortlisted,
+                selected = counts.selected,
+                rejected = counts.rejected,
+                hired = counts.hired,
+                today = counts.today,
+                today_date = CURRENT_DATE
+            FROM (
+                SELECT job_post_id,
+                    COUNT(*) FILTER (WHERE status = 'Pending') AS pending,
+                    COUNT(*) FILTER (WHERE status = 'Shortlisted') AS shortlisted,
+                    COUNT(*) FILTER (WHERE status = 'Selected') AS selected,
+                    COUNT(*) FILTER (WHERE status = 'Rejected') AS rejected,
+                    COUNT(*) FILTER (WHERE status = 'Hired') AS hired,
+                    COUNT(*) FILTER (WHERE applied_on::date = CURRENT_DATE) AS today
+                FROM peeldb_appliedjobs GROUP BY job_post_id
+            ) counts
+            WHERE counts.job_post_id = peeldb_applicanttally.job_post_id
+            """,
+            migrations.RunSQL.noop,
+        ),
+    ]
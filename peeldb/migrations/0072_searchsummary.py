@@ -0,0 +1,51 @@
+# Generated by Django 5.2.2 on 2026-10-19 06:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('peeldb', '0071_applicanttally_statuses'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchSummary',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('kind', models.CharField(choices=[('skill', 'Skill'), ('city', 'City'), ('other_skill', 'Other Skill'), ('other_location', 'Other Location')], max_length=20)),
+                ('term', models.CharField(max_length=1000)),
+                ('searches', models.IntegerField(default=0)),
+            ],
+            options={
+                'unique_together': {('date', 'kind', 'term')},
+            },
+        ),
+        migrations.RunSQL(
+            """
+            INSERT INTO peeldb_searchsummary (date, kind, term, searches)
+            SELECT r.search_on::date, 'skill', s.name, COUNT(*)
+            FROM peeldb_searchresult_skills rs
+            JOIN peeldb_searchresult r ON r.id = rs.searchresult_id
+            JOIN peeldb_skill s ON s.id = rs.skill_id
+            GROUP BY 1, 3
+            UNION ALL
+            SELECT r.search_on::date, 'city', c.name, COUNT(*)
+            FROM peeldb_searchresult_locations rl
+            JOIN peeldb_searchresult r ON r.id = rl.searchresult_id
+            JOIN peeldb_city c ON c.id = rl.city_id
+            GROUP BY 1, 3
+            UNION ALL
+            SELECT search_on::date, 'other_skill', other_skill, COUNT(*)
+            FROM peeldb_searchresult WHERE other_skill != ''
+            GROUP BY 1, 3
+            UNION ALL
+            SELECT search_on::date, 'other_location', other_location, COUNT(*)
+            FROM peeldb_searchresult WHERE other_location != ''
+            GROUP BY 1, 3
+            """,
+            migrations.RunSQL.noop,
+        ),
+    ]
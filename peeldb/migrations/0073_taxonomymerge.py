@@ -0,0 +1,34 @@
+# Generated by Django 5.2.2 on 2026-10-19 06:59
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('peeldb', '0072_searchsummary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaxonomyMerge',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('skill', 'Skill'), ('city', 'City'), ('industry', 'Industry'), ('qualification', 'Qualification'), ('functional_area', 'FunctionalArea')], max_length=20)),
+                ('source_id', models.IntegerField()),
+                ('target_id', models.IntegerField()),
+                ('jobs_only', models.BooleanField(default=False)),
+                ('delete_source', models.BooleanField(default=False)),
+                ('status', models.CharField(choices=[('Pending', 'Pending'), ('Processing', 'Processing'), ('Done', 'Done'), ('Failed', 'Failed')], default='Pending', max_length=20)),
+                ('total', models.IntegerField(default=0)),
+                ('processed', models.IntegerField(default=0)),
+                ('jobs', models.IntegerField(default=0)),
+                ('error', models.TextField(blank=True, default='')),
+                ('created_on', models.DateTimeField(auto_now_add=True)),
+                ('updated_on', models.DateTimeField(auto_now=True)),
+                ('requested_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.2 on 2026-10-19 07:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('peeldb', '0073_taxonomymerge'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchIndexRebuild',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('index_name', models.CharField(max_length=100)),
+                ('status', models.CharField(choices=[('Pending', 'Pending'), ('Processing', 'Processing'), ('Done', 'Done'), ('Failed', 'Failed')], default='Processing', max_length=20)),
+                ('documents', models.IntegerField(default=0)),
+                ('fill_seconds', models.FloatField(default=0)),
+                ('seconds', models.FloatField(default=0)),
+                ('error', models.TextField(blank=True, default='')),
+                ('created_on', models.DateTimeField(auto_now_add=True)),
+                ('updated_on', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='searchindexqueue',
+            name='replay',
+            field=models.BooleanField(default=False),
+        ),
+    ]
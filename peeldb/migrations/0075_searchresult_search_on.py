@@ -0,0 +1,19 @@
+# Generated by Django 5.2.2 on 2026-10-19 07:28
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('peeldb', '0074_searchindexrebuild_searchindexqueue_replay'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='searchresult',
+            name='search_on',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -2,17 +2,20 @@ import hashlib
 import json
 import uuid
 import os
-from datetime import datetime
+from datetime import date, datetime
 import re
 import arrow
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin, UserManager
 
 # from oauth2client.contrib.django_util.models import CredentialsField
 
+from django.contrib.postgres.expressions import ArraySubquery
 from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector
 from django.core.exceptions import ObjectDoesNotExist
 from django.db import models
-from django.db.models import Q, Count, F, JSONField
+from django.db.models import Q, Count, F, JSONField, OuterRef
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
@@ -572,6 +575,8 @@ class User(AbstractBaseUser, PermissionsMixin):
     profile_updated = models.DateTimeField(auto_now_add=True)
     is_admin = models.BooleanField(default=False)  # agency created user
     profile_completeness = models.CharField(max_length=500, default="")
+    # bitmask of the satisfied sections, see peeldb.profile_completeness
+    profile_sections = models.PositiveIntegerField(default=0)
     activation_code = models.CharField(max_length=100, null=True, blank=True)
     # is_register_through_mail = models.BooleanField(default=False)
     registered_from = models.CharField(
@@ -718,38 +723,9 @@ class User(AbstractBaseUser, PermissionsMixin):
 
     @property
     def profile_completion_percentage(self):
-        complete = 0
-        if self.year:
-            complete += 10
-        if self.mobile:
-            complete += 20
-        if self.is_active:
-            complete += 10
-        if self.user_type == "JS":
-            if self.resume:
-                complete += 15
-            if len(self.profile_description):
-                complete += 5
-            if self.education.all():
-                complete += 10
-            if self.project.all():
-                complete += 10
-            if self.skills.all():
-                complete += 15
-            if self.language.all():
-                complete += 5
-        else:
-            if self.job_role:
-                complete += 10
-            if self.industry.all():
-                complete += 10
-            if self.profile_description:
-                complete += 15
-            if self.technical_skills.all():
-                complete += 15
-            if self.functional_area.all():
-                complete += 10
-        return complete
+        from peeldb.profile_completeness import profile_percentage, profile_sections
+
+        return profile_percentage(self.user_type, profile_sections(self))
 
     def get_jobposts_count(self):
         return len(JobPost.objects.filter(user=self))
@@ -901,37 +877,14 @@ class User(AbstractBaseUser, PermissionsMixin):
         return JobAlert.objects.filter(email=self.email)
 
     def related_walkin_jobs(self):
-        skill_ids = self.skills.all().values_list("skill_id", flat=True)
-        job_posts = JobPost.objects.filter(status="Live", job_type="walk-in")
-        job_posts = job_posts.filter(skills__in=Skill.objects.filter(id__in=skill_ids))
-        if len(job_posts) > 0:
-            if len(job_posts) < 15:
-                all_job_posts = JobPost.objects.filter(status="Live").order_by(
-                    "-published_on"
-                )
-                rest = 15 - len(job_posts)
-                job_posts = list(job_posts) + list(all_job_posts[:rest])
-        else:
-            job_posts = JobPost.objects.filter(
-                status="Live", job_type="walk-in"
-            ).order_by("-published_on")[:15]
-        return job_posts
+        from peeldb.recommendations import recommended_jobs
+
+        return recommended_jobs(self, job_type="walk-in")
 
     def related_jobs(self):
-        ids = (
-            AppliedJobs.objects.filter(user=self)
-            .exclude(ip_address="", user_agent="")
-            .values_list("job_post", flat=True)
-        )
-        user_skills = Skill.objects.filter(id__in=self.skills.all().values("skill"))
-        related_jobs = JobPost.objects.filter(
-            Q(status="Live") & Q(skills__in=user_skills)
-            | Q(location__in=[self.current_city])
-        ).exclude(id__in=ids)
-        related_jobs = list(related_jobs) + list(
-            JobPost.objects.filter(status="Live").order_by("-published_on")[:15]
-        )
-        return related_jobs[:15]
+        from peeldb.recommendations import recommended_jobs
+
+        return recommended_jobs(self)
 
     def get_similar_recruiters(self):
         if self.agency_admin:
@@ -1164,6 +1117,11 @@ class AgencyCompany(models.Model):
     )
 
 
+# the words of a job matched by database_refined_search, indexed as they
+# are matched so the GIN index serves the query
+JOBPOST_SEARCH_TEXT = SearchVector("title", "job_role", "description", config="simple")
+
+
 class JobPostManager(models.Manager):
     def get_queryset(self):
         return super(JobPostManager, self).get_queryset().order_by("-created_on")
@@ -1292,9 +1250,27 @@ class JobPost(models.Model):
 
     fb_groups = ArrayField(models.CharField(max_length=200), blank=True, null=True)
 
+    # denormalized copies of the m2m ids, used by the database search engine
+    skill_ids = ArrayField(models.IntegerField(), default=list, blank=True)
+    location_ids = ArrayField(models.IntegerField(), default=list, blank=True)
+    industry_ids = ArrayField(models.IntegerField(), default=list, blank=True)
+    qualification_ids = ArrayField(models.IntegerField(), default=list, blank=True)
+    functional_area_ids = ArrayField(
+        models.IntegerField(), default=list, blank=True
+    )
+
     # objects = JobPostManager()
     class Meta:
         ordering = ["-created_on"]
+        indexes = [
+            GinIndex(fields=["skill_ids"]),
+            GinIndex(fields=["location_ids"]),
+            GinIndex(fields=["industry_ids"]),
+            GinIndex(fields=["qualification_ids"]),
+            GinIndex(fields=["functional_area_ids"]),
+            # the text match of database_refined_search
+            GinIndex(JOBPOST_SEARCH_TEXT, name="peeldb_jobpost_text_gin"),
+        ]
 
     def __unicode__(self):
         return self.title
@@ -1328,44 +1304,19 @@ class JobPost(models.Model):
         return qs
 
     def get_total_views_count(self):
+        from peeldb.job_views import buffered_job_views
+
         total_views = self.fb_views + self.tw_views + self.ln_views + self.other_views
-        return total_views
+        # views not flushed to the counters yet
+        return total_views + sum(buffered_job_views(self.id).values())
 
     def get_similar_jobposts(self):
-        # current_date = datetime.strptime(str(datetime.now().date()), "%Y-%m-%d").strftime("%Y-%m-%d")
-        jobs = (
-            JobPost.objects.filter(Q(skills__in=self.skills.all()))
-            .filter(Q(min_year=self.min_year) | Q(max_year=self.max_year))
-            .exclude(pk=self.id)
-            .distinct()
-        )
-        jobs = (
-            jobs.filter(status="Live")
-            .select_related("company")
-            .prefetch_related("location")
-        )
-        # no_of_jobs = len(jobs)
-        # if no_of_jobs < 10:
-        #     jobs = JobPost.objects.filter(status='Live')
-        return jobs
+        from peeldb.recommendations import similar_live_jobs
+
+        return similar_live_jobs(self.id)
 
     def get_recommended_jobposts(self):
-        jobs = (
-            JobPost.objects.filter(
-                Q(skills__in=self.skills.all()) | Q(location__in=self.location.all())
-            )
-            .exclude(pk=self.id)
-            .distinct()
-        )
-        jobs = (
-            jobs.filter(status="Live")
-            .select_related("company")
-            .prefetch_related("location")
-        )
-        # no_of_jobs = len(jobs)
-        # if no_of_jobs < 10:
-        #     jobs = JobPost.objects.filter(status='Live')
-        return jobs
+        return self.get_similar_jobposts()
 
     def get_locations(self):
         return self.location.values_list("name", flat=True)
@@ -1393,8 +1344,14 @@ class JobPost(models.Model):
     def get_active_industries(self):
         return self.industry.filter(status="Active").order_by("name")
 
+    def get_applicant_tally(self):
+        try:
+            return self.applicant_tally
+        except ApplicantTally.DoesNotExist:
+            return ApplicantTally(job_post=self)
+
     def get_all_applied_users_count(self):
-        return AppliedJobs.objects.filter(job_post=self).count()
+        return self.get_applicant_tally().total
 
     def get_selected_users(self):
         return AppliedJobs.objects.filter(job_post=self, status="Selected")
@@ -1446,20 +1403,30 @@ class JobPost(models.Model):
         return current_date
 
     def adding_applicants(self):
+        from peeldb.applicant_tally import add_applicants
+
         job_post = self
         user_technical_skills = TechnicalSkill.objects.filter(
             skill__in=job_post.skills.all().values_list("id", flat=True)
         )
-        users = User.objects.filter(user_type="JS", skills__in=user_technical_skills)
-        for user in users:
-            if not AppliedJobs.objects.filter(user=user, job_post=job_post):
-                AppliedJobs.objects.create(
-                    user=user,
-                    job_post=job_post,
-                    status="Pending",
-                    ip_address="",
-                    user_agent="",
-                )
+        user_ids = (
+            User.objects.filter(user_type="JS", skills__in=user_technical_skills)
+            .exclude(appliedjobs__job_post=job_post)
+            .values_list("id", flat=True)
+            .distinct()
+        )
+        applied = AppliedJobs.objects.bulk_create(
+            AppliedJobs(
+                user_id=user_id,
+                job_post=job_post,
+                status="Pending",
+                ip_address="",
+                user_agent="",
+            )
+            for user_id in user_ids
+        )
+        # bulk_create sends no post_save for the tally
+        add_applicants(job_post.id, len(applied))
 
     def get_job_status(self):
         if self.status == "Disabled":
@@ -1509,6 +1476,29 @@ class JobPost(models.Model):
         return False
 
 
+JOBPOST_SEARCH_COLUMNS = {
+    "skill_ids": ("skills", "skill_id"),
+    "location_ids": ("location", "city_id"),
+    "industry_ids": ("industry", "industry_id"),
+    "qualification_ids": ("edu_qualification", "qualification_id"),
+    "functional_area_ids": ("functional_area", "functionalarea_id"),
+}
+
+
+def update_jobpost_search_columns(job_ids, columns=None):
+    """Copy the m2m ids of the given jobs into their array columns."""
+    values = {}
+    for column in columns or JOBPOST_SEARCH_COLUMNS:
+        field, id_column = JOBPOST_SEARCH_COLUMNS[column]
+        through = getattr(JobPost, field).through
+        values[column] = ArraySubquery(
+            through.objects.filter(jobpost_id=OuterRef("pk"))
+            .order_by(id_column)
+            .values(id_column)
+        )
+    return JobPost.objects.filter(pk__in=job_ids).update(**values)
+
+
 POST = (
     ("Page", "Page"),
     ("Group", "Group"),
@@ -1574,6 +1564,30 @@ class AppliedJobs(models.Model):
     )
 
 
+class ApplicantTally(models.Model):
+    """Applications per job and status, see peeldb.applicant_tally."""
+
+    job_post = models.OneToOneField(
+        JobPost,
+        primary_key=True,
+        related_name="applicant_tally",
+        on_delete=models.CASCADE,
+    )
+    total = models.IntegerField(default=0)
+    pending = models.IntegerField(default=0)
+    shortlisted = models.IntegerField(default=0)
+    selected = models.IntegerField(default=0)
+    rejected = models.IntegerField(default=0)
+    hired = models.IntegerField(default=0)
+    # applications made on today_date, stale once the day is over
+    today = models.IntegerField(default=0)
+    today_date = models.DateField(null=True)
+
+    @property
+    def applied_today(self):
+        return self.today if self.today_date == date.today() else 0
+
+
 ENQUERY_TYPES = (
     ("Suggestion", "Suggestion"),
     ("Technical Issue", "Technical Issue"),
@@ -1644,7 +1658,8 @@ class SearchResult(models.Model):
     other_location = models.CharField(max_length=1000)
     search_text = JSONField()
     industry = models.CharField(max_length=1000)
-    search_on = models.DateTimeField(auto_now=True)
+    # the time of the search, written later by peeldb.search_log
+    search_on = models.DateTimeField(default=timezone.now)
     functional_area = models.CharField(max_length=1000)
     job_type = models.CharField(max_length=20, choices=JOB_TYPE, blank=True, null=True)
     expierence = models.IntegerField(blank=True, null=True)
@@ -1692,6 +1707,149 @@ class DailySearchLog(models.Model):
     no_of_searches = models.IntegerField(default="0")
 
 
+class DailyReport(models.Model):
+    date = models.DateField(unique=True)
+    data = JSONField(default=dict)
+    created_on = models.DateTimeField(auto_now=True)
+
+
+SEARCH_SUMMARY_KINDS = (
+    ("skill", "Skill"),
+    ("city", "City"),
+    ("other_skill", "Other Skill"),
+    ("other_location", "Other Location"),
+)
+
+
+class SearchSummary(models.Model):
+    """Searches per day of each skill, city and unmatched search text,
+    rolled up from SearchResult, see peeldb.search_log."""
+
+    date = models.DateField()
+    kind = models.CharField(choices=SEARCH_SUMMARY_KINDS, max_length=20)
+    term = models.CharField(max_length=1000)
+    searches = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ("date", "kind", "term")
+
+
+JOB_COUNTER_KINDS = (
+    ("skill", "Skill"),
+    ("city", "City"),
+    ("state", "State"),
+    ("industry", "Industry"),
+    ("qualification", "Qualification"),
+    ("functional_area", "FunctionalArea"),
+)
+
+
+class JobCounter(models.Model):
+    """Live jobs per taxonomy row and job type, see peeldb.job_counters."""
+
+    kind = models.CharField(choices=JOB_COUNTER_KINDS, max_length=20)
+    object_id = models.IntegerField()
+    job_type = models.CharField(choices=JOB_TYPE, max_length=50)
+    live = models.IntegerField(default=0)
+    fresher = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ("kind", "object_id", "job_type")
+
+
+class SearchIndexQueue(models.Model):
+    """Objects whose search documents are stale, see peeldb.search_queue."""
+
+    model = models.CharField(max_length=100)
+    object_id = models.CharField(max_length=100)
+    queued_on = models.DateTimeField(default=timezone.now)
+    # indexed while a rebuild was running, indexed again once it is live
+    replay = models.BooleanField(default=False)
+
+    class Meta:
+        unique_together = ("model", "object_id")
+
+
+RESUME_BATCH_STATUS = (
+    ("Pending", "Pending"),
+    ("Processing", "Processing"),
+    ("Done", "Done"),
+    ("Failed", "Failed"),
+)
+
+
+class SearchIndexRebuild(models.Model):
+    """A search index built next to the live one, see peeldb.search_rebuild."""
+
+    index_name = models.CharField(max_length=100)
+    status = models.CharField(
+        max_length=20, choices=RESUME_BATCH_STATUS, default="Processing"
+    )
+    documents = models.IntegerField(default=0)
+    # seconds the index took to fill, and until it was swapped in
+    fill_seconds = models.FloatField(default=0)
+    seconds = models.FloatField(default=0)
+    error = models.TextField(default="", blank=True)
+    created_on = models.DateTimeField(auto_now_add=True)
+    updated_on = models.DateTimeField(auto_now=True)
+
+
+class ResumeBatch(models.Model):
+    """A zip of resumes uploaded at once, see recruiter.resume_ingestion."""
+
+    uploaded_by = models.ForeignKey(User, on_delete=models.CASCADE)
+    archive = models.CharField(max_length=500)
+    job_post_ids = ArrayField(models.IntegerField(), default=list, blank=True)
+    ip_address = models.CharField(max_length=2000, default="")
+    user_agent = models.CharField(max_length=2000, default="")
+    status = models.CharField(
+        max_length=20, choices=RESUME_BATCH_STATUS, default="Pending"
+    )
+    total = models.IntegerField(default=0)
+    processed = models.IntegerField(default=0)
+    created = models.IntegerField(default=0)
+    duplicates = models.IntegerField(default=0)
+    failed = models.IntegerField(default=0)
+    # {file name: reason} of the resumes that were not added
+    errors = JSONField(default=dict, blank=True)
+    created_on = models.DateTimeField(auto_now_add=True)
+    updated_on = models.DateTimeField(auto_now=True)
+
+
+TAXONOMY_MERGE_KINDS = (
+    ("skill", "Skill"),
+    ("city", "City"),
+    ("industry", "Industry"),
+    ("qualification", "Qualification"),
+    ("functional_area", "FunctionalArea"),
+)
+
+
+class TaxonomyMerge(models.Model):
+    """The references of one taxonomy row moved to another, see
+    peeldb.taxonomy_merge."""
+
+    kind = models.CharField(choices=TAXONOMY_MERGE_KINDS, max_length=20)
+    source_id = models.IntegerField()
+    target_id = models.IntegerField()
+    # only the job posts are moved, the other references stay
+    jobs_only = models.BooleanField(default=False)
+    delete_source = models.BooleanField(default=False)
+    requested_by = models.ForeignKey(
+        User, null=True, blank=True, on_delete=models.SET_NULL
+    )
+    status = models.CharField(
+        max_length=20, choices=RESUME_BATCH_STATUS, default="Pending"
+    )
+    # tables rewritten of the ones referencing the kind
+    total = models.IntegerField(default=0)
+    processed = models.IntegerField(default=0)
+    jobs = models.IntegerField(default=0)
+    error = models.TextField(default="", blank=True)
+    created_on = models.DateTimeField(auto_now_add=True)
+    updated_on = models.DateTimeField(auto_now=True)
+
+
 class AgencyApplicants(models.Model):
     applicant = models.ForeignKey(AgencyResume, on_delete=models.CASCADE)
     status = models.CharField(max_length=20, choices=POST, default="Pending")
@@ -1720,12 +1878,13 @@ class AgencyRecruiterJobposts(models.Model):
 
 
 def skills_update(skill_slug, slug):
+    from peeldb.taxonomy_merge import queue_taxonomy_merge
+
     removed_skill = Skill.objects.get(slug=skill_slug)
-    job_posts = JobPost.objects.filter(skills__in=[removed_skill])
     latest_skill = Skill.objects.get(slug=slug)
-    for i in job_posts:
-        i.skills.add(latest_skill)
-    removed_skill.delete()
+    return queue_taxonomy_merge(
+        "skill", removed_skill.id, latest_skill.id, delete_source=True
+    )
 
 
 class AgencyWorkLog(models.Model):
@@ -1739,10 +1898,11 @@ class AgencyWorkLog(models.Model):
 
 
 def updating_skills_jobposts(skill, update_skill):
-    job_posts = JobPost.objects.filter(skills__in=[skill])
-    for each in job_posts:
-        each.skills.add(update_skill)
-    skill.remove()
+    from peeldb.taxonomy_merge import queue_taxonomy_merge
+
+    return queue_taxonomy_merge(
+        "skill", skill.id, update_skill.id, jobs_only=True, delete_source=True
+    )
 
 
 STATUS = (
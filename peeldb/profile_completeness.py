@@ -0,0 +1,217 @@
+from django.db.models import Exists, OuterRef
+
+from peeldb.models import EducationDetails, Project, TechnicalSkill, User, UserLanguage
+
+YEAR = 1 << 0
+MOBILE = 1 << 1
+ACTIVE = 1 << 2
+RESUME = 1 << 3
+DESCRIPTION = 1 << 4
+JOB_ROLE = 1 << 5
+EDUCATION = 1 << 6
+PROJECT = 1 << 7
+SKILLS = 1 << 8
+LANGUAGE = 1 << 9
+INDUSTRY = 1 << 10
+TECHNICAL_SKILLS = 1 << 11
+FUNCTIONAL_AREA = 1 << 12
+
+# percentage each section adds, jobseekers and recruiters fill in different
+# sections
+PROFILE_SECTION_WEIGHTS = {
+    "JS": {
+        YEAR: 10,
+        MOBILE: 20,
+        ACTIVE: 10,
+        RESUME: 15,
+        DESCRIPTION: 5,
+        EDUCATION: 10,
+        PROJECT: 10,
+        SKILLS: 15,
+        LANGUAGE: 5,
+    },
+    "recruiter": {
+        YEAR: 10,
+        MOBILE: 20,
+        ACTIVE: 10,
+        JOB_ROLE: 10,
+        INDUSTRY: 10,
+        DESCRIPTION: 15,
+        TECHNICAL_SKILLS: 15,
+        FUNCTIONAL_AREA: 10,
+    },
+}
+# sections satisfied by a row in a User m2m, by field name
+RELATION_SECTIONS = {
+    "education": EDUCATION,
+    "project": PROJECT,
+    "skills": SKILLS,
+    "language": LANGUAGE,
+    "industry": INDUSTRY,
+    "technical_skills": TECHNICAL_SKILLS,
+    "functional_area": FUNCTIONAL_AREA,
+}
+RELATION_MASK = sum(RELATION_SECTIONS.values())
+# profile rows whose deletion removes them from their users' m2m
+SECTION_MODELS = {
+    EducationDetails: "education",
+    Project: "project",
+    TechnicalSkill: "skills",
+    UserLanguage: "language",
+}
+# User columns of the sections field_sections checks
+FIELD_SECTION_COLUMNS = (
+    "year",
+    "mobile",
+    "is_active",
+    "resume",
+    "profile_description",
+    "job_role",
+)
+
+
+def field_sections(year, mobile, is_active, resume, profile_description, job_role):
+    return (
+        (YEAR if year else 0)
+        | (MOBILE if mobile else 0)
+        | (ACTIVE if is_active else 0)
+        | (RESUME if resume else 0)
+        | (DESCRIPTION if profile_description else 0)
+        | (JOB_ROLE if job_role else 0)
+    )
+
+
+def profile_sections(user):
+    """The sections of user, the fields read from the instance and the
+    relations from its stored mask, no queries."""
+    return (user.profile_sections & RELATION_MASK) | field_sections(
+        user.year,
+        user.mobile,
+        user.is_active,
+        user.resume,
+        user.profile_description,
+        user.job_role,
+    )
+
+
+def profile_percentage(user_type, sections):
+    weights = PROFILE_SECTION_WEIGHTS["JS" if user_type == "JS" else "recruiter"]
+    return sum(weight for section, weight in weights.items() if sections & section)
+
+
+def relation_exists(field, user_model=User):
+    through = getattr(user_model, field).through
+    return Exists(through.objects.filter(user_id=OuterRef("pk")))
+
+
+def through_user_ids(field, object_ids):
+    """ids of the users having one of object_ids in their field m2m."""
+    descriptor = getattr(User, field)
+    return list(
+        descriptor.through.objects.filter(
+            **{descriptor.field.m2m_reverse_field_name() + "__in": object_ids}
+        )
+        .values_list("user_id", flat=True)
+        .distinct()
+    )
+
+
+def save_profile_sections(users, user_model=User):
+    """Writes the [id, user type, stored mask, stored percentage, new mask]
+    of users that changed, returns their count."""
+    changed = [
+        user_model(
+            id=user_id,
+            profile_sections=sections,
+            profile_completeness=str(profile_percentage(user_type, sections)),
+        )
+        for user_id, user_type, stored, completeness, sections in users
+        if sections != stored
+        or str(profile_percentage(user_type, sections)) != completeness
+    ]
+    user_model.objects.bulk_update(
+        changed, ["profile_sections", "profile_completeness"]
+    )
+    return len(changed)
+
+
+def refresh_profile_sections(user_ids, fields):
+    """Rechecks the relation sections of fields for user_ids with one
+    EXISTS per field."""
+    if not user_ids:
+        return 0
+    rows = (
+        User.objects.filter(id__in=user_ids)
+        .annotate(**{"has_" + field: relation_exists(field) for field in fields})
+        .values_list(
+            "id",
+            "user_type",
+            "profile_sections",
+            "profile_completeness",
+            *["has_" + field for field in fields]
+        )
+    )
+    users = []
+    for user_id, user_type, stored, completeness, *found in rows:
+        sections = stored
+        for field, exists in zip(fields, found):
+            if exists:
+                sections |= RELATION_SECTIONS[field]
+            else:
+                sections &= ~RELATION_SECTIONS[field]
+        users.append((user_id, user_type, stored, completeness, sections))
+    return save_profile_sections(users)
+
+
+def set_profile_section(user, field, satisfied):
+    """Sets the section of field on user and its row, when it changed."""
+    section = RELATION_SECTIONS[field]
+    sections = (
+        (user.profile_sections | section)
+        if satisfied
+        else (user.profile_sections & ~section)
+    )
+    if sections == user.profile_sections:
+        return
+    user.profile_sections = sections
+    user.profile_completeness = str(profile_percentage(user.user_type, sections))
+    User.objects.filter(pk=user.pk).update(
+        profile_sections=user.profile_sections,
+        profile_completeness=user.profile_completeness,
+    )
+
+
+def backfill_profile_sections(batch_size=2000, user_model=User):
+    """Recomputes the mask of every user, the relations with grouped EXISTS
+    subqueries, in pages of batch_size. user_model is the historical model
+    in migrations. Returns (users, changed)."""
+    queryset = user_model.objects.annotate(
+        **{
+            "has_" + field: relation_exists(field, user_model)
+            for field in RELATION_SECTIONS
+        }
+    ).values_list(
+        "id",
+        "user_type",
+        "profile_sections",
+        "profile_completeness",
+        *FIELD_SECTION_COLUMNS,
+        *["has_" + field for field in RELATION_SECTIONS]
+    )
+    columns = len(FIELD_SECTION_COLUMNS)
+    last_id = 0
+    total = changed = 0
+    while True:
+        rows = list(queryset.filter(id__gt=last_id).order_by("id")[:batch_size])
+        if not rows:
+            return total, changed
+        users = []
+        for user_id, user_type, stored, completeness, *values in rows:
+            sections = field_sections(*values[:columns])
+            for section, exists in zip(RELATION_SECTIONS.values(), values[columns:]):
+                if exists:
+                    sections |= section
+            users.append((user_id, user_type, stored, completeness, sections))
+        total += len(rows)
+        changed += save_profile_sections(users, user_model)
+        last_id = rows[-1][0]
@@ -0,0 +1,221 @@
+import heapq
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import Q
+
+from mpcomp.cache import PrefixedCache
+from peeldb.models import AppliedJobs, JobPost
+
+# similar jobs kept per live job
+SIMILAR_JOBS_K = 20
+# score of a shared skill, a shared city and overlapping experience ranges
+SKILL_WEIGHT = 3
+CITY_WEIGHT = 2
+EXPERIENCE_WEIGHT = 1
+# applied jobs whose similar jobs are scored for a user, and the most
+# recent live jobs in the user's skills or city scored with them
+RECOMMENDATION_SEED_JOBS = 5
+RECOMMENDATION_CANDIDATES = 100
+# the nightly rebuild rewrites every list well before they expire
+SIMILAR_JOBS_TIMEOUT = 3 * 24 * 60 * 60
+
+similar_cache = PrefixedCache("similar_jobs", SIMILAR_JOBS_TIMEOUT)
+
+FEATURE_FIELDS = ("id", "skill_ids", "location_ids", "min_year", "max_year")
+
+
+def job_features(queryset):
+    """{job id: (skill ids, city ids, min_year, max_year)} of queryset, from
+    the array columns."""
+    return {
+        job_id: (frozenset(skill_ids), frozenset(location_ids), min_year, max_year)
+        for job_id, skill_ids, location_ids, min_year, max_year in (
+            queryset.values_list(*FEATURE_FIELDS).order_by()
+        )
+    }
+
+
+def postings(features):
+    """Job ids by skill id and by city id, the sparse columns scored."""
+    skills = defaultdict(list)
+    cities = defaultdict(list)
+    for job_id, (skill_ids, city_ids, min_year, max_year) in features.items():
+        for skill_id in skill_ids:
+            skills[skill_id].append(job_id)
+        for city_id in city_ids:
+            cities[city_id].append(job_id)
+    return skills, cities
+
+
+def overlaps(min_year, max_year, other_min_year, other_max_year):
+    return min_year <= other_max_year and other_min_year <= max_year
+
+
+def top_similar(job, features, skills, cities, k=SIMILAR_JOBS_K):
+    """[[score, job id]] of the k jobs of features closest to job, a
+    (skill ids, city ids, min_year, max_year) tuple. Only jobs sharing a
+    skill or a city are scored, newer jobs win ties."""
+    skill_ids, city_ids, min_year, max_year = job
+    scores = Counter()
+    for skill_id in skill_ids:
+        for job_id in skills.get(skill_id, ()):
+            scores[job_id] += SKILL_WEIGHT
+    for city_id in city_ids:
+        for job_id in cities.get(city_id, ()):
+            scores[job_id] += CITY_WEIGHT
+    for job_id in scores:
+        if overlaps(min_year, max_year, *features[job_id][2:]):
+            scores[job_id] += EXPERIENCE_WEIGHT
+    return [
+        list(similar)
+        for similar in heapq.nlargest(k, ((score, i) for i, score in scores.items()))
+    ]
+
+
+def live_jobs():
+    return JobPost.objects.filter(status="Live")
+
+
+def similar_jobs(job_id):
+    """[[score, job id]] of the live jobs most similar to job_id, from the
+    live jobs sharing one of its skills or cities."""
+    job = job_features(JobPost.objects.filter(id=job_id)).get(job_id)
+    if not job or not (job[0] or job[1]):
+        return []
+    features = job_features(
+        live_jobs()
+        .filter(
+            Q(skill_ids__overlap=list(job[0])) | Q(location_ids__overlap=list(job[1]))
+        )
+        .exclude(id=job_id)
+    )
+    skills, cities = postings(features)
+    return top_similar(job, features, skills, cities)
+
+
+def rebuild_similar_jobs():
+    """Recomputes the similar jobs of every live job, returns their count."""
+    features = job_features(live_jobs())
+    skills, cities = postings(features)
+    values = {}
+    for job_id, job in features.items():
+        # the job scores itself highest, one more is taken and dropped
+        similar = top_similar(job, features, skills, cities, SIMILAR_JOBS_K + 1)
+        values[job_id] = [pair for pair in similar if pair[1] != job_id][
+            :SIMILAR_JOBS_K
+        ]
+    similar_cache.set_many(values)
+    return len(values)
+
+
+def refresh_similar_jobs(job_id):
+    """Stores the similar jobs of a job that went live, and adds it to the
+    cached lists of the jobs it now outranks."""
+    similar = similar_jobs(job_id)
+    neighbours = similar_cache.cached_many([other_id for score, other_id in similar])
+    changed = {job_id: similar}
+    for score, other_id in similar:
+        others = [pair for pair in neighbours.get(other_id) or [] if pair[1] != job_id]
+        if len(others) < SIMILAR_JOBS_K or [score, job_id] > others[-1]:
+            changed[other_id] = sorted(others + [[score, job_id]], reverse=True)[
+                :SIMILAR_JOBS_K
+            ]
+    similar_cache.set_many(changed)
+    return similar
+
+
+def schedule_similar_jobs(job_id):
+    from dashboard.tasks import refreshing_similar_jobs
+
+    transaction.on_commit(lambda: refreshing_similar_jobs.delay(job_id))
+
+
+def similar_job_ids(job_id):
+    return [
+        other_id
+        for score, other_id in similar_cache.get(job_id, lambda: similar_jobs(job_id))
+        or []
+    ]
+
+
+def jobs_in_order(ids, queryset=None):
+    """The live jobs of ids, in the order of ids."""
+    jobs = (
+        (queryset if queryset is not None else live_jobs())
+        .filter(id__in=ids)
+        .select_related("company")
+        .prefetch_related("location")
+        .in_bulk()
+    )
+    return [jobs[job_id] for job_id in ids if job_id in jobs]
+
+
+def similar_live_jobs(job_id):
+    """The live jobs most similar to job_id, read from the cache. Jobs that
+    left Live since the lists were built are skipped."""
+    return jobs_in_order(similar_job_ids(job_id))
+
+
+def experience_years(user):
+    try:
+        return int(user.year or 0)
+    except ValueError:
+        return 0
+
+
+def recommended_jobs(user, limit=15, job_type=None):
+    """
+    The live jobs for user, scored on the user's skills, city and
+    experience. The candidates are the similar jobs of the user's latest
+    applications and the newest jobs in the user's skills or city, so the
+    cost does not grow with the number of live jobs. Filled up with the
+    newest live jobs.
+    """
+    applied = list(
+        AppliedJobs.objects.filter(user=user)
+        .exclude(ip_address="", user_agent="")
+        .order_by("-applied_on")
+        .values_list("job_post_id", flat=True)
+    )
+    skill_ids = list(user.skills.values_list("skill_id", flat=True))
+    city_ids = [user.current_city_id] if user.current_city_id else []
+    seeds = similar_cache.get_many(
+        applied[:RECOMMENDATION_SEED_JOBS],
+        lambda missing: {job_id: similar_jobs(job_id) for job_id in missing},
+    )
+    candidates = {
+        job_id for similar in seeds.values() for score, job_id in similar or []
+    }
+    jobs = live_jobs().exclude(id__in=applied)
+    if job_type:
+        jobs = jobs.filter(job_type=job_type)
+    if skill_ids or city_ids:
+        candidates.update(
+            jobs.filter(
+                Q(skill_ids__overlap=skill_ids) | Q(location_ids__overlap=city_ids)
+            )
+            .order_by("-published_on")
+            .values_list("id", flat=True)[:RECOMMENDATION_CANDIDATES]
+        )
+    features = job_features(jobs.filter(id__in=candidates))
+    years = experience_years(user)
+    scores = [
+        (
+            SKILL_WEIGHT * len(job_skill_ids.intersection(skill_ids))
+            + CITY_WEIGHT * len(job_city_ids.intersection(city_ids))
+            + EXPERIENCE_WEIGHT * overlaps(years, years, min_year, max_year),
+            job_id,
+        )
+        for job_id, (job_skill_ids, job_city_ids, min_year, max_year) in (
+            features.items()
+        )
+    ]
+    ids = [job_id for score, job_id in heapq.nlargest(limit, scores)]
+    if len(ids) < limit:
+        ids += list(
+            jobs.exclude(id__in=ids)
+            .order_by("-published_on")
+            .values_list("id", flat=True)[: limit - len(ids)]
+        )
+    return jobs_in_order(ids, jobs)
@@ -1,4 +1,5 @@
 from haystack import indexes
+from peeldb.job_counters import job_counts
 from peeldb.models import (
     JobPost,
     Skill,
@@ -50,11 +51,15 @@ class jobIndex(indexes.SearchIndex, indexes.Indexable):
     def get_model(self):
         return JobPost
 
+    def get_updated_field(self):
+        return "posted_on"
+
     def prepare_post_url(self, obj):
         return get_absolute_url(obj)
 
+    # the related rows are read from the ones index_queryset prefetches
     def prepare_skills(self, obj):
-        return [str(s.name) for s in obj.skills.filter(status="Active")]
+        return [str(s.name) for s in obj.skills.all() if s.status == "Active"]
 
     def prepare_location(self, obj):
         locations = serializers.serialize("json", obj.location.all())
@@ -95,7 +100,9 @@ class jobIndex(indexes.SearchIndex, indexes.Indexable):
         return None
 
     def prepare_edu_qualification(self, obj):
-        return [str(s.name) for s in obj.edu_qualification.filter(status="Active")]
+        return [
+            str(s.name) for s in obj.edu_qualification.all() if s.status == "Active"
+        ]
 
     # def prepare_walkin_from_date(self, obj):
     #     if obj.walkin_from_date:
@@ -142,7 +149,7 @@ class skillautoIndex(indexes.SearchIndex, indexes.Indexable):
         return self.get_model().objects.filter(status="Active")
 
     def prepare_no_of_jobposts(self, obj):
-        return obj.get_no_of_jobposts().count()
+        return job_counts.get("skill", obj.id)
 
 
 class locationIndex(indexes.SearchIndex, indexes.Indexable):
@@ -162,7 +169,7 @@ class locationIndex(indexes.SearchIndex, indexes.Indexable):
         return self.get_model().objects.filter(status="Enabled")
 
     def prepare_no_of_jobposts(self, obj):
-        return obj.get_no_of_jobposts().count()
+        return job_counts.get("city", obj.id)
 
 
 class industryIndex(indexes.SearchIndex, indexes.Indexable):
@@ -182,7 +189,7 @@ class industryIndex(indexes.SearchIndex, indexes.Indexable):
         return self.get_model().objects.all()
 
     def prepare_no_of_jobposts(self, obj):
-        return obj.get_no_of_jobposts().count()
+        return job_counts.get("industry", obj.id)
 
 
 class functionalareaIndex(indexes.SearchIndex, indexes.Indexable):
@@ -201,7 +208,7 @@ class functionalareaIndex(indexes.SearchIndex, indexes.Indexable):
         return self.get_model().objects.all()
 
     def prepare_no_of_jobposts(self, obj):
-        return obj.get_no_of_jobposts().count()
+        return job_counts.get("functional_area", obj.id)
 
 
 class qualificationIndex(indexes.SearchIndex, indexes.Indexable):
@@ -218,7 +225,7 @@ class qualificationIndex(indexes.SearchIndex, indexes.Indexable):
         return Qualification
 
     def prepare_no_of_jobposts(self, obj):
-        return obj.get_no_of_jobposts().count()
+        return job_counts.get("qualification", obj.id)
 
     def index_queryset(self, using=None):
         return self.get_model().objects.filter(status="Active")
@@ -240,13 +247,15 @@ class stateIndex(indexes.SearchIndex, indexes.Indexable):
         return State
 
     def index_queryset(self, using=None):
-        return self.get_model().objects.filter(status="Enabled")
+        return (
+            self.get_model().objects.filter(status="Enabled").prefetch_related("state")
+        )
 
     def prepare_no_of_cities(self, obj):
-        return obj.state.all().count()
+        return len(obj.state.all())
 
     def prepare_no_of_jobposts(self, obj):
-        return obj.get_no_of_jobposts().count()
+        return job_counts.get("state", obj.id)
 
     def prepare_is_duplicate(self, obj):
-        return obj.state.filter(name=obj.name).exists()
+        return any(city.name == obj.name for city in obj.state.all())
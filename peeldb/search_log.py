@@ -0,0 +1,272 @@
+import atexit
+import json
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+
+from mpcomp.reference_data import reference_data
+from peeldb.models import SearchResult, SearchSummary, User
+
+logger = logging.getLogger(__name__)
+
+# seconds an in-process buffer collects searches before it writes them
+SEARCH_LOG_FLUSH_INTERVAL = 60
+# searches an in-process buffer writes at once, whatever their age
+SEARCH_LOG_FLUSH_SIZE = 500
+SEARCH_SUMMARY_UPDATE_BATCH = 500
+
+
+class LocalSearchBuffer(object):
+    """Searches buffered in this process, for tests and single process
+    setups."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._events = []
+        self._taken = []
+        self._started = time.monotonic()
+
+    def add(self, event):
+        with self._lock:
+            self._events.append(event)
+
+    def due(self):
+        with self._lock:
+            return (
+                len(self._events) >= SEARCH_LOG_FLUSH_SIZE
+                or time.monotonic() - self._started >= SEARCH_LOG_FLUSH_INTERVAL
+            )
+
+    def take(self):
+        """The buffered searches, kept aside until done() so a failed flush
+        is retried by the next one."""
+        with self._lock:
+            self._taken.extend(self._events)
+            self._events = []
+            self._started = time.monotonic()
+            return list(self._taken)
+
+    def done(self):
+        with self._lock:
+            self._taken = []
+
+
+class RedisSearchBuffer(object):
+    """Searches buffered in a redis list shared by every process."""
+
+    EVENTS_KEY = "search_log:events"
+
+    def __init__(self, url):
+        import redis
+
+        self.errors = redis.exceptions
+        self.client = redis.Redis.from_url(url)
+
+    def add(self, event):
+        self.client.rpush(self.EVENTS_KEY, event)
+
+    def due(self):
+        # flushed by the flushing_search_log beat task
+        return False
+
+    def take(self):
+        """Moves the buffered searches aside, unless a failed flush left
+        some."""
+        if not self.client.exists(self.EVENTS_KEY + ":flushing"):
+            try:
+                self.client.rename(self.EVENTS_KEY, self.EVENTS_KEY + ":flushing")
+            except self.errors.ResponseError:
+                # nothing buffered
+                pass
+        return [
+            event.decode()
+            for event in self.client.lrange(self.EVENTS_KEY + ":flushing", 0, -1)
+        ]
+
+    def done(self):
+        self.client.delete(self.EVENTS_KEY + ":flushing")
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def search_log_buffer():
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                url = getattr(settings, "SEARCH_LOG_REDIS_URL", None)
+                if url:
+                    _buffer = RedisSearchBuffer(url)
+                else:
+                    if not settings.DEBUG:
+                        logger.warning(
+                            "SEARCH_LOG_REDIS_URL is not set, the searches are buffered "
+                            "in each process"
+                        )
+                    _buffer = LocalSearchBuffer()
+                    # written at exit too, the beat task only flushes its own process
+                    atexit.register(flush_search_log)
+    return _buffer
+
+
+def record_search(ip_address, data, results, user_id=None):
+    """Logs a search of the skills in data["q"] and the locations in
+    data["location"], the database is written by flush_search_log."""
+    buffer = search_log_buffer()
+    buffer.add(
+        json.dumps(
+            {
+                "ip_address": ip_address,
+                "skills": data.get("q", "").strip(", "),
+                "locations": data.get("location", "").strip(", "),
+                "results": results,
+                "user_id": user_id,
+                "searched_on": datetime.now().isoformat(),
+            }
+        )
+    )
+    if buffer.due():
+        flush_search_log()
+
+
+def search_terms(kind):
+    """{lowercased slug or name: (id, name)} of the reference rows of kind,
+    the lowest id first."""
+
+    def build(rows):
+        terms = {}
+        for row in sorted(rows, key=lambda row: row["id"]):
+            for value in (row["slug"], row["name"]):
+                if value:
+                    terms.setdefault(value.lower(), (row["id"], row["name"]))
+        return terms
+
+    return reference_data.snapshot(kind).derived("search_terms", build)
+
+
+def resolve_terms(text, terms):
+    """({id: name} of the comma separated searched terms found in terms, the
+    others joined by commas)."""
+    found = {}
+    others = []
+    for term in text.split(", ") if text else ():
+        match = terms.get(term.lower())
+        if match:
+            found[match[0]] = match[1]
+        else:
+            others.append(term)
+    return found, ",".join(others)
+
+
+def save_search_summary(day, searches):
+    """Adds {(kind, term): searches} to the SearchSummary rows of day, the
+    missing rows inserted first so concurrent flushes only add."""
+    SearchSummary.objects.bulk_create(
+        [SearchSummary(date=day, kind=kind, term=term) for kind, term in searches],
+        ignore_conflicts=True,
+    )
+    rows = [
+        (summary_id, searches[kind, term])
+        for summary_id, kind, term in SearchSummary.objects.filter(
+            date=day, term__in={term for kind, term in searches}
+        ).values_list("id", "kind", "term")
+        if (kind, term) in searches
+    ]
+    for start in range(0, len(rows), SEARCH_SUMMARY_UPDATE_BATCH):
+        batch = rows[start : start + SEARCH_SUMMARY_UPDATE_BATCH]
+        SearchSummary.objects.filter(
+            id__in=[summary_id for summary_id, _ in batch]
+        ).update(
+            searches=F("searches")
+            + Case(
+                *[
+                    When(id=summary_id, then=Value(count))
+                    for summary_id, count in batch
+                ],
+                default=Value(0),
+                output_field=IntegerField(),
+            )
+        )
+
+
+def save_searches(events):
+    """Writes the searches with their skills and cities in bulk and adds
+    them to the summary of the day they were made. Returns the searches
+    written."""
+    skill_terms = search_terms("skill")
+    city_terms = search_terms("city")
+    user_ids = set(
+        User.objects.filter(
+            id__in={event["user_id"] for event in events if event["user_id"]}
+        ).values_list("id", flat=True)
+    )
+    results = []
+    links = []
+    # {day: {(kind, term): searches}}
+    days = defaultdict(Counter)
+    for event in events:
+        skills, other_skill = resolve_terms(event["skills"], skill_terms)
+        cities, other_location = resolve_terms(event["locations"], city_terms)
+        # events buffered before the timestamp was logged count at the flush
+        searched_on = (
+            datetime.fromisoformat(event["searched_on"])
+            if event.get("searched_on")
+            else datetime.now()
+        )
+        searches = days[searched_on.date()]
+        results.append(
+            SearchResult(
+                search_on=searched_on,
+                ip_address=event["ip_address"],
+                user_id=event["user_id"] if event["user_id"] in user_ids else None,
+                search_text={
+                    "skills": event["skills"],
+                    "locations": event["locations"],
+                },
+                other_skill=other_skill,
+                other_location=other_location,
+                job_post=event["results"],
+            )
+        )
+        links.append((skills, cities))
+        searches.update(("skill", name) for name in skills.values())
+        searches.update(("city", name) for name in cities.values())
+        if other_skill:
+            searches["other_skill", other_skill] += 1
+        if other_location:
+            searches["other_location", other_location] += 1
+    results = SearchResult.objects.bulk_create(results)
+    SearchResult.skills.through.objects.bulk_create(
+        SearchResult.skills.through(searchresult_id=result.id, skill_id=skill_id)
+        for result, (skills, _) in zip(results, links)
+        for skill_id in skills
+    )
+    SearchResult.locations.through.objects.bulk_create(
+        SearchResult.locations.through(searchresult_id=result.id, city_id=city_id)
+        for result, (_, cities) in zip(results, links)
+        for city_id in cities
+    )
+    for day, searches in sorted(days.items()):
+        if searches:
+            save_search_summary(day, searches)
+    return len(results)
+
+
+def flush_search_log():
+    """Writes the buffered searches, returns how many."""
+    buffer = search_log_buffer()
+    events = [json.loads(event) for event in buffer.take()]
+    if not events:
+        return 0
+    with transaction.atomic():
+        written = save_searches(events)
+    buffer.done()
+    return written
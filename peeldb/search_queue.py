@@ -0,0 +1,209 @@
+import logging
+from collections import defaultdict
+from functools import reduce
+from operator import __or__ as OR
+
+from django.apps import apps
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.utils import timezone
+from haystack import connection_router, connections
+from haystack.exceptions import NotHandled
+from haystack.signals import BaseSignalProcessor
+
+from peeldb.models import JobPost, SearchIndexQueue, SearchIndexRebuild
+
+logger = logging.getLogger(__name__)
+
+# objects prepared and sent to the search backend per bulk request
+INDEX_QUEUE_BATCH = 500
+# seconds edits are coalesced for before the queue is processed
+INDEX_QUEUE_DELAY = 10
+INDEX_QUEUE_SCHEDULED_KEY = "search_index_queue_scheduled"
+
+JOBPOST_M2M_FIELDS = (
+    "skills",
+    "location",
+    "industry",
+    "edu_qualification",
+    "functional_area",
+)
+
+
+def is_indexed(model):
+    try:
+        connections["default"].get_unified_index().get_index(model)
+    except NotHandled:
+        return False
+    return True
+
+
+def schedule_index_queue():
+    # one pending task per delay window, beat picks up anything missed
+    if not cache.add(INDEX_QUEUE_SCHEDULED_KEY, 1, INDEX_QUEUE_DELAY):
+        return
+    from dashboard.tasks import processing_search_index_queue
+
+    try:
+        processing_search_index_queue.apply_async(countdown=INDEX_QUEUE_DELAY)
+    except Exception:
+        logger.exception("could not schedule the search index queue")
+
+
+def enqueue(model, pks):
+    """Marks the search documents of model's pks as stale, once per pk."""
+    now = timezone.now()
+    SearchIndexQueue.objects.bulk_create(
+        [
+            SearchIndexQueue(
+                model=model._meta.label_lower, object_id=str(pk), queued_on=now
+            )
+            for pk in set(pks)
+        ],
+        update_conflicts=True,
+        unique_fields=["model", "object_id"],
+        update_fields=["queued_on", "replay"],
+    )
+    transaction.on_commit(schedule_index_queue)
+
+
+class QueuedSignalProcessor(BaseSignalProcessor):
+    """
+    Records saved and deleted objects in SearchIndexQueue instead of
+    indexing them inside the request, process_index_queue indexes them.
+    """
+
+    def setup(self):
+        post_save.connect(self.handle_save)
+        post_delete.connect(self.handle_delete)
+        for field in JOBPOST_M2M_FIELDS:
+            m2m_changed.connect(
+                self.handle_jobpost_m2m, sender=getattr(JobPost, field).through
+            )
+
+    def teardown(self):
+        post_save.disconnect(self.handle_save)
+        post_delete.disconnect(self.handle_delete)
+        for field in JOBPOST_M2M_FIELDS:
+            m2m_changed.disconnect(
+                self.handle_jobpost_m2m, sender=getattr(JobPost, field).through
+            )
+
+    def handle_save(self, sender, instance, **kwargs):
+        if kwargs.get("raw") or not is_indexed(sender):
+            return
+        enqueue(sender, [instance.pk])
+
+    def handle_delete(self, sender, instance, **kwargs):
+        if is_indexed(sender):
+            enqueue(sender, [instance.pk])
+
+    def handle_jobpost_m2m(self, sender, instance, action, reverse, pk_set, **kwargs):
+        if not action.startswith("post_"):
+            return
+        if not reverse:
+            enqueue(JobPost, [instance.pk])
+        elif pk_set:
+            enqueue(JobPost, pk_set)
+
+
+def index_objects(model, object_ids):
+    """Updates the documents of object_ids still in the index queryset and
+    removes the rest, on every write connection."""
+    label = model._meta.label_lower
+    for using in connection_router.for_write():
+        connection = connections[using]
+        try:
+            index = connection.get_unified_index().get_index(model)
+        except NotHandled:
+            continue
+        # a separate backend that raises, so failed batches stay queued
+        backend = connection.backend(
+            using, **dict(connection.options, SILENTLY_FAIL=False)
+        )
+        objs = list(index.index_queryset(using=using).filter(pk__in=object_ids))
+        if objs:
+            backend.update(index, objs)
+        found = {str(obj.pk) for obj in objs}
+        for object_id in object_ids:
+            if object_id not in found:
+                backend.remove("%s.%s" % (label, object_id))
+
+
+def rebuild_running():
+    return SearchIndexRebuild.objects.filter(status="Processing").exists()
+
+
+def process_index_queue(batch_size=INDEX_QUEUE_BATCH):
+    """Indexes the queued objects in batches, returns how many were done.
+    Rows queued again while their batch was indexed are kept for the next run.
+    While a rebuild runs the rows are kept for replay_index_queue, the new
+    index may have read the objects before they changed."""
+    processed = 0
+    last_id = 0
+    while True:
+        rows = list(
+            SearchIndexQueue.objects.filter(id__gt=last_id, replay=False)
+            .order_by("id")
+            .values_list("id", "model", "object_id", "queued_on")[:batch_size]
+        )
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        by_model = defaultdict(list)
+        by_queued_on = defaultdict(list)
+        for row_id, label, object_id, queued_on in rows:
+            by_model[label].append(object_id)
+            by_queued_on[queued_on].append(row_id)
+        for label, object_ids in by_model.items():
+            try:
+                model = apps.get_model(label)
+            except LookupError:
+                continue
+            index_objects(model, object_ids)
+        done = SearchIndexQueue.objects.filter(
+            reduce(
+                OR,
+                [
+                    Q(queued_on=queued_on, id__in=row_ids)
+                    for queued_on, row_ids in by_queued_on.items()
+                ],
+            )
+        )
+        if rebuild_running():
+            done.update(replay=True)
+        else:
+            done.delete()
+        processed += len(rows)
+    return processed
+
+
+def replay_index_queue():
+    """Queues the rows indexed while a rebuild ran again, once the rebuilt
+    index is live. Returns how many."""
+    replayed = SearchIndexQueue.objects.filter(replay=True).update(replay=False)
+    if replayed:
+        transaction.on_commit(schedule_index_queue)
+    return replayed
+
+
+def enqueue_since(since):
+    """Queues the objects changed since `since`, and every object of the
+    indexes without an updated field."""
+    queued = 0
+    unified_index = connections["default"].get_unified_index()
+    for model, index in unified_index.get_indexes().items():
+        updated_field = index.get_updated_field()
+        if updated_field:
+            pks = model._default_manager.filter(
+                **{updated_field + "__gte": since}
+            ).values_list("pk", flat=True)
+        else:
+            pks = index.index_queryset().values_list("pk", flat=True)
+        pks = list(pks)
+        for start in range(0, len(pks), INDEX_QUEUE_BATCH):
+            enqueue(model, pks[start : start + INDEX_QUEUE_BATCH])
+        queued += len(pks)
+    return queued
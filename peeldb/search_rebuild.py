@@ -0,0 +1,204 @@
+import copy
+import logging
+import multiprocessing
+import time
+from datetime import datetime
+
+from django import db
+from django.apps import apps
+from haystack import connections
+from haystack.constants import DJANGO_CT
+
+from peeldb.models import SearchIndexRebuild
+from peeldb.search_queue import replay_index_queue
+
+logger = logging.getLogger(__name__)
+
+# objects a rebuild worker prepares and sends per bulk request
+REBUILD_BATCH = 1000
+REBUILD_WORKERS = 4
+# a new index skips refreshes and replicas until it is filled
+REBUILD_SETTINGS = {"refresh_interval": "-1", "number_of_replicas": 0}
+LIVE_SETTINGS = {"index": {"refresh_interval": None, "number_of_replicas": None}}
+
+
+class RebuildError(Exception):
+    pass
+
+
+def rebuild_backend(index_name, using="default"):
+    """A backend of connection using that writes to index_name and raises
+    on errors."""
+    connection = connections[using]
+    return connection.backend(
+        using, **dict(connection.options, INDEX_NAME=index_name, SILENTLY_FAIL=False)
+    )
+
+
+def id_ranges(queryset, size=REBUILD_BATCH):
+    """[(first pk, last pk)] of queryset, size objects each."""
+    pks = list(queryset.order_by("pk").values_list("pk", flat=True))
+    return [
+        (pks[start], pks[min(start + size, len(pks)) - 1])
+        for start in range(0, len(pks), size)
+    ]
+
+
+def index_range(job):
+    """Prepares the objects of one id range and sends them in bulk requests,
+    returns (model label, documents sent). Runs in the workers."""
+    using, index_name, label, first, last = job
+    model = apps.get_model(label)
+    index = connections[using].get_unified_index().get_index(model)
+    backend = rebuild_backend(index_name, using)
+    # the mapping was put when the index was created
+    backend.setup_complete = True
+    objs = list(index.index_queryset(using=using).filter(pk__gte=first, pk__lte=last))
+    if objs:
+        backend.update(index, objs, commit=False)
+    return label, len(objs)
+
+
+def run_jobs(jobs, workers):
+    """Yields the results of index_range over jobs as they finish."""
+    if workers > 1 and not multiprocessing.current_process().daemon:
+        # the forked workers open database connections of their own
+        db.connections.close_all()
+        with multiprocessing.get_context("fork").Pool(workers) as pool:
+            yield from pool.imap_unordered(index_range, jobs)
+    else:
+        # daemonic processes can't start workers
+        for job in jobs:
+            yield index_range(job)
+
+
+def indexed_counts(conn, index_name):
+    """{model label: documents} of index_name."""
+    conn.indices.refresh(index=index_name)
+    response = conn.search(
+        index=index_name,
+        body={
+            "size": 0,
+            "aggs": {"models": {"terms": {"field": DJANGO_CT, "size": 1000}}},
+        },
+    )
+    return {
+        bucket["key"]: bucket["doc_count"]
+        for bucket in response["aggregations"]["models"]["buckets"]
+    }
+
+
+def check_counts(sent, indexed):
+    """Raises RebuildError unless index holds as many documents of each
+    model as were sent."""
+    differences = [
+        "%s: %d sent, %d indexed" % (label, sent.get(label, 0), indexed.get(label, 0))
+        for label in sorted(set(sent) | set(indexed))
+        if sent.get(label, 0) != indexed.get(label, 0)
+    ]
+    if differences:
+        raise RebuildError("document counts differ, " + "; ".join(differences))
+
+
+def current_indexes(conn, alias):
+    """The indexes alias points at, or None while alias is the plain index
+    haystack creates before the first rebuild."""
+    if conn.indices.exists_alias(name=alias):
+        return sorted(conn.indices.get_alias(name=alias))
+    if conn.indices.exists(index=alias):
+        return None
+    return []
+
+
+def alias_actions(alias, index_name, current):
+    """update_aliases actions pointing alias at index_name alone, applied
+    by Elasticsearch in one step."""
+    if current is None:
+        actions = [{"remove_index": {"index": alias}}]
+    else:
+        actions = [{"remove": {"index": name, "alias": alias}} for name in current]
+    return actions + [{"add": {"index": index_name, "alias": alias}}]
+
+
+def rebuild_search_index(
+    workers=REBUILD_WORKERS, batch_size=REBUILD_BATCH, keep_old=False, using="default"
+):
+    """
+    Builds every search index into a new versioned Elasticsearch index next
+    to the live one, workers processes sending the id ranges in bulk
+    requests. Once its document counts match, the INDEX_NAME alias is swapped
+    to it in one request, searches read the old index until then. The
+    changes the queue indexed meanwhile are queued again, the objects may
+    have been read before they changed. Returns a report of the documents,
+    rates and times.
+    """
+    start = time.perf_counter()
+    connection = connections[using]
+    alias = connection.options["INDEX_NAME"]
+    index_name = "%s_%s" % (alias, datetime.now().strftime("%Y%m%d%H%M%S"))
+    # a rebuild killed before it finished
+    SearchIndexRebuild.objects.filter(status="Processing").update(status="Failed")
+    # from here on the queue keeps the rows it indexes for replay_index_queue
+    rebuild = SearchIndexRebuild.objects.create(index_name=index_name)
+    backend = rebuild_backend(index_name, using)
+    conn = backend.conn
+    body = copy.deepcopy(backend.DEFAULT_SETTINGS)
+    body["settings"].setdefault("index", {}).update(REBUILD_SETTINGS)
+    try:
+        conn.indices.create(index=index_name, body=body)
+        backend.setup()
+        sent = {}
+        jobs = []
+        for model, index in connection.get_unified_index().get_indexes().items():
+            label = model._meta.label_lower
+            sent[label] = 0
+            jobs.extend(
+                (using, index_name, label, first, last)
+                for first, last in id_ranges(
+                    index.index_queryset(using=using), batch_size
+                )
+            )
+        for label, documents in run_jobs(jobs, workers):
+            sent[label] += documents
+        fill_seconds = time.perf_counter() - start
+        conn.indices.put_settings(index=index_name, body=LIVE_SETTINGS)
+        check_counts(sent, indexed_counts(conn, index_name))
+        current = current_indexes(conn, alias)
+        conn.indices.update_aliases(
+            body={"actions": alias_actions(alias, index_name, current)}
+        )
+    except Exception as exc:
+        conn.indices.delete(index=index_name, ignore=404)
+        SearchIndexRebuild.objects.filter(id=rebuild.id).update(
+            status="Failed", error=str(exc)
+        )
+        # the old index stays live, the kept rows go back to the queue
+        replay_index_queue()
+        raise
+    documents = sum(sent.values())
+    rebuild.status = "Done"
+    rebuild.documents = documents
+    rebuild.fill_seconds = fill_seconds
+    rebuild.seconds = time.perf_counter() - start
+    rebuild.save()
+    # the changes indexed into the old index while the new one was built
+    replay_index_queue()
+    if current and not keep_old:
+        conn.indices.delete(index=",".join(current), ignore=404)
+    report = {
+        "index": index_name,
+        # the plain index haystack created is dropped by the swap
+        "replaced": [alias] if current is None else current,
+        "documents": sent,
+        "fill_seconds": fill_seconds,
+        "documents_per_second": documents / fill_seconds if fill_seconds else 0,
+        "seconds": rebuild.seconds,
+    }
+    logger.info(
+        "search index %s built: %d documents, %.0f documents/s, %.1fs in total",
+        index_name,
+        documents,
+        report["documents_per_second"],
+        report["seconds"],
+    )
+    return report
@@ -0,0 +1,308 @@
+from django.db import transaction
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+from django.dispatch import receiver
+
+from mpcomp.listing_cache import (
+    TAXONOMY_TAG,
+    invalidate_column_listings,
+    invalidate_jobpost_listings,
+    invalidate_tags,
+)
+from mpcomp.meta_templates import meta_templates
+from mpcomp.reference_data import REFERENCE_DATA_KINDS, reference_data
+from mpcomp.slug_index import slug_index
+from peeldb.applicant_tally import add_applicants, move_applicant, remove_applicant
+from peeldb.job_counters import (
+    jobpost_counter_ids,
+    refresh_column_counters,
+    refresh_jobpost_counters,
+)
+from peeldb.models import (
+    JOBPOST_SEARCH_COLUMNS,
+    AppliedJobs,
+    City,
+    Industry,
+    JobPost,
+    MetaData,
+    Qualification,
+    Skill,
+    State,
+    User,
+    update_jobpost_search_columns,
+)
+from peeldb.profile_completeness import (
+    FIELD_SECTION_COLUMNS,
+    RELATION_SECTIONS,
+    SECTION_MODELS,
+    profile_percentage,
+    profile_sections,
+    refresh_profile_sections,
+    set_profile_section,
+    through_user_ids,
+)
+from peeldb.recommendations import schedule_similar_jobs
+
+
+@receiver(post_save, sender=Skill)
+@receiver(post_delete, sender=Skill)
+@receiver(post_save, sender=Qualification)
+@receiver(post_delete, sender=Qualification)
+@receiver(post_save, sender=City)
+@receiver(post_delete, sender=City)
+@receiver(post_save, sender=State)
+@receiver(post_delete, sender=State)
+def invalidate_slug_index(sender, **kwargs):
+    # no process rebuilds it before the change is visible
+    transaction.on_commit(slug_index.invalidate)
+
+
+@receiver(post_save, sender=Skill)
+@receiver(post_delete, sender=Skill)
+@receiver(post_save, sender=Qualification)
+@receiver(post_delete, sender=Qualification)
+@receiver(post_save, sender=City)
+@receiver(post_delete, sender=City)
+@receiver(post_save, sender=State)
+@receiver(post_delete, sender=State)
+@receiver(post_save, sender=Industry)
+@receiver(post_delete, sender=Industry)
+def invalidate_listing_pages(sender, **kwargs):
+    invalidate_tags([TAXONOMY_TAG])
+
+
+def invalidate_reference_data(sender, **kwargs):
+    reference_data.schedule_invalidate(REFERENCE_DATA_KINDS[sender])
+
+
+for model in REFERENCE_DATA_KINDS:
+    post_save.connect(invalidate_reference_data, sender=model)
+    post_delete.connect(invalidate_reference_data, sender=model)
+
+
+@receiver(post_save, sender=MetaData)
+@receiver(post_delete, sender=MetaData)
+def invalidate_meta_templates(sender, **kwargs):
+    transaction.on_commit(meta_templates.invalidate)
+
+
+# the columns similar jobs are scored on
+SIMILAR_JOBS_COLUMNS = ("skill_ids", "location_ids")
+
+SEARCH_COLUMN_THROUGH_MODELS = {
+    getattr(JobPost, field).through: column
+    for column, (field, id_column) in JOBPOST_SEARCH_COLUMNS.items()
+}
+
+
+def jobpost_m2m_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    column = SEARCH_COLUMN_THROUGH_MODELS[sender]
+    if not reverse:
+        field, id_column = JOBPOST_SEARCH_COLUMNS[column]
+        if action == "pre_clear":
+            instance._cleared_counter_ids = list(
+                sender.objects.filter(jobpost_id=instance.pk).values_list(
+                    id_column, flat=True
+                )
+            )
+        elif action == "post_clear":
+            update_jobpost_search_columns([instance.pk], [column])
+            instance.refresh_from_db(fields=[column])
+            # only Live jobs are counted or listed
+            if instance.status == "Live":
+                cleared = getattr(instance, "_cleared_counter_ids", [])
+                refresh_column_counters(column, cleared)
+                invalidate_column_listings(column, cleared)
+        elif action in ("post_add", "post_remove"):
+            update_jobpost_search_columns([instance.pk], [column])
+            # a later instance.save() would write the stale list back
+            instance.refresh_from_db(fields=[column])
+            if instance.status == "Live":
+                refresh_column_counters(column, pk_set)
+                invalidate_column_listings(column, pk_set)
+                if column in SIMILAR_JOBS_COLUMNS:
+                    schedule_similar_jobs(instance.pk)
+        return
+    # the taxonomy side changed, e.g. skill.jobpost_set.add(...)
+    if action == "pre_clear":
+        field, id_column = JOBPOST_SEARCH_COLUMNS[column]
+        instance._cleared_jobpost_ids = list(
+            sender.objects.filter(**{id_column: instance.pk}).values_list(
+                "jobpost_id", flat=True
+            )
+        )
+    elif action == "post_clear":
+        update_jobpost_search_columns(
+            getattr(instance, "_cleared_jobpost_ids", []), [column]
+        )
+        refresh_column_counters(column, [instance.pk])
+    elif action in ("post_add", "post_remove"):
+        update_jobpost_search_columns(pk_set, [column])
+        refresh_column_counters(column, [instance.pk])
+    if action.startswith("post_"):
+        invalidate_column_listings(column, [instance.pk])
+
+
+for through in SEARCH_COLUMN_THROUGH_MODELS:
+    m2m_changed.connect(
+        jobpost_m2m_changed, sender=through, dispatch_uid=through.__name__
+    )
+
+
+# the JobPost fields the live job counters depend on
+JOB_COUNTER_FIELDS = ("status", "job_type", "min_year")
+
+
+@receiver(post_save, sender=JobPost)
+def refresh_jobpost_job_counters(sender, instance, **kwargs):
+    counted = getattr(instance, "_counted_fields", None)
+    if counted is None or "Live" not in (counted[0], instance.status):
+        # a new job has no taxonomy rows yet, jobs outside Live aren't counted
+        return
+    if counted != tuple(getattr(instance, field) for field in JOB_COUNTER_FIELDS):
+        refresh_jobpost_counters([instance.pk])
+
+
+@receiver(pre_delete, sender=JobPost)
+def collect_jobpost_job_counters(sender, instance, **kwargs):
+    instance._counter_ids = jobpost_counter_ids([instance.pk])
+
+
+@receiver(post_delete, sender=JobPost)
+def refresh_deleted_jobpost_job_counters(sender, instance, **kwargs):
+    refresh_jobpost_counters(counter_ids=getattr(instance, "_counter_ids", {}))
+
+
+@receiver(pre_save, sender=JobPost)
+def collect_jobpost_status(sender, instance, **kwargs):
+    instance._counted_fields = (
+        JobPost.objects.filter(pk=instance.pk).values_list(*JOB_COUNTER_FIELDS).first()
+        if instance.pk
+        else None
+    )
+    instance._was_live = bool(
+        instance._counted_fields and instance._counted_fields[0] == "Live"
+    )
+
+
+@receiver(post_save, sender=JobPost)
+@receiver(post_delete, sender=JobPost)
+def invalidate_jobpost_listing_pages(sender, instance, **kwargs):
+    # the listings change when a job goes Live, leaves Live or is edited live
+    if instance.status == "Live" or getattr(instance, "_was_live", False):
+        invalidate_jobpost_listings(instance)
+
+
+@receiver(post_save, sender=JobPost)
+def refresh_live_similar_jobs(sender, instance, **kwargs):
+    if instance.status == "Live" and not getattr(instance, "_was_live", False):
+        schedule_similar_jobs(instance.pk)
+
+
+@receiver(pre_save, sender=AppliedJobs)
+def collect_applied_job_status(sender, instance, **kwargs):
+    instance._previous_status = (
+        AppliedJobs.objects.filter(pk=instance.pk)
+        .values_list("status", flat=True)
+        .first()
+        if instance.pk
+        else None
+    )
+
+
+@receiver(post_save, sender=AppliedJobs)
+def count_applied_job(sender, instance, created, **kwargs):
+    if created:
+        add_applicants(instance.job_post_id, 1, instance.status)
+    elif instance._previous_status != instance.status:
+        move_applicant(instance.job_post_id, instance._previous_status, instance.status)
+
+
+@receiver(post_delete, sender=AppliedJobs)
+def uncount_applied_job(sender, instance, **kwargs):
+    remove_applicant(instance.job_post_id, instance.status, instance.applied_on)
+
+
+# the User fields profile_sections reads, with user_type for the weights
+PROFILE_FIELDS = {"user_type", *FIELD_SECTION_COLUMNS}
+
+
+@receiver(pre_save, sender=User)
+def update_profile_field_sections(sender, instance, update_fields=None, **kwargs):
+    instance._profile_sections_changed = False
+    if update_fields is not None and not set(update_fields) & PROFILE_FIELDS:
+        # e.g. the last_login save of a login
+        return
+    sections = profile_sections(instance)
+    completeness = str(profile_percentage(instance.user_type, sections))
+    changed = (sections, completeness) != (
+        instance.profile_sections,
+        instance.profile_completeness,
+    )
+    instance.profile_sections = sections
+    instance.profile_completeness = completeness
+    # a save of other fields would leave the changed mask unsaved
+    instance._profile_sections_changed = (
+        changed
+        and update_fields is not None
+        and "profile_sections" not in update_fields
+    )
+
+
+@receiver(post_save, sender=User)
+def save_profile_field_sections(sender, instance, **kwargs):
+    if getattr(instance, "_profile_sections_changed", False):
+        instance._profile_sections_changed = False
+        User.objects.filter(pk=instance.pk).update(
+            profile_sections=instance.profile_sections,
+            profile_completeness=instance.profile_completeness,
+        )
+
+
+PROFILE_THROUGH_MODELS = {
+    getattr(User, field).through: field for field in RELATION_SECTIONS
+}
+
+
+def profile_m2m_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    field = PROFILE_THROUGH_MODELS[sender]
+    if not reverse:
+        if action == "post_add" and pk_set:
+            set_profile_section(instance, field, True)
+        elif action == "post_clear":
+            set_profile_section(instance, field, False)
+        elif action == "post_remove":
+            set_profile_section(instance, field, getattr(instance, field).exists())
+    elif action == "pre_clear":
+        instance._profile_user_ids = through_user_ids(field, [instance.pk])
+    elif action == "post_clear":
+        refresh_profile_sections(getattr(instance, "_profile_user_ids", []), [field])
+    elif action in ("post_add", "post_remove"):
+        refresh_profile_sections(pk_set, [field])
+
+
+for through in PROFILE_THROUGH_MODELS:
+    m2m_changed.connect(
+        profile_m2m_changed, sender=through, dispatch_uid="profile_" + through.__name__
+    )
+
+
+def collect_profile_users(sender, instance, **kwargs):
+    # the m2m rows are deleted with the instance, without m2m_changed
+    instance._profile_user_ids = through_user_ids(SECTION_MODELS[sender], [instance.pk])
+
+
+def refresh_deleted_profile_sections(sender, instance, **kwargs):
+    refresh_profile_sections(
+        getattr(instance, "_profile_user_ids", []), [SECTION_MODELS[sender]]
+    )
+
+
+for model in SECTION_MODELS:
+    pre_delete.connect(collect_profile_users, sender=model)
+    post_delete.connect(refresh_deleted_profile_sections, sender=model)
@@ -0,0 +1,189 @@
+from django.db import DEFAULT_DB_ALIAS, connection, connections, transaction
+
+from mpcomp.listing_cache import invalidate_column_listings
+from peeldb.job_counters import JOB_COUNTER_SOURCES, refresh_column_counters
+from peeldb.models import (
+    City,
+    FunctionalArea,
+    Industry,
+    JobPost,
+    Qualification,
+    Skill,
+    TaxonomyMerge,
+    update_jobpost_search_columns,
+)
+from peeldb.search_queue import enqueue
+
+TAXONOMY_MERGE_MODELS = {
+    "skill": Skill,
+    "city": City,
+    "industry": Industry,
+    "qualification": Qualification,
+    "functional_area": FunctionalArea,
+}
+
+
+def progress_connection():
+    """A connection of its own writing the progress of a merge, whose
+    rewrites are not visible before it commits. None inside an outer
+    transaction, the merge row is locked by it."""
+    if connection.in_atomic_block:
+        return None
+    return connections.create_connection(DEFAULT_DB_ALIAS)
+
+
+def save_progress(progress, merge_id, processed):
+    if progress is None:
+        return
+    with progress.cursor() as cursor:
+        cursor.execute(
+            "UPDATE %s SET processed = %%s WHERE id = %%s"
+            % progress.ops.quote_name(TaxonomyMerge._meta.db_table),
+            [processed, merge_id],
+        )
+
+
+def taxonomy_relations(model, jobs_only=False):
+    """
+    [(table, column, other column, many to many, JobPost rows)] of the
+    tables referencing model. Many to many rows are moved over by
+    (other column, column), foreign keys are updated in place. One to one
+    references can't hold two rows and are left to the source.
+    """
+    relations = []
+    for rel in model._meta.related_objects:
+        if rel.one_to_one:
+            continue
+        if rel.many_to_many:
+            if not rel.through._meta.auto_created:
+                # the through model's own foreign key is a relation too
+                continue
+            relations.append(
+                (
+                    rel.through._meta.db_table,
+                    rel.field.m2m_reverse_name(),
+                    rel.field.m2m_column_name(),
+                    True,
+                    rel.related_model is JobPost,
+                )
+            )
+        else:
+            relations.append(
+                (
+                    rel.related_model._meta.db_table,
+                    rel.field.column,
+                    rel.related_model._meta.pk.column,
+                    False,
+                    rel.related_model is JobPost,
+                )
+            )
+    if jobs_only:
+        relations = [relation for relation in relations if relation[4]]
+    return sorted(relations)
+
+
+def move_rows(cursor, relation, source_id, target_id):
+    """Points the rows of relation from source_id to target_id with one
+    INSERT ... SELECT and one DELETE, or one UPDATE. Rows the target has
+    already are not duplicated. Returns the ids of the other side."""
+    table, column, other, many_to_many, _ = relation
+    quote = connection.ops.quote_name
+    names = {"table": quote(table), "column": quote(column), "other": quote(other)}
+    if not many_to_many:
+        cursor.execute(
+            "UPDATE %(table)s SET %(column)s = %%s WHERE %(column)s = %%s "
+            "RETURNING %(other)s" % names,
+            [target_id, source_id],
+        )
+        return [row[0] for row in cursor.fetchall()]
+    cursor.execute(
+        "INSERT INTO %(table)s (%(other)s, %(column)s) "
+        "SELECT moved.%(other)s, %%s FROM %(table)s moved "
+        "WHERE moved.%(column)s = %%s AND NOT EXISTS ("
+        "SELECT 1 FROM %(table)s kept WHERE kept.%(other)s = moved.%(other)s "
+        "AND kept.%(column)s = %%s)" % names,
+        [target_id, source_id, target_id],
+    )
+    cursor.execute(
+        "DELETE FROM %(table)s WHERE %(column)s = %%s RETURNING %(other)s" % names,
+        [source_id],
+    )
+    return [row[0] for row in cursor.fetchall()]
+
+
+def merge_taxonomy(merge):
+    """
+    Runs a TaxonomyMerge in one transaction: every table referencing the
+    source row is rewritten set-based, the array columns and live job
+    counters of the affected jobs are refreshed and the jobs are queued for
+    one bulk reindex. Returns the merge.
+    """
+    model = TAXONOMY_MERGE_MODELS[merge.kind]
+    relations = taxonomy_relations(model, merge.jobs_only)
+    TaxonomyMerge.objects.filter(id=merge.id).update(
+        status="Processing", total=len(relations)
+    )
+    merge.total = len(relations)
+    column = JOB_COUNTER_SOURCES[merge.kind][2]
+    job_ids = set()
+    progress = progress_connection()
+    try:
+        if merge.source_id == merge.target_id:
+            raise ValueError("a row can't be merged into itself")
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                for processed, relation in enumerate(relations, 1):
+                    moved = move_rows(
+                        cursor, relation, merge.source_id, merge.target_id
+                    )
+                    if relation[4]:
+                        job_ids.update(moved)
+                    save_progress(progress, merge.id, processed)
+            update_jobpost_search_columns(job_ids, [column])
+            refresh_column_counters(column, [merge.source_id, merge.target_id])
+            enqueue(JobPost, job_ids)
+            # their documents hold the live job counts
+            enqueue(model, [merge.source_id, merge.target_id])
+            if merge.delete_source:
+                model.objects.filter(id=merge.source_id).delete()
+            merge.processed = len(relations)
+            merge.jobs = len(job_ids)
+            merge.status = "Done"
+            merge.save(update_fields=["processed", "jobs", "status", "updated_on"])
+    except Exception as exc:
+        # the rewrites were rolled back
+        TaxonomyMerge.objects.filter(id=merge.id).update(
+            status="Failed", processed=0, error=str(exc)
+        )
+        raise
+    finally:
+        if progress is not None:
+            progress.close()
+    invalidate_column_listings(column, [merge.source_id, merge.target_id])
+    return merge
+
+
+def merge_progress(merge):
+    """(processed, total) tables of merge, written as it runs."""
+    return merge.processed, merge.total
+
+
+def queue_taxonomy_merge(kind, source_id, target_id, user=None, **options):
+    """Creates a TaxonomyMerge and runs it in the background."""
+    merge = TaxonomyMerge.objects.create(
+        kind=kind,
+        source_id=source_id,
+        target_id=target_id,
+        requested_by=user,
+        **options
+    )
+    from dashboard.tasks import merging_taxonomy
+
+    transaction.on_commit(lambda: merging_taxonomy.delay(merge.id))
+    return merge
+
+
+def run_taxonomy_merge(merge_id):
+    merge = TaxonomyMerge.objects.filter(id=merge_id, status="Pending").first()
+    if merge:
+        return merge_taxonomy(merge)
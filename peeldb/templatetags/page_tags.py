@@ -10,6 +10,7 @@ from django.conf import settings
 from django.db.models import Count, Q, Prefetch
 from django.core.cache import cache
 import boto3
+from peeldb.job_counters import with_live_job_counts
 from peeldb.models import (
     AppliedJobs,
     JobPost,
@@ -229,8 +230,7 @@ def get_industries():
     all_industries = cache.get("list_all_industries")
     if not all_industries:
         all_industries = (
-            Industry.objects.filter(status="Active")
-            .annotate(num_posts=Count("jobpost"))
+            with_live_job_counts(Industry.objects.filter(status="Active"), "industry")
             .order_by("-num_posts")[:17]
         )
         cache.set("list_all_industries", all_industries, 60 * 60 * 24)
@@ -240,8 +240,7 @@ def get_industries():
 @register.simple_tag
 def get_all_industries():
     all_industries = (
-        Industry.objects.annotate(num_posts=Count("jobpost"))
-        .filter(status="Active")
+        with_live_job_counts(Industry.objects.filter(status="Active"), "industry")
         .order_by("-num_posts")
     )
     return all_industries
@@ -252,8 +251,7 @@ def get_skills():
     all_skills = cache.get("list_all_skills")
     if not all_skills:
         all_skills = (
-            Skill.objects.annotate(num_posts=Count("jobpost"))
-            .filter(status="Active")
+            with_live_job_counts(Skill.objects.filter(status="Active"), "skill")
             .exclude(name="Fresher")
             .order_by("-num_posts")
         )
@@ -263,7 +261,7 @@ def get_skills():
 
 @register.simple_tag
 def get_all_skills():
-    all_skills = Skill.objects.annotate(num_posts=Count("jobpost"))
+    all_skills = with_live_job_counts(Skill.objects.all(), "skill")
     all_skills = (
         all_skills.filter(status="Active")
         .exclude(name="Fresher")
@@ -277,13 +275,12 @@ def get_refine_skills(skills):
     all_refine_skills = cache.get("all_refine_skills")
     if not all_refine_skills:
         all_refine_skills = list(
-            Skill.objects.filter(status="Active")
-            .annotate(num_posts=Count("jobpost"))
+            with_live_job_counts(Skill.objects.filter(status="Active"), "skill")
             .order_by("-num_posts")
         )
         cache.set("all_refine_skills", all_refine_skills, 10000)
     if skills:
-        each_skill = skills.annotate(num_posts=Count("jobpost")).order_by("num_posts")
+        each_skill = with_live_job_counts(skills, "skill").order_by("num_posts")
         for each in each_skill.iterator():
             try:
                 all_refine_skills.remove(each)
@@ -298,15 +295,12 @@ def get_refine_locations(locations):
     all_refine_locations = cache.get("all_refine_locations")
     if not all_refine_locations:
         all_refine_locations = list(
-            City.objects.annotate(num_posts=Count("locations"))
-            .filter(status="Enabled")
+            with_live_job_counts(City.objects.filter(status="Enabled"), "city")
             .order_by("-num_posts")
         )
         cache.set("all_refine_locations", all_refine_locations, 10000)
     if locations:
-        each_location = locations.annotate(num_posts=Count("locations")).order_by(
-            "num_posts"
-        )
+        each_location = with_live_job_counts(locations, "city").order_by("num_posts")
         for each in each_location.iterator():
             try:
                 all_refine_locations.remove(each)
@@ -321,15 +315,12 @@ def get_refine_states(states):
     all_refine_states = cache.get("all_refine_states")
     if not all_refine_states:
         all_refine_states = list(
-            State.objects.annotate(num_posts=Count("state__locations"))
-            .filter(status="Enabled")
+            with_live_job_counts(State.objects.filter(status="Enabled"), "state")
             .order_by("-num_posts")
         )
         cache.set("all_refine_states", all_refine_states, 10000)
     if states:
-        each_location = states.annotate(num_posts=Count("state__locations")).order_by(
-            "num_posts"
-        )
+        each_location = with_live_job_counts(states, "state").order_by("num_posts")
         for each in each_location.iterator():
             try:
                 all_refine_states.remove(each)
@@ -344,13 +335,12 @@ def get_refine_industries(industry):
     all_refine_industries = cache.get("all_refine_industries")
     if not all_refine_industries:
         all_refine_industries = list(
-            Industry.objects.annotate(num_posts=Count("jobpost"))
-            .filter(status="Active")
+            with_live_job_counts(Industry.objects.filter(status="Active"), "industry")
             .order_by("-num_posts")
         )
         cache.set("all_refine_industries", all_refine_industries, 10000)
     if industry:
-        each_industry = industry.annotate(num_posts=Count("jobpost")).order_by(
+        each_industry = with_live_job_counts(industry, "industry").order_by(
             "num_posts"
         )
         for each in each_industry.iterator():
@@ -367,13 +357,15 @@ def get_refine_educations(education):
     all_refine_educations = cache.get("all_refine_educations")
     if not all_refine_educations:
         all_refine_educations = list(
-            Qualification.objects.annotate(num_posts=Count("jobpost"))
-            .filter(status="Active")
-            .order_by("-num_posts")
+            with_live_job_counts(
+                Qualification.objects.filter(status="Active"), "qualification"
+            ).order_by("-num_posts")
         )
         cache.set("all_refine_educations", all_refine_educations, 10000)
     if education:
-        each_edu = education.annotate(num_posts=Count("jobpost")).order_by("num_posts")
+        each_edu = with_live_job_counts(education, "qualification").order_by(
+            "num_posts"
+        )
         for each in each_edu.iterator():
             try:
                 all_refine_educations.remove(each)
@@ -388,8 +380,7 @@ def get_locations():
     all_locations = cache.get("list_all_locations")
     if not all_locations:
         all_locations = (
-            City.objects.annotate(num_posts=Count("locations"))
-            .filter(status="Enabled")
+            with_live_job_counts(City.objects.filter(status="Enabled"), "city")
             .order_by("-num_posts")
         )
         cache.set("list_all_locations", all_locations, 60 * 60 * 48)
@@ -599,9 +590,9 @@ def get_qualifications():
     latest_qualifications = cache.get("latest_qualifications")
     if not latest_qualifications:
         latest_qualifications = (
-            Qualification.objects.annotate(num_posts=Count("jobpost"))
-            .filter(status="Active")
-            .order_by("-num_posts")
+            with_live_job_counts(
+                Qualification.objects.filter(status="Active"), "qualification"
+            ).order_by("-num_posts")
         )
         cache.set("latest_qualifications", latest_qualifications, 60 * 60 * 48)
     return latest_qualifications
@@ -692,10 +683,10 @@ def get_related_skills(search_skills):
         latest = cache.get("get_top_skills")
         if not latest:
             latest = (
-                Skill.objects.filter(status="Active")
-                .exclude(id__in=exclude)
-                .annotate(num_posts=Count("jobpost"))
-                .order_by("-num_posts")
+                with_live_job_counts(
+                    Skill.objects.filter(status="Active").exclude(id__in=exclude),
+                    "skill",
+                ).order_by("-num_posts")
             )
             cache.set("get_top_skills", latest, 60 * 60 * 24)
         latest = latest.filter(skill_type=status)
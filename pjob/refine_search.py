@@ -1,4 +1,21 @@
-from peeldb.models import JobPost, City, Skill, Qualification, Industry, State, Country
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.contrib.postgres.expressions import ArraySubquery
+from django.contrib.postgres.search import SearchQuery
+from django.db.models import F, Q
+
+from peeldb.models import (
+    JOBPOST_SEARCH_TEXT,
+    JobPost,
+    City,
+    Skill,
+    Qualification,
+    Industry,
+    Country,
+    FunctionalArea,
+)
 from haystack.query import SQ, SearchQuerySet
 
 
@@ -6,6 +23,12 @@ valid_time_formats = ["%Y-%m-%d 00:00:00"]
 
 
 def refined_search(data):
+    if getattr(settings, "JOB_SEARCH_ENGINE", "haystack") == "database":
+        return database_refined_search(data)
+    return haystack_refined_search(data)
+
+
+def haystack_refined_search(data):
     searched_skills = searched_locations = searched_industry = searched_edu = (
         Skill.objects.none()
     )
@@ -68,3 +91,149 @@ def refined_search(data):
         searched_industry,
         searched_edu,
     )
+
+
+class DatabaseSearchResult(object):
+    """Stands in for a haystack SearchResult, templates use result.object"""
+
+    def __init__(self, obj):
+        self.object = obj
+        self.pk = obj.pk
+
+    def __getattr__(self, name):
+        return getattr(self.object, name)
+
+
+class DatabaseSearchQuerySet(object):
+    """
+    The subset of the SearchQuerySet api the listing views use, answered by a
+    single JobPost query over the denormalized id array columns.
+    """
+
+    def __init__(self, queryset):
+        self.queryset = queryset
+
+    def filter(self, *args, **kwargs):
+        return DatabaseSearchQuerySet(self.queryset.filter(*args, **kwargs))
+
+    filter_and = filter
+
+    def order_by(self, *fields):
+        return DatabaseSearchQuerySet(self.queryset.order_by(*fields))
+
+    def load_all(self):
+        return self
+
+    def count(self):
+        return self.queryset.count()
+
+    def __len__(self):
+        return self.count()
+
+    def __bool__(self):
+        return self.queryset.exists()
+
+    def __iter__(self):
+        return iter(self[:])
+
+    def __getitem__(self, key):
+        queryset = self.queryset.select_related("company", "user").prefetch_related(
+            "location", "skills", "industry"
+        )
+        if isinstance(key, slice):
+            return [DatabaseSearchResult(job) for job in queryset[key]]
+        return DatabaseSearchResult(queryset[key])
+
+
+def ids_of(queryset):
+    return ArraySubquery(queryset.values("id"))
+
+
+def database_refined_search(data):
+    searched_skills = searched_locations = searched_industry = searched_edu = (
+        Skill.objects.none()
+    )
+    # the conditions are combined as haystack_refined_search combines them,
+    # over the Live jobs its index holds
+    query = Q(status="Live")
+    if "refine_skill" in data and data.getlist("refine_skill"):
+        term = data.getlist("refine_skill")
+        # the terms as phrases of the title, role or description, as haystack
+        # matches them in its text fields
+        text_query = reduce(
+            or_,
+            [SearchQuery(word, config="simple", search_type="phrase") for word in term],
+        )
+        query &= (
+            Q(
+                skill_ids__overlap=ids_of(
+                    Skill.objects.filter(name__in=term, status="Active")
+                )
+            )
+            | Q(
+                qualification_ids__overlap=ids_of(
+                    Qualification.objects.filter(name__in=term, status="Active")
+                )
+            )
+            | Q(search_text=text_query)
+        )
+        searched_skills = Skill.objects.filter(name__in=term)
+
+    location = data.getlist("refine_location") if "refine_location" in data else []
+    searched_locations = City.objects.filter(name__in=location)
+    if "Across India" in location:
+        query &= Q(
+            location_ids__overlap=ids_of(
+                City.objects.filter(state__country__name="India")
+            )
+        )
+    elif location:
+        query &= Q(location_ids__overlap=ids_of(City.objects.filter(name__in=location)))
+
+    if data.get("job_type"):
+        if data["job_type"] == "Fresher":
+            query &= Q(min_year__lte=0)
+        else:
+            query &= Q(job_type__in=[data["job_type"]])
+
+    if "refine_industry" in data and data.getlist("refine_industry"):
+        term = data.getlist("refine_industry")
+        query &= Q(industry_ids__overlap=ids_of(Industry.objects.filter(name__in=term)))
+        searched_industry = Industry.objects.filter(name__in=term)
+
+    if "refine_education" in data and data.getlist("refine_education"):
+        term = data.getlist("refine_education")
+        query &= Q(
+            qualification_ids__overlap=ids_of(
+                Qualification.objects.filter(name__in=term, status="Active")
+            )
+        )
+        searched_edu = Qualification.objects.filter(name__in=term)
+
+    if "functional_area" in data and data.getlist("functional_area"):
+        term = data.getlist("functional_area")
+        # ORed with everything before, as haystack's filter_or does
+        query |= Q(
+            functional_area_ids__overlap=ids_of(
+                FunctionalArea.objects.filter(name__in=term)
+            )
+        )
+
+    if data.get("refine_experience_min") or data.get("refine_experience_min") == 0:
+        query &= Q(min_year__lte=int(data["refine_experience_min"]))
+
+    if data.get("refine_experience_max") or data.get("refine_experience_max") == 0:
+        query &= Q(max_year__lte=int(data["refine_experience_max"]))
+
+    jobs = (
+        JobPost.objects.alias(search_text=JOBPOST_SEARCH_TEXT)
+        .filter(query, status="Live")
+        .order_by(F("published_on").desc(nulls_last=True), "-id")
+    )
+    return (
+        DatabaseSearchQuerySet(jobs),
+        searched_skills,
+        searched_locations,
+        searched_industry,
+        searched_edu,
+    )
@@ -1,7 +1,11 @@
-from django.test import TestCase
+from django.test import RequestFactory, TestCase, override_settings
 from django.test import Client
 from django.urls import reverse
-from datetime import datetime
+from datetime import date, datetime, timedelta
+import io
+import re
+import zipfile
+from unittest import mock
 from peeldb.models import (
     User,
     Country,
@@ -15,6 +19,54 @@ from peeldb.models import (
     InterviewLocation,
 )
 from django.core import management
+from django.contrib.auth.models import AnonymousUser
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.http import HttpResponse, QueryDict
+from mpcomp.views import (
+    get_meta_data,
+    resolve_slugs,
+    get_valid_locations_list,
+    get_valid_qualifications,
+    get_valid_skills_list,
+    get_valid_state,
+)
+from pjob.refine_search import database_refined_search
+from mpcomp.autocomplete import autocomplete
+from django.core.cache import CacheHandler
+from jobsp.settings import cache_settings
+from mpcomp.cache import PrefixedCache, cache_per_process, cache_stats
+from mpcomp import resume_text
+from mpcomp.views import get_resume_data
+from mpcomp.listing_cache import cache_listing, listing_cache_stats, location_tags
+from mpcomp.reference_data import reference_data
+from peeldb.applicant_tally import reconcile_applicant_tallies
+from peeldb.job_counters import job_counts, reconcile_job_counters
+from peeldb import job_views, search_log
+from peeldb.job_views import LocalViewBuffer, flush_job_views, record_job_view
+from peeldb.models import ApplicantTally, AppliedJobs, Project, TechnicalSkill
+from peeldb.models import MetaData, SearchIndexQueue, VisitedJobs
+from peeldb.models import SearchResult, SearchSummary
+from peeldb.models import JobAlert, Subscriber, TaxonomyMerge, skills_update
+from peeldb.models import SearchIndexRebuild
+from peeldb.profile_completeness import backfill_profile_sections
+from peeldb.recommendations import (
+    rebuild_similar_jobs,
+    recommended_jobs,
+    refresh_similar_jobs,
+)
+from peeldb.search_log import (
+    flush_search_log,
+    record_search,
+    search_log_buffer,
+    search_terms,
+)
+from peeldb.search_indexes import jobIndex
+from peeldb.search_queue import QueuedSignalProcessor, process_index_queue
+from peeldb.search_queue import enqueue, replay_index_queue
+from peeldb.search_rebuild import RebuildError, alias_actions, check_counts
+from peeldb.search_rebuild import id_ranges
+from peeldb.taxonomy_merge import merge_taxonomy, queue_taxonomy_merge
+from peeldb.taxonomy_merge import run_taxonomy_merge
 
 
 class BaseTest(TestCase):
@@ -491,3 +543,1059 @@ class calendar_views_get(BaseTest):
         )
         self.assertEqual(response.status_code, 200)
         self.assertTemplateUsed(response, "calendar/calendar_day_results.html")
+
+
+class slug_index_test(TestCase):
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            country = Country.objects.create(name="India")
+            state = State.objects.create(
+                name="Telangana", country=country, slug="telangana"
+            )
+            City.objects.create(name="Hyderabad", state=state, slug="hyderabad")
+            City.objects.create(name="New Delhi", state=state, slug="new-delhi")
+            Skill.objects.create(name="Python", slug="python", status="Active")
+            Skill.objects.create(name="Django", slug="django", status="Active")
+            Skill.objects.create(name="Java", slug="java", status="InActive")
+            Qualification.objects.create(name="B.Tech", slug="btech", status="Active")
+
+    def test_resolves_without_queries(self):
+        get_valid_skills_list("python")
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                get_valid_skills_list("python-django-java-hyderabad"),
+                ["Python", "Django"],
+            )
+            self.assertEqual(
+                get_valid_locations_list("python-new-delhi-hyderabad"),
+                ["New Delhi", "Hyderabad"],
+            )
+            self.assertEqual(get_valid_qualifications("btech-python"), ["B.Tech"])
+            self.assertEqual(get_valid_state("Telangana"), "Telangana")
+
+    def test_resolve_slugs(self):
+        get_valid_skills_list("python")
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                resolve_slugs(skill="python", city="python-hyderabad"),
+                {"skill": ["Python"], "city": ["Hyderabad"]},
+            )
+
+    def test_invalidated_on_save(self):
+        self.assertEqual(get_valid_skills_list("java"), [])
+        skill = Skill.objects.get(slug="java")
+        skill.status = "Active"
+        with self.captureOnCommitCallbacks(execute=True):
+            skill.save()
+            # the index is kept until the save commits
+            self.assertEqual(get_valid_skills_list("java"), [])
+        self.assertEqual(get_valid_skills_list("java"), ["Java"])
+        with self.captureOnCommitCallbacks(execute=True):
+            skill.delete()
+        self.assertEqual(get_valid_skills_list("java"), [])
+
+
+class database_refined_search_test(TestCase):
+    def setUp(self):
+        country = Country.objects.create(name="India")
+        state = State.objects.create(name="Telangana", country=country, slug="telangana")
+        self.city = City.objects.create(name="Hyderabad", state=state, slug="hyderabad")
+        self.skill = Skill.objects.create(name="Python", slug="python", status="Active")
+        self.industry = Industry.objects.create(name="Software", slug="software")
+        user = User.objects.create(email="test@mp.com", username="test")
+        for job_type in ["full-time", "walk-in"]:
+            jobpost = JobPost.objects.create(
+                user=user,
+                title="developer",
+                vacancies=1,
+                job_type=job_type,
+                status="Live",
+                min_year=1,
+            )
+            jobpost.skills.add(self.skill)
+            jobpost.location.add(self.city)
+        self.jobpost = jobpost
+
+    def test_search_columns_follow_m2m_changes(self):
+        self.jobpost.refresh_from_db()
+        self.assertEqual(self.jobpost.skill_ids, [self.skill.id])
+        self.jobpost.industry.add(self.industry)
+        # saving the same instance must not write stale id lists back
+        self.jobpost.save()
+        self.skill.jobpost_set.remove(self.jobpost)
+        self.jobpost.refresh_from_db()
+        self.assertEqual(self.jobpost.industry_ids, [self.industry.id])
+        self.assertEqual(self.jobpost.skill_ids, [])
+
+    def test_filters(self):
+        search = QueryDict("", mutable=True)
+        search.setlist("refine_skill", ["Python"])
+        search.setlist("refine_location", ["Hyderabad"])
+        job_list = database_refined_search(search)[0]
+        self.assertEqual(job_list.count(), 2)
+        self.assertEqual(job_list.filter_and(job_type__in=["walk-in"]).count(), 1)
+        self.assertEqual(job_list[0:1][0].object.title, "developer")
+        search.setlist("refine_experience_min", ["0"])
+        self.assertFalse(database_refined_search(search)[0])
+
+    def test_matches_the_haystack_search(self):
+        functional_area = FunctionalArea.objects.create(name="IT")
+        jobpost = JobPost.objects.create(
+            user=self.jobpost.user,
+            title="analyst",
+            description="reports in cobol",
+            vacancies=1,
+            status="Live",
+        )
+        search = QueryDict("refine_skill=cobol")
+        self.assertEqual(
+            [result.pk for result in database_refined_search(search)[0]],
+            [jobpost.id],
+        )
+        # functional areas widen the search, as haystack's filter_or did
+        jobpost.functional_area.add(functional_area)
+        search = QueryDict("refine_skill=Python&functional_area=IT")
+        self.assertEqual(database_refined_search(search)[0].count(), 3)
+
+
+class job_counters_test(TestCase):
+    def setUp(self):
+        country = Country.objects.create(name="India")
+        self.state = State.objects.create(
+            name="Telangana", country=country, slug="telangana"
+        )
+        self.city = City.objects.create(
+            name="Hyderabad", state=self.state, slug="hyderabad"
+        )
+        self.other_city = City.objects.create(
+            name="Warangal", state=self.state, slug="warangal"
+        )
+        self.skill = Skill.objects.create(name="Python", slug="python", status="Active")
+        user = User.objects.create(email="test@mp.com", username="test")
+        self.jobposts = []
+        for job_type, min_year in [("full-time", 0), ("walk-in", 2)]:
+            jobpost = JobPost.objects.create(
+                user=user,
+                title="developer",
+                vacancies=1,
+                job_type=job_type,
+                status="Live",
+                min_year=min_year,
+            )
+            jobpost.skills.add(self.skill)
+            jobpost.location.add(self.city, self.other_city)
+            self.jobposts.append(jobpost)
+        # the counts other tests loaded, the refreshes above wait for a commit
+        with self.captureOnCommitCallbacks(execute=True):
+            job_counts.invalidate()
+
+    def test_counters_follow_jobposts(self):
+        self.assertEqual(job_counts.get("skill", self.skill.id), 2)
+        self.assertEqual(job_counts.get("skill", self.skill.id, "walk-in"), 1)
+        self.assertEqual(job_counts.get("skill", self.skill.id, "fresher"), 1)
+        self.assertEqual(job_counts.get("city", self.city.id), 2)
+        # a job in two cities of a state counts once for the state
+        self.assertEqual(job_counts.get("state", self.state.id), 2)
+
+        jobpost = self.jobposts[0]
+        jobpost.status = "Disabled"
+        with self.captureOnCommitCallbacks(execute=True):
+            jobpost.save()
+            # the counts held are kept until the save commits
+            self.assertEqual(job_counts.get("skill", self.skill.id), 2)
+        self.assertEqual(job_counts.get("skill", self.skill.id), 1)
+        self.assertEqual(job_counts.get("skill", self.skill.id, "fresher"), 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.jobposts[1].location.clear()
+        self.assertEqual(job_counts.get("city", self.city.id), 0)
+        self.assertEqual(job_counts.get("state", self.state.id), 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.jobposts[1].delete()
+        self.assertEqual(job_counts.get("skill", self.skill.id), 0)
+
+    def test_saves_recount_only_counted_changes(self):
+        from django.core.cache import cache
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        from peeldb.job_counters import JOB_COUNTS_VERSION_KEY
+
+        jobpost = self.jobposts[0]
+        version = cache.get(JOB_COUNTS_VERSION_KEY)
+        jobpost.title = "python developer"
+        with CaptureQueriesContext(connection) as queries:
+            jobpost.save()
+        self.assertFalse(
+            [query for query in queries if "peeldb_jobcounter" in query["sql"]]
+        )
+        self.assertEqual(cache.get(JOB_COUNTS_VERSION_KEY), version)
+
+        jobpost.job_type = "walk-in"
+        with self.captureOnCommitCallbacks(execute=True):
+            jobpost.save()
+        # every kind recounted, the shared version bumped once
+        self.assertEqual(cache.get(JOB_COUNTS_VERSION_KEY), version + 1)
+        self.assertEqual(job_counts.get("skill", self.skill.id, "walk-in"), 2)
+
+    def test_reconcile_and_lookup(self):
+        JobPost.objects.filter(id=self.jobposts[0].id).update(status="Disabled")
+        with self.captureOnCommitCallbacks(execute=True):
+            reconcile_job_counters()
+        with self.assertNumQueries(1):
+            self.assertEqual(job_counts.get("skill", self.skill.id), 1)
+            self.assertEqual(job_counts.get("city", self.other_city.id), 1)
+
+
+class search_index_queue_test(TestCase):
+    def setUp(self):
+        from haystack import connection_router, connections
+
+        self.skill = Skill.objects.create(name="Python", slug="python", status="Active")
+        self.user = User.objects.create(email="test@mp.com", username="test")
+        self.processor = QueuedSignalProcessor(connections, connection_router)
+        self.addCleanup(self.processor.teardown)
+
+    def test_saves_are_coalesced(self):
+        jobpost = JobPost.objects.create(
+            user=self.user, title="developer", vacancies=1, status="Live"
+        )
+        jobpost.skills.add(self.skill)
+        jobpost.title = "python developer"
+        jobpost.save()
+        # not an indexed model
+        Country.objects.create(name="India")
+        self.assertEqual(
+            list(SearchIndexQueue.objects.values_list("model", "object_id")),
+            [("peeldb.jobpost", str(jobpost.id))],
+        )
+
+        self.skill.delete()
+        self.assertEqual(SearchIndexQueue.objects.count(), 2)
+        self.assertEqual(process_index_queue(batch_size=1), 2)
+        self.assertFalse(SearchIndexQueue.objects.exists())
+
+
+class meta_templates_test(TestCase):
+    def test_rendered_from_registry(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            meta = MetaData.objects.create(
+                name="skill_location_jobs",
+                meta_title="{{ skill }} Jobs in {{ city }}",
+                meta_description="{{ skill }} openings - page {{ current_page }}",
+                h1_tag="{{ skill }} Jobs",
+            )
+        data = {"final_skill": ["Python"], "final_location": ["Hyderabad"], "page": 2}
+        get_meta_data("skill_location_jobs", data)
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                get_meta_data("skill_location_jobs", data),
+                ("Python Jobs in Hyderabad", "Python openings - page 2", "Python Jobs"),
+            )
+            self.assertEqual(get_meta_data("location_jobs", data), ("", "", ""))
+
+        meta.h1_tag = "Latest {{ skill }} Jobs"
+        with self.captureOnCommitCallbacks(execute=True):
+            meta.save()
+        self.assertEqual(
+            get_meta_data("skill_location_jobs", data)[2], "Latest Python Jobs"
+        )
+
+
+class listing_cache_test(TestCase):
+    def setUp(self):
+        country = Country.objects.create(name="India")
+        state = State.objects.create(name="Telangana", country=country, slug="telangana")
+        self.city = City.objects.create(name="Hyderabad", state=state, slug="hyderabad")
+        self.user = User.objects.create(email="test@mp.com", username="test")
+
+        @cache_listing("job_locations", location_tags)
+        def view(request, location, **kwargs):
+            titles = JobPost.objects.filter(
+                status="Live", location_ids__contains=[self.city.id]
+            ).values_list("title", flat=True)
+            return HttpResponse(", ".join(sorted(titles)))
+
+        self.view = view
+
+    def get(self, **params):
+        request = RequestFactory().get("/jobs-in-hyderabad/", params)
+        request.user = AnonymousUser()
+        return self.view(request, location="hyderabad").content.decode()
+
+    def create_job(self, title, status="Live"):
+        jobpost = JobPost.objects.create(
+            user=self.user, title=title, vacancies=1, status=status
+        )
+        jobpost.location.add(self.city)
+        return jobpost
+
+    def test_cached_until_a_job_goes_live(self):
+        self.create_job("python developer")
+        before = listing_cache_stats()
+        self.assertEqual(self.get(), "python developer")
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get(), "python developer")
+        stats = listing_cache_stats()
+        self.assertEqual(stats["misses"] - before["misses"], 1)
+        self.assertEqual(stats["hits"] - before["hits"], 1)
+
+        # jobs outside Live do not expire the page
+        draft = self.create_job("django developer", status="Draft")
+        self.assertEqual(self.get(), "python developer")
+        # other query strings are not cached
+        self.get(sort="title")
+        self.assertEqual(listing_cache_stats()["hits"] - before["hits"], 2)
+
+        draft.status = "Live"
+        draft.save()
+        self.assertEqual(self.get(), "django developer, python developer")
+        self.assertEqual(listing_cache_stats()["misses"] - before["misses"], 2)
+
+
+    def test_cached_page_sent_with_the_visitors_csrf_token(self):
+        from django.middleware.csrf import _unmask_cipher_token
+        from django.template import RequestContext, Template
+
+        @cache_listing("csrf_form", lambda **kwargs: set())
+        def view(request, **kwargs):
+            response = HttpResponse(
+                Template("<form>{% csrf_token %}</form>").render(
+                    RequestContext(request)
+                )
+            )
+            response["X-Robots-Tag"] = "noindex"
+            return response
+
+        before = listing_cache_stats()
+        tokens = []
+        for _ in range(2):
+            request = RequestFactory().get("/")
+            request.user = AnonymousUser()
+            response = view(request)
+            token = re.search(
+                r'value="([A-Za-z0-9]+)"', response.content.decode()
+            ).group(1)
+            # the CSRF middleware sends the cookie the token belongs to
+            self.assertTrue(request.META["CSRF_COOKIE_NEEDS_UPDATE"])
+            self.assertEqual(
+                _unmask_cipher_token(token), request.META["CSRF_COOKIE"]
+            )
+            self.assertEqual(response["X-Robots-Tag"], "noindex")
+            tokens.append(token)
+        self.assertNotEqual(tokens[0], tokens[1])
+        self.assertEqual(listing_cache_stats()["hits"] - before["hits"], 1)
+
+    def test_responses_setting_cookies_not_cached(self):
+        @cache_listing("cookie", lambda **kwargs: set())
+        def view(request, **kwargs):
+            response = HttpResponse("jobs")
+            response.set_cookie("referer", "google")
+            return response
+
+        before = listing_cache_stats()
+        for _ in range(2):
+            request = RequestFactory().get("/")
+            request.user = AnonymousUser()
+            self.assertEqual(view(request).cookies["referer"].value, "google")
+        self.assertEqual(listing_cache_stats()["hits"] - before["hits"], 0)
+
+
+class cache_settings_test(TestCase):
+    def test_clients_built_for_each_backend(self):
+        for backend in [
+            "memcached://127.0.0.1:11211;127.0.0.1:11212/",
+            "redis://127.0.0.1:6379/2",
+            "",
+        ]:
+            cache = CacheHandler(cache_settings(backend))["default"]
+            if backend.startswith("memcached://"):
+                # the client is built on first use, it connects later
+                self.assertEqual(len(cache._cache.clients), 2)
+            elif backend.startswith("redis://"):
+                cache._cache.get_client(write=True)
+            else:
+                cache.set("key", "value")
+                self.assertEqual(cache.get("key"), "value")
+
+    def test_per_process_cache_detected(self):
+        self.assertTrue(cache_per_process())
+        with override_settings(CACHES=cache_settings("redis://127.0.0.1:6379/2")):
+            self.assertFalse(cache_per_process())
+
+
+class prefixed_cache_test(TestCase):
+    def test_misses_computed_once(self):
+        computed = []
+
+        def compute(keys):
+            computed.extend(keys)
+            return {"python": ["Python"], "cobol": []}
+
+        lookups = PrefixedCache("test")
+        self.assertEqual(
+            lookups.get_many(["python", "cobol", "fortran"], compute),
+            {"python": ["Python"], "cobol": [], "fortran": None},
+        )
+        # empty and missing results are cached as well
+        self.assertEqual(
+            lookups.get_many(["python", "cobol", "fortran"], compute),
+            {"python": ["Python"], "cobol": [], "fortran": None},
+        )
+        self.assertEqual(computed, ["python", "cobol", "fortran"])
+        self.assertEqual(cache_stats()["test"]["hits"], 3)
+
+
+class job_views_test(TestCase):
+    def setUp(self):
+        job_views._buffer = LocalViewBuffer()
+        self.user = User.objects.create(email="test@mp.com", username="test")
+        self.jobpost = JobPost.objects.create(
+            user=self.user,
+            title="developer",
+            vacancies=1,
+            job_type="full-time",
+            status="Live",
+            fb_views=2,
+        )
+
+    def tearDown(self):
+        job_views._buffer = None
+
+    def test_views_buffered_and_flushed(self):
+        with self.assertNumQueries(0):
+            record_job_view(self.jobpost.id, "fb", self.user.id)
+            record_job_view(self.jobpost.id, "fb", self.user.id)
+            record_job_view(self.jobpost.id, "otr")
+        self.assertEqual(self.jobpost.get_total_views_count(), 5)
+
+        self.assertEqual(flush_job_views(), (1, 1))
+        self.jobpost.refresh_from_db()
+        self.assertEqual((self.jobpost.fb_views, self.jobpost.other_views), (4, 1))
+        self.assertEqual(self.jobpost.get_total_views_count(), 5)
+        self.assertEqual(flush_job_views(), (0, 0))
+
+    def test_visits_recorded_once(self):
+        VisitedJobs.objects.create(user=self.user, job_post=self.jobpost)
+        record_job_view(self.jobpost.id, "tw", self.user.id)
+        flush_job_views()
+        self.assertEqual(VisitedJobs.objects.count(), 1)
+
+    @override_settings(JOB_VIEWS_REDIS_URL=None)
+    def test_process_buffer_flushed_at_exit(self):
+        job_views._buffer = None
+        with mock.patch("peeldb.job_views.atexit.register") as register:
+            self.assertIsInstance(job_views.job_view_buffer(), LocalViewBuffer)
+        register.assert_called_once_with(flush_job_views)
+
+
+class resume_text_test(TestCase):
+    def setUp(self):
+        self.extracted = []
+
+        @resume_text.extractor("txt")
+        def txt_text(content):
+            self.extracted.append(content)
+            return content.decode("utf-8")
+
+    def tearDown(self):
+        del resume_text.RESUME_EXTRACTORS["txt"]
+
+    def test_docx_text(self):
+        content = io.BytesIO()
+        with zipfile.ZipFile(content, "w") as document:
+            document.writestr(
+                "word/document.xml",
+                '<w:document xmlns:w="http://schemas.openxmlformats.org/'
+                'wordprocessingml/2006/main"><w:body>'
+                "<w:p><w:r><w:t>Jane</w:t></w:r>"
+                "<w:r><w:tab/><w:t>Doe</w:t></w:r></w:p>"
+                "<w:p/><w:p><w:r><w:t>jane@mp.com 9876543210</w:t></w:r></w:p>"
+                "</w:body></w:document>",
+            )
+        self.assertEqual(
+            get_resume_data(SimpleUploadedFile("cv.docx", content.getvalue())),
+            ("jane@mp.com", "9876543210", "Jane\tDoe\n\njane@mp.com 9876543210"),
+        )
+        self.assertEqual(resume_text.resume_data("cv.docx", b"not a zip")[2], "")
+        self.assertEqual(resume_text.resume_data("cv.rtf", b"jane@mp.com")[2], "")
+
+    def test_extracted_once_per_content(self):
+        resumes = [
+            ("a.txt", b"mail: jo@mp.com, 9876543210"),
+            ("b.txt", b"mail: jo@mp.com, 9876543210"),
+            ("c.txt", b"no contact details"),
+        ]
+        self.assertEqual(
+            resume_text.resumes_data(resumes),
+            [
+                ("jo@mp.com", "9876543210", "mail: jo@mp.com, 9876543210"),
+                ("jo@mp.com", "9876543210", "mail: jo@mp.com, 9876543210"),
+                ("", "", "no contact details"),
+            ],
+        )
+        # a re-uploaded resume is read from the cache
+        self.assertEqual(
+            resume_text.resume_data("d.txt", b"no contact details"),
+            ("", "", "no contact details"),
+        )
+        self.assertEqual(
+            self.extracted, [b"mail: jo@mp.com, 9876543210", b"no contact details"]
+        )
+
+
+class similar_jobs_test(TestCase):
+    def setUp(self):
+        country = Country.objects.create(name="India")
+        state = State.objects.create(
+            name="Telangana", country=country, slug="telangana"
+        )
+        self.city = City.objects.create(name="Hyderabad", state=state, slug="hyderabad")
+        self.other_city = City.objects.create(
+            name="Warangal", state=state, slug="warangal"
+        )
+        self.python = Skill.objects.create(name="Python", slug="python")
+        self.django = Skill.objects.create(name="Django", slug="django")
+        self.java = Skill.objects.create(name="Java", slug="java")
+        self.user = User.objects.create(email="test@mp.com", username="test")
+        self.a = self.jobpost([self.python, self.django], self.city, 0, 2)
+        self.b = self.jobpost([self.python, self.django], self.city, 1, 3)
+        self.c = self.jobpost([self.python], self.other_city, 5, 8)
+        self.d = self.jobpost([self.java], self.city, 0, 2)
+        self.jobpost([self.java], self.other_city, 0, 2, status="Disabled")
+
+    def jobpost(self, skills, city, min_year, max_year, status="Live"):
+        jobpost = JobPost.objects.create(
+            user=self.user,
+            title="developer",
+            vacancies=1,
+            job_type="full-time",
+            status=status,
+            min_year=min_year,
+            max_year=max_year,
+        )
+        jobpost.skills.add(*skills)
+        jobpost.location.add(city)
+        return jobpost
+
+    def test_similar_jobs_precomputed(self):
+        self.assertEqual(rebuild_similar_jobs(), 4)
+        # shared skills, then the shared city, newer jobs first on ties
+        with self.assertNumQueries(2):
+            self.assertEqual(
+                self.a.get_recommended_jobposts(), [self.b, self.d, self.c]
+            )
+
+        f = self.jobpost([self.python, self.django], self.city, 0, 2)
+        self.assertEqual(
+            [job_id for score, job_id in refresh_similar_jobs(f.id)],
+            [self.b.id, self.a.id, self.d.id, self.c.id],
+        )
+        self.assertEqual(self.a.get_similar_jobposts(), [f, self.b, self.d, self.c])
+        # jobs that left Live are skipped until the next rebuild
+        self.b.status = "Disabled"
+        self.b.save()
+        self.assertEqual(self.a.get_similar_jobposts(), [f, self.d, self.c])
+
+    def test_recommended_jobs(self):
+        rebuild_similar_jobs()
+        self.user.skills.add(TechnicalSkill.objects.create(skill=self.python))
+        self.user.current_city = self.other_city
+        self.user.year = "6"
+        self.assertEqual(
+            recommended_jobs(self.user, limit=4), [self.c, self.b, self.a, self.d]
+        )
+        AppliedJobs.objects.create(
+            user=self.user, job_post=self.b, status="Pending", ip_address="127.0.0.1"
+        )
+        self.assertEqual(self.user.related_jobs(), [self.c, self.a, self.d])
+        self.assertEqual(self.user.related_walkin_jobs(), [])
+
+
+class profile_completeness_test(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(
+            email="test@mp.com", username="test", user_type="JS", mobile="9876543210"
+        )
+        self.skill = Skill.objects.create(name="Python", slug="python")
+
+    def stored(self):
+        return User.objects.values_list("profile_completeness", flat=True).get(
+            id=self.user.id
+        )
+
+    def test_sections_follow_changes(self):
+        self.assertEqual(self.stored(), "20")
+        project = Project.objects.create(name="careerlite")
+        self.user.project.add(project)
+        self.user.skills.add(TechnicalSkill.objects.create(skill=self.skill))
+        self.assertEqual(self.stored(), "45")
+        with self.assertNumQueries(0):
+            self.assertEqual(self.user.profile_completion_percentage, 45)
+
+        self.user.year = "3"
+        self.user.save(update_fields=["year"])
+        self.assertEqual(self.stored(), "55")
+        self.user.skills.clear()
+        project.delete()
+        self.assertEqual(self.stored(), "30")
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.profile_completion_percentage, 30)
+
+    def test_backfill(self):
+        self.user.project.add(Project.objects.create(name="careerlite"))
+        User.objects.update(profile_sections=0, profile_completeness="")
+        self.assertEqual(backfill_profile_sections(), (1, 1))
+        self.assertEqual(self.stored(), "30")
+        self.assertEqual(backfill_profile_sections(), (1, 0))
+
+    def test_login_save_left_alone(self):
+        self.user.project.add(Project.objects.create(name="careerlite"))
+        # a mask the backfill has not written yet
+        User.objects.update(profile_sections=0)
+        self.user.refresh_from_db()
+        self.user.last_login = datetime.now()
+        with self.assertNumQueries(1):
+            self.user.save(update_fields=["last_login"])
+        self.assertEqual(self.stored(), "30")
+
+
+class applicant_tally_test(TestCase):
+    def setUp(self):
+        self.recruiter = User.objects.create(
+            email="recruiter@mp.com", username="recruiter", user_type="RR"
+        )
+        self.job_post = JobPost.objects.create(
+            user=self.recruiter,
+            title="developer",
+            vacancies=1,
+            job_type="full-time",
+            status="Live",
+        )
+        self.users = [
+            User.objects.create(
+                email="js%d@mp.com" % i, username="js%d" % i, user_type="JS"
+            )
+            for i in range(3)
+        ]
+
+    def tally(self):
+        return ApplicantTally.objects.get(job_post=self.job_post)
+
+    def test_tally_follows_applications(self):
+        applied = [
+            AppliedJobs.objects.create(
+                job_post=self.job_post, user=user, status="Pending"
+            )
+            for user in self.users
+        ]
+        applied[0].status = "Shortlisted"
+        applied[0].save()
+        applied[1].status = "Hired"
+        applied[1].save()
+        applied[2].delete()
+        tally = self.tally()
+        self.assertEqual(
+            (tally.total, tally.pending, tally.shortlisted, tally.hired),
+            (2, 0, 1, 1),
+        )
+        self.assertEqual(tally.applied_today, 2)
+        job_post = JobPost.objects.select_related("applicant_tally").get(
+            id=self.job_post.id
+        )
+        with self.assertNumQueries(0):
+            self.assertEqual(job_post.get_all_applied_users_count(), 2)
+
+        ApplicantTally.objects.filter(job_post=self.job_post).update(
+            total=9, today_date=date.today() - timedelta(days=1)
+        )
+        self.assertEqual(self.tally().applied_today, 0)
+        self.assertEqual(reconcile_applicant_tallies(), (1, 1))
+        self.assertEqual((self.tally().total, self.tally().applied_today), (2, 2))
+        self.assertEqual(reconcile_applicant_tallies(), (1, 0))
+
+    def test_adding_applicants(self):
+        skill = Skill.objects.create(name="Python", slug="python")
+        self.job_post.skills.add(skill)
+        for user in self.users:
+            user.skills.add(TechnicalSkill.objects.create(skill=skill))
+        AppliedJobs.objects.create(
+            job_post=self.job_post, user=self.users[0], status="Pending"
+        )
+        self.job_post.adding_applicants()
+        self.assertEqual(AppliedJobs.objects.filter(job_post=self.job_post).count(), 3)
+        self.assertEqual((self.tally().total, self.tally().pending), (3, 3))
+
+
+class autocomplete_test(TestCase):
+    def setUp(self):
+        country = Country.objects.create(name="India")
+        state = State.objects.create(
+            name="Telangana", country=country, slug="telangana"
+        )
+        hyderabad = City.objects.create(name="Hyderabad", state=state, slug="hyderabad")
+        City.objects.create(name="Warangal", state=state, slug="warangal")
+        java = Skill.objects.create(name="Java", slug="java", status="Active")
+        django = Skill.objects.create(
+            name="Python Django", slug="python-django", status="Active"
+        )
+        Skill.objects.create(name="Python", slug="python", status="Active")
+        Skill.objects.create(name="Pyramid", slug="pyramid", status="InActive")
+        user = User.objects.create(email="test@mp.com", username="test")
+        for skill in [java, java, django]:
+            jobpost = JobPost.objects.create(
+                user=user,
+                title="developer",
+                vacancies=1,
+                job_type="full-time",
+                status="Live",
+            )
+            jobpost.skills.add(skill)
+            jobpost.location.add(hyderabad)
+        with self.captureOnCommitCallbacks(execute=True):
+            job_counts.invalidate()
+        # snapshots loaded by other tests hold rows rolled back since
+        for kind in ["skill", "qualification", "city", "state"]:
+            reference_data.invalidate(kind)
+
+    def names(self, index, prefix, **kwargs):
+        return [
+            suggestion["name"]
+            for suggestion in autocomplete.search(index, prefix, **kwargs)
+        ]
+
+    def test_word_prefixes_ranked_by_live_jobs(self):
+        self.assertEqual(self.names("skill", "py"), ["Python Django", "Python"])
+        self.assertEqual(self.names("skill", "DJ"), ["Python Django"])
+        self.assertEqual(self.names("skill", "python-d"), ["Python Django"])
+        self.assertEqual(
+            self.names("skill", "py", exclude=["Python Django"]), ["Python"]
+        )
+        self.assertEqual(self.names("skill", "ja"), ["Java"])
+        self.assertEqual(autocomplete.search("skill", "ja")[0]["jobs_count"], 2)
+        self.assertEqual(self.names("city", ""), ["Hyderabad"])
+        self.assertEqual(self.names("city_state", "tel"), ["Telangana"])
+
+    def test_views_read_the_index_only(self):
+        self.client.get("/skill-auto/", {"q": "py"})
+        with self.assertNumQueries(0):
+            response = self.client.get(
+                "/skill-auto/", {"q": "py", "text": "Python, ", "search": "filter"}
+            )
+        self.assertEqual(
+            [suggestion["name"] for suggestion in response.json()["results"]],
+            ["Python Django"],
+        )
+
+    def test_rebuilt_on_taxonomy_change(self):
+        self.assertEqual(self.names("skill", "pyr"), [])
+        Skill.objects.filter(name="Pyramid").update(status="Active")
+        reference_data.invalidate("skill")
+        self.assertEqual(self.names("skill", "pyr"), ["Pyramid"])
+
+
+class search_log_test(TestCase):
+    def setUp(self):
+        country = Country.objects.create(name="India")
+        state = State.objects.create(
+            name="Telangana", country=country, slug="telangana"
+        )
+        self.city = City.objects.create(name="Hyderabad", state=state, slug="hyderabad")
+        self.skill = Skill.objects.create(name="Python", slug="python", status="Active")
+        self.user = User.objects.create(email="test@mp.com", username="test")
+        for kind in ["skill", "city"]:
+            reference_data.invalidate(kind)
+        # searches other tests left in the process buffer
+        search_log_buffer().take()
+        search_log_buffer().done()
+
+    def test_searches_written_in_bulk(self):
+        record_search("127.0.0.1", QueryDict("q=python, cobol, &location=Hyderabad"), 3)
+        record_search(
+            "127.0.0.1", QueryDict("q=Python&location=vizag"), 0, self.user.id
+        )
+        self.assertEqual(SearchResult.objects.count(), 0)
+        # terms are resolved against the reference data loaded once a version
+        search_terms("skill")
+        search_terms("city")
+        # savepoint, users, results, skills, locations, summary insert, select
+        # and update, release
+        with self.assertNumQueries(9):
+            self.assertEqual(flush_search_log(), 2)
+        first, second = SearchResult.objects.order_by("id")
+        self.assertEqual(list(first.skills.all()), [self.skill])
+        self.assertEqual(list(first.locations.all()), [self.city])
+        self.assertEqual(first.other_skill, "cobol")
+        self.assertEqual(first.job_post, "3")
+        self.assertEqual(second.other_location, "vizag")
+        self.assertEqual(second.user, self.user)
+        self.assertEqual(flush_search_log(), 0)
+
+        record_search("127.0.0.1", QueryDict("q=python"), 1)
+        flush_search_log()
+        summary = {
+            (row.kind, row.term): row.searches for row in SearchSummary.objects.all()
+        }
+        self.assertEqual(
+            summary,
+            {
+                ("skill", "Python"): 3,
+                ("city", "Hyderabad"): 1,
+                ("other_skill", "cobol"): 1,
+                ("other_location", "vizag"): 1,
+            },
+        )
+
+    def test_searches_counted_on_the_day_they_were_made(self):
+        import json
+
+        searched_on = datetime.now().replace(microsecond=0) - timedelta(days=1)
+        search_log_buffer().add(
+            json.dumps(
+                {
+                    "ip_address": "127.0.0.1",
+                    "skills": "python",
+                    "locations": "",
+                    "results": 1,
+                    "user_id": None,
+                    "searched_on": searched_on.isoformat(),
+                }
+            )
+        )
+        record_search("127.0.0.1", QueryDict("q=python"), 1)
+        flush_search_log()
+        self.assertEqual(
+            sorted(SearchResult.objects.values_list("search_on__date", flat=True)),
+            [searched_on.date(), datetime.now().date()],
+        )
+        self.assertEqual(
+            sorted(SearchSummary.objects.values_list("date", "searches")),
+            [(searched_on.date(), 1), (datetime.now().date(), 1)],
+        )
+
+
+    @override_settings(SEARCH_LOG_REDIS_URL=None)
+    def test_process_buffer_flushed_at_exit(self):
+        buffer = search_log._buffer
+        search_log._buffer = None
+        try:
+            with mock.patch("peeldb.search_log.atexit.register") as register:
+                self.assertIsInstance(
+                    search_log_buffer(), search_log.LocalSearchBuffer
+                )
+            register.assert_called_once_with(flush_search_log)
+        finally:
+            search_log._buffer = buffer
+
+
+class taxonomy_merge_test(TestCase):
+    def setUp(self):
+        country = Country.objects.create(name="India")
+        state = State.objects.create(
+            name="Telangana", country=country, slug="telangana"
+        )
+        self.city = City.objects.create(name="Hyderabad", state=state, slug="hyderabad")
+        self.other_city = City.objects.create(
+            name="Secunderabad", state=state, slug="secunderabad"
+        )
+        self.skill = Skill.objects.create(name="Python", slug="python", status="Active")
+        self.duplicate = Skill.objects.create(
+            name="Python 3", slug="python-3", status="Active"
+        )
+        self.user = User.objects.create(email="test@mp.com", username="test")
+
+    def create_jobs(self, count):
+        jobposts = []
+        for _ in range(count):
+            jobpost = JobPost.objects.create(
+                user=self.user, title="developer", vacancies=1, status="Live"
+            )
+            jobpost.skills.add(self.duplicate)
+            jobpost.location.add(self.other_city)
+            jobposts.append(jobpost)
+        return jobposts
+
+    def test_references_moved(self):
+        moved, kept = self.create_jobs(2)
+        kept.skills.add(self.skill)
+        alert = JobAlert.objects.create(name="python jobs")
+        alert.skill.add(self.duplicate)
+        subscriber = Subscriber.objects.create(
+            email="test@mp.com", skill=self.duplicate
+        )
+        technical_skill = TechnicalSkill.objects.create(skill=self.duplicate)
+        self.user.technical_skills.add(self.duplicate)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            merge = skills_update("python-3", "python")
+        self.assertEqual(len(callbacks), 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            run_taxonomy_merge(merge.id)
+        self.assertFalse(Skill.objects.filter(id=self.duplicate.id).exists())
+        for jobpost in (moved, kept):
+            jobpost.refresh_from_db()
+            # a job holding both skills keeps one row
+            self.assertEqual(list(jobpost.skills.all()), [self.skill])
+            self.assertEqual(jobpost.skill_ids, [self.skill.id])
+        self.assertEqual(list(alert.skill.all()), [self.skill])
+        subscriber.refresh_from_db()
+        self.assertEqual(subscriber.skill, self.skill)
+        technical_skill.refresh_from_db()
+        self.assertEqual(technical_skill.skill, self.skill)
+        self.assertEqual(list(self.user.technical_skills.all()), [self.skill])
+        self.assertEqual(job_counts.get("skill", self.skill.id), 2)
+        self.assertEqual(
+            set(SearchIndexQueue.objects.values_list("model", "object_id")),
+            {
+                ("peeldb.jobpost", str(moved.id)),
+                ("peeldb.jobpost", str(kept.id)),
+                ("peeldb.skill", str(self.skill.id)),
+                ("peeldb.skill", str(self.duplicate.id)),
+            },
+        )
+        merge = TaxonomyMerge.objects.get()
+        self.assertEqual((merge.status, merge.jobs), ("Done", 2))
+        self.assertEqual(merge.processed, merge.total)
+
+    def test_jobs_moved_in_the_background(self):
+        jobposts = self.create_jobs(2)
+        alert = JobAlert.objects.create(name="secunderabad jobs")
+        alert.location.add(self.other_city)
+        with self.captureOnCommitCallbacks() as callbacks:
+            merge = queue_taxonomy_merge(
+                "city", self.other_city.id, self.city.id, self.user, jobs_only=True
+            )
+        self.assertEqual(len(callbacks), 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            run_taxonomy_merge(merge.id)
+        for jobpost in jobposts:
+            jobpost.refresh_from_db()
+            self.assertEqual(jobpost.location_ids, [self.city.id])
+        # only the jobs are moved
+        self.assertEqual(list(alert.location.all()), [self.other_city])
+        self.assertEqual(job_counts.get("city", self.city.id), 2)
+        self.assertEqual(job_counts.get("city", self.other_city.id), 0)
+        merge.refresh_from_db()
+        self.assertEqual(merge.status, "Done")
+        # a merge runs once
+        self.assertIsNone(run_taxonomy_merge(merge.id))
+
+    def test_queries_do_not_grow_with_jobs(self):
+        self.create_jobs(2)
+        merge = TaxonomyMerge.objects.create(
+            kind="skill",
+            source_id=self.duplicate.id,
+            target_id=self.skill.id,
+            jobs_only=True,
+        )
+        # status, the rewrites, array columns, counters, queue and status, with
+        # their savepoints
+        with self.assertNumQueries(16):
+            merge_taxonomy(merge)
+        self.create_jobs(20)
+        merge = TaxonomyMerge.objects.create(
+            kind="skill",
+            source_id=self.duplicate.id,
+            target_id=self.skill.id,
+            jobs_only=True,
+        )
+        with self.assertNumQueries(16):
+            merge_taxonomy(merge)
+
+    def test_merge_into_itself_fails(self):
+        merge = TaxonomyMerge.objects.create(
+            kind="skill", source_id=self.skill.id, target_id=self.skill.id
+        )
+        with self.assertRaises(ValueError):
+            merge_taxonomy(merge)
+        merge.refresh_from_db()
+        self.assertEqual(merge.status, "Failed")
+
+
+class search_rebuild_test(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(email="test@mp.com", username="test")
+        self.skills = [
+            Skill.objects.create(name=name, slug=name.lower(), status=status)
+            for name, status in [
+                ("Python", "Active"),
+                ("Django", "Active"),
+                ("Cobol", "InActive"),
+                ("Java", "Active"),
+                ("Go", "Active"),
+            ]
+        ]
+        self.qualification = Qualification.objects.create(
+            name="B.Tech", slug="btech", status="Active"
+        )
+
+    def test_id_ranges(self):
+        ids = [skill.id for skill in self.skills]
+        self.assertEqual(
+            id_ranges(Skill.objects.all(), 2),
+            [(ids[0], ids[1]), (ids[2], ids[3]), (ids[4], ids[4])],
+        )
+        self.assertEqual(id_ranges(Skill.objects.none()), [])
+
+    def test_alias_swapped_in_one_step(self):
+        self.assertEqual(
+            alias_actions("haystack", "haystack_2", ["haystack_1"]),
+            [
+                {"remove": {"index": "haystack_1", "alias": "haystack"}},
+                {"add": {"index": "haystack_2", "alias": "haystack"}},
+            ],
+        )
+        # the index haystack created holds the alias name until the first swap
+        self.assertEqual(
+            alias_actions("haystack", "haystack_2", None),
+            [
+                {"remove_index": {"index": "haystack"}},
+                {"add": {"index": "haystack_2", "alias": "haystack"}},
+            ],
+        )
+        self.assertEqual(
+            alias_actions("haystack", "haystack_2", []),
+            [{"add": {"index": "haystack_2", "alias": "haystack"}}],
+        )
+
+    def test_counts_checked(self):
+        check_counts({"peeldb.skill": 4, "peeldb.city": 0}, {"peeldb.skill": 4})
+        with self.assertRaises(RebuildError):
+            check_counts({"peeldb.skill": 4}, {"peeldb.skill": 3})
+        with self.assertRaises(RebuildError):
+            check_counts({"peeldb.skill": 4}, {"peeldb.skill": 4, "peeldb.city": 1})
+
+    def test_queue_kept_for_replay_while_rebuilding(self):
+        rebuild = SearchIndexRebuild.objects.create(index_name="haystack_1")
+        enqueue(Skill, [skill.id for skill in self.skills[:2]])
+        self.assertEqual(process_index_queue(), 2)
+        # indexed into the live index, kept until the rebuilt one is live
+        self.assertEqual(SearchIndexQueue.objects.filter(replay=True).count(), 2)
+        self.assertEqual(process_index_queue(), 0)
+        # queued again, it is indexed again
+        enqueue(Skill, [self.skills[0].id])
+        self.assertEqual(process_index_queue(), 1)
+
+        rebuild.status = "Done"
+        rebuild.save()
+        self.assertEqual(replay_index_queue(), 2)
+        self.assertEqual(process_index_queue(), 2)
+        self.assertFalse(SearchIndexQueue.objects.exists())
+
+    def test_jobs_prepared_from_prefetched_rows(self):
+        for _ in range(3):
+            jobpost = JobPost.objects.create(
+                user=self.user, title="developer", vacancies=1, status="Live"
+            )
+            jobpost.skills.add(*self.skills[:3])
+            jobpost.edu_qualification.add(self.qualification)
+        index = jobIndex()
+        jobposts = list(index.index_queryset())
+        with self.assertNumQueries(0):
+            documents = [index.full_prepare(jobpost) for jobpost in jobposts]
+        self.assertEqual(
+            [sorted(document["skills"]) for document in documents],
+            [["Django", "Python"]] * 3,
+        )
+        self.assertEqual(documents[0]["edu_qualification"], ["B.Tech"])
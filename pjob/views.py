@@ -1,7 +1,6 @@
 import json
 import math
 import re
-import os
 import boto3
 import random
 
@@ -25,18 +24,25 @@ from django.contrib.auth import load_backend
 from mpcomp.views import (
     jobseeker_login_required,
     get_prev_after_pages_count,
-    get_valid_skills_list,
     get_meta_data,
-    get_valid_locations_list,
     get_social_referer,
     get_resume_data,
-    handle_uploaded_file,
-    get_valid_qualifications,
+    get_valid_state,
     get_meta,
     get_ordered_skill_degrees,
     get_404_meta,
     rand_string,
+    resolve_slugs,
 )
+from mpcomp.listing_cache import (
+    cache_listing,
+    index_tags,
+    industry_tags,
+    location_tags,
+    skill_tags,
+)
+from peeldb.job_views import record_job_view
+from peeldb.search_log import record_search
 from peeldb.models import (
     JobPost,
     AppliedJobs,
@@ -46,7 +52,6 @@ from peeldb.models import (
     Industry,
     Skill,
     Subscriber,
-    VisitedJobs,
     State,
     TechnicalSkill,
     Company,
@@ -66,7 +71,8 @@ from psite.forms import (
 from .refine_search import refined_search
 from django.db.models import Prefetch
 from django.core.cache import cache
-from dashboard.tasks import save_search_results, send_email
+from dashboard.applications import notify_application
+from dashboard.tasks import send_email
 
 
 months = [
@@ -253,22 +259,12 @@ def job_detail(request, job_title_slug, job_id):
         if str(job.get_absolute_url()) != str(request.path):
             return redirect(job.get_absolute_url(), permanent=False)
         if job.status == "Live":
-            if request.user.is_authenticated:
-                visited_jobs = VisitedJobs.objects.filter(
-                    user=request.user, job_post=job
-                )
-                if not visited_jobs:
-                    VisitedJobs.objects.create(user=request.user, job_post=job)
             field = get_social_referer(request)
-            if field == "fb":
-                job.fb_views += 1
-            elif field == "tw":
-                job.tw_views += 1
-            elif field == "ln":
-                job.ln_views += 1
-            else:
-                job.other_views += 1
-            job.save()
+            record_job_view(
+                job.id,
+                field,
+                request.user.id if request.user.is_authenticated else None,
+            )
         elif job.status == "Disabled":
             if job.major_skill and job.major_skill.status == "Active":
                 return HttpResponseRedirect(job.major_skill.get_job_url())
@@ -459,6 +455,7 @@ def recruiters(request, **kwargs):
     )
 
 
+@cache_listing("index", index_tags)
 def index(request, **kwargs):
     if kwargs.get("page_num") == "1" or request.GET.get("page") == "1":
         return redirect(reverse("jobs:index"), permanent=True)
@@ -528,6 +525,7 @@ def index(request, **kwargs):
     return render(request, template, data)
 
 
+@cache_listing("job_locations", location_tags)
 def job_locations(request, location, **kwargs):
     current_url = reverse("job_locations", kwargs={"location": location})
     if kwargs.get("page_num") == "1" or request.GET.get("page") == "1":
@@ -536,8 +534,11 @@ def job_locations(request, location, **kwargs):
         url = current_url + request.GET.get("page") + "/"
         return redirect(url, permanent=True)
     request.session["formdata"] = ""
-    final_location = get_valid_locations_list(location)
-    state = State.objects.filter(slug__iexact=location)
+    final_location = resolve_slugs(city=location)["city"]
+    if get_valid_state(location):
+        state = State.objects.filter(slug__iexact=location)
+    else:
+        state = State.objects.none()
     if request.POST.get("refine_search") == "True":
         (
             job_list,
@@ -575,7 +576,7 @@ def job_locations(request, location, **kwargs):
     else:
         job_list = []
     if request.POST.get("location"):
-        save_search_results.delay(
+        record_search(
             request.META["REMOTE_ADDR"],
             request.POST,
             job_list.count() if job_list else 0,
@@ -661,19 +662,8 @@ def job_locations(request, location, **kwargs):
         )
 
 
-def list_deserializer(key, value, flags):
-    import ast
-
-    value = value.decode("utf-8")
-    value = ast.literal_eval(value)
-    value = [i.strip() for i in value if i.strip()]
-    return value
-
-
+@cache_listing("job_skills", skill_tags)
 def job_skills(request, skill, **kwargs):
-    from pymemcache.client.base import Client
-
-    client = Client(("localhost", 11211), deserializer=list_deserializer)
     current_url = reverse("job_skills", kwargs={"skill": skill})
     if kwargs.get("page_num") == "1" or request.GET.get("page") == "1":
         return redirect(current_url, permanent=True)
@@ -682,20 +672,9 @@ def job_skills(request, skill, **kwargs):
         url = current_url + request.GET.get("page") + "/"
         return redirect(url, permanent=True)
 
-    final_skill = client.get("final_skill" + skill)
-    if not final_skill:
-        final_skill = get_valid_skills_list(skill)
-        client.set("final_skill" + skill, final_skill, expire=60 * 60 * 24)
-    if final_skill == b"[]":
-        final_skill = []
-
-    final_edu = client.get("final_edu" + skill)
-    if not final_edu:
-        final_edu = get_valid_qualifications(skill)
-        client.set("final_edu" + skill, final_edu, expire=60 * 60 * 24)
-
-    if final_edu == b"[]":
-        final_edu = []
+    names = resolve_slugs(skill=skill, qualification=skill)
+    final_skill = names["skill"]
+    final_edu = names["qualification"]
     if request.POST.get("refine_search") == "True":
         (
             job_list,
@@ -731,7 +710,7 @@ def job_skills(request, skill, **kwargs):
     )
 
     if request.POST.get("q"):
-        save_search_results.delay(
+        record_search(
             request.META["REMOTE_ADDR"], request.POST, job_list.count(), request.user.id
         )
 
@@ -842,6 +821,7 @@ def job_skills(request, skill, **kwargs):
         )
 
 
+@cache_listing("job_industries", industry_tags)
 def job_industries(request, industry, **kwargs):
     current_url = reverse("job_industries", kwargs={"industry": industry})
     if kwargs.get("page_num") == "1" or request.GET.get("page") == "1":
@@ -967,7 +947,7 @@ def job_apply(request, job_id):
                     or request.user.profile_completion_percentage >= 50
                 ):
                     # need to check user uploaded a resume or not
-                    AppliedJobs.objects.create(
+                    applied_job = AppliedJobs.objects.create(
                         user=request.user,
                         job_post=job_post,
                         status="Pending",
@@ -980,68 +960,7 @@ def job_apply(request, job_id):
                         + " at "
                         + job_post.company_name
                     )
-                    t = loader.get_template("email/applicant_apply_job.html")
-                    c = {
-                        "user": request.user,
-                        "recruiter": job_post.user,
-                        "job_post": job_post,
-                    }
-                    rendered = t.render(c)
-                    
-                    # Prepare email content
-                    subject = "Resume Alert - " + job_post.title
-                    from_email = settings.DEFAULT_FROM_EMAIL
-                    to_email = job_post.user.email
-                    
-                    # Handle resume attachment if exists
-                    attachment_data = None
-                    if request.user.resume:
-                        try:
-                            import urllib.request
-                            resume_filename = str(request.user.email) + ".docx"
-                            urllib.request.urlretrieve(
-                                "https://peeljobs.s3.amazonaws.com/"
-                                + str(
-                                    request.user.resume.encode("ascii", "ignore").decode(
-                                        "ascii"
-                                    )
-                                ),
-                                resume_filename,
-                            )
-                            if os.path.exists(resume_filename):
-                                with open(resume_filename, "rb") as f:
-                                    attachment_data = f.read()
-                                os.remove(resume_filename)
-                        except Exception as e:
-                            # Log error but continue without attachment
-                            pass
-                    
-                    # Use SES to send email
-                    try:
-                        ses_client = boto3.client(
-                            'ses',
-                            region_name=getattr(settings, 'AWS_SES_REGION_NAME', 'eu-west-1'),
-                            aws_access_key_id=getattr(settings, 'AWS_ACCESS_KEY_ID', settings.AM_ACCESS_KEY),
-                            aws_secret_access_key=getattr(settings, 'AWS_SECRET_ACCESS_KEY', settings.AM_PASS_KEY),
-                        )
-                        
-                        # Create email message
-                        email_data = {
-                            'Source': from_email,
-                            'Destination': {'ToAddresses': [to_email]},
-                            'Message': {
-                                'Subject': {'Data': subject},
-                                'Body': {'Html': {'Data': rendered}}
-                            }
-                        }
-                        
-                        # Send email (attachment handling would need additional implementation)
-                        ses_client.send_email(**email_data)
-                        
-                    except Exception as e:
-                        # Log error but don't fail the application process
-                        pass
-                    
+                    notify_application(applied_job)
                     data = {
                         "error": False,
                         "response": message,
@@ -1824,8 +1743,9 @@ def skill_fresher_jobs(request, skill_name, **kwargs):
     if "page" in request.GET:
         url = current_url + request.GET.get("page") + "/"
         return redirect(url, permanent=True)
-    final_skill = get_valid_skills_list(skill_name)
-    final_locations = get_valid_locations_list(skill_name)
+    names = resolve_slugs(skill=skill_name, city=skill_name)
+    final_skill = names["skill"]
+    final_locations = names["city"]
     if final_locations:
         return redirect(
             reverse("location_fresher_jobs", kwargs={"city_name": skill_name}),
@@ -1854,7 +1774,7 @@ def skill_fresher_jobs(request, skill_name, **kwargs):
         jobs_list = searched_skills = []
     if request.POST.get("q"):
         ip_address = request.META["REMOTE_ADDR"]
-        save_search_results.delay(
+        record_search(
             ip_address,
             request.POST,
             jobs_list.count() if jobs_list else 0,
@@ -1948,7 +1868,7 @@ def location_fresher_jobs(request, city_name, **kwargs):
         url = current_url + request.GET.get("page") + "/"
         return redirect(url, permanent=True)
     state = State.objects.filter(slug__iexact=city_name)
-    final_locations = get_valid_locations_list(city_name)
+    final_locations = resolve_slugs(city=city_name)["city"]
     if request.POST.get("refine_search") == "True":
         (
             jobs_list,
@@ -1985,7 +1905,7 @@ def location_fresher_jobs(request, city_name, **kwargs):
         jobs_list = searched_locations = []
     if request.POST.get("location") or request.POST.get("q"):
         ip_address = request.META["REMOTE_ADDR"]
-        save_search_results.delay(
+        record_search(
             ip_address,
             request.POST,
             jobs_list.count() if jobs_list else 0,
@@ -2083,8 +2003,9 @@ def skill_location_walkin_jobs(request, skill_name, **kwargs):
     if "page" in request.GET:
         url = current_url + request.GET.get("page") + "/"
         return redirect(url, permanent=True)
-    final_skill = get_valid_skills_list(skill_name)
-    final_locations = get_valid_locations_list(skill_name)
+    names = resolve_slugs(skill=skill_name, city=skill_name)
+    final_skill = names["skill"]
+    final_locations = names["city"]
     state = State.objects.filter(slug__iexact=skill_name)
     if request.POST.get("refine_search") == "True":
         (
@@ -2128,7 +2049,7 @@ def skill_location_walkin_jobs(request, skill_name, **kwargs):
         jobs_list = []
     if request.POST.get("location") or request.POST.get("q"):
         ip_address = request.META["REMOTE_ADDR"]
-        save_search_results.delay(
+        record_search(
             ip_address,
             request.POST,
             jobs_list.count() if jobs_list else 0,
@@ -2256,8 +2177,9 @@ def skill_location_wise_fresher_jobs(request, skill_name, city_name, **kwargs):
     if "page" in request.GET:
         url = current_url + request.GET.get("page") + "/"
         return redirect(url, permanent=True)
-    final_skill = get_valid_skills_list(skill_name)
-    final_location = get_valid_locations_list(city_name)
+    names = resolve_slugs(skill=skill_name, city=city_name)
+    final_skill = names["skill"]
+    final_location = names["city"]
     if request.POST.get("refine_search") == "True":
         (
             jobs_list,
@@ -2282,7 +2204,7 @@ def skill_location_wise_fresher_jobs(request, skill_name, city_name, **kwargs):
         jobs_list = []
     if request.POST.get("location") or request.POST.get("q"):
         ip_address = request.META["REMOTE_ADDR"]
-        save_search_results.delay(
+        record_search(
             ip_address,
             request.POST,
             jobs_list.count() if jobs_list else 0,
@@ -2436,9 +2358,6 @@ def save_codes_and_send_mail(user, request, passwd):
 def register_using_email(request):
     if request.method == "POST":
         if request.FILES.get("get_resume"):
-            handle_uploaded_file(
-                request.FILES["get_resume"], request.FILES["get_resume"].name
-            )
             email, mobile, text = get_resume_data(request.FILES["get_resume"])
             data = {
                 "error": False,
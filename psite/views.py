@@ -1,6 +1,7 @@
 import json
 import requests
 import math
+import os
 
 from django.shortcuts import render
 from django.contrib.auth import logout
@@ -107,7 +108,7 @@ def custom_500(request):
 
 
 def sitemap_xml(request):
-    with open("sitemap/sitemap.xml") as file:
+    with open(os.path.join(settings.SITEMAP_DIR, "sitemap.xml")) as file:
         xml_cont = file.read()
     return HttpResponse(xml_cont, content_type="text/xml")
 
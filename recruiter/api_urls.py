@@ -17,6 +17,11 @@ urlpatterns = [
     path("state/list/", api_views.state_list),
     path("company/list/", api_views.company_list),
     path("functional-area/list/", api_views.functional_area_list),
+    path(
+        "reference-data/<str:kind>/",
+        api_views.reference_data_view,
+        name="reference_data",
+    ),
     path("job/inactive/list/", api_views.inactive_jobs, name="api_inactive_jobs"),
     path("profile/edit/", api_views.edit_profile, name="edit_profile"),
     path("company-profile/", api_views.view_company, name="view_company"),
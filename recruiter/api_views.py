@@ -3,15 +3,18 @@ import math
 from django.utils import timezone
 from zoneinfo import ZoneInfo
 from datetime import datetime
-from django.http.response import JsonResponse
-from django.db.models import Q, Count
+from django.http.response import HttpResponse, HttpResponseNotModified, JsonResponse
+from django.db.models import Q
 from django.template.defaultfilters import slugify
 from django.shortcuts import get_object_or_404
 from django.conf import settings
 from django.template import loader, Template, Context
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
 
 from rest_framework.authtoken.models import Token
 from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import AllowAny
 from peeldb.models import (
     AgencyApplicants,
     InterviewLocation,
@@ -39,7 +42,20 @@ from mpcomp.views import (
 )
 from dashboard.tasks import send_email
 from mpcomp.views import get_absolute_url
+from mpcomp.reference_data import (
+    REFERENCE_DATA,
+    compact_json,
+    reference_data,
+    reference_rows,
+)
 from recruiter.forms import JobPostForm, YEARS, MONTHS
+from recruiter.job_listing import (
+    JOBS_PER_PAGE,
+    estimated_count,
+    job_applicants,
+    job_page,
+    recruiter_jobs,
+)
 from recruiter.serializers import *
 
 
@@ -74,34 +90,9 @@ def login_view(request):
 @api_view(["GET", "POST"])
 @permission_classes((RecruiterRequiredPermission,))
 def jobs_list(request):
-    if request.user.agency_admin:
-        active_jobs_list = (
-            JobPost.objects.filter(user__company=request.user.company)
-            .exclude(status__in=["Disabled", "Expired"])
-            .prefetch_related("location", "agency_recruiters")
-            .annotate(responses=Count("appliedjobs"))
-            .order_by("-id")
-        )
-    elif request.user.is_agency_recruiter:
-        active_jobs_list = (
-            JobPost.objects.filter(
-                Q(agency_recruiters__in=[request.user]) | Q(user=request.user)
-            )
-            .exclude(status__in=["Disabled", "Expired"])
-            .prefetch_related("location", "agency_recruiters")
-            .annotate(responses=Count("appliedjobs"))
-            .order_by("-id")
-            .distinct()
-        )
-    else:
-        active_jobs_list = (
-            JobPost.objects.filter(user=request.user)
-            .exclude(status__in=["Disabled", "Expired"])
-            .prefetch_related("location", "agency_recruiters")
-            .annotate(responses=Count("appliedjobs"))
-            .order_by("-id")
-        )
-    items_per_page = 10
+    active_jobs_list = recruiter_jobs(request.user).exclude(
+        status__in=["Disabled", "Expired"]
+    )
     if request.POST.get("search_value"):
         if request.POST.get("search_value") == "all":
             pass
@@ -114,22 +105,34 @@ def jobs_list(request):
         page = int(request.POST.get("page"))
     else:
         page = 1
-
-    no_pages = int(math.ceil(float(active_jobs_list.count()) / items_per_page))
-    active_jobs_list = active_jobs_list[
-        (page - 1) * items_per_page : page * items_per_page
-    ]
+    cursors = {}
+    for cursor in ("after", "before"):
+        value = request.POST.get(cursor, request.GET.get(cursor, ""))
+        if value.isdigit():
+            cursors[cursor] = int(value)
+
+    total, exact = estimated_count(active_jobs_list)
+    no_pages = int(math.ceil(float(total) / JOBS_PER_PAGE))
+    job_page_list = job_page(active_jobs_list, page=page, **cursors)
+    jobs = JobPostSerializer(job_page_list.jobs, many=True).data
+    for job, job_post in zip(jobs, job_page_list.jobs):
+        job["applicants"] = job_applicants(job_post)
+        job["responses"] = job["applicants"]["total"]
     prev_page, previous_page, aft_page, after_page = get_prev_after_pages_count(
         page, no_pages
     )
     response_data = {
-        "jobs_list": JobPostSerializer(active_jobs_list, many=True).data,
+        "jobs_list": jobs,
         "aft_page": aft_page,
         "after_page": after_page,
         "prev_page": prev_page,
         "previous_page": previous_page,
         "current_page": page,
         "last_page": no_pages,
+        "total": total,
+        "total_is_estimate": not exact,
+        "next_cursor": job_page_list.next_cursor,
+        "previous_cursor": job_page_list.previous_cursor,
         "search_value": (
             request.POST["search_value"] if "search_value" in request.POST else "All"
         ),
@@ -540,18 +543,6 @@ def new_job(request, job_type):
                     {"message": message, "reason": reason},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
-            countries = Country.objects.all().order_by("name")
-            skills = Skill.objects.all().exclude(status="InActive").order_by("name")
-            functional_area = (
-                FunctionalArea.objects.all().exclude(status="InActive").order_by("name")
-            )
-            industries = (
-                Industry.objects.all().exclude(status="InActive").order_by("name")
-            )
-            qualifications = (
-                Qualification.objects.all().exclude(status="InActive").order_by("name")
-            )
-            cities = City.objects.filter().exclude(status="Disabled")
             recruiters = User.objects.filter(company=request.user.company)
             if request.user.agency_admin or request.user.has_perm("jobposts_edit"):
                 jobposts = JobPost.objects.filter(
@@ -569,19 +560,15 @@ def new_job(request, job_type):
             return JsonResponse(
                 {
                     "job_types": JOB_TYPE,
-                    "functional_area": FunctionalAreaSerializer(
-                        functional_area, many=True
-                    ).data,
-                    "qualifications": QualificationSerializer(
-                        qualifications, many=True
-                    ).data,
+                    "functional_area": reference_data.rows("functional_area"),
+                    "qualifications": reference_data.rows("qualification"),
                     "years": YEARS,
                     "months": MONTHS,
-                    "industries": IndustrySerializer(industries, many=True).data,
-                    "countries": CountrySerializer(countries, many=True).data,
-                    "skills": SkillSerializer(skills, many=True).data,
+                    "industries": reference_data.rows("industry"),
+                    "countries": reference_data.rows("country"),
+                    "skills": reference_data.rows("skill"),
                     "jobposts": JobPostSerializer(jobposts, many=True).data,
-                    "cities": CitySerializer(cities, many=True).data,
+                    "cities": reference_data.rows("city"),
                     "status": job_type,
                     "agency_invoice_types": AGENCY_INVOICE_TYPE,
                     "agency_job_types": AGENCY_JOB_TYPE,
@@ -644,50 +631,24 @@ def edit_job(request, job_post_id):
     if request.method == "GET":
         if request.user.mobile_verified:
             if job_post:
-                countries = Country.objects.all().order_by("name")
-                skills = list(Skill.objects.filter(status="Active"))
-                skills.extend(job_post.skills.filter(status="InActive"))
-
-                industries = list(
-                    Industry.objects.filter(status="Active").order_by("name")
-                )
-                industries.extend(job_post.industry.filter(status="InActive"))
-
-                cities = list(City.objects.filter(status="Enabled").order_by("name"))
-                cities.extend(job_post.location.filter(status="Disabled"))
-
-                qualifications = list(
-                    Qualification.objects.filter(status="Active").order_by("name")
-                )
-                qualifications.extend(
-                    job_post.edu_qualification.filter(status="InActive")
-                )
-
                 recruiters = User.objects.filter(company=request.user.company)
                 clients = AgencyCompany.objects.filter(company=request.user.company)
-
-                functional_area = list(
-                    FunctionalArea.objects.filter(status="Active").order_by("name")
-                )
-                functional_area.extend(
-                    job_post.functional_area.filter(status="InActive")
-                )
                 return JsonResponse(
                     {
                         "job_types": JOB_TYPE,
-                        "functional_area": FunctionalAreaSerializer(
-                            functional_area, many=True
-                        ).data,
-                        "qualifications": QualificationSerializer(
-                            qualifications, many=True
-                        ).data,
+                        "functional_area": with_selected(
+                            "functional_area", job_post.functional_area
+                        ),
+                        "qualifications": with_selected(
+                            "qualification", job_post.edu_qualification
+                        ),
                         "years": YEARS,
                         "months": MONTHS,
-                        "industries": IndustrySerializer(industries, many=True).data,
-                        "countries": CountrySerializer(countries, many=True).data,
-                        "skills": SkillSerializer(skills, many=True).data,
+                        "industries": with_selected("industry", job_post.industry),
+                        "countries": reference_data.rows("country"),
+                        "skills": with_selected("skill", job_post.skills),
                         "jobpost": JobPostSerializer(job_post).data,
-                        "cities": CitySerializer(cities, many=True).data,
+                        "cities": with_selected("city", job_post.location),
                         "agency_invoice_types": AGENCY_INVOICE_TYPE,
                         "agency_job_types": AGENCY_JOB_TYPE,
                         "recruiters": UserSerializer(recruiters, many=True).data,
@@ -765,7 +726,6 @@ def change_password(request):
 @permission_classes((RecruiterRequiredPermission,))
 def edit_profile(request):
     if request.method == "GET":
-        functional_areas = FunctionalArea.objects.all()
         user = (
             User.objects.filter(id=request.user.id)
             .prefetch_related("technical_skills", "industry", "functional_area")
@@ -773,22 +733,17 @@ def edit_profile(request):
         )
         return JsonResponse(
             {
-                "skills": SkillSerializer(Skill.objects.all(), many=True).data,
-                "industries": IndustrySerializer(
-                    Industry.objects.all(), many=True
-                ).data,
-                "functional_areas": FunctionalAreaSerializer(
-                    functional_areas, many=True
-                ).data,
+                "skills": with_selected("skill", user.technical_skills),
+                "industries": with_selected("industry", user.industry),
+                "functional_areas": with_selected(
+                    "functional_area", user.functional_area
+                ),
                 "martial_status": MARTIAL_STATUS,
-                "countries": CountrySerializer(Country.objects.all(), many=True).data,
-                "cities": CitySerializer(
-                    City.objects.all().select_related("state", "state__country"),
-                    many=True,
-                ).data,
-                "states": StateSerializer(
-                    State.objects.all().select_related("country"), many=True
-                ).data,
+                "countries": reference_data.rows("country"),
+                "cities": with_selected("city", City.objects.filter(id=user.city_id)),
+                "states": with_selected(
+                    "state", State.objects.filter(id=user.state_id)
+                ),
                 "user": UserSerializer(user).data,
             },
         )
@@ -827,7 +782,6 @@ def edit_profile(request):
         user.technical_skills.add(*request.data.getlist("technical_skills"))
         user.industry.add(*request.data.getlist("industry"))
         user.functional_area.add(*request.data.getlist("functional_area"))
-        user.profile_completeness = user.profile_completion_percentage
         user.save()
         data = {"error": False, "response": '', "is_login": user_login}
         return JsonResponse(data, status=status.HTTP_200_OK)
@@ -867,61 +821,84 @@ def user_profile(request):
     )
 
 
+def with_selected(kind, selected):
+    """The dropdown rows of kind followed by the rows of selected that the
+    snapshot leaves out for their status."""
+    excluded = REFERENCE_DATA[kind][1]
+    return reference_data.rows(kind) + reference_rows(
+        kind, selected.filter(status=excluded)
+    )
+
+
+def reference_list(kind, key):
+    # the {"error": False, key: rows} body is encoded once per version
+    body = reference_data.snapshot(kind).derived(
+        "list:" + key, lambda rows: compact_json({"error": False, key: rows})
+    )
+    return HttpResponse(body, content_type="application/json")
+
+
 @api_view(["GET"])
 @permission_classes((RecruiterRequiredPermission,))
 def skill_list(request):
-    skills = Skill.objects.exclude(status="InActive").order_by("name")
-    return JsonResponse(
-        {"error": False, "skills": SkillSerializer(skills, many=True).data},
-        status=status.HTTP_200_OK,
-    )
+    return reference_list("skill", "skills")
 
 
 @api_view(["GET"])
 @permission_classes((RecruiterRequiredPermission,))
 def industry_list(request):
-    industries = Industry.objects.exclude(status="InActive").order_by("name")
-    return JsonResponse(
-        {"error": False, "industries": IndustrySerializer(industries, many=True).data},
-        status=status.HTTP_200_OK,
-    )
+    return reference_list("industry", "industries")
 
 
 @api_view(["GET"])
 @permission_classes((RecruiterRequiredPermission,))
 def city_list(request):
-    cities = City.objects.exclude(status="Disabled")
-    return JsonResponse(
-        {"error": False, "cities": CitySerializer(cities, many=True).data},
-        status=status.HTTP_200_OK,
-    )
+    return reference_list("city", "cities")
 
 
 @api_view(["GET"])
 @permission_classes((RecruiterRequiredPermission,))
 def state_list(request):
-    states = State.objects.exclude(status="Disabled")
-    return JsonResponse(
-        {"error": False, "states": StateSerializer(states, many=True).data},
-        status=status.HTTP_200_OK,
-    )
+    return reference_list("state", "states")
 
 
 @api_view(["GET"])
 @permission_classes((RecruiterRequiredPermission,))
 def functional_area_list(request):
-    functional_areas = FunctionalArea.objects.exclude(status="InActive").order_by(
-        "name"
-    )
-    return JsonResponse(
-        {
-            "error": False,
-            "functional_areas": FunctionalAreaSerializer(
-                functional_areas, many=True
-            ).data,
-        },
-        status=status.HTTP_200_OK,
-    )
+    return reference_list("functional_area", "functional_areas")
+
+
+@api_view(["GET"])
+@permission_classes((AllowAny,))
+def reference_data_view(request, kind):
+    """
+    The dropdown rows of kind with the version they belong to. The body is
+    sent gzipped when accepted and a matching If-None-Match gets a 304.
+    ?since=<version> returns only the rows changed and the ids removed
+    since that version, or the whole snapshot when it is too old.
+    """
+    if kind not in REFERENCE_DATA:
+        return JsonResponse(
+            {"error": True, "response": "Unknown reference data"},
+            status=status.HTTP_404_NOT_FOUND,
+        )
+    since = request.GET.get("since", "")
+    if since.isdigit():
+        diff = reference_data.diff(kind, int(since))
+        if diff is not None:
+            return HttpResponse(diff, content_type="application/json")
+    snapshot = reference_data.snapshot(kind)
+    if snapshot.etag in parse_etags(request.META.get("HTTP_IF_NONE_MATCH", "")):
+        response = HttpResponseNotModified()
+    elif "gzip" in request.META.get("HTTP_ACCEPT_ENCODING", ""):
+        response = HttpResponse(snapshot.gzip, content_type="application/json")
+        response["Content-Encoding"] = "gzip"
+    else:
+        response = HttpResponse(snapshot.json, content_type="application/json")
+    response["ETag"] = snapshot.etag
+    response["Cache-Control"] = "no-cache"
+    patch_vary_headers(response, ("Accept-Encoding",))
+    return response
 
 
 @api_view(["GET"])
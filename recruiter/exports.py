@@ -0,0 +1,169 @@
+import base64
+import csv
+import gzip
+import hashlib
+import hmac
+import io
+import tempfile
+import time
+from urllib.parse import quote
+
+from django.conf import settings
+from django.db.models import Q
+from django.template import loader
+from django.utils.crypto import get_random_string
+
+from dashboard.applications import aws_client
+from peeldb.models import AppliedJobs, User
+
+APPLICANT_EXPORT_HEADERS = (
+    "Firstname",
+    "Lastname",
+    "Email",
+    "Phone Number",
+    "Current Location",
+    "Permanent Address",
+    "Resume",
+    "Status",
+)
+# applicants loaded per keyset page
+APPLICANT_EXPORT_BATCH = 2000
+# seconds the resume links of a downloaded and a mailed export work for
+RESUME_URL_EXPIRES = 600
+EXPORT_URL_EXPIRES = 3 * 24 * 60 * 60
+# bytes a background export is kept in memory before spilling to disk
+EXPORT_SPOOL_SIZE = 8 * 1024 * 1024
+
+
+class PresignedUrlSigner(object):
+    """
+    Signs S3 GET urls locally with the query string (signature v2) scheme
+    boto3 uses for clients without a region, with the HMAC key set up once
+    instead of a botocore request per url.
+    """
+
+    def __init__(self, bucket=None, access_key=None, secret_key=None):
+        self.bucket = bucket or settings.AWS_STORAGE_BUCKET_NAME
+        self.access_key = access_key or settings.AWS_ACCESS_KEY_ID
+        self._hmac = hmac.new(
+            (secret_key or settings.AWS_SECRET_ACCESS_KEY or "").encode("utf-8"),
+            digestmod=hashlib.sha1,
+        )
+
+    def url(self, key, expires):
+        """url of key valid until the expires timestamp."""
+        path = "/" + quote(key, safe="/~")
+        signature = self._hmac.copy()
+        signature.update(
+            ("GET\n\n\n%d\n/%s%s" % (expires, self.bucket, path)).encode("utf-8")
+        )
+        return (
+            "https://%s.s3.amazonaws.com%s?AWSAccessKeyId=%s&Signature=%s&Expires=%d"
+            % (
+                self.bucket,
+                path,
+                quote(self.access_key, safe=""),
+                quote(base64.b64encode(signature.digest()).decode("ascii"), safe=""),
+                expires,
+            )
+        )
+
+
+def applicants_queryset(jobpost_id, status, search_skills=(), search_locations=()):
+    applicants = AppliedJobs.objects.filter(
+        job_post_id=jobpost_id, status=status.capitalize(), user__isnull=False
+    )
+    if search_skills or search_locations:
+        # a subquery, a join on skills repeats applicants with many skills
+        applicants = applicants.filter(
+            Q(user__current_city_id__in=search_locations)
+            | Q(
+                user_id__in=User.objects.filter(
+                    skills__skill_id__in=search_skills
+                ).values("id")
+            )
+        )
+    return applicants.select_related("user__current_city").only(
+        "user__first_name",
+        "user__last_name",
+        "user__email",
+        "user__mobile",
+        "user__permanent_address",
+        "user__resume",
+        "user__current_city__name",
+    )
+
+
+def iter_applicants(queryset, batch_size=APPLICANT_EXPORT_BATCH):
+    """Yields the applicants of queryset in pages of batch_size, by id."""
+    last_id = 0
+    while True:
+        batch = list(queryset.filter(id__gt=last_id).order_by("id")[:batch_size])
+        if not batch:
+            return
+        yield batch
+        last_id = batch[-1].id
+
+
+def applicant_rows(queryset, status, signer=None, expires_in=RESUME_URL_EXPIRES):
+    """Yields the export header and a row per applicant of queryset."""
+    signer = signer or PresignedUrlSigner()
+    yield APPLICANT_EXPORT_HEADERS
+    for batch in iter_applicants(queryset):
+        # one expiry for the urls of a page
+        expires = int(time.time()) + expires_in
+        for applied_job in batch:
+            user = applied_job.user
+            yield (
+                user.first_name,
+                user.last_name,
+                user.email,
+                user.mobile,
+                user.current_city.name if user.current_city else "",
+                user.permanent_address,
+                signer.url(user.resume.name, expires) if user.resume else "",
+                status,
+            )
+
+
+class Echo(object):
+    # file-like object csv.writer writes a row to and gets the line back
+    def write(self, value):
+        return value
+
+
+def stream_applicants_csv(queryset, status):
+    writer = csv.writer(Echo())
+    return (writer.writerow(row) for row in applicant_rows(queryset, status))
+
+
+def export_applicants(jobpost_id, status, search_skills, search_locations, user_id):
+    """Writes the applicants to a gzip CSV in storage and mails the
+    recruiter a link to it, returns the storage key."""
+    recruiter = User.objects.get(id=user_id)
+    queryset = applicants_queryset(jobpost_id, status, search_skills, search_locations)
+    key = "exports/applicants/%s/%s_applicants_%s.csv.gz" % (
+        jobpost_id,
+        status,
+        get_random_string(12),
+    )
+    with tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_SIZE) as export:
+        with gzip.GzipFile(fileobj=export, mode="wb") as compressed:
+            text = io.TextIOWrapper(compressed, encoding="utf-8", newline="")
+            csv.writer(text).writerows(applicant_rows(queryset, status))
+            text.detach()
+        export.seek(0)
+        aws_client("s3").upload_fileobj(
+            export,
+            settings.AWS_STORAGE_BUCKET_NAME,
+            key,
+            ExtraArgs={"ContentType": "application/gzip"},
+        )
+    from dashboard.tasks import send_email
+
+    url = PresignedUrlSigner().url(key, int(time.time()) + EXPORT_URL_EXPIRES)
+    body = loader.get_template("email/applicants_export.html").render(
+        {"recruiter": recruiter, "status": status, "url": url}
+    )
+    send_email(recruiter.email, "Your applicants export is ready - CareerLite", body)
+    return key
@@ -387,6 +387,12 @@ class JobPostForm(ModelForm):
             "major_skill",
             "vacancies",
             "slug",
+            # kept in sync with the many-to-many fields by peeldb.signals
+            "skill_ids",
+            "location_ids",
+            "industry_ids",
+            "qualification_ids",
+            "functional_area_ids",
         ]
 
     def __init__(self, *args, **kwargs):
@@ -0,0 +1,82 @@
+import json
+
+from django.db.models import Prefetch, Q
+
+from peeldb.applicant_tally import TALLY_STATUSES
+from peeldb.models import JobPost
+
+JOBS_PER_PAGE = 10
+# listings up to this many jobs are counted, larger ones get the planner's
+# row estimate instead of a full count
+EXACT_COUNT_LIMIT = 1000
+# the tally columns sent with each job
+TALLY_COUNTS = ["total", *TALLY_STATUSES.values()]
+# the many-to-many fields JobPostSerializer reads, each fetched once a page.
+# Only skills, location and industry are serialized whole, the others are
+# sent as ids.
+JOB_LIST_SERIALIZED = ("skills", "location", "industry")
+JOB_LIST_PREFETCH = list(JOB_LIST_SERIALIZED) + [
+    Prefetch(field.name, queryset=field.related_model.objects.only("id"))
+    for field in JobPost._meta.many_to_many
+    if field.name not in JOB_LIST_SERIALIZED
+]
+
+
+def recruiter_jobs(user):
+    """The jobs user sees in the recruiter API. The jobs an agency recruiter
+    is assigned to are matched with a subquery, so no DISTINCT is needed."""
+    if user.agency_admin:
+        return JobPost.objects.filter(user__company=user.company)
+    if user.is_agency_recruiter:
+        assigned = JobPost.agency_recruiters.through.objects.filter(user=user).values(
+            "jobpost_id"
+        )
+        return JobPost.objects.filter(Q(user=user) | Q(id__in=assigned))
+    return JobPost.objects.filter(user=user)
+
+
+def estimated_count(queryset, limit=EXACT_COUNT_LIMIT):
+    """(count, exact) of queryset, counted up to limit rows and estimated by
+    the planner above it."""
+    queryset = queryset.order_by()
+    count = queryset[: limit + 1].count()
+    if count <= limit:
+        return count, True
+    plan = json.loads(queryset.explain(format="json"))
+    return max(int(plan[0]["Plan"]["Plan Rows"]), count), False
+
+
+class JobPage(object):
+    def __init__(self, jobs, has_next, has_previous):
+        self.jobs = jobs
+        self.next_cursor = jobs[-1].id if jobs and has_next else None
+        self.previous_cursor = jobs[0].id if jobs and has_previous else None
+
+
+def job_applicants(job_post):
+    """{"total", status columns, "today"} of the tally of job_post."""
+    tally = job_post.get_applicant_tally()
+    applicants = {column: getattr(tally, column) for column in TALLY_COUNTS}
+    applicants["today"] = tally.applied_today
+    return applicants
+
+
+def job_page(queryset, after=None, before=None, page=1, per_page=JOBS_PER_PAGE):
+    """
+    A page of queryset, newest first, with the applicant counts read from
+    the tallies. after and before are job id cursors, the page holds the
+    jobs older than after or the ones just newer than before. Without a
+    cursor page is an offset page number, as older clients send it.
+    """
+    rows = queryset.select_related("applicant_tally").prefetch_related(
+        *JOB_LIST_PREFETCH
+    )
+    if before:
+        jobs = list(rows.filter(id__gt=before).order_by("id")[: per_page + 1])
+        return JobPage(jobs[:per_page][::-1], True, len(jobs) > per_page)
+    if after:
+        jobs = list(rows.filter(id__lt=after).order_by("-id")[: per_page + 1])
+        return JobPage(jobs[:per_page], len(jobs) > per_page, True)
+    offset = (page - 1) * per_page
+    jobs = list(rows.order_by("-id")[offset : offset + per_page + 1])
+    return JobPage(jobs[:per_page], len(jobs) > per_page, page > 1)
@@ -0,0 +1,280 @@
+import io
+import os
+import random
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+from billiard.pool import Pool
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.functions import Lower
+from django.template import loader
+from django.utils.crypto import get_random_string
+
+from dashboard.applications import aws_client
+from mpcomp.resume_text import RESUME_EXTRACTORS, resume_format, resumes_data
+from peeldb.applicant_tally import add_applicants
+from peeldb.models import AgencyResume, AppliedJobs, ResumeBatch, User
+
+RESUME_MAX_SIZE = 300 * 1024
+RESUME_BATCH_MAX_FILES = 5000
+# resumes read from the archive and parsed per round, bounds the memory used
+RESUME_PARSE_CHUNK = 250
+RESUME_UPLOAD_THREADS = 16
+ACCOUNT_MAIL_BATCH = 100
+
+
+def batch_archive(files):
+    """Bytes of a zip of the uploaded files, an uploaded zip as it is."""
+    if len(files) == 1 and resume_format(files[0].name) == "zip":
+        return files[0].read()
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w", zipfile.ZIP_STORED) as resumes:
+        for i, resume in enumerate(files):
+            # numbered folders, uploads may share a file name
+            resumes.writestr("%d/%s" % (i, resume.name), resume.read())
+    return archive.getvalue()
+
+
+def create_resume_batch(user, files, job_post_ids=(), ip_address="", user_agent=""):
+    """Stores the uploaded resumes and queues their ingestion."""
+    key = "resume_batches/%s/%s.zip" % (user.id, get_random_string(12))
+    aws_client("s3").put_object(
+        Bucket=settings.AWS_STORAGE_BUCKET_NAME, Key=key, Body=batch_archive(files)
+    )
+    batch = ResumeBatch.objects.create(
+        uploaded_by=user,
+        archive=key,
+        job_post_ids=[int(job_post_id) for job_post_id in job_post_ids],
+        ip_address=ip_address,
+        user_agent=user_agent,
+    )
+    from dashboard.tasks import ingesting_resume_batch
+
+    transaction.on_commit(lambda: ingesting_resume_batch.delay(batch.id))
+    return batch
+
+
+def resume_path(user_id, name):
+    random_string = "".join(random.choice("0123456789ABCDEF") for i in range(3))
+    return (
+        "resume/"
+        + str(user_id)
+        + random_string
+        + "/"
+        + name.replace(" ", "-").encode("ascii", "ignore").decode("ascii")
+    )
+
+
+def upload_resume(path, content):
+    aws_client("s3").put_object(
+        Bucket=settings.AWS_STORAGE_BUCKET_NAME,
+        Key=path,
+        Body=content,
+        ACL="public-read",
+    )
+
+
+class ResumeBatchIngestion(object):
+    """
+    Adds the resumes of a ResumeBatch to the uploader's resume pool. Each
+    round of chunk_size resumes is parsed in a process pool, unless its text
+    is cached already, deduplicated by email against the batch and the pool,
+    uploaded to S3 by a thread pool and saved with a bulk insert per model.
+    The counters of the batch are updated after every round.
+    """
+
+    def __init__(self, batch, processes=None, chunk_size=RESUME_PARSE_CHUNK):
+        self.batch = batch
+        self.processes = processes or os.cpu_count()
+        self.chunk_size = chunk_size
+        self.emails = set()
+        self.mails = []
+
+    def members(self, archive):
+        members = []
+        for info in archive.infolist():
+            name = os.path.basename(info.filename)
+            if info.is_dir() or not name or info.filename.startswith("__MACOSX/"):
+                continue
+            if resume_format(name) not in RESUME_EXTRACTORS:
+                self.fail(name, "Upload Valid Files Ex: docx, pdf, doc, odt")
+            elif not 0 < info.file_size < RESUME_MAX_SIZE:
+                self.fail(name, "File Size must be less than 300 kb")
+            elif len(members) >= RESUME_BATCH_MAX_FILES:
+                self.fail(name, "Only %d resumes are added per batch" % len(members))
+            else:
+                members.append(info)
+        return members
+
+    def fail(self, name, reason):
+        self.batch.failed += 1
+        self.batch.errors[name] = reason
+
+    def save_progress(self, **fields):
+        ResumeBatch.objects.filter(id=self.batch.id).update(
+            total=self.batch.total,
+            processed=self.batch.processed,
+            created=self.batch.created,
+            duplicates=self.batch.duplicates,
+            failed=self.batch.failed,
+            errors=self.batch.errors,
+            **fields
+        )
+
+    def new_resumes(self, resumes, parsed):
+        """The [name, content, email, mobile] of resumes not in the batch or
+        the uploader's pool already."""
+        new = []
+        for (name, content), (email, mobile, text) in zip(resumes, parsed):
+            self.batch.processed += 1
+            email = email.lower()
+            if not email:
+                self.fail(name, "Resume Must contain Email address")
+            elif email in self.emails:
+                self.batch.duplicates += 1
+            else:
+                self.emails.add(email)
+                new.append([name, content, email, mobile])
+        existing = set(
+            AgencyResume.objects.filter(uploaded_by_id=self.batch.uploaded_by_id)
+            .annotate(email_lower=Lower("email"))
+            .filter(email_lower__in=[resume[2] for resume in new])
+            .values_list("email_lower", flat=True)
+        )
+        self.batch.duplicates += len([1 for resume in new if resume[2] in existing])
+        return [resume for resume in new if resume[2] not in existing]
+
+    def create_users(self, emails, pool):
+        """Jobseeker accounts for the emails without one, like a single
+        upload creates, with the passwords hashed in the pool."""
+        existing = set()
+        for email, username in (
+            User.objects.annotate(email_lower=Lower("email"))
+            .filter(Q(email_lower__in=emails) | Q(username__in=emails))
+            .values_list("email_lower", "username")
+        ):
+            existing.update((email, username))
+        emails = [email for email in emails if email not in existing]
+        passwords = [get_random_string(length=10).lower() for email in emails]
+        users = User.objects.bulk_create(
+            User(
+                email=email,
+                username=email,
+                user_type="JS",
+                registered_from="ResumePool",
+                password=password_hash,
+                activation_code=get_random_string(length=15),
+                unsubscribe_code=get_random_string(length=15),
+            )
+            for email, password_hash in zip(emails, pool.map(make_password, passwords))
+        )
+        self.mails.extend(zip(users, passwords))
+
+    def ingest(self, resumes, pool):
+        parsed = resumes_data(resumes, pool.map)
+        resumes = self.new_resumes(resumes, parsed)
+        for resume in resumes:
+            resume[0] = resume_path(self.batch.uploaded_by_id, resume[0])
+        with ThreadPoolExecutor(RESUME_UPLOAD_THREADS) as uploads:
+            list(uploads.map(lambda resume: upload_resume(*resume[:2]), resumes))
+        with transaction.atomic():
+            self.create_users([resume[2] for resume in resumes], pool)
+            agency_resumes = AgencyResume.objects.bulk_create(
+                AgencyResume(
+                    candidate_name=email,
+                    email=email,
+                    resume=path,
+                    uploaded_by_id=self.batch.uploaded_by_id,
+                    mobile=mobile,
+                )
+                for path, content, email, mobile in resumes
+            )
+            AppliedJobs.objects.bulk_create(
+                AppliedJobs(
+                    status="Pending",
+                    resume_applicant=agency_resume,
+                    job_post_id=job_post_id,
+                    ip_address=self.batch.ip_address,
+                    user_agent=self.batch.user_agent,
+                )
+                for agency_resume in agency_resumes
+                for job_post_id in self.batch.job_post_ids
+            )
+            # bulk_create sends no post_save for the tallies
+            for job_post_id in self.batch.job_post_ids:
+                add_applicants(job_post_id, len(agency_resumes))
+            self.batch.created += len(agency_resumes)
+            self.save_progress()
+
+    def send_account_mails(self):
+        template = loader.get_template("email/jobseeker_account.html")
+        messages = [
+            [
+                [user.email],
+                "CareerLite User Account Activation",
+                template.render(
+                    {
+                        "activate_url": settings.PEEL_URL.rstrip("/")
+                        + "/user/activation/"
+                        + user.activation_code
+                        + "/",
+                        "user_email": user.email,
+                        "user_mobile": user.mobile,
+                        "user": user,
+                        "user_password": password,
+                        "user_profile": 10 if user.is_active else 0,
+                    }
+                ),
+            ]
+            for user, password in self.mails
+        ]
+        from dashboard.tasks import send_bulk_email
+
+        for start in range(0, len(messages), ACCOUNT_MAIL_BATCH):
+            send_bulk_email.delay(messages[start : start + ACCOUNT_MAIL_BATCH])
+
+    def run(self, content=None):
+        """Ingests the batch, from content when given, else its archive."""
+        self.save_progress(status="Processing")
+        try:
+            if content is None:
+                content = (
+                    aws_client("s3")
+                    .get_object(
+                        Bucket=settings.AWS_STORAGE_BUCKET_NAME, Key=self.batch.archive
+                    )["Body"]
+                    .read()
+                )
+            with zipfile.ZipFile(io.BytesIO(content)) as archive:
+                members = self.members(archive)
+                self.batch.total = len(members) + self.batch.failed
+                self.save_progress()
+                pool = Pool(self.processes)
+                try:
+                    for start in range(0, len(members), self.chunk_size):
+                        self.ingest(
+                            [
+                                (os.path.basename(info.filename), archive.read(info))
+                                for info in members[start : start + self.chunk_size]
+                            ],
+                            pool,
+                        )
+                finally:
+                    pool.terminate()
+                    pool.join()
+        except Exception as exc:
+            self.batch.errors["batch"] = str(exc)
+            self.save_progress(status="Failed")
+            raise
+        self.save_progress(status="Done")
+        transaction.on_commit(self.send_account_mails)
+        return self.batch
+
+
+def ingest_resume_batch(batch_id):
+    batch = ResumeBatch.objects.filter(id=batch_id, status="Pending").first()
+    if batch:
+        return ResumeBatchIngestion(batch).run()
@@ -90,7 +90,14 @@ class JobPostSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = JobPost
-        fields = "__all__"
+        exclude = [
+            # the search columns repeat the many-to-many fields
+            "skill_ids",
+            "location_ids",
+            "industry_ids",
+            "qualification_ids",
+            "functional_area_ids",
+        ]
 
 
 class CountrySerializer(serializers.ModelSerializer):
@@ -170,6 +177,12 @@ class CreateJobPostSerailizer(serializers.ModelSerializer):
             "major_skill",
             "vacancies",
             "slug",
+            # kept in sync with the many-to-many fields by peeldb.signals
+            "skill_ids",
+            "location_ids",
+            "industry_ids",
+            "qualification_ids",
+            "functional_area_ids",
         ]
 
     def __init__(self, *args, **kwargs):
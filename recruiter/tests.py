@@ -1,9 +1,18 @@
-from django.test import TestCase
+import gzip
+import io
+import zipfile
+
+import boto3
+from botocore.stub import ANY, Stubber
+from django.http import Http404
+from django.test import RequestFactory, TestCase, override_settings
 from django.core.files.uploadedfile import SimpleUploadedFile
 from datetime import datetime
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 import json
-
+from rest_framework.authtoken.models import Token
 from .forms import (
     JobPostForm,
     Company_Form,
@@ -31,7 +40,21 @@ from peeldb.models import (
     InterviewLocation,
     AgencyCompany,
     AgencyCompanyCatogery,
+    AgencyResume,
+    AppliedJobs,
+    ResumeBatch,
+    TechnicalSkill,
+)
+from dashboard.applications import aws_client
+from mpcomp.reference_data import REFERENCE_DATA_DERIVED_SIZE, reference_data
+from recruiter.views.resume_management import download_applicants
+from recruiter.job_listing import (
+    JOB_LIST_PREFETCH,
+    estimated_count,
+    recruiter_jobs,
 )
+from recruiter.exports import PresignedUrlSigner, applicant_rows, applicants_queryset
+from recruiter.resume_ingestion import ResumeBatchIngestion
 
 
 class job_post_form_test(TestCase):
@@ -2278,9 +2301,12 @@ class recruiter_get_views_test(TestCase):
         expected_errors = {"error": False, "response": "Recruiter Deleted Successfully"}
         self.assertEqual(error_data, expected_errors)
 
+        # an id no user has, a fixed one can belong to the agency admin
+        missing_id = User.objects.order_by("-id").values_list("id", flat=True)[0] + 1
         response = self.client.get(
             reverse(
-                "recruiter:delete_company_recruiter", kwargs={"recruiter_id": "100"}
+                "recruiter:delete_company_recruiter",
+                kwargs={"recruiter_id": missing_id},
             )
         )
         self.assertEqual(response.status_code, 200)
@@ -2302,3 +2328,344 @@ class recruiter_get_views_test(TestCase):
     def test_facebook_login(self):
         response = self.client.post(reverse("recruiter:facebook_login"))
         self.assertEqual(response.status_code, 302)
+
+
+@override_settings(
+    AWS_STORAGE_BUCKET_NAME="peeljobs",
+    AWS_ACCESS_KEY_ID="AKID",
+    AWS_SECRET_ACCESS_KEY="secret",
+)
+class resume_applicants_export_test(TestCase):
+    def setUp(self):
+        self.recruiter = User.objects.create(
+            email="recruiter@mp.com",
+            username="recruiter",
+            user_type="RR",
+            is_active=True,
+        )
+        self.recruiter.set_password("mp")
+        self.recruiter.save()
+        self.job_post = JobPost.objects.create(
+            user=self.recruiter,
+            title="developer",
+            vacancies=1,
+            job_type="full-time",
+            status="Live",
+        )
+        python = Skill.objects.create(name="Python", slug="python", status="Active")
+        django = Skill.objects.create(name="Django", slug="django", status="Active")
+        for i in range(3):
+            user = User.objects.create(
+                email="js%d@mp.com" % i,
+                username="js%d" % i,
+                user_type="JS",
+                resume="resume/%d/my cv.pdf" % i if i else "",
+            )
+            if i < 2:
+                user.skills.add(
+                    TechnicalSkill.objects.create(skill=python),
+                    TechnicalSkill.objects.create(skill=django),
+                )
+            AppliedJobs.objects.create(
+                user=user, job_post=self.job_post, status="Pending"
+            )
+        self.skill_ids = [str(python.id), str(django.id)]
+
+    def test_signer_matches_boto3(self):
+        key = "resume/12A/my cv+(1)~.pdf"
+        url = boto3.client(
+            "s3", aws_access_key_id="AKID", aws_secret_access_key="secret"
+        ).generate_presigned_url(
+            "get_object", Params={"Bucket": "peeljobs", "Key": key}, ExpiresIn=600
+        )
+        expires = int(url.rsplit("Expires=", 1)[1])
+        self.assertEqual(PresignedUrlSigner().url(key, expires), url)
+
+    def test_rows_filtered_without_duplicates(self):
+        applicants = applicants_queryset(
+            self.job_post.id, "pending", search_skills=self.skill_ids
+        )
+        # the page of applicants and the empty page that ends the scan
+        with self.assertNumQueries(2):
+            rows = list(applicant_rows(applicants.all(), "pending"))
+        self.assertEqual([row[2] for row in rows[1:]], ["js0@mp.com", "js1@mp.com"])
+        self.assertEqual(rows[1][6], "")
+        self.assertIn("/resume/1/my%20cv.pdf?AWSAccessKeyId=AKID", rows[2][6])
+
+    def test_download_streams_csv(self):
+        self.client.login(email="recruiter@mp.com", password="mp")
+        response = self.client.get(
+            reverse(
+                "recruiter:download_applicants",
+                kwargs={"jobpost_id": self.job_post.id, "status": "pending"},
+            )
+        )
+        self.assertTrue(response.streaming)
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0].split(",")[2], "Email")
+        self.assertEqual(len(lines), 4)
+
+    def test_download_limited_to_own_jobs(self):
+        other = User.objects.create(
+            email="other@mp.com", username="other", user_type="RR", is_active=True
+        )
+        for params in [{}, {"export": "background"}]:
+            request = RequestFactory().get("/", params)
+            request.user = other
+            with self.assertRaises(Http404):
+                download_applicants(request, self.job_post.id, "pending")
+
+
+def docx(text):
+    content = io.BytesIO()
+    with zipfile.ZipFile(content, "w") as document:
+        document.writestr(
+            "word/document.xml",
+            '<w:document xmlns:w="http://schemas.openxmlformats.org/'
+            'wordprocessingml/2006/main"><w:body><w:p><w:r><w:t>%s</w:t>'
+            "</w:r></w:p></w:body></w:document>" % text,
+        )
+    return content.getvalue()
+
+
+@override_settings(AWS_STORAGE_BUCKET_NAME="peeljobs")
+class resume_batch_ingestion_test(TestCase):
+    def setUp(self):
+        self.recruiter = User.objects.create(
+            email="recruiter@mp.com", username="recruiter", user_type="RR"
+        )
+        self.job_post = JobPost.objects.create(
+            user=self.recruiter,
+            title="developer",
+            vacancies=1,
+            job_type="full-time",
+            status="Live",
+        )
+        User.objects.create(email="Known@mp.com", username="known", user_type="JS")
+        AgencyResume.objects.create(
+            candidate_name="pooled", email="pooled@mp.com", uploaded_by=self.recruiter
+        )
+
+    def test_batch_ingested(self):
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, "w") as resumes:
+            resumes.writestr("a.docx", docx("new@mp.com 9876543210"))
+            resumes.writestr("cvs/b.docx", docx("NEW@mp.com"))
+            resumes.writestr("c.docx", docx("no contact details"))
+            resumes.writestr("d.txt", "new2@mp.com")
+            resumes.writestr("e.docx", docx("pooled@mp.com"))
+            resumes.writestr("f.docx", docx("known@mp.com"))
+        batch = ResumeBatch.objects.create(
+            uploaded_by=self.recruiter, job_post_ids=[self.job_post.id]
+        )
+        with Stubber(aws_client("s3")) as s3:
+            for i in range(2):
+                s3.add_response(
+                    "put_object",
+                    {},
+                    {"Bucket": "peeljobs", "Key": ANY, "Body": ANY, "ACL": ANY},
+                )
+            ResumeBatchIngestion(batch, processes=2, chunk_size=3).run(
+                archive.getvalue()
+            )
+            s3.assert_no_pending_responses()
+
+        batch.refresh_from_db()
+        self.assertEqual(batch.status, "Done")
+        self.assertEqual((batch.total, batch.processed, batch.created), (6, 5, 2))
+        self.assertEqual((batch.duplicates, batch.failed), (2, 2))
+        self.assertEqual(sorted(batch.errors), ["c.docx", "d.txt"])
+        resume = AgencyResume.objects.get(email="new@mp.com")
+        self.assertEqual(resume.mobile, "9876543210")
+        self.assertEqual(AppliedJobs.objects.filter(job_post=self.job_post).count(), 2)
+        # accounts for new emails only
+        self.assertEqual(User.objects.filter(email__iexact="known@mp.com").count(), 1)
+        self.assertTrue(User.objects.get(email="new@mp.com").has_usable_password())
+
+
+class reference_data_test(TestCase):
+    def setUp(self):
+        self.recruiter = User.objects.create(
+            email="recruiter@mp.com",
+            username="recruiter",
+            user_type="RR",
+            is_active=True,
+        )
+        self.token = Token.objects.create(user=self.recruiter)
+        self.python = Skill.objects.create(
+            name="Python", slug="python", status="Active"
+        )
+        self.django = Skill.objects.create(
+            name="Django", slug="django", status="Active"
+        )
+        Skill.objects.create(name="Cobol", slug="cobol", status="InActive")
+        # snapshots loaded by other tests hold rows rolled back since
+        reference_data.invalidate("skill")
+        self.url = reverse("api_recruiter:reference_data", args=["skill"])
+
+    def test_snapshot_etag_and_gzip(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        snapshot = json.loads(response.content)
+        self.assertEqual(
+            [row["name"] for row in snapshot["rows"]], ["Django", "Python"]
+        )
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING="gzip, deflate")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(json.loads(gzip.decompress(response.content)), snapshot)
+        response = self.client.get(
+            reverse("api_recruiter:reference_data", args=["keyword"])
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_diff_since_version(self):
+        version = json.loads(self.client.get(self.url).content)["version"]
+        etag = self.client.get(self.url)["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.python.name = "Python 3"
+            self.python.save()
+        django_id = self.django.id
+        with self.captureOnCommitCallbacks(execute=True):
+            self.django.delete()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(self.url, {"since": version})
+        diff = json.loads(response.content)
+        self.assertEqual(diff["since"], version)
+        self.assertEqual(diff["version"], version + 2)
+        self.assertEqual([row["name"] for row in diff["changed"]], ["Python 3"])
+        self.assertEqual(diff["removed"], [django_id])
+        # versions whose rows are unknown get the whole snapshot
+        response = self.client.get(self.url, {"since": version + 10})
+        self.assertEqual(len(json.loads(response.content)["rows"]), 1)
+
+    def test_derived_values_capped(self):
+        snapshot = reference_data.snapshot("skill")
+        for since in range(REFERENCE_DATA_DERIVED_SIZE + 5):
+            snapshot.derived("diff:%s" % since, len)
+        self.assertEqual(len(snapshot._derived), REFERENCE_DATA_DERIVED_SIZE)
+        # the oldest are dropped first
+        self.assertNotIn("diff:0", snapshot._derived)
+        self.assertIn("diff:%s" % (REFERENCE_DATA_DERIVED_SIZE + 4), snapshot._derived)
+
+    def test_dropdown_lists(self):
+        response = self.client.get(
+            "/api-recruiter/skill/list/",
+            HTTP_AUTHORIZATION="Token " + self.token.key,
+        )
+        data = json.loads(response.content)
+        self.assertFalse(data["error"])
+        self.assertEqual(
+            [(row["id"], row["name"]) for row in data["skills"]],
+            [(self.django.id, "Django"), (self.python.id, "Python")],
+        )
+
+
+class recruiter_jobs_list_test(TestCase):
+    def setUp(self):
+        company = Company.objects.create(
+            name="agency", website="agency.com", company_type="Consultant"
+        )
+        self.recruiter = User.objects.create(
+            email="recruiter@mp.com",
+            username="recruiter",
+            user_type="RR",
+            is_active=True,
+            company=company,
+        )
+        self.other = User.objects.create(
+            email="other@mp.com", username="other", user_type="RR", company=company
+        )
+        self.token = Token.objects.create(user=self.recruiter)
+        self.skill = Skill.objects.create(name="Python", slug="python", status="Active")
+        country = Country.objects.create(name="India", slug="india")
+        state = State.objects.create(name="Telangana", country=country, slug="telangana")
+        self.city = City.objects.create(
+            name="Hyderabad", slug="hyderabad", state=state, internship_text=""
+        )
+        self.jobs = []
+        self.add_jobs(self.recruiter, 12)
+        # assigned to the recruiter as well, listed once
+        for job_post in self.add_jobs(self.other, 3):
+            job_post.agency_recruiters.add(self.recruiter, self.other)
+        self.add_jobs(self.other, 2)
+        self.applied = AppliedJobs.objects.create(
+            job_post=self.jobs[0], user=self.other, status="Pending"
+        )
+        AppliedJobs.objects.create(
+            job_post=self.jobs[0], user=self.recruiter, status="Pending"
+        )
+
+    def add_jobs(self, user, count):
+        jobs = []
+        for i in range(count):
+            job_post = JobPost.objects.create(
+                user=user,
+                title="job %d" % len(self.jobs),
+                vacancies=1,
+                job_type="full-time",
+                status="Live",
+            )
+            job_post.skills.add(self.skill)
+            job_post.location.add(self.city)
+            jobs.append(job_post)
+        self.jobs.extend(jobs)
+        return jobs
+
+    def jobs_list(self, **data):
+        return json.loads(
+            self.client.post(
+                "/api-recruiter/job/list/",
+                data,
+                HTTP_AUTHORIZATION="Token " + self.token.key,
+            ).content
+        )
+
+    def test_cursor_pages(self):
+        visible = sorted((job.id for job in self.jobs[:15]), reverse=True)
+        first = self.jobs_list()
+        self.assertEqual((first["total"], first["total_is_estimate"]), (15, False))
+        self.assertEqual(first["last_page"], 2)
+        self.assertEqual([job["id"] for job in first["jobs_list"]], visible[:10])
+        self.assertIsNone(first["previous_cursor"])
+        second = self.jobs_list(after=first["next_cursor"])
+        self.assertEqual([job["id"] for job in second["jobs_list"]], visible[10:])
+        self.assertIsNone(second["next_cursor"])
+        back = self.jobs_list(before=second["previous_cursor"])
+        self.assertEqual(back["jobs_list"], first["jobs_list"])
+        self.assertEqual(
+            self.jobs_list(page=2)["jobs_list"], second["jobs_list"]
+        )
+        responses = {job["id"]: job["responses"] for job in second["jobs_list"]}
+        self.assertEqual(responses[self.jobs[0].id], 2)
+        applicants = second["jobs_list"][-1]["applicants"]
+        self.assertEqual((applicants["pending"], applicants["today"]), (2, 2))
+        self.assertEqual(second["jobs_list"][-1]["skills"][0]["name"], "Python")
+        self.applied.delete()
+        responses = {
+            job["id"]: job["responses"]
+            for job in self.jobs_list(page=2)["jobs_list"]
+        }
+        self.assertEqual(responses[self.jobs[0].id], 1)
+
+    def test_query_count_per_page(self):
+        with CaptureQueriesContext(connection) as small:
+            self.jobs_list()
+        self.add_jobs(self.recruiter, 30)
+        for job_post in self.jobs[-30:]:
+            job_post.industry.add(
+                Industry.objects.create(name=job_post.title, status="Active")
+            )
+        with CaptureQueriesContext(connection) as large:
+            self.jobs_list(after=self.jobs[-1].id)
+        self.assertEqual(len(small), len(large))
+        # token, user, count, page and one query per many-to-many field
+        self.assertLessEqual(len(large), 4 + len(JOB_LIST_PREFETCH) + 2)
+
+    def test_estimated_total(self):
+        count, exact = estimated_count(recruiter_jobs(self.recruiter), limit=5)
+        self.assertFalse(exact)
+        self.assertGreaterEqual(count, 6)
@@ -17,6 +17,8 @@ from recruiter.views import (
     delete_job,
     applicants,
     multiple_resume_upload,
+    resume_batch_upload,
+    resume_batch_status,
 
     new_user,
     user_password_reset,
@@ -166,6 +168,12 @@ urlpatterns = [
         multiple_resume_upload,
         name="multiple_resume_upload",
     ),
+    url(r"^resume/batch/$", resume_batch_upload, name="resume_batch_upload"),
+    url(
+        r"^resume/batch/(?P<batch_id>[0-9]+)/$",
+        resume_batch_status,
+        name="resume_batch_status",
+    ),
     url(r"^resume/view/(?P<resume_id>[a-zA-Z0-9]+)/$", resume_view, name="resume_view"),
     url(r"^resume/edit/(?P<resume_id>[a-zA-Z0-9]+)/$", resume_edit, name="resume_edit"),
     # mail templates
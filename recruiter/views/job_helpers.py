@@ -98,7 +98,6 @@ from mpcomp.views import (
     get_next_month,
     get_aws_file_path,
     get_resume_data,
-    handle_uploaded_file,
 )
 
 
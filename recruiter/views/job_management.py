@@ -8,7 +8,8 @@ from django.template import loader, Template, Context
 from django.template.loader import render_to_string
 from datetime import datetime
 from django.utils import timezone
-from django.db.models import Q, Count
+from django.db.models import Q
+from django.db.models.functions import Coalesce
 
 
 from dashboard.tasks import send_email
@@ -57,7 +58,7 @@ def jobs_list(request):
             .exclude(status="Disabled")
             .exclude(status="Expired")
             .prefetch_related("location", "agency_recruiters")
-            .annotate(responses=Count("appliedjobs"))
+            .annotate(responses=Coalesce("applicant_tally__total", 0))
             .order_by("-id")
         )
     elif request.user.is_agency_recruiter:
@@ -68,7 +69,7 @@ def jobs_list(request):
             .exclude(status="Disabled")
             .exclude(status="Expired")
             .prefetch_related("location", "agency_recruiters")
-            .annotate(responses=Count("appliedjobs"))
+            .annotate(responses=Coalesce("applicant_tally__total", 0))
             .order_by("-id")
             .distinct()
         )
@@ -78,7 +79,7 @@ def jobs_list(request):
             .exclude(status="Disabled")
             .exclude(status="Expired")
             .prefetch_related("location", "agency_recruiters")
-            .annotate(responses=Count("appliedjobs"))
+            .annotate(responses=Coalesce("applicant_tally__total", 0))
             .order_by("-id")
         )
     items_per_page = 10
@@ -98,7 +98,6 @@ from mpcomp.views import (
     get_next_month,
     get_aws_file_path,
     get_resume_data,
-    handle_uploaded_file,
 )
 
 
@@ -209,7 +208,6 @@ def edit_profile(request):
         user.technical_skills.add(*request.POST.getlist("technical_skills"))
         user.industry.add(*request.POST.getlist("industry"))
         user.functional_area.add(*request.POST.getlist("functional_area"))
-        user.profile_completeness = user.profile_completion_percentage
         user.save()
         data = {
             "error": False,
@@ -9,10 +9,12 @@ import math
 import random
 import time
 from mpcomp.s3_utils import S3Connection
-import csv
-from collections import OrderedDict
 
-from django.http.response import HttpResponse, HttpResponseRedirect
+from django.http.response import (
+    HttpResponse,
+    HttpResponseRedirect,
+    StreamingHttpResponse,
+)
 from django.shortcuts import render, get_object_or_404
 from django.conf import settings
 from django.urls import reverse
@@ -28,12 +30,13 @@ from django.contrib.auth import update_session_auth_hash
 from django.template.defaultfilters import slugify
 from django.contrib.auth.models import Permission, ContentType
 from django.db.models import Case, When
-import boto3
 from django.contrib.auth import load_backend
 
 
 from mpcomp.aws import AWS
-from dashboard.tasks import sending_mail, send_email
+from recruiter.exports import applicants_queryset, stream_applicants_csv
+from recruiter.resume_ingestion import create_resume_batch
+from dashboard.tasks import exporting_applicants, sending_mail, send_email
 from django.utils.crypto import get_random_string
 from mpcomp.facebook import GraphAPI, get_access_token_from_code
 from mpcomp.views import get_absolute_url
@@ -70,6 +73,7 @@ from peeldb.models import (
     AGENCY_RECRUITER_JOB_TYPE,
     AgencyApplicants,
     AgencyResume,
+    ResumeBatch,
     POST,
     UserMessage,
 )
@@ -98,7 +102,6 @@ from mpcomp.views import (
     get_next_month,
     get_aws_file_path,
     get_resume_data,
-    handle_uploaded_file,
 )
 
 
@@ -246,7 +249,6 @@ def multiple_resume_upload(request):
         size = resume.size / 1024
         if str(resume.content_type) in sup_formates:
             if size < 300 and size > 0:
-                handle_uploaded_file(resume, resume.name)
                 email, mobile, text = get_resume_data(resume)
                 if not email:
                     data = {"error": True, "data": "Resume Must contain Email address"}
@@ -350,6 +352,52 @@ def multiple_resume_upload(request):
 
 
 
+@recruiter_login_required
+def resume_batch_upload(request):
+    if request.method == "POST":
+        files = request.FILES.getlist("files")
+        if not files:
+            data = {"error": True, "data": "Upload a zip or a set of resumes"}
+            return HttpResponse(json.dumps(data))
+        batch = create_resume_batch(
+            request.user,
+            files,
+            request.POST.getlist("job_post"),
+            ip_address=request.META.get("REMOTE_ADDR", ""),
+            user_agent=request.META.get("HTTP_USER_AGENT", ""),
+        )
+        data = {
+            "error": False,
+            "data": "Resumes Uploaded Successfully, they are being added to the pool",
+            "batch_id": batch.id,
+            "status_url": request.path + str(batch.id) + "/",
+        }
+        return HttpResponse(json.dumps(data))
+    message = (
+        "Sorry, Page not available, Url may be mispelled or Page not available anymore"
+    )
+    return render(request, "recruiter/recruiter_404.html", {"message": message})
+
+
+@recruiter_login_required
+def resume_batch_status(request, batch_id):
+    batch = ResumeBatch.objects.filter(id=batch_id, uploaded_by=request.user).first()
+    if not batch:
+        data = {"error": True, "data": "Batch not found"}
+        return HttpResponse(json.dumps(data))
+    data = {
+        "error": False,
+        "status": batch.status,
+        "total": batch.total,
+        "processed": batch.processed,
+        "created": batch.created,
+        "duplicates": batch.duplicates,
+        "failed": batch.failed,
+        "errors": batch.errors,
+    }
+    return HttpResponse(json.dumps(data))
+
+
 @recruiter_login_required
 def resume_pool(request):
     if request.POST.getlist("applicants"):
@@ -605,63 +653,37 @@ def resume_edit(request, resume_id):
 
 
 
+@recruiter_login_required
 def download_applicants(request, jobpost_id, status):
-    search_locations = ""
-    search_skills = ""
+    if request.user.is_agency_admin:
+        jobposts = JobPost.objects.filter(user__company=request.user.company)
+    else:
+        jobposts = JobPost.objects.filter(
+            Q(agency_recruiters__in=[request.user]) | Q(user=request.user)
+        ).distinct()
+    jobpost_id = get_object_or_404(jobposts, id=jobpost_id).id
+    search_locations = []
+    search_skills = []
     if request.GET.get("search_skills"):
         search_skills = request.GET.get("search_skills").split(",")
     if request.GET.get("search_locations"):
         search_locations = request.GET.get("search_locations").split(",")
-    all_applicants = (
-        AppliedJobs.objects.filter(job_post=jobpost_id)
-        .prefetch_related("user", "resume_applicant")
-        .distinct()
-    )
-    pending_applicants = all_applicants.filter(status=status.capitalize())
-    if search_skills or search_locations:
-        pending_applicants = pending_applicants.filter(
-            Q(user__current_city__id__in=search_locations)
-            | Q(user__skills__skill__id__in=search_skills)
+    if request.GET.get("export") == "background":
+        exporting_applicants.delay(
+            jobpost_id, status, search_skills, search_locations, request.user.id
         )
-    response = HttpResponse(content_type="text/csv")
+        data = {
+            "error": False,
+            "response": "We will mail you the download link once the export is ready",
+        }
+        return HttpResponse(json.dumps(data))
+    applicants = applicants_queryset(
+        jobpost_id, status, search_skills, search_locations
+    )
+    response = StreamingHttpResponse(
+        stream_applicants_csv(applicants, status), content_type="text/csv"
+    )
     response["Content-Disposition"] = (
         "attachment; filename=" + status + "_applicants.csv"
     )
-    headers = OrderedDict()
-    headers["first_name"] = "Firstname"
-    headers["last_name"] = "Lastname"
-    headers["email"] = "Email"
-    headers["mobile"] = "Phone Number"
-    headers["location"] = "Current Location"
-    headers["permanent_address"] = "Permanent Address"
-    headers["resume"] = "Resume"
-    headers["status"] = "Status"
-    writer = csv.DictWriter(response, fieldnames=headers)
-    writer.writerow(headers)
-    s3_client = boto3.client(
-        's3',
-        aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-        aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY
-    )
-    for user in pending_applicants:
-        if user.user.resume:
-            stored_url = s3_client.generate_presigned_url(
-                'get_object',
-                Params={'Bucket': settings.AWS_STORAGE_BUCKET_NAME, 'Key': user.user.resume},
-                ExpiresIn=600
-            )
-        else:
-            stored_url = ""
-        writer.writerow(
-            {
-                "email": user.user.email,
-                "first_name": user.user.first_name,
-                "last_name": user.user.last_name,
-                "location": user.user.current_city,
-                "mobile": user.user.mobile,
-                "resume": stored_url,
-                "status": status,
-                "permanent_address": user.user.permanent_address,
-            }
-        )
     return response
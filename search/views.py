@@ -7,31 +7,29 @@ from django.http.response import HttpResponse, HttpResponseRedirect
 from django.shortcuts import redirect, render
 from django.template.defaultfilters import slugify
 from django.db.models import Q, F
-from haystack.query import SQ, SearchQuerySet
 from django.http import QueryDict
 
 # from haystack.views import SearchView
 
+from mpcomp.autocomplete import AUTOCOMPLETE_LIMIT, autocomplete
 from mpcomp.views import (
     get_prev_after_pages_count,
-    get_valid_locations_list,
-    get_valid_skills_list,
     get_meta_data,
     get_404_meta,
+    resolve_slugs,
 )
+from mpcomp.listing_cache import cache_listing, skill_location_tags
 from peeldb.models import (
     City,
-    FunctionalArea,
-    Industry,
     JobPost,
     Qualification,
     Skill,
     State,
 )
+from peeldb.search_log import record_search
 from pjob.refine_search import refined_search
 from pjob.views import get_page_number
 from search.forms import JobSearchForm
-from dashboard.tasks import save_search_results
 
 
 # class search_job(SearchView):
@@ -174,6 +172,7 @@ def custom_search(data, request):
     return {"job_list": []}
 
 
+@cache_listing("custome_search", skill_location_tags)
 def custome_search(request, skill_name, city_name, **kwargs):
     current_url = reverse(
         "custome_search", kwargs={"skill_name": skill_name, "city_name": city_name}
@@ -183,12 +182,11 @@ def custome_search(request, skill_name, city_name, **kwargs):
     if "page" in request.GET:
         url = current_url + request.GET.get("page") + "/"
         return redirect(url, permanent=True)
-    final_skill = get_valid_skills_list(skill_name)
-    final_location = get_valid_locations_list(city_name)
+    names = resolve_slugs(skill=skill_name, city=city_name)
+    final_skill = names["skill"]
+    final_location = names["city"]
     if request.POST:
-        save_search_results.delay(
-            request.META["REMOTE_ADDR"], request.POST, 0, request.user.id
-        )
+        record_search(request.META["REMOTE_ADDR"], request.POST, 0, request.user.id)
     if not final_location or not final_skill:
         template = "404.html"
         return render(
@@ -294,6 +292,7 @@ def custome_search(request, skill_name, city_name, **kwargs):
         )
 
 
+@cache_listing("custom_walkins", skill_location_tags)
 def custom_walkins(request, skill_name, city_name, **kwargs):
     current_url = reverse(
         "custom_walkins", kwargs={"skill_name": skill_name, "city_name": city_name}
@@ -303,13 +302,12 @@ def custom_walkins(request, skill_name, city_name, **kwargs):
     if "page" in request.GET:
         url = current_url + request.GET.get("page") + "/"
         return redirect(url, permanent=True)
-    final_skill = get_valid_skills_list(skill_name)
-    final_location = get_valid_locations_list(city_name)
+    names = resolve_slugs(skill=skill_name, city=city_name)
+    final_skill = names["skill"]
+    final_location = names["city"]
     if not final_location or not final_skill:
         if request.POST:
-            save_search_results.delay(
-                request.META["REMOTE_ADDR"], request.POST, 0, request.user.id
-            )
+            record_search(request.META["REMOTE_ADDR"], request.POST, 0, request.user.id)
         location = final_location or [city_name]
         skills = final_skill or [skill_name]
         template = "404.html"
@@ -419,181 +417,56 @@ def custom_walkins(request, skill_name, city_name, **kwargs):
         )
 
 
+def suggestions_response(suggestions):
+    the_data = json.dumps({"results": suggestions[:AUTOCOMPLETE_LIMIT]})
+    return HttpResponse(the_data, content_type="application/json")
+
+
 def skill_auto_search(request):
     text = request.GET.get("text", "").split(", ")[:-1]
     search = request.GET.get("q", "")
-    sqs = (
-        SearchQuerySet()
-        .models(Skill)
-        .filter_and(SQ(skill_name__contains=search) | SQ(skill_slug__contains=search))
-    )
-    if text:
-        sqs = sqs.exclude(skill_name__in=text)
-    suggestions = [
-        {
-            "name": result.skill_name,
-            "slug": result.skill_slug,
-            "jobs_count": result.no_of_jobposts,
-            "id": result.pk,
-        }
-        for result in sqs
-    ]
-    suggestions = sorted(suggestions, key=lambda k: len(k["name"]), reverse=False)
+    suggestions = autocomplete.search("skill", search, exclude=text)
     if not request.GET.get("search") == "filter":
-        deg = (
-            SearchQuerySet()
-            .models(Qualification)
-            .filter_and(SQ(edu_name__contains=search) | SQ(edu_slug__contains=search))
+        suggestions = suggestions + autocomplete.search(
+            "qualification", search, exclude=text
         )
-        if text:
-            deg = deg.exclude(edu_name__in=text)
-        degrees = [
-            {"name": result.edu_name, "id": result.pk, "slug": result.edu_slug}
-            for result in deg
-        ]
-        suggestions = suggestions + degrees
-    # suggestions = sorted(suggestions, key=int(itemgetter('jobs_count'), reverse=True)
-    the_data = json.dumps({"results": suggestions[:10]})
-    return HttpResponse(the_data, content_type="application/json")
+    return suggestions_response(suggestions)
 
 
 def city_auto_search(request):
     text = request.GET.get("text", "").split(", ")[:-1]
     search = request.GET.get("location", "")
-    sqs = SearchQuerySet().models(City).filter(city_name__contains=search)
-    if text:
-        sqs = sqs.exclude(city_name__in=text)
-    suggestions = [
-        {"name": result.city_name, "jobs_count": result.no_of_jobposts, "id": result.pk}
-        for result in sqs
-        if result.no_of_jobposts and int(result.no_of_jobposts or 0) > 0
-    ]
-    suggestions = sorted(suggestions, key=lambda k: len(k["name"]), reverse=False)
+    suggestions = autocomplete.search("city", search, exclude=text)
     if not request.GET.get("search") == "filter":
-        state = (
-            SearchQuerySet()
-            .models(State)
-            .filter_and(
-                SQ(state_name__contains=search) | SQ(state_slug__contains=search)
-            )
+        suggestions = suggestions + autocomplete.search(
+            "city_state", search, exclude=text
         )
-        state = state.exclude(is_duplicate__in=["true"])
-        if text:
-            state = state.exclude(state_name__in=text)
-        states = [
-            {"name": result.state_name, "id": result.pk, "slug": result.state_slug}
-            for result in state
-            if result.no_of_jobposts and int(result.no_of_jobposts or 0) > 0
-        ]
-        suggestions = suggestions + states
-    the_data = json.dumps({"results": suggestions[:10]})
-    return HttpResponse(the_data, content_type="application/json")
+    return suggestions_response(suggestions)
 
 
 def industry_auto_search(request):
-    search_term = request.GET.get("industry", "")
-    print(f"Debug: Search term: '{search_term}'")
-    
-    # Check total industries in database
-    total_industries = Industry.objects.count()
-    print(f"Debug: Total industries in database: {total_industries}")
-    
-    # Get all industries from SearchQuerySet without filter
-    all_sqs = SearchQuerySet().models(Industry)
-    print(f"Debug: All SearchQuerySet industries count: {all_sqs.count()}")
-    print(f"Debug: All SearchQuerySet industries (first 10): {[result.industry_name for result in all_sqs]}")
-    
-    # Now apply the filter
-    sqs = (
-        SearchQuerySet()
-        .models(Industry)
-        .filter(industry_name__icontains=search_term)
+    return suggestions_response(
+        autocomplete.search("industry", request.GET.get("industry", ""))
     )
-    print(f"Debug: Filtered SearchQuerySet count: {sqs.count()}")
-    print(f"Debug: Filtered SearchQuerySet results: {list(sqs)}")
-    
-    suggestions = [
-        {
-            "name": result.industry_name.split("/")[0],
-            "jobs_count": result.no_of_jobposts,
-            "id": result.pk,
-            "slug": result.industry_slug,
-        }
-        for result in sqs
-    ]
-    print(f"Debug: Suggestions count: {len(suggestions)}")
-    print(f"Debug: First 5 suggestions: {suggestions[:5]}")
-    
-    # suggestions = sorted(suggestions, key=lambda k: int(k['jobs_count']), reverse=True)
-    the_data = json.dumps({"results": suggestions[:10]})
-    print(f"Debug: Final results count: {len(json.loads(the_data)['results'])}")
-    return HttpResponse(the_data, content_type="application/json")
 
 
 def functional_area_auto_search(request):
-    sqs = (
-        SearchQuerySet()
-        .models(FunctionalArea)
-        .filter(functionalarea_name__contains=request.GET.get("functional_area", ""))[
-            :10
-        ]
+    return suggestions_response(
+        autocomplete.search("functional_area", request.GET.get("functional_area", ""))
     )
-    suggestions = [
-        {"name": result.functionalarea_name, "jobs_count": result.no_of_jobposts}
-        for result in sqs
-    ]
-    suggestions = sorted(suggestions, key=lambda k: int(k["jobs_count"]), reverse=True)
-    the_data = json.dumps({"results": suggestions})
-    return HttpResponse(the_data, content_type="application/json")
 
 
 def education_auto_search(request):
-    degrees = (
-        SearchQuerySet()
-        .models(Qualification)
-        .filter_and(
-            SQ(edu_name__contains=request.GET.get("education", ""))
-            | SQ(edu_slug__contains=request.GET.get("education", ""))
-        )
+    return suggestions_response(
+        autocomplete.search("qualification", request.GET.get("education", ""))
     )
-    suggestions = [
-        {
-            "name": result.edu_name,
-            "id": result.pk,
-            "slug": result.edu_slug,
-            "jobs_count": result.no_of_jobposts or 0,
-        }
-        for result in degrees
-    ]
-    suggestions = sorted(suggestions, key=lambda k: int(k["jobs_count"]), reverse=True)
-    the_data = json.dumps({"results": suggestions[:10]})
-    return HttpResponse(the_data, content_type="application/json")
 
 
 def state_auto_search(request):
     text = request.GET.get("text", "").split(", ")[:-1]
-    states = (
-        SearchQuerySet()
-        .models(State)
-        .filter_and(
-            SQ(state_name__contains=request.GET.get("state", ""))
-            | SQ(state_slug__contains=request.GET.get("state", ""))
-        )
+    return suggestions_response(
+        autocomplete.search("state", request.GET.get("state", ""), exclude=text)
     )
-    if text:
-        states = states.exclude(state_name__in=text)
-    suggestions = [
-        {
-            "name": result.state_name,
-            "id": result.pk,
-            "slug": result.state_slug,
-            "jobs_count": result.no_of_jobposts or 0,
-        }
-        for result in states
-    ]
-    suggestions = sorted(suggestions, key=lambda k: int(k["jobs_count"]), reverse=True)
-    the_data = json.dumps({"results": suggestions[:10]})
-    return HttpResponse(the_data, content_type="application/json")
 
 
 def search_slugs(request):
@@ -1,12 +1,6 @@
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from email.mime.application import MIMEApplication
 from datetime import datetime
-import boto3
 import requests
-import os
 
-from django.template import loader
 from django.shortcuts import render
 from django.http.response import HttpResponseRedirect
 from django.contrib.auth import authenticate, login
@@ -23,6 +17,7 @@ from peeldb.models import (
     JobPost,
     AppliedJobs,
 )
+from dashboard.applications import notify_application
 from mpcomp.facebook import GraphAPI, get_access_token_from_code
 
 from urllib.parse import parse_qsl
@@ -41,52 +36,14 @@ def login_and_apply(request):
     if job_post:
         if not AppliedJobs.objects.filter(user=request.user, job_post=job_post):
             if request.user.resume or request.user.profile_completion_percentage >= 50:
-                AppliedJobs.objects.create(
+                applied_job = AppliedJobs.objects.create(
                     user=request.user,
                     job_post=job_post,
                     status="Pending",
                     ip_address=request.META["REMOTE_ADDR"],
                     user_agent=request.META["HTTP_USER_AGENT"],
                 )
-                template_loader = loader.get_template("email/applicant_apply_job.html")
-                context = {
-                    "user": request.user,
-                    "recruiter": job_post.user,
-                    "job_post": job_post,
-                }
-                rendered = template_loader.render(context)
-                msg = MIMEMultipart()
-                msg["Subject"] = "CareerLite - The best Job Portal"
-                msg["From"] = settings.DEFAULT_FROM_EMAIL
-                msg["To"] = job_post.user.email
-                part = MIMEText(rendered, "html")
-                msg.attach(part)
-                if request.user.resume and os.path.exists(
-                    str(request.user.email) + ".docx"
-                ):
-                    resume_part = MIMEApplication(
-                        open(str(request.user.email) + ".docx", "rb").read()
-                    )
-                    resume_part.add_header(
-                        "Content-Disposition",
-                        "attachment",
-                        filename=str(request.user.email) + ".docx",
-                    )
-                    msg.attach(resume_part)
-                    os.remove(str(request.user.email) + ".docx")
-                
-                # Use boto3 SES client
-                ses_client = boto3.client(
-                    'ses',
-                    region_name='eu-west-1',
-                    aws_access_key_id=settings.AM_ACCESS_KEY,
-                    aws_secret_access_key=settings.AM_PASS_KEY,
-                )
-                ses_client.send_raw_email(
-                    Source=msg["From"],
-                    Destinations=[msg["To"]],
-                    RawMessage={'Data': msg.as_string()}
-                )
+                notify_application(applied_job)
                 return job_post, "applied"
         return job_post, "apply"
     return False